@@ -10,6 +10,7 @@ import time
 import json
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional, Union, Tuple
 
 # 确保app目录在Python路径中
@@ -20,13 +21,51 @@ if APP_DIR not in sys.path:
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_rate_limiter import RateLimitedClient
+from app.data_collectors.latest_prices import store_latest_prices
 
 # 配置日志
 logger = logging.getLogger('binance_data_collector')
 
+# K线周期对应的毫秒数（1M按自然月计算，不支持增量获取）
+INTERVAL_MILLISECONDS = {
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000
+}
+
+# K线数据写入列，按 (trading_pair, interval_type, timestamp) 唯一键去重更新
+KLINE_COLUMNS = (
+    'trading_pair', 'interval_type', 'timestamp', 'open_price', 'high_price', 'low_price', 'close_price',
+    'volume', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_volume', 'taker_buy_quote_volume',
+    'retrieved_at'
+)
+KLINE_UPDATE_COLUMNS = KLINE_COLUMNS[3:]
+
+# 市场资金流向数据写入列
+FUND_FLOW_COLUMNS = (
+    'timestamp', 'crypto_symbol', 'inflow_amount', 'change_rate', 'volume_24h', 'funding_rate',
+    'open_interest', 'liquidations_24h', 'data_source', 'retrieved_at'
+)
+FUND_FLOW_UPDATE_COLUMNS = (
+    'inflow_amount', 'change_rate', 'volume_24h', 'funding_rate', 'open_interest', 'liquidations_24h',
+    'retrieved_at'
+)
+
 def initialize_binance_client(api_key: str, api_secret: str, testnet: bool = True) -> Client:
     """
-    初始化Binance API客户端
+    初始化Binance API客户端，客户端的所有请求都经过进程内共享的请求权重限流器
 
     Args:
         api_key (str): Binance API Key
@@ -37,7 +76,7 @@ def initialize_binance_client(api_key: str, api_secret: str, testnet: bool = Tru
         Client: Binance API客户端实例
     """
     try:
-        client = Client(api_key, api_secret, testnet=testnet)
+        client = RateLimitedClient(api_key, api_secret, testnet=testnet)
         # 测试连接
         server_time = client.get_server_time()
         logger.info(f"成功连接到Binance API，服务器时间: {datetime.datetime.fromtimestamp(server_time['serverTime']/1000)}")
@@ -76,7 +115,8 @@ def fetch_crypto_price_data(client: Client, symbol: str = 'BTCUSDT') -> Dict[str
         logger.error(f"获取{symbol}价格数据失败: {e}")
         return None
 
-def fetch_kline_data(client: Client, symbol: str = 'BTCUSDT', interval: str = '1h', limit: int = 100) -> List[Dict[str, Any]]:
+def fetch_kline_data(client: Client, symbol: str = 'BTCUSDT', interval: str = '1h', limit: int = 100,
+                     start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     获取加密货币K线数据
 
@@ -85,12 +125,20 @@ def fetch_kline_data(client: Client, symbol: str = 'BTCUSDT', interval: str = '1
         symbol (str): 交易对，例如：BTCUSDT
         interval (str): K线间隔，例如：1m, 5m, 1h, 1d
         limit (int): 获取的K线数量，最大1000
+        start_time (Optional[int]): 起始开盘时间（毫秒时间戳），指定后从该时间起向后获取
+        end_time (Optional[int]): 截止开盘时间（毫秒时间戳）
 
     Returns:
         List[Dict[str, Any]]: K线数据列表
     """
     try:
-        klines = client.get_klines(symbol=symbol, interval=interval, limit=limit)
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+        if end_time is not None:
+            params['endTime'] = int(end_time)
+
+        klines = client.get_klines(**params)
         kline_data = []
 
         for k in klines:
@@ -118,6 +166,89 @@ def fetch_kline_data(client: Client, symbol: str = 'BTCUSDT', interval: str = '1
         logger.error(f"获取{symbol} {interval}周期K线数据失败: {e}")
         return None
 
+def fetch_kline_data_since(client: Client, symbol: str, interval: str,
+                           last_open_time: datetime.datetime, max_limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+    """
+    增量获取K线数据：只获取已存储的最后一根K线及其之后的K线
+
+    已存储的最后一根K线可能在上次收集时尚未收盘，因此从它的开盘时间开始获取，
+    以便用收盘后的数据覆盖它。缺口超过单次请求上限时会分页获取。
+
+    Args:
+        client (Client): Binance API客户端实例
+        symbol (str): 交易对，例如：BTCUSDT
+        interval (str): K线间隔，例如：1m, 5m, 1h, 1d
+        last_open_time (datetime.datetime): 数据库中该交易对和周期最后一根K线的开盘时间
+        max_limit (int): 单次请求的最大K线数量
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: K线数据列表，请求失败时返回None
+    """
+    interval_ms = INTERVAL_MILLISECONDS.get(interval)
+    if interval_ms is None:
+        logger.warning(f"不支持增量获取{interval}周期K线，改为按数量获取")
+        return fetch_kline_data(client, symbol=symbol, interval=interval, limit=max_limit)
+
+    start_time = int(last_open_time.timestamp() * 1000)
+    now_ms = int(time.time() * 1000)
+    kline_data = []
+
+    while True:
+        # 按缺口大小请求，K线数量越少请求权重越低
+        missing = (now_ms - start_time) // interval_ms + 1
+        limit = int(max(1, min(max_limit, missing)))
+
+        batch = fetch_kline_data(client, symbol=symbol, interval=interval, limit=limit, start_time=start_time)
+        if batch is None:
+            return kline_data or None
+
+        kline_data.extend(batch)
+        if len(batch) < limit:
+            break
+
+        last_batch_open = datetime.datetime.strptime(batch[-1]['timestamp'], "%Y-%m-%d %H:%M:%S")
+        start_time = int(last_batch_open.timestamp() * 1000) + interval_ms
+        if start_time > now_ms:
+            break
+
+    return kline_data
+
+def get_latest_kline_times(db_config: Dict[str, Any],
+                           trading_pairs: Optional[List[str]] = None) -> Dict[Tuple[str, str], datetime.datetime]:
+    """
+    查询每个交易对和K线周期在数据库中最后一根K线的开盘时间
+
+    Args:
+        db_config (Dict[str, Any]): 数据库配置
+        trading_pairs (Optional[List[str]]): 交易对过滤，为None时查询全部
+
+    Returns:
+        Dict[Tuple[str, str], datetime.datetime]: {(trading_pair, interval_type): 最后开盘时间}
+    """
+    db_manager = DatabaseManager(db_config)
+    latest_times = {}
+
+    try:
+        # 主键 (trading_pair, interval_type, timestamp) 可以直接服务这个分组查询
+        query = """
+        SELECT trading_pair, interval_type, MAX(timestamp)
+        FROM kline_data
+        """
+        params = ()
+        if trading_pairs:
+            query += f" WHERE trading_pair IN ({', '.join(['%s'] * len(trading_pairs))})"
+            params = tuple(trading_pairs)
+        query += " GROUP BY trading_pair, interval_type"
+
+        for trading_pair, interval_type, latest_time in db_manager.execute_query(query, params):
+            if latest_time:
+                latest_times[(trading_pair, interval_type)] = latest_time
+
+    except Exception as err:
+        logger.error(f"查询最新K线时间失败: {err}")
+
+    return latest_times
+
 def fetch_funding_rate_data(client: Client, symbol: str = 'BTCUSDT') -> Dict[str, Any]:
     """
     获取合约资金费率数据
@@ -175,13 +306,18 @@ def fetch_open_interest_data(client: Client, symbol: str = 'BTCUSDT') -> Dict[st
         logger.error(f"获取{symbol}未平仓量数据失败: {e}")
         return None
 
-def fetch_market_fund_flow_data(client: Client, symbols: List[str] = ['BTCUSDT', 'ETHUSDT']) -> List[Dict[str, Any]]:
+def fetch_market_fund_flow_data(client: Client, symbols: List[str] = ['BTCUSDT', 'ETHUSDT'],
+                                max_workers: int = 8) -> List[Dict[str, Any]]:
     """
     获取多个加密货币的市场资金流向数据
 
+    24小时行情和资金费率（premiumIndex）各用一次批量请求获取全部交易对，
+    只有未平仓量需要逐个交易对请求，这部分通过有界线程池并发执行。
+
     Args:
         client (Client): Binance API客户端实例
         symbols (List[str]): 交易对列表
+        max_workers (int): 并发请求未平仓量的最大线程数
 
     Returns:
         List[Dict[str, Any]]: 市场资金流向数据列表
@@ -189,46 +325,77 @@ def fetch_market_fund_flow_data(client: Client, symbols: List[str] = ['BTCUSDT',
     market_data_list = []
     current_time = datetime.datetime.now()
 
-    for symbol in symbols:
-        try:
-            # 获取24小时价格变动
-            ticker = client.get_ticker(symbol=symbol)
-
-            # 获取资金费率（如果可用）
-            try:
-                funding_rate = client.futures_funding_rate(symbol=symbol, limit=1)[0]['fundingRate']
-            except:
-                funding_rate = 0
+    if not symbols:
+        return market_data_list
 
-            # 获取未平仓量（如果可用）
+    # 一次请求获取所有交易对的24小时行情
+    try:
+        tickers = None
+        if len(symbols) <= 100:
             try:
-                open_interest = client.futures_open_interest(symbol=symbol)['openInterest']
-            except:
-                open_interest = 0
-
-            # 计算加密货币符号（例如：从BTCUSDT提取BTC）
-            crypto_symbol = symbol.replace('USDT', '')
-
-            market_data = {
-                "timestamp": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "crypto_symbol": crypto_symbol,
-                "inflow_amount": float(ticker['quoteVolume']) * 0.01,  # 这里用成交量的1%作为净流入的估计值
-                "change_rate": float(ticker['priceChangePercent']),
-                "volume_24h": float(ticker['volume']),
-                "funding_rate": float(funding_rate),
-                "open_interest": float(open_interest),
-                "liquidations_24h": 0,  # 需要额外API获取，此处暂设为0
-                "data_source": "Binance API",
-                "retrieved_at": current_time.strftime("%Y-%m-%d %H:%M:%S")
-            }
+                tickers = client.get_ticker(symbols=json.dumps(list(symbols), separators=(',', ':')))
+            except BinanceAPIException as e:
+                # 列表中有无效或已下架的交易对时整个请求失败，改为获取全市场行情后按交易对筛选
+                logger.warning(f"按交易对批量获取24小时行情失败，改为获取全市场行情: {e}")
+        if tickers is None:
+            # 交易对较多时直接获取全市场行情，权重更低
+            tickers = client.get_ticker()
+        wanted = set(symbols)
+        tickers_by_symbol = {ticker['symbol']: ticker for ticker in tickers if ticker['symbol'] in wanted}
+    except (BinanceAPIException, BinanceRequestException) as e:
+        logger.error(f"批量获取24小时行情失败: {e}")
+        return market_data_list
 
-            market_data_list.append(market_data)
-            logger.info(f"成功获取{symbol}市场资金流向数据")
+    # 一次请求获取所有合约的资金费率（如果可用）
+    funding_rates = {}
+    try:
+        for premium in client.futures_mark_price():
+            funding_rates[premium['symbol']] = premium.get('lastFundingRate') or 0
+    except Exception as e:
+        logger.warning(f"批量获取资金费率失败，资金费率按0处理: {e}")
+
+    # 未平仓量只能逐个获取，只请求有合约的交易对
+    open_interests = {}
+    futures_symbols = [symbol for symbol in symbols if symbol in funding_rates]
+    if futures_symbols:
+        def fetch_open_interest(symbol):
+            return client.futures_open_interest(symbol=symbol)['openInterest']
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(futures_symbols))),
+                                thread_name_prefix='open-interest') as executor:
+            futures = {executor.submit(fetch_open_interest, symbol): symbol for symbol in futures_symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    open_interests[symbol] = future.result()
+                except Exception as e:
+                    logger.warning(f"获取{symbol}未平仓量失败，按0处理: {e}")
 
-        except (BinanceAPIException, BinanceRequestException) as e:
-            logger.error(f"获取{symbol}市场资金流向数据失败: {e}")
+    for symbol in symbols:
+        ticker = tickers_by_symbol.get(symbol)
+        if not ticker:
+            logger.error(f"获取{symbol}市场资金流向数据失败: 行情中没有该交易对")
             continue
 
+        # 计算加密货币符号（例如：从BTCUSDT提取BTC）
+        crypto_symbol = symbol.replace('USDT', '')
+
+        market_data = {
+            "timestamp": current_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "crypto_symbol": crypto_symbol,
+            "inflow_amount": float(ticker['quoteVolume']) * 0.01,  # 这里用成交量的1%作为净流入的估计值
+            "change_rate": float(ticker['priceChangePercent']),
+            "volume_24h": float(ticker['volume']),
+            "funding_rate": float(funding_rates.get(symbol, 0)),
+            "open_interest": float(open_interests.get(symbol, 0)),
+            "liquidations_24h": 0,  # 需要额外API获取，此处暂设为0
+            "data_source": "Binance API",
+            "retrieved_at": current_time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        market_data_list.append(market_data)
+
+    logger.info(f"成功获取{len(market_data_list)}/{len(symbols)}个交易对的市场资金流向数据")
     return market_data_list
 
 def store_market_fund_flow_data(db_config: Dict[str, Any], flows_data: List[Dict[str, Any]]) -> int:
@@ -247,33 +414,14 @@ def store_market_fund_flow_data(db_config: Dict[str, Any], flows_data: List[Dict
         return 0
 
     db_manager = DatabaseManager(db_config)
-    inserted_count = 0
 
     try:
-        with db_manager.get_connection() as (connection, cursor):
-            add_flow_sql = ("""
-            INSERT INTO market_fund_flows
-            (timestamp, crypto_symbol, inflow_amount, change_rate, volume_24h, funding_rate, open_interest, liquidations_24h, data_source, retrieved_at)
-            VALUES (%(timestamp)s, %(crypto_symbol)s, %(inflow_amount)s, %(change_rate)s, %(volume_24h)s, %(funding_rate)s, %(open_interest)s, %(liquidations_24h)s, %(data_source)s, %(retrieved_at)s)
-            ON DUPLICATE KEY UPDATE
-            inflow_amount=VALUES(inflow_amount),
-            change_rate=VALUES(change_rate),
-            volume_24h=VALUES(volume_24h),
-            funding_rate=VALUES(funding_rate),
-            open_interest=VALUES(open_interest),
-            liquidations_24h=VALUES(liquidations_24h),
-            retrieved_at=VALUES(retrieved_at)
-            """)
-
-            for flow_item in flows_data:
-                try:
-                    cursor.execute(add_flow_sql, flow_item)
-                    inserted_count += 1
-                except Exception as err:
-                    logger.error(f"数据库错误，无法存储{flow_item.get('crypto_symbol')}的资金流向数据: {err}")
-
-            connection.commit()
-            logger.info(f"成功存储了{inserted_count}条市场资金流向数据")
+        inserted_count, failed_rows = db_manager.bulk_upsert(
+            'market_fund_flows', FUND_FLOW_COLUMNS, flows_data, FUND_FLOW_UPDATE_COLUMNS
+        )
+        for index, err in failed_rows:
+            logger.error(f"数据库错误，无法存储{flows_data[index].get('crypto_symbol')}的资金流向数据: {err}")
+        logger.info(f"成功存储了{inserted_count}条市场资金流向数据")
 
     except Exception as err:
         logger.error(f"连接数据库或执行查询时出错: {err}")
@@ -281,6 +429,45 @@ def store_market_fund_flow_data(db_config: Dict[str, Any], flows_data: List[Dict
 
     return inserted_count
 
+def latest_price_rows(kline_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    从K线数据中取出每个交易对开盘时间最新的K线，转换为latest_prices的行
+
+    价格时间取K线收盘时间与获取时间中较早的一个：未收盘K线的收盘价是获取时的价格，
+    已收盘的历史K线不会因为刚获取而覆盖更新的价格。
+
+    Args:
+        kline_data (List[Dict[str, Any]]): K线数据列表
+
+    Returns:
+        List[Dict[str, Any]]: 以LATEST_PRICE_COLUMNS为键的行，每个交易对一行
+    """
+    latest = {}
+    for kline in kline_data:
+        current = latest.get(kline['trading_pair'])
+        if current is None or kline['timestamp'] >= current['timestamp']:
+            latest[kline['trading_pair']] = kline
+
+    rows = []
+    for trading_pair, kline in latest.items():
+        price_time = kline['timestamp']
+        interval_ms = INTERVAL_MILLISECONDS.get(kline['interval_type'])
+        if interval_ms and kline.get('retrieved_at'):
+            open_time = datetime.datetime.strptime(kline['timestamp'], "%Y-%m-%d %H:%M:%S")
+            close_time = (open_time + datetime.timedelta(milliseconds=interval_ms)).strftime("%Y-%m-%d %H:%M:%S")
+            price_time = min(close_time, kline['retrieved_at'])
+        rows.append({
+            'trading_pair': trading_pair,
+            'price': kline['close_price'],
+            'price_time': price_time,
+            'price_source': 'kline',
+            'high_price': kline['high_price'],
+            'low_price': kline['low_price'],
+            'kline_interval': kline['interval_type'],
+            'kline_time': kline['timestamp']
+        })
+    return rows
+
 def store_kline_data(db_config: Dict[str, Any], kline_data: List[Dict[str, Any]]) -> int:
     """
     将K线数据存储到数据库
@@ -297,39 +484,20 @@ def store_kline_data(db_config: Dict[str, Any], kline_data: List[Dict[str, Any]]
         return 0
 
     db_manager = DatabaseManager(db_config)
-    inserted_count = 0
 
     try:
-        with db_manager.get_connection() as (connection, cursor):
-            add_kline_sql = ("""
-            INSERT INTO kline_data
-            (trading_pair, interval_type, timestamp, open_price, high_price, low_price, close_price,
-             volume, quote_asset_volume, number_of_trades, taker_buy_base_volume, taker_buy_quote_volume, retrieved_at)
-            VALUES (%(trading_pair)s, %(interval_type)s, %(timestamp)s, %(open_price)s, %(high_price)s, %(low_price)s,
-                    %(close_price)s, %(volume)s, %(quote_asset_volume)s, %(number_of_trades)s,
-                    %(taker_buy_base_volume)s, %(taker_buy_quote_volume)s, %(retrieved_at)s)
-            ON DUPLICATE KEY UPDATE
-            open_price=VALUES(open_price),
-            high_price=VALUES(high_price),
-            low_price=VALUES(low_price),
-            close_price=VALUES(close_price),
-            volume=VALUES(volume),
-            quote_asset_volume=VALUES(quote_asset_volume),
-            number_of_trades=VALUES(number_of_trades),
-            taker_buy_base_volume=VALUES(taker_buy_base_volume),
-            taker_buy_quote_volume=VALUES(taker_buy_quote_volume),
-            retrieved_at=VALUES(retrieved_at)
-            """)
-
-            for kline_point in kline_data:
-                try:
-                    cursor.execute(add_kline_sql, kline_point)
-                    inserted_count += 1
-                except Exception as err:
-                    logger.error(f"数据库错误，无法存储{kline_point.get('trading_pair')}的K线数据: {err}")
-
-            connection.commit()
-            logger.info(f"成功存储了{inserted_count}条K线数据")
+        inserted_count, failed_rows = db_manager.bulk_upsert(
+            'kline_data', KLINE_COLUMNS, kline_data, KLINE_UPDATE_COLUMNS
+        )
+        for index, err in failed_rows:
+            kline_point = kline_data[index]
+            logger.error(f"数据库错误，无法存储{kline_point.get('trading_pair')} {kline_point.get('timestamp')}的K线数据: {err}")
+        logger.info(f"成功存储了{inserted_count}条K线数据")
+
+        failed_indexes = {index for index, _ in failed_rows}
+        store_latest_prices(db_manager, latest_price_rows(
+            [kline for index, kline in enumerate(kline_data) if index not in failed_indexes]
+        ))
 
     except Exception as err:
         logger.error(f"连接数据库或执行查询时出错: {err}")
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+Binance请求权重限流模块
+进程内共享的令牌桶限流器，所有通过 initialize_binance_client 创建的客户端
+（数据收集、交易执行、仓位管理）共用同一份请求权重预算。
+每次响应后根据 X-MBX-USED-WEIGHT-1M 响应头校准剩余额度，
+在接近限额时主动暂停到下一个分钟窗口，收到429/418时按 Retry-After 暂停所有请求。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import requests
+from binance.client import Client
+
+# 配置日志
+logger = logging.getLogger('binance_rate_limiter')
+
+# 默认每分钟请求权重限额（现货与U本位合约分别计算）
+DEFAULT_WEIGHT_LIMITS = {
+    'spot': 6000,
+    'futures': 2400
+}
+
+# 已知接口的请求权重，未列出的接口按1计算（实际消耗以响应头为准）
+ENDPOINT_WEIGHTS = {
+    'klines': 2,
+    'ticker/price': 2,
+    'ticker/bookTicker': 2,
+    'depth': 5,
+    'account': 20,
+    'openOrders': 6,
+    'allOrders': 20,
+    'exchangeInfo': 20,
+    'premiumIndex': 1,
+    'fundingRate': 1,
+    'openInterest': 1
+}
+
+def estimate_request_weight(uri: str, params: Optional[Dict[str, Any]] = None) -> int:
+    """
+    估算一次请求的权重
+
+    Args:
+        uri (str): 请求地址
+        params (Optional[Dict[str, Any]]): 请求参数
+
+    Returns:
+        int: 估算的请求权重
+    """
+    path = urlparse(uri).path
+    params = params or {}
+    has_symbol = 'symbol' in params
+
+    if path.endswith('ticker/24hr'):
+        if has_symbol:
+            return 2
+        symbols = params.get('symbols')
+        if symbols:
+            count = len(json.loads(symbols)) if isinstance(symbols, str) else len(symbols)
+            return 2 if count <= 20 else 40 if count <= 100 else 80
+        return 80
+
+    if path.endswith('premiumIndex') and not has_symbol:
+        return 10
+
+    if path.endswith('ticker/price') or path.endswith('ticker/bookTicker'):
+        return 2 if has_symbol else 4
+
+    if path.endswith('openOrders') and not has_symbol:
+        return 80
+
+    for endpoint, weight in ENDPOINT_WEIGHTS.items():
+        if path.endswith(endpoint):
+            return weight
+    return 1
+
+def api_family(uri: str) -> str:
+    """根据请求地址区分现货与合约接口"""
+    return 'futures' if '/fapi/' in uri or 'fapi.' in uri else 'spot'
+
+class _WeightBucket:
+    """单个接口族的令牌桶"""
+
+    def __init__(self, weight_limit: int, safety_ratio: float):
+        self.configure(weight_limit, safety_ratio)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.server_used_weight = 0
+
+    def configure(self, weight_limit: int, safety_ratio: float):
+        self.weight_limit = weight_limit
+        self.capacity = max(1.0, weight_limit * safety_ratio)
+        self.refill_per_second = self.capacity / 60.0
+
+    def refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+class BinanceRateLimiter:
+    """
+    Binance请求权重限流器（线程安全）
+    """
+
+    def __init__(self, weight_limits: Optional[Dict[str, int]] = None, safety_ratio: float = 0.8):
+        """
+        初始化限流器
+
+        Args:
+            weight_limits (Optional[Dict[str, int]]): 各接口族每分钟的权重限额，{'spot': 6000, 'futures': 2400}
+            safety_ratio (float): 只使用限额的这一比例，服务端已用权重超过该比例时暂停到下一个分钟窗口
+        """
+        self.safety_ratio = safety_ratio
+        limits = dict(DEFAULT_WEIGHT_LIMITS)
+        limits.update(weight_limits or {})
+
+        self._lock = threading.Lock()
+        self._buckets = {family: _WeightBucket(limit, safety_ratio) for family, limit in limits.items()}
+        self._paused_until = {family: 0.0 for family in self._buckets}
+
+        self._stats = {
+            'requests': 0,
+            'throttled': 0,
+            'throttled_seconds': 0.0,
+            'window_backoffs': 0,
+            'rate_limit_responses': 0
+        }
+
+    def configure(self, weight_limits: Optional[Dict[str, int]] = None, safety_ratio: Optional[float] = None):
+        """
+        更新限额配置
+
+        Args:
+            weight_limits (Optional[Dict[str, int]]): 各接口族每分钟的权重限额
+            safety_ratio (Optional[float]): 安全比例
+        """
+        with self._lock:
+            if safety_ratio is not None:
+                self.safety_ratio = safety_ratio
+            for family, bucket in self._buckets.items():
+                limit = (weight_limits or {}).get(family, bucket.weight_limit)
+                bucket.configure(limit, self.safety_ratio)
+                bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+    def acquire(self, family: str, weight: int = 1):
+        """
+        申请请求权重，额度不足或处于退避期时阻塞等待
+
+        Args:
+            family (str): 接口族，spot或futures
+            weight (int): 请求权重
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._buckets[family]
+                now = time.monotonic()
+                bucket.refill(now)
+
+                paused_for = self._paused_until[family] - now
+                if paused_for > 0:
+                    wait_seconds = paused_for
+                elif bucket.tokens >= min(weight, bucket.capacity):
+                    bucket.tokens -= weight
+                    self._stats['requests'] += 1
+                    if waited:
+                        self._stats['throttled'] += 1
+                        self._stats['throttled_seconds'] += waited
+                    return
+                else:
+                    wait_seconds = (min(weight, bucket.capacity) - bucket.tokens) / bucket.refill_per_second
+
+            wait_seconds = max(wait_seconds, 0.01)
+            waited += wait_seconds
+            time.sleep(wait_seconds)
+
+    def update_from_response(self, response: requests.Response):
+        """
+        根据响应头和状态码校准限流状态
+
+        Args:
+            response (requests.Response): Binance接口响应
+        """
+        family = api_family(response.url or '')
+        headers = response.headers
+        used_weight = headers.get('x-mbx-used-weight-1m') or headers.get('X-MBX-USED-WEIGHT-1M')
+
+        with self._lock:
+            bucket = self._buckets[family]
+            now = time.monotonic()
+
+            if response.status_code in (418, 429):
+                retry_after = headers.get('Retry-After')
+                pause_seconds = float(retry_after) if retry_after else (120.0 if response.status_code == 418 else 60.0)
+                self._paused_until[family] = max(self._paused_until[family], now + pause_seconds)
+                bucket.tokens = 0
+                self._stats['rate_limit_responses'] += 1
+                logger.error(f"Binance返回{response.status_code}限流响应，{family}接口暂停{pause_seconds}秒")
+                return
+
+            if used_weight is None:
+                return
+
+            try:
+                used_weight = int(used_weight)
+            except ValueError:
+                return
+
+            bucket.server_used_weight = used_weight
+            bucket.refill(now)
+            bucket.tokens = min(bucket.tokens, max(0.0, bucket.capacity - used_weight))
+
+            # 服务端已用权重接近限额时，暂停到下一个分钟窗口再继续
+            if used_weight >= bucket.capacity:
+                pause_seconds = 60 - (time.time() % 60) + 0.5
+                if self._paused_until[family] < now + pause_seconds:
+                    self._paused_until[family] = now + pause_seconds
+                    self._stats['window_backoffs'] += 1
+                    logger.warning(f"{family}接口已用权重{used_weight}/{bucket.weight_limit}，暂停{pause_seconds:.1f}秒")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取限流统计信息
+
+        Returns:
+            Dict[str, Any]: 请求数、被限流次数以及各接口族的额度状态
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            now = time.monotonic()
+            for family, bucket in self._buckets.items():
+                bucket.refill(now)
+                stats[family] = {
+                    'weight_limit': bucket.weight_limit,
+                    'available_weight': round(bucket.tokens, 1),
+                    'server_used_weight': bucket.server_used_weight,
+                    'paused_seconds': round(max(0.0, self._paused_until[family] - now), 1)
+                }
+            return stats
+
+# 进程内共享的限流器
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> BinanceRateLimiter:
+    """获取进程内共享的限流器"""
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = BinanceRateLimiter()
+        return _rate_limiter
+
+def configure_rate_limiter(config: Any) -> BinanceRateLimiter:
+    """
+    按配置更新共享限流器的限额
+
+    Args:
+        config: 配置对象
+
+    Returns:
+        BinanceRateLimiter: 共享的限流器
+    """
+    limiter = get_rate_limiter()
+    limiter.configure(
+        weight_limits={
+            'spot': getattr(config, 'BINANCE_REQUEST_WEIGHT_LIMIT', DEFAULT_WEIGHT_LIMITS['spot']),
+            'futures': getattr(config, 'BINANCE_FUTURES_REQUEST_WEIGHT_LIMIT', DEFAULT_WEIGHT_LIMITS['futures'])
+        },
+        safety_ratio=getattr(config, 'BINANCE_WEIGHT_SAFETY_RATIO', 0.8)
+    )
+    return limiter
+
+class RateLimitedClient(Client):
+    """
+    接入共享限流器的Binance客户端：请求前申请权重，响应后按响应头校准
+    """
+
+    def _init_session(self) -> requests.Session:
+        session = super()._init_session()
+        # 响应钩子拿到的是每个请求自己的响应对象，多线程共用客户端时也不会串号
+        session.hooks['response'].append(self._on_response)
+        return session
+
+    def _on_response(self, response, *args, **kwargs):
+        try:
+            get_rate_limiter().update_from_response(response)
+        except Exception as e:
+            logger.error(f"更新限流状态失败: {e}")
+        return response
+
+    def _request(self, method, uri: str, signed: bool, force_params: bool = False, **kwargs):
+        get_rate_limiter().acquire(api_family(uri), estimate_request_weight(uri, kwargs.get('data')))
+        return super()._request(method, uri, signed, force_params, **kwargs)
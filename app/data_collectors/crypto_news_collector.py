@@ -27,6 +27,10 @@ logger = logging.getLogger('crypto_news_collector')
 CRYPTOPANIC_API_URL = "https://cryptopanic.com/api/v1/posts/"
 COINMARKETCAL_API_URL = "https://developers.coinmarketcal.com/v1/events"
 
+# 热点资讯写入列，按url唯一键去重更新
+NEWS_COLUMNS = ('timestamp', 'source', 'title', 'url', 'content_summary', 'sentiment', 'retrieved_at')
+NEWS_UPDATE_COLUMNS = ('title', 'content_summary', 'sentiment', 'retrieved_at')
+
 def analyze_sentiment(text: str) -> str:
     """
     使用TextBlob分析文本情感
@@ -259,30 +263,14 @@ def store_crypto_news_data(db_config: Dict[str, Any], news_data: List[Dict[str,
         return 0
 
     db_manager = DatabaseManager(db_config)
-    inserted_count = 0
 
     try:
-        with db_manager.get_connection() as (connection, cursor):
-            add_news_sql = ("""
-            INSERT INTO hot_topics
-            (timestamp, source, title, url, content_summary, sentiment, retrieved_at)
-            VALUES (%(timestamp)s, %(source)s, %(title)s, %(url)s, %(content_summary)s, %(sentiment)s, %(retrieved_at)s)
-            ON DUPLICATE KEY UPDATE
-            title=VALUES(title),
-            content_summary=VALUES(content_summary),
-            sentiment=VALUES(sentiment),
-            retrieved_at=VALUES(retrieved_at)
-            """)
-
-            for news_item in news_data:
-                try:
-                    cursor.execute(add_news_sql, news_item)
-                    inserted_count += 1
-                except Exception as err:
-                    logger.error(f"数据库错误，无法存储新闻 '{news_item.get('title')}': {err}")
-
-            connection.commit()
-            logger.info(f"成功存储了{inserted_count}条加密货币新闻")
+        inserted_count, failed_rows = db_manager.bulk_upsert(
+            'hot_topics', NEWS_COLUMNS, news_data, NEWS_UPDATE_COLUMNS
+        )
+        for index, err in failed_rows:
+            logger.error(f"数据库错误，无法存储新闻 '{news_data[index].get('title')}': {err}")
+        logger.info(f"成功存储了{inserted_count}条加密货币新闻")
 
     except Exception as err:
         logger.error(f"连接数据库或执行查询时出错: {err}")
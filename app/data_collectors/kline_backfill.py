@@ -0,0 +1,235 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线历史数据回填模块
+按 startTime/endTime 分页拉取Binance历史K线，多个交易对并发执行，
+请求权重由客户端（RateLimitedClient）与其他Binance调用共享的进程级限流器控制，
+进度写入检查点文件，中断后重新运行会从上次停止的位置继续。
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from binance.client import Client
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import (
+    INTERVAL_MILLISECONDS,
+    KLINE_COLUMNS,
+    KLINE_UPDATE_COLUMNS,
+    fetch_kline_data
+)
+
+# 配置日志
+logger = logging.getLogger('kline_backfill')
+
+# 单次K线请求的最大数量
+KLINE_PAGE_SIZE = 1000
+
+DEFAULT_CHECKPOINT_FILE = os.path.join(APP_DIR, 'data', 'kline_backfill_checkpoint.json')
+
+class BackfillCheckpoint:
+    """
+    回填进度检查点，以JSON文件保存每个任务下一次要请求的开盘时间和截止时间
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化检查点
+
+        Args:
+            path (str): 检查点文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._state = json.load(f)
+                logger.info(f"加载回填检查点: {path}，共{len(self._state)}个任务")
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"读取回填检查点失败，将从头开始: {e}")
+                self._state = {}
+
+    def get(self, job_key: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务的检查点
+
+        Args:
+            job_key (str): 任务标识
+
+        Returns:
+            Optional[Dict[str, Any]]: 检查点信息，不存在时返回None
+        """
+        with self._lock:
+            entry = self._state.get(job_key)
+            return dict(entry) if entry else None
+
+    def update(self, job_key: str, next_open_time: int, done: bool = False, rows: int = 0,
+               end_time: Optional[int] = None):
+        """
+        更新任务的检查点并写入文件
+
+        Args:
+            job_key (str): 任务标识
+            next_open_time (int): 下一次请求的开盘时间（毫秒）
+            done (bool): 任务是否已完成
+            rows (int): 本次新增写入的行数
+            end_time (Optional[int]): 任务的截止开盘时间（毫秒），为None时保留原值
+        """
+        with self._lock:
+            entry = self._state.setdefault(job_key, {'rows': 0})
+            entry['next_open_time'] = next_open_time
+            if end_time is not None:
+                entry['end_time'] = end_time
+            entry['done'] = done
+            entry['rows'] = entry.get('rows', 0) + rows
+            entry['updated_at'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._save_locked()
+
+    def _save_locked(self):
+        """原子地写入检查点文件"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+def _to_milliseconds(value: datetime.datetime) -> int:
+    """将本地时间转换为毫秒时间戳"""
+    return int(value.timestamp() * 1000)
+
+def backfill_kline_job(client: Client, db_manager: DatabaseManager, checkpoint: BackfillCheckpoint, symbol: str, interval: str,
+                       start_time: int, end_time: int) -> int:
+    """
+    回填单个交易对、单个周期的K线数据
+
+    Args:
+        client (Client): Binance API客户端实例
+        db_manager (DatabaseManager): 数据库管理器
+        checkpoint (BackfillCheckpoint): 回填检查点
+        symbol (str): 交易对
+        interval (str): K线周期
+        start_time (int): 起始开盘时间（毫秒）
+        end_time (int): 截止开盘时间（毫秒），早于检查点中记录的截止时间时沿用检查点的截止时间
+
+    Returns:
+        int: 写入的K线数量
+    """
+    interval_ms = INTERVAL_MILLISECONDS[interval]
+    # 未指定截止日期时截止时间是运行时的当前时间，每次都不同，因此检查点只按起始时间区分任务，
+    # 截止时间记录在检查点中，重新运行时沿用，新的截止时间更晚时延长
+    job_key = f"{symbol}|{interval}|{start_time}"
+
+    next_open_time = start_time
+    entry = checkpoint.get(job_key)
+    if entry:
+        stored_end_time = entry.get('end_time', end_time)
+        if entry.get('done') and stored_end_time >= end_time:
+            logger.info(f"{symbol} {interval} 已回填完成，跳过")
+            return 0
+        end_time = max(end_time, stored_end_time)
+        next_open_time = max(start_time, entry['next_open_time'])
+        logger.info(f"{symbol} {interval} 从检查点继续: {datetime.datetime.fromtimestamp(next_open_time / 1000)}")
+
+    total_rows = 0
+    while next_open_time <= end_time:
+        klines = fetch_kline_data(client, symbol=symbol, interval=interval, limit=KLINE_PAGE_SIZE,
+                                  start_time=next_open_time, end_time=end_time)
+        if klines is None:
+            raise RuntimeError(f"获取{symbol} {interval}历史K线失败，检查点停在{next_open_time}")
+
+        if not klines:
+            break
+
+        stored_count, failed_rows = db_manager.bulk_upsert('kline_data', KLINE_COLUMNS, klines, KLINE_UPDATE_COLUMNS)
+        total_rows += stored_count
+        if failed_rows:
+            # 检查点不越过有写入失败的页，重新运行时重试整页
+            raise RuntimeError(f"{symbol} {interval} 有{len(failed_rows)}条K线写入失败，检查点停在{next_open_time}，"
+                               f"首个错误: {failed_rows[0][1]}")
+
+        last_open = datetime.datetime.strptime(klines[-1]['timestamp'], "%Y-%m-%d %H:%M:%S")
+        next_open_time = _to_milliseconds(last_open) + interval_ms
+        checkpoint.update(job_key, next_open_time, rows=len(klines), end_time=end_time)
+
+        if len(klines) < KLINE_PAGE_SIZE:
+            break
+
+    checkpoint.update(job_key, next_open_time, done=True, end_time=end_time)
+    logger.info(f"{symbol} {interval} 回填完成，共写入{total_rows}条K线")
+    return total_rows
+
+def backfill_klines(client: Client, db_config: Dict[str, Any], trading_pairs: List[str],
+                    intervals: List[str], start: datetime.datetime, end: datetime.datetime,
+                    max_workers: int = 4,
+                    checkpoint_file: str = DEFAULT_CHECKPOINT_FILE) -> Dict[str, Any]:
+    """
+    并发回填多个交易对、多个周期的历史K线数据
+
+    Args:
+        client (Client): Binance API客户端实例，请求权重由共享限流器控制
+        db_config (Dict[str, Any]): 数据库配置
+        trading_pairs (List[str]): 交易对列表
+        intervals (List[str]): K线周期列表
+        start (datetime.datetime): 回填起始时间（本地时间）
+        end (datetime.datetime): 回填截止时间（本地时间）
+        max_workers (int): 并发回填的任务数
+        checkpoint_file (str): 检查点文件路径
+
+    Returns:
+        Dict[str, Any]: 回填结果统计
+    """
+    unsupported = [interval for interval in intervals if interval not in INTERVAL_MILLISECONDS]
+    if unsupported:
+        raise ValueError(f"不支持回填的K线周期: {unsupported}")
+
+    start_time = _to_milliseconds(start)
+    end_time = _to_milliseconds(end)
+    if start_time > end_time:
+        raise ValueError("回填起始时间不能晚于截止时间")
+
+    db_manager = DatabaseManager(db_config)
+    checkpoint = BackfillCheckpoint(checkpoint_file)
+
+    jobs = [(pair, interval) for pair in trading_pairs for interval in intervals]
+    logger.info(f"开始回填K线: {len(jobs)}个任务, {start} ~ {end}, 并发数={max_workers}")
+
+    started_at = time.monotonic()
+    result = {'total_rows': 0, 'completed': [], 'failed': {}}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kline-backfill') as executor:
+        futures = {
+            executor.submit(backfill_kline_job, client, db_manager, checkpoint,
+                            pair, interval, start_time, end_time): (pair, interval)
+            for pair, interval in jobs
+        }
+
+        for future in as_completed(futures):
+            pair, interval = futures[future]
+            try:
+                result['total_rows'] += future.result()
+                result['completed'].append(f"{pair} {interval}")
+            except Exception as e:
+                logger.error(f"回填{pair} {interval}失败: {e}")
+                result['failed'][f"{pair} {interval}"] = str(e)
+
+    result['elapsed_seconds'] = round(time.monotonic() - started_at, 2)
+    logger.info(f"K线回填结束: 写入{result['total_rows']}条, 完成{len(result['completed'])}个任务, "
+                f"失败{len(result['failed'])}个任务, 耗时{result['elapsed_seconds']}秒")
+    return result
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线WebSocket实时写入模块
+订阅 <symbol>@kline_<interval> 组合流，已收盘的K线按小批量写入kline_data，
+未收盘的K线只保存在内存中。每次（重新）连接后通过REST补齐断线期间缺失的K线。
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import datetime
+from typing import List, Dict, Any, Optional
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import websocket
+from binance.client import Client
+from app.database.db_manager import DatabaseManager
+from app.fast_json import loads
+from app.data_collectors.binance_data_collector import (
+    INTERVAL_MILLISECONDS,
+    KLINE_COLUMNS,
+    KLINE_UPDATE_COLUMNS,
+    fetch_kline_data,
+    fetch_kline_data_since,
+    get_latest_kline_times,
+    latest_price_rows
+)
+from app.data_collectors.latest_prices import store_latest_prices
+
+# 配置日志
+logger = logging.getLogger('kline_stream_ingester')
+
+STREAM_BASE_URL = "wss://stream.binance.com:9443/stream?streams="
+
+def parse_kline_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将kline事件转换为与fetch_kline_data一致的K线字典
+
+    Args:
+        event (Dict[str, Any]): WebSocket kline事件（组合流中data字段的内容）
+
+    Returns:
+        Dict[str, Any]: K线数据，额外包含is_closed字段
+    """
+    k = event['k']
+    return {
+        'trading_pair': k['s'],
+        'interval_type': k['i'],
+        'timestamp': datetime.datetime.fromtimestamp(k['t'] / 1000).strftime("%Y-%m-%d %H:%M:%S"),
+        'open_price': float(k['o']),
+        'high_price': float(k['h']),
+        'low_price': float(k['l']),
+        'close_price': float(k['c']),
+        'volume': float(k['v']),
+        'quote_asset_volume': float(k['q']),
+        'number_of_trades': int(k['n']),
+        'taker_buy_base_volume': float(k['V']),
+        'taker_buy_quote_volume': float(k['Q']),
+        'retrieved_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'is_closed': bool(k['x'])
+    }
+
+class KlineStreamIngester:
+    """K线WebSocket实时写入器"""
+
+    def __init__(self, binance_client: Client, db_config: Dict[str, Any], trading_pairs: List[str],
+                 intervals: List[str], batch_size: int = 200, flush_interval: float = 2.0,
+                 reconnect_interval: float = 30.0, kline_limits: Optional[Dict[str, int]] = None):
+        """
+        初始化K线实时写入器
+
+        Args:
+            binance_client (Client): Binance API客户端，用于重连后补齐缺口
+            db_config (Dict[str, Any]): 数据库配置
+            trading_pairs (List[str]): 订阅的交易对
+            intervals (List[str]): 订阅的K线周期
+            batch_size (int): 累积多少根已收盘K线后立即写入
+            flush_interval (float): 最长多少秒写入一次
+            reconnect_interval (float): 连接断开后的最长重连等待时间（秒）
+            kline_limits (Optional[Dict[str, int]]): 数据库中没有某个周期的数据时，补齐时获取的K线数量
+        """
+        self.client = binance_client
+        self.db_manager = DatabaseManager(db_config)
+        self.db_config = db_config
+        self.trading_pairs = list(trading_pairs)
+        self.intervals = list(intervals)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reconnect_interval = reconnect_interval
+        self.kline_limits = kline_limits or {}
+
+        self.is_running = False
+        self.ws = None
+        self.stream_thread = None
+        self.flush_thread = None
+
+        # 未收盘的K线 {(symbol, interval): kline}
+        self.open_candles = {}
+        self._open_lock = threading.Lock()
+
+        # 等待写入的已收盘K线
+        self._pending = []
+        self._pending_cond = threading.Condition()
+
+        self.stats = {
+            'messages': 0,
+            'closed_candles': 0,
+            'rows_written': 0,
+            'flushes': 0,
+            'write_failures': 0,
+            'connects': 0,
+            'gap_filled_rows': 0
+        }
+
+    def start(self):
+        """启动订阅和写入线程"""
+        if self.is_running:
+            logger.warning("K线实时写入已在运行中")
+            return
+
+        self.is_running = True
+
+        self.flush_thread = threading.Thread(target=self._flush_loop, name='kline-stream-flush')
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+        self.stream_thread = threading.Thread(target=self._stream_loop, name='kline-stream')
+        self.stream_thread.daemon = True
+        self.stream_thread.start()
+
+        logger.info(f"开始订阅K线: {len(self.trading_pairs)}个交易对 x {self.intervals}")
+
+    def stop(self):
+        """停止订阅，并写入剩余的已收盘K线"""
+        self.is_running = False
+
+        if self.ws:
+            self.ws.close()
+
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+
+        if self.stream_thread and self.stream_thread.is_alive():
+            self.stream_thread.join(timeout=5)
+
+        if self.flush_thread and self.flush_thread.is_alive():
+            self.flush_thread.join(timeout=10)
+
+        logger.info(f"K线实时写入已停止: {self.get_stats()}")
+
+    def get_open_candle(self, symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+        """
+        获取内存中尚未收盘的K线
+
+        Args:
+            symbol (str): 交易对
+            interval (str): K线周期
+
+        Returns:
+            Optional[Dict[str, Any]]: 未收盘的K线，没有数据时返回None
+        """
+        with self._open_lock:
+            candle = self.open_candles.get((symbol, interval))
+            return dict(candle) if candle else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入统计信息"""
+        with self._pending_cond:
+            pending = len(self._pending)
+        return dict(self.stats, pending=pending, open_candles=len(self.open_candles))
+
+    def _stream_url(self) -> str:
+        streams = [f"{symbol.lower()}@kline_{interval}" for symbol in self.trading_pairs for interval in self.intervals]
+        return STREAM_BASE_URL + '/'.join(streams)
+
+    def _stream_loop(self):
+        """保持WebSocket连接，断开后按退避时间重连"""
+        backoff = 1.0
+        while self.is_running:
+            connected_at = time.monotonic()
+            try:
+                self.ws = websocket.WebSocketApp(
+                    self._stream_url(),
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close
+                )
+                self.ws.run_forever(ping_interval=180, ping_timeout=10)
+            except Exception as e:
+                logger.error(f"K线WebSocket运行出错: {e}")
+
+            if not self.is_running:
+                break
+
+            # 连接维持了较长时间说明不是持续失败，重置退避时间
+            if time.monotonic() - connected_at > 60:
+                backoff = 1.0
+            logger.warning(f"K线WebSocket已断开，{backoff:.0f}秒后重连")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.reconnect_interval)
+
+    def _on_open(self, ws):
+        self.stats['connects'] += 1
+        logger.info("K线WebSocket连接已建立，开始补齐缺失的K线")
+        # 补齐在单独的线程中执行，不阻塞消息处理
+        threading.Thread(target=self._fill_gaps, name='kline-gap-fill', daemon=True).start()
+
+    def _on_message(self, ws, message):
+        try:
+            data = loads(message)
+            event = data.get('data', data)
+            if event.get('e') != 'kline':
+                return
+
+            self.stats['messages'] += 1
+            kline = parse_kline_event(event)
+            key = (kline['trading_pair'], kline['interval_type'])
+
+            if kline.pop('is_closed'):
+                with self._open_lock:
+                    self.open_candles.pop(key, None)
+                self._enqueue([kline])
+                self.stats['closed_candles'] += 1
+            else:
+                with self._open_lock:
+                    self.open_candles[key] = kline
+
+        except Exception as e:
+            logger.error(f"处理K线WebSocket消息出错: {e}")
+
+    def _on_error(self, ws, error):
+        logger.error(f"K线WebSocket错误: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        logger.info(f"K线WebSocket连接已关闭: {close_status_code} {close_msg}")
+
+    def _enqueue(self, klines: List[Dict[str, Any]]):
+        with self._pending_cond:
+            self._pending.extend(klines)
+            if len(self._pending) >= self.batch_size:
+                self._pending_cond.notify()
+
+    def _flush_loop(self):
+        """按批量大小或时间间隔写入已收盘K线"""
+        while True:
+            with self._pending_cond:
+                if self.is_running and len(self._pending) < self.batch_size:
+                    self._pending_cond.wait(timeout=self.flush_interval)
+                batch, self._pending = self._pending, []
+
+            if batch:
+                self._write_batch(batch)
+
+            if not self.is_running:
+                with self._pending_cond:
+                    if not self._pending:
+                        break
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            stored_count, failed_rows = self.db_manager.bulk_upsert('kline_data', KLINE_COLUMNS, batch, KLINE_UPDATE_COLUMNS)
+            self.stats['rows_written'] += stored_count
+            self.stats['flushes'] += 1
+            for index, err in failed_rows:
+                self.stats['write_failures'] += 1
+                logger.error(f"数据库错误，无法存储{batch[index]['trading_pair']} {batch[index]['timestamp']}的K线数据: {err}")
+            failed_indexes = {index for index, _ in failed_rows}
+            store_latest_prices(self.db_manager, latest_price_rows(
+                [kline for index, kline in enumerate(batch) if index not in failed_indexes]
+            ))
+        except Exception as e:
+            self.stats['write_failures'] += len(batch)
+            if not self.is_running:
+                logger.error(f"停止时写入{len(batch)}条实时K线失败，下次启动时由REST补齐: {e}")
+                return
+
+            # 数据库暂时不可用时放回队列，等待下一次写入
+            logger.error(f"写入{len(batch)}条实时K线失败，稍后重试: {e}")
+            with self._pending_cond:
+                self._pending[:0] = batch
+            time.sleep(self.flush_interval)
+
+    def _fill_gaps(self):
+        """通过REST补齐数据库中最后一根K线到当前时间之间的已收盘K线"""
+        try:
+            self._fill_gaps_once()
+        except Exception as e:
+            logger.error(f"补齐K线缺口出错: {e}")
+
+    def _fill_gaps_once(self):
+        latest_times = get_latest_kline_times(self.db_config, self.trading_pairs)
+        now_ms = int(time.time() * 1000)
+
+        for symbol in self.trading_pairs:
+            for interval in self.intervals:
+                if not self.is_running:
+                    return
+
+                last_open_time = latest_times.get((symbol, interval))
+                if last_open_time:
+                    klines = fetch_kline_data_since(self.client, symbol=symbol, interval=interval,
+                                                    last_open_time=last_open_time)
+                else:
+                    klines = fetch_kline_data(self.client, symbol=symbol, interval=interval,
+                                              limit=self.kline_limits.get(interval, 500))
+                if not klines:
+                    continue
+
+                # 未收盘的K线由WebSocket维护，不写入数据库
+                interval_ms = INTERVAL_MILLISECONDS.get(interval)
+                if interval_ms:
+                    klines = [k for k in klines
+                              if datetime.datetime.strptime(k['timestamp'], "%Y-%m-%d %H:%M:%S").timestamp() * 1000
+                              + interval_ms <= now_ms]
+                else:
+                    klines = klines[:-1]
+
+                if klines:
+                    self._enqueue(klines)
+                    self.stats['gap_filled_rows'] += len(klines)
+
+        logger.info(f"K线缺口补齐完成，累计补齐{self.stats['gap_filled_rows']}条")
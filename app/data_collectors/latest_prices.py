@@ -0,0 +1,168 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+最新价格表
+latest_prices 每个交易对一行，由K线写入（REST收集和WebSocket实时K线）和价格监控的行情共同维护，
+查询最新价格时按主键批量读取，不再对kline_data按时间倒序排序，耗时与K线历史的长度无关。
+价格和K线最高/最低价分别按各自的时间只前进不后退，回填历史K线不会覆盖更新的价格。
+"""
+import os
+import sys
+import time
+import logging
+import datetime
+import threading
+from typing import List, Dict, Any, Optional
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.database.db_manager import DatabaseManager
+
+# 配置日志
+logger = logging.getLogger('latest_prices')
+
+# 最新价格写入列，按trading_pair主键去重更新
+LATEST_PRICE_COLUMNS = (
+    'trading_pair', 'price', 'price_time', 'price_source', 'high_price', 'low_price', 'kline_interval', 'kline_time'
+)
+
+_NEWER_PRICE = "VALUES(`price_time`) >= `price_time`"
+_NEWER_KLINE = "VALUES(`kline_time`) IS NOT NULL AND (`kline_time` IS NULL OR VALUES(`kline_time`) >= `kline_time`)"
+
+# 唯一键冲突时的条件更新。MySQL按顺序执行赋值，后面的表达式读到的是已更新的值，
+# 因此price_time和kline_time必须放在依赖它们的列之后
+LATEST_PRICE_UPDATES = {
+    'price': f"IF({_NEWER_PRICE}, VALUES(`price`), `price`)",
+    'price_source': f"IF({_NEWER_PRICE}, VALUES(`price_source`), `price_source`)",
+    'price_time': "GREATEST(`price_time`, VALUES(`price_time`))",
+    'high_price': f"IF({_NEWER_KLINE}, VALUES(`high_price`), `high_price`)",
+    'low_price': f"IF({_NEWER_KLINE}, VALUES(`low_price`), `low_price`)",
+    'kline_interval': f"IF({_NEWER_KLINE}, VALUES(`kline_interval`), `kline_interval`)",
+    'kline_time': f"IF({_NEWER_KLINE}, VALUES(`kline_time`), `kline_time`)"
+}
+
+LATEST_PRICES_QUERY = """
+    SELECT trading_pair, price, price_time, price_source, high_price, low_price, kline_interval, kline_time
+    FROM latest_prices
+    WHERE trading_pair IN ({placeholders})
+"""
+
+def store_latest_prices(db_manager: DatabaseManager, rows: List[Dict[str, Any]]) -> int:
+    """
+    写入最新价格，已有的行只在新数据更新时才被覆盖
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        rows (List[Dict[str, Any]]): 以LATEST_PRICE_COLUMNS为键的行；只有价格时K线相关的列为None
+
+    Returns:
+        int: 成功写入的行数，出错时返回0
+    """
+    if not rows:
+        return 0
+
+    try:
+        stored_count, failed_rows = db_manager.bulk_upsert(
+            'latest_prices', LATEST_PRICE_COLUMNS, rows, LATEST_PRICE_UPDATES
+        )
+        for index, err in failed_rows:
+            logger.error(f"数据库错误，无法更新{rows[index].get('trading_pair')}的最新价格: {err}")
+        return stored_count
+    except Exception as err:
+        logger.error(f"更新最新价格时出错: {err}")
+        return 0
+
+def get_latest_prices(db_manager: DatabaseManager, trading_pairs: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    用一条按主键的查询获取多个交易对的最新价格
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        trading_pairs (List[str]): 交易对列表
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 交易对到最新价格行的映射，没有数据的交易对不包含在内
+    """
+    if not trading_pairs:
+        return {}
+
+    query = LATEST_PRICES_QUERY.format(placeholders=", ".join(["%s"] * len(trading_pairs)))
+    results = db_manager.execute_query(query, tuple(trading_pairs), dictionary=True)
+    return {row['trading_pair']: row for row in results or []}
+
+class LatestPriceRecorder:
+    """把价格监控收到的行情合并后定期写入latest_prices"""
+
+    def __init__(self, db_config: Dict[str, Any], flush_interval: float = 5.0, source: str = 'stream'):
+        """
+        初始化最新价格记录器
+
+        Args:
+            db_config (Dict[str, Any]): 数据库配置
+            flush_interval (float): 写入间隔（秒），间隔内同一交易对只写入最后一个价格
+            source (str): 写入price_source列的来源标识
+        """
+        self.db_manager = DatabaseManager(db_config)
+        self.flush_interval = flush_interval
+        self.source = source
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_thread = None
+        self._flush_stop = threading.Event()
+
+    def record(self, symbol: str, price: float, price_time: Optional[float] = None):
+        """
+        记录一个价格（只更新内存，在价格回调中调用）
+
+        Args:
+            symbol (str): 交易对
+            price (float): 价格
+            price_time (Optional[float]): 价格时间（Unix时间戳，秒），默认为当前时间
+        """
+        with self._lock:
+            self._pending[symbol] = (price, price_time or time.time())
+
+    def flush(self) -> int:
+        """
+        写入间隔内记录的价格
+
+        Returns:
+            int: 写入的交易对数量
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            {'trading_pair': symbol, 'price': price, 'price_source': self.source,
+             'price_time': datetime.datetime.fromtimestamp(price_time).strftime("%Y-%m-%d %H:%M:%S")}
+            for symbol, (price, price_time) in pending.items()
+        ]
+        return store_latest_prices(self.db_manager, rows)
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+
+        self._flush_stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='latest-price-flush')
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+
+    def stop(self):
+        """停止后台写入线程，并写入剩余的价格"""
+        self._flush_stop.set()
+        if self._flush_thread and self._flush_thread.is_alive():
+            self._flush_thread.join(timeout=10)
+        self._flush_thread = None
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.flush_interval):
+            self.flush()
@@ -29,6 +29,36 @@ from app.database.db_manager import DatabaseManager
 # 配置日志
 logger = logging.getLogger('daily_summary_processor')
 
+# 当日数据按入库时间的半开区间 [day_start, day_end) 过滤，可以使用retrieved_at上的索引
+HOT_TOPICS_QUERY = """
+SELECT title, source, content_summary, sentiment FROM hot_topics
+WHERE retrieved_at >= %(day_start)s AND retrieved_at < %(day_end)s
+ORDER BY timestamp DESC LIMIT 15
+"""
+
+FUND_FLOWS_QUERY = """
+SELECT crypto_symbol, inflow_amount, change_rate, volume_24h, funding_rate, open_interest
+FROM market_fund_flows
+WHERE retrieved_at >= %(day_start)s AND retrieved_at < %(day_end)s
+ORDER BY volume_24h DESC
+"""
+
+def day_range(target_date: datetime.date) -> Dict[str, str]:
+    """
+    日期对应的半开时间区间参数
+
+    Args:
+        target_date (datetime.date): 日期
+
+    Returns:
+        Dict[str, str]: 包含day_start（当日0点）和day_end（次日0点）的查询参数
+    """
+    day_start = datetime.datetime.combine(target_date, datetime.time.min)
+    return {
+        "day_start": day_start.strftime("%Y-%m-%d %H:%M:%S"),
+        "day_end": (day_start + datetime.timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    }
+
 def calculate_market_sentiment(topics_data: List[Dict[str, Any]]) -> str:
     """
     根据热点话题的情感分析结果计算整体市场情绪
@@ -91,12 +121,7 @@ def process_and_store_crypto_daily_summary(db_config: Dict[str, Any], target_dat
         # 使用数据库管理器的上下文管理器
         with db_manager.get_connection(dictionary=True) as (connection, cursor):
             # 1. 获取并汇总当日热点话题
-            query_topics = """
-            SELECT title, source, content_summary, sentiment FROM hot_topics
-            WHERE DATE(retrieved_at) = %(target_date)s
-            ORDER BY timestamp DESC LIMIT 15
-            """
-            cursor.execute(query_topics, {"target_date": target_date.strftime("%Y-%m-%d")})
+            cursor.execute(HOT_TOPICS_QUERY, day_range(target_date))
             topics = cursor.fetchall()
 
             if topics:
@@ -118,13 +143,7 @@ def process_and_store_crypto_daily_summary(db_config: Dict[str, Any], target_dat
                 aggregated_hot_topics_summary = "No specific crypto hot topics found for today in the database."
 
             # 2. 获取并汇总当日市场资金流向
-            query_flows = """
-            SELECT crypto_symbol, inflow_amount, change_rate, volume_24h, funding_rate, open_interest
-            FROM market_fund_flows
-            WHERE DATE(retrieved_at) = %(target_date)s
-            ORDER BY volume_24h DESC
-            """
-            cursor.execute(query_flows, {"target_date": target_date.strftime("%Y-%m-%d")})
+            cursor.execute(FUND_FLOWS_QUERY, day_range(target_date))
             flows = cursor.fetchall()
 
             if flows:
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线重采样模块
+用数据库中已存储的1分钟K线聚合出5m/1h/1d等更高周期的K线，替代逐周期从Binance下载。
+聚合按Binance的UTC对齐方式划分时间桶，只有1分钟数据完整覆盖的时间桶才会被写入；
+数据不完整时返回None，由调用方回退到从交易所获取。
+可定期用交易所K线交叉校验聚合结果，发现差异时以交易所数据为准覆盖。
+"""
+import os
+import sys
+import time
+import datetime
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+import numpy as np
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from binance.client import Client
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import (
+    INTERVAL_MILLISECONDS,
+    KLINE_COLUMNS,
+    KLINE_UPDATE_COLUMNS,
+    fetch_kline_data
+)
+
+# 配置日志
+logger = logging.getLogger('kline_resampler')
+
+BASE_INTERVAL = '1m'
+BASE_INTERVAL_MS = INTERVAL_MILLISECONDS[BASE_INTERVAL]
+
+# 交叉校验时允许的相对误差（交易所返回的数值本身是定点小数，聚合求和会有浮点误差）
+CROSS_CHECK_TOLERANCE = 1e-6
+
+# 每个交易对、周期上一次交叉校验的时间
+_last_cross_check = {}
+_last_cross_check_lock = threading.Lock()
+
+def can_resample(interval: str) -> bool:
+    """判断周期是否可以由1分钟K线聚合得到（1M按自然月划分，不支持）"""
+    interval_ms = INTERVAL_MILLISECONDS.get(interval)
+    return interval != BASE_INTERVAL and interval_ms is not None and interval_ms % BASE_INTERVAL_MS == 0
+
+def _to_milliseconds(value: Union[str, datetime.datetime]) -> int:
+    """将本地时间（字符串或datetime）转换为毫秒时间戳"""
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return int(value.timestamp() * 1000)
+
+def resample_klines(base_klines: Sequence[Dict[str, Any]], interval: str,
+                    now_ms: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    将1分钟K线聚合为更高周期的K线
+
+    Args:
+        base_klines (Sequence[Dict[str, Any]]): 同一交易对的1分钟K线，字段与kline_data表一致
+        interval (str): 目标周期，例如：5m, 1h, 1d
+        now_ms (Optional[int]): 当前时间（毫秒），用于识别尚未收盘的最后一个时间桶
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: 按时间排序的聚合K线；有时间桶缺少1分钟数据时返回None
+    """
+    if not can_resample(interval):
+        raise ValueError(f"不支持由1分钟K线聚合{interval}周期")
+
+    if not base_klines:
+        return []
+
+    interval_ms = INTERVAL_MILLISECONDS[interval]
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    trading_pair = base_klines[0]['trading_pair']
+
+    open_ms = np.fromiter((_to_milliseconds(k['timestamp']) for k in base_klines), dtype=np.int64, count=len(base_klines))
+    order = np.argsort(open_ms, kind='stable')
+    open_ms = open_ms[order]
+
+    # 同一开盘时间重复出现时保留最后一条
+    keep = np.append(open_ms[1:] != open_ms[:-1], True)
+    open_ms = open_ms[keep]
+    order = order[keep]
+
+    def column(name, dtype=np.float64):
+        return np.fromiter((base_klines[i][name] for i in order), dtype=dtype, count=len(order))
+
+    buckets = open_ms - open_ms % interval_ms
+    starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+    ends = np.append(starts[1:], len(buckets)) - 1
+    bucket_open = buckets[starts]
+
+    # 时间桶必须从桶的第一分钟开始连续覆盖；已收盘的桶还必须覆盖到最后一分钟
+    counts = ends - starts + 1
+    contiguous = (open_ms[starts] == bucket_open) & ((open_ms[ends] - bucket_open) // BASE_INTERVAL_MS + 1 == counts)
+    closed = bucket_open + interval_ms <= now_ms
+    complete = contiguous & (~closed | (counts == interval_ms // BASE_INTERVAL_MS))
+    if not complete.all():
+        missing = [datetime.datetime.fromtimestamp(ms / 1000).strftime("%Y-%m-%d %H:%M:%S")
+                   for ms in bucket_open[~complete][:3]]
+        logger.info(f"{trading_pair} {interval} 有{int((~complete).sum())}个时间桶的1分钟数据不完整，例如: {missing}")
+        return None
+
+    open_prices = column('open_price')
+    high_prices = np.maximum.reduceat(column('high_price'), starts)
+    low_prices = np.minimum.reduceat(column('low_price'), starts)
+    close_prices = column('close_price')
+    sums = {
+        name: np.add.reduceat(column(name), starts)
+        for name in ('volume', 'quote_asset_volume', 'taker_buy_base_volume', 'taker_buy_quote_volume')
+    }
+    trades = np.add.reduceat(column('number_of_trades', np.int64), starts)
+
+    retrieved_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    resampled = []
+    for i in range(len(starts)):
+        resampled.append({
+            'trading_pair': trading_pair,
+            'interval_type': interval,
+            'timestamp': datetime.datetime.fromtimestamp(bucket_open[i] / 1000).strftime("%Y-%m-%d %H:%M:%S"),
+            'open_price': float(open_prices[starts[i]]),
+            'high_price': float(high_prices[i]),
+            'low_price': float(low_prices[i]),
+            'close_price': float(close_prices[ends[i]]),
+            'volume': float(sums['volume'][i]),
+            'quote_asset_volume': float(sums['quote_asset_volume'][i]),
+            'number_of_trades': int(trades[i]),
+            'taker_buy_base_volume': float(sums['taker_buy_base_volume'][i]),
+            'taker_buy_quote_volume': float(sums['taker_buy_quote_volume'][i]),
+            'retrieved_at': retrieved_at
+        })
+
+    return resampled
+
+def load_base_klines(db_manager: DatabaseManager, trading_pair: str,
+                     since: datetime.datetime) -> List[Dict[str, Any]]:
+    """
+    从数据库读取某个时间之后的1分钟K线
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        trading_pair (str): 交易对
+        since (datetime.datetime): 起始开盘时间（包含）
+
+    Returns:
+        List[Dict[str, Any]]: 1分钟K线列表
+    """
+    query = f"""
+    SELECT {', '.join(KLINE_COLUMNS[:-1])}
+    FROM kline_data
+    WHERE trading_pair = %s AND interval_type = %s AND timestamp >= %s
+    ORDER BY timestamp
+    """
+    return db_manager.execute_query(query, (trading_pair, BASE_INTERVAL, since), dictionary=True)
+
+def resample_stored_klines(db_config: Dict[str, Any], trading_pair: str, interval: str,
+                           last_open_time: datetime.datetime) -> Optional[List[Dict[str, Any]]]:
+    """
+    用数据库中的1分钟K线聚合出目标周期最后一根已存储K线及其之后的K线，并写入数据库
+
+    Args:
+        db_config (Dict[str, Any]): 数据库配置
+        trading_pair (str): 交易对
+        interval (str): 目标周期
+        last_open_time (datetime.datetime): 目标周期在数据库中最后一根K线的开盘时间（可能未收盘）
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: 写入的聚合K线；1分钟数据不完整时返回None，不写入任何数据
+    """
+    db_manager = DatabaseManager(db_config)
+
+    try:
+        base_klines = load_base_klines(db_manager, trading_pair, last_open_time)
+        if not base_klines:
+            return None
+
+        resampled = resample_klines(base_klines, interval)
+        if not resampled:
+            return None
+
+        stored_count, failed_rows = db_manager.bulk_upsert('kline_data', KLINE_COLUMNS, resampled, KLINE_UPDATE_COLUMNS)
+    except Exception as err:
+        logger.error(f"聚合{trading_pair} {interval} K线时出错: {err}")
+        return None
+
+    for index, err in failed_rows:
+        logger.error(f"数据库错误，无法存储{trading_pair} {resampled[index]['timestamp']}的{interval}聚合K线: {err}")
+
+    logger.info(f"由{len(base_klines)}条1分钟K线聚合并存储了{stored_count}条 {trading_pair} {interval} K线")
+    return resampled
+
+def _values_match(left: float, right: float) -> bool:
+    return abs(left - right) <= CROSS_CHECK_TOLERANCE * max(1.0, abs(left), abs(right))
+
+def cross_check_resampled_klines(client: Client, db_config: Dict[str, Any], trading_pair: str,
+                                 interval: str, limit: int = 24) -> int:
+    """
+    用交易所K线校验最近的已收盘聚合K线，有差异时以交易所数据覆盖
+
+    Args:
+        client (Client): Binance API客户端实例
+        db_config (Dict[str, Any]): 数据库配置
+        trading_pair (str): 交易对
+        interval (str): 目标周期
+        limit (int): 校验的K线数量
+
+    Returns:
+        int: 与交易所不一致的K线数量
+    """
+    exchange_klines = fetch_kline_data(client, symbol=trading_pair, interval=interval, limit=limit + 1)
+    if not exchange_klines:
+        logger.warning(f"交叉校验{trading_pair} {interval}时未能获取交易所K线")
+        return 0
+
+    # 最后一根可能尚未收盘，不参与校验
+    exchange_klines = exchange_klines[:-1]
+    if not exchange_klines:
+        return 0
+
+    db_manager = DatabaseManager(db_config)
+    stored_rows = db_manager.execute_query(
+        f"""
+        SELECT {', '.join(KLINE_COLUMNS[:-1])}
+        FROM kline_data
+        WHERE trading_pair = %s AND interval_type = %s AND timestamp BETWEEN %s AND %s
+        """,
+        (trading_pair, interval, exchange_klines[0]['timestamp'], exchange_klines[-1]['timestamp']),
+        dictionary=True
+    )
+    stored = {row['timestamp'].strftime("%Y-%m-%d %H:%M:%S"): row for row in stored_rows}
+
+    mismatched = []
+    for kline in exchange_klines:
+        row = stored.get(kline['timestamp'])
+        if row is None:
+            mismatched.append(kline)
+            continue
+        fields = [name for name in KLINE_UPDATE_COLUMNS[:-1]
+                  if not _values_match(float(row[name]), float(kline[name]))]
+        if fields:
+            logger.warning(f"{trading_pair} {interval} {kline['timestamp']} 聚合K线与交易所不一致: {fields}")
+            mismatched.append(kline)
+
+    if mismatched:
+        db_manager.bulk_upsert('kline_data', KLINE_COLUMNS, mismatched, KLINE_UPDATE_COLUMNS)
+        logger.warning(f"{trading_pair} {interval} 交叉校验发现{len(mismatched)}/{len(exchange_klines)}条K线不一致，已用交易所数据覆盖")
+    else:
+        logger.info(f"{trading_pair} {interval} 交叉校验通过，共{len(exchange_klines)}条K线")
+
+    return len(mismatched)
+
+def cross_check_due(trading_pair: str, interval: str, every_hours: float) -> bool:
+    """
+    判断是否到了交叉校验的时间，到期时同时记录本次校验时间
+
+    Args:
+        trading_pair (str): 交易对
+        interval (str): 目标周期
+        every_hours (float): 校验间隔（小时），小于等于0表示不校验
+
+    Returns:
+        bool: 是否需要校验
+    """
+    if every_hours <= 0:
+        return False
+
+    now = time.monotonic()
+    with _last_cross_check_lock:
+        last_checked = _last_cross_check.get((trading_pair, interval))
+        if last_checked is not None and now - last_checked < every_hours * 3600:
+            return False
+        _last_cross_check[(trading_pair, interval)] = now
+        return True
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线分区维护和保留策略
+kline_data 按 RANGE COLUMNS(interval_type, timestamp) 分区（models/migrations/003）：
+1分钟K线每月一个分区 p1m_YYYYMM，其他周期数据量小，按周期名排在1m之前/之后分别放在 p_coarse_a/p_coarse_b。
+这样超过保留期的1分钟K线可以整块删除分区，不影响由它们聚合出的更高周期K线。
+维护任务预先拆出未来几个月的分区，并删除或归档超过保留期、且已聚合为更高周期的1分钟分区；
+聚合不完整的月份保留不动，等补齐更高周期的K线后再处理。
+"""
+import os
+import sys
+import datetime
+import logging
+from typing import List, Dict, Any, Optional, Sequence
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import INTERVAL_MILLISECONDS
+from app.data_processors.kline_resampler import BASE_INTERVAL
+
+# 配置日志
+logger = logging.getLogger('kline_retention')
+
+KLINE_TABLE = 'kline_data'
+PARTITION_PREFIX = 'p1m_'
+FUTURE_PARTITION = 'p1m_future'
+ARCHIVE_TABLE_PREFIX = 'kline_data_archive_'
+RETENTION_MODES = ('drop', 'archive')
+
+# Binance现货2017年7月开始交易，迁移从这个月开始建立月分区
+FIRST_PARTITION_MONTH = datetime.date(2017, 7, 1)
+
+PARTITIONS_QUERY = """
+    SELECT PARTITION_NAME, TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+# 分区内1分钟K线覆盖的（交易对, 目标周期时间桶）
+BASE_BUCKETS_QUERY = """
+    SELECT trading_pair, FLOOR(UNIX_TIMESTAMP(timestamp) / %s) AS bucket
+    FROM kline_data PARTITION ({partition})
+    WHERE interval_type = %s
+    GROUP BY trading_pair, bucket
+"""
+
+# 已存储的目标周期K线的时间桶
+ROLLUP_BUCKETS_QUERY = """
+    SELECT trading_pair, FLOOR(UNIX_TIMESTAMP(timestamp) / %s)
+    FROM kline_data
+    WHERE interval_type = %s AND timestamp >= %s AND timestamp < %s
+"""
+
+def month_start(value: datetime.date) -> datetime.date:
+    """取日期所在月份的第一天"""
+    return datetime.date(value.year, value.month, 1)
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    """月份加减，返回结果月份的第一天"""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime.date) -> str:
+    """月份对应的1分钟K线分区名，例如 p1m_202401"""
+    return f"{PARTITION_PREFIX}{month.strftime('%Y%m')}"
+
+def partition_month(name: str) -> Optional[datetime.date]:
+    """
+    从分区名解析月份
+
+    Args:
+        name (str): 分区名
+
+    Returns:
+        Optional[datetime.date]: 月份第一天，不是1分钟K线的月分区时返回None
+    """
+    suffix = name[len(PARTITION_PREFIX):] if name.startswith(PARTITION_PREFIX) else ''
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime.date(int(suffix[:4]), int(suffix[4:]), 1)
+
+def _month_definition(month: datetime.date) -> str:
+    return (f"PARTITION {partition_name(month)} VALUES LESS THAN "
+            f"('{BASE_INTERVAL}', '{add_months(month, 1).strftime('%Y-%m-%d')}')")
+
+def _future_definition() -> str:
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN ('{BASE_INTERVAL}', MAXVALUE)"
+
+def partition_definitions(first_month: datetime.date, last_month: datetime.date) -> List[str]:
+    """
+    生成kline_data的分区定义
+
+    Args:
+        first_month (datetime.date): 第一个月分区（更早的1分钟K线也放在这个分区）
+        last_month (datetime.date): 最后一个月分区，之后的1分钟K线放在 p1m_future
+
+    Returns:
+        List[str]: 按分区顺序排列的 PARTITION ... VALUES LESS THAN ... 定义
+    """
+    definitions = [f"PARTITION p_coarse_a VALUES LESS THAN ('{BASE_INTERVAL}', '1000-01-01')"]
+    month = first_month
+    while month <= last_month:
+        definitions.append(_month_definition(month))
+        month = add_months(month, 1)
+    definitions.append(_future_definition())
+    definitions.append("PARTITION p_coarse_b VALUES LESS THAN (MAXVALUE, MAXVALUE)")
+    return definitions
+
+def partition_clause(first_month: datetime.date, last_month: datetime.date) -> str:
+    """生成 CREATE/ALTER TABLE 使用的 PARTITION BY 子句"""
+    return ("PARTITION BY RANGE COLUMNS(interval_type, timestamp) (\n    "
+            + ",\n    ".join(partition_definitions(first_month, last_month)) + "\n)")
+
+def list_partitions(db_manager: DatabaseManager, table: str = KLINE_TABLE) -> List[Dict[str, Any]]:
+    """
+    列出表的分区（行数和大小来自information_schema，是InnoDB的估计值）
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        table (str): 表名
+
+    Returns:
+        List[Dict[str, Any]]: 按分区顺序排列的 {'name', 'month', 'rows', 'bytes'}，未分区时为空列表
+    """
+    partitions = []
+    for name, rows, size in db_manager.execute_query(PARTITIONS_QUERY, (table,)):
+        partitions.append({'name': name, 'month': partition_month(name), 'rows': int(rows or 0), 'bytes': int(size or 0)})
+    return partitions
+
+def ensure_future_partitions(db_manager: DatabaseManager, months_ahead: int = 3,
+                             today: Optional[datetime.date] = None) -> List[str]:
+    """
+    从 p1m_future 中拆出到未来第months_ahead个月为止的月分区
+
+    p1m_future 通常为空，拆分只修改元数据；长期没有执行维护时已写入的数据会被移动到新分区。
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        months_ahead (int): 提前建立的月数
+        today (Optional[datetime.date]): 当前日期，默认为今天
+
+    Returns:
+        List[str]: 新建的分区名
+    """
+    partitions = list_partitions(db_manager)
+    if not any(partition['name'] == FUTURE_PARTITION for partition in partitions):
+        logger.warning("kline_data尚未按月分区，请先执行 scripts/migrate_db.py")
+        return []
+
+    target = add_months(month_start(today or datetime.date.today()), months_ahead)
+    months = [partition['month'] for partition in partitions if partition['month']]
+    month = add_months(max(months), 1) if months else month_start(today or datetime.date.today())
+
+    new_months = []
+    while month <= target:
+        new_months.append(month)
+        month = add_months(month, 1)
+    if not new_months:
+        return []
+
+    definitions = [_month_definition(month) for month in new_months] + [_future_definition()]
+    db_manager.execute_update(
+        f"ALTER TABLE {KLINE_TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+    )
+    names = [partition_name(month) for month in new_months]
+    logger.info(f"已新建K线分区: {names}")
+    return names
+
+def _timestamp(seconds: int) -> str:
+    return datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+
+def missing_rollups(db_manager: DatabaseManager, partition: str,
+                    intervals: Sequence[str]) -> Optional[Dict[str, int]]:
+    """
+    检查分区中的1分钟K线是否都已聚合为更高周期的K线
+
+    对每个周期，1分钟K线落在的每个（交易对, 时间桶）都必须有该周期的K线；
+    时间桶按Unix时间对齐，与重采样和Binance的划分方式一致。
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        partition (str): 1分钟K线分区名
+        intervals (Sequence[str]): 需要存在的更高周期
+
+    Returns:
+        Optional[Dict[str, int]]: 每个周期缺少的K线数量；分区中没有1分钟K线时返回None
+    """
+    missing = {}
+    for interval in intervals:
+        interval_seconds = INTERVAL_MILLISECONDS[interval] // 1000
+        base = {(pair, int(bucket)) for pair, bucket in db_manager.execute_query(
+            BASE_BUCKETS_QUERY.format(partition=partition), (interval_seconds, BASE_INTERVAL)
+        )}
+        if not base:
+            return None
+
+        buckets = [bucket for _, bucket in base]
+        rolled_up = {(pair, int(bucket)) for pair, bucket in db_manager.execute_query(
+            ROLLUP_BUCKETS_QUERY,
+            (interval_seconds, interval, _timestamp(min(buckets) * interval_seconds),
+             _timestamp((max(buckets) + 1) * interval_seconds))
+        )}
+        missing[interval] = len(base - rolled_up)
+    return missing
+
+def archive_partition(db_manager: DatabaseManager, partition: str) -> str:
+    """
+    把分区的数据交换到同结构的独立表 kline_data_archive_YYYYMM（只交换表空间，不复制数据），
+    交换后分区为空。归档表已存在时抛出异常，避免把已归档的数据换回分区。
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        partition (str): 1分钟K线分区名
+
+    Returns:
+        str: 归档表名
+    """
+    archive_table = ARCHIVE_TABLE_PREFIX + partition[len(PARTITION_PREFIX):]
+    with db_manager.get_connection() as (connection, cursor):
+        cursor.execute(f"CREATE TABLE {archive_table} LIKE {KLINE_TABLE}")
+        cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {KLINE_TABLE} EXCHANGE PARTITION {partition} WITH TABLE {archive_table}")
+        connection.commit()
+    return archive_table
+
+def apply_kline_retention(db_manager: DatabaseManager, retention_months: int, rollup_intervals: Sequence[str],
+                          mode: str = 'drop', dry_run: bool = False,
+                          today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    删除或归档整月都早于保留期、且已聚合为rollup_intervals各周期的1分钟K线分区
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        retention_months (int): 1分钟K线保留的月数（不含当月）
+        rollup_intervals (Sequence[str]): 删除前必须已存在的更高周期
+        mode (str): drop 直接删除分区；archive 先交换到归档表再删除空分区
+        dry_run (bool): 为True时只返回将要处理的分区，不修改数据库
+        today (Optional[datetime.date]): 当前日期，默认为今天
+
+    Returns:
+        Dict[str, Any]: {'removed': 已删除（dry_run时为将要删除）的分区, 'archived': {分区: 归档表},
+            'kept': {分区: 各周期缺少的K线数量或错误信息}, 'freed_bytes': 释放的空间（估计值）}
+    """
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"不支持的保留模式: {mode}")
+
+    result = {'removed': [], 'archived': {}, 'kept': {}, 'freed_bytes': 0}
+    cutoff = add_months(month_start(today or datetime.date.today()), -retention_months)
+
+    for partition in list_partitions(db_manager):
+        month = partition['month']
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+
+        name = partition['name']
+        missing = missing_rollups(db_manager, name, rollup_intervals)
+        if missing is None:
+            # 没有1分钟K线的分区保留，之后回填的历史数据仍然按月分区
+            continue
+        missing = {interval: count for interval, count in missing.items() if count}
+        if missing:
+            logger.warning(f"{name} 的1分钟K线尚未完整聚合，暂不清理，缺少的K线数量: {missing}")
+            result['kept'][name] = missing
+            continue
+
+        if not dry_run:
+            try:
+                if mode == 'archive':
+                    result['archived'][name] = archive_partition(db_manager, name)
+                db_manager.execute_update(f"ALTER TABLE {KLINE_TABLE} DROP PARTITION {name}")
+            except Exception as e:
+                logger.error(f"清理K线分区{name}失败: {e}")
+                result['kept'][name] = str(e)
+                continue
+
+        result['removed'].append(name)
+        result['freed_bytes'] += partition['bytes']
+
+    if result['removed']:
+        action = '将要清理' if dry_run else '已清理'
+        logger.info(f"{action}{len(result['removed'])}个1分钟K线分区（{mode}）: {result['removed']}，"
+                    f"约{result['freed_bytes'] / 1024 / 1024:.1f}MB")
+    return result
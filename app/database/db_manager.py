@@ -1,69 +1,408 @@
 #!/usr/bin/env python3.11
 # -*- coding: utf-8 -*-
+import time
+import decimal
+import datetime
+import threading
+import numpy as np
 import mysql.connector
+from mysql.connector import errors as mysql_errors
 from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Mapping, Sequence, Tuple, Union, Iterator
+
+# 连接池默认参数，可通过db_config中的同名键覆盖
+DEFAULT_POOL_SETTINGS = {
+    "DB_POOL_ENABLED": True,
+    "DB_POOL_MIN_SIZE": 1,
+    "DB_POOL_MAX_SIZE": 10,
+    "DB_POOL_IDLE_TIMEOUT": 300,
+    "DB_POOL_PING_INTERVAL": 30,
+    "DB_POOL_CHECKOUT_TIMEOUT": 10
+}
+
+# 批量写入时每条INSERT语句包含的默认行数
+DEFAULT_BULK_CHUNK_SIZE = 500
+
+# 流式查询每次从服务器读取的默认行数，可通过db_config中的DB_STREAM_FETCH_SIZE覆盖
+DEFAULT_STREAM_FETCH_SIZE = 10000
+
+class ConnectionPool:
+    """
+    MySQL连接池。
+    空闲连接按线程亲和优先复用（同一线程优先取回自己上次归还的连接），其次按后进先出复用，
+    超过空闲时间的连接会被回收，长时间未使用的连接在借出前做一次健康检查。
+    """
+
+    def __init__(self, connect_kwargs: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 idle_timeout: float = 300, ping_interval: float = 30, checkout_timeout: float = 10):
+        """
+        初始化连接池
+
+        Args:
+            connect_kwargs (Dict[str, Any]): 传给mysql.connector.connect的连接参数
+            min_size (int): 空闲回收时至少保留的连接数
+            max_size (int): 连接池允许的最大连接数
+            idle_timeout (float): 空闲连接的最长保留时间（秒）
+            ping_interval (float): 连接空闲超过该时间（秒）后借出前先ping检查
+            checkout_timeout (float): 连接池耗尽时等待空闲连接的最长时间（秒）
+        """
+        self.connect_kwargs = connect_kwargs
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._condition = threading.Condition()
+        self._idle = []  # [(connection, last_used, owner_thread_id)]
+        self._size = 0  # 已创建且未被丢弃的连接总数
+
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "checkout_timeouts": 0
+        }
+
+    def acquire(self, connect_timeout: int = 5):
+        """
+        从连接池借出一个连接
+
+        Args:
+            connect_timeout (int): 新建连接时的连接超时时间（秒）
+
+        Returns:
+            MySQLConnection: 可用的数据库连接
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        thread_id = threading.get_ident()
+
+        with self._condition:
+            while True:
+                self._prune_idle_locked()
+
+                if self._idle:
+                    connection, last_used = self._pop_idle_locked(thread_id)
+                    break
+
+                if self._size < self.max_size:
+                    # 先占位，在锁外建立连接
+                    self._size += 1
+                    connection = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["checkout_timeouts"] += 1
+                    raise mysql_errors.PoolError(f"连接池已耗尽（最大连接数={self.max_size}），等待空闲连接超时")
+
+                self._stats["waits"] += 1
+                self._condition.wait(remaining)
+
+        if connection is None:
+            return self._create(connect_timeout)
+
+        # 长时间空闲的连接先做健康检查
+        if time.monotonic() - last_used >= self.ping_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                with self._condition:
+                    self._stats["health_check_failures"] += 1
+                self._discard(connection, reserve_slot=True)
+                return self._create(connect_timeout)
+
+        with self._condition:
+            self._stats["reused"] += 1
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        """
+        归还连接到连接池
+
+        Args:
+            connection: 借出的数据库连接
+            discard (bool): 是否直接丢弃该连接（例如连接已损坏）
+        """
+        if connection is None:
+            return
+
+        if not discard:
+            try:
+                if connection.unread_result:
+                    discard = True
+                elif connection.in_transaction:
+                    # 未提交的事务不能带回连接池
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic(), threading.get_ident()))
+            self._prune_idle_locked()
+            self._condition.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            Dict[str, Any]: 连接池大小、空闲数、借出数以及各项计数
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size
+            })
+            return stats
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._condition:
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for connection, _, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _create(self, connect_timeout: int):
+        """在已占位的前提下新建一个连接"""
+        try:
+            connection = mysql.connector.connect(connect_timeout=connect_timeout, **self.connect_kwargs)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._stats["created"] += 1
+        return connection
+
+    def _discard(self, connection, reserve_slot: bool = False):
+        """
+        丢弃一个连接
+
+        Args:
+            connection: 要丢弃的连接
+            reserve_slot (bool): 是否保留占位（随后会立即新建连接替代）
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+        with self._condition:
+            self._stats["discarded"] += 1
+            if not reserve_slot:
+                self._size -= 1
+                self._condition.notify()
+
+    def _pop_idle_locked(self, thread_id: int):
+        """优先取出当前线程上次归还的连接，否则取最近归还的连接"""
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][2] == thread_id:
+                connection, last_used, _ = self._idle.pop(index)
+                return connection, last_used
+
+        connection, last_used, _ = self._idle.pop()
+        return connection, last_used
+
+    def _prune_idle_locked(self):
+        """回收超过空闲时间的连接，至少保留min_size个"""
+        if not self._idle:
+            return
+
+        now = time.monotonic()
+        expired = []
+        kept = []
+        # 从最旧的空闲连接开始回收
+        for entry in self._idle:
+            if now - entry[1] > self.idle_timeout and self._size - len(expired) > self.min_size:
+                expired.append(entry)
+            else:
+                kept.append(entry)
+
+        if not expired:
+            return
+
+        self._idle = kept
+        self._size -= len(expired)
+        self._stats["discarded"] += len(expired)
+        self._condition.notify_all()
+
+        for connection, _, _ in expired:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+# 进程内共享的连接池，按连接参数区分
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(db_config: Dict[str, Any]) -> ConnectionPool:
+    """
+    获取（必要时创建）与数据库配置对应的共享连接池
+
+    Args:
+        db_config (Dict[str, Any]): 数据库配置
+
+    Returns:
+        ConnectionPool: 连接池实例
+    """
+    key = (
+        db_config["DB_HOST"],
+        db_config["DB_PORT"],
+        db_config["DB_USER"],
+        db_config["DB_PASSWORD"],
+        db_config["DB_NAME"]
+    )
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            settings = {name: db_config.get(name, default) for name, default in DEFAULT_POOL_SETTINGS.items()}
+            pool = ConnectionPool(
+                connect_kwargs={
+                    "user": db_config["DB_USER"],
+                    "password": db_config["DB_PASSWORD"],
+                    "host": db_config["DB_HOST"],
+                    "port": db_config["DB_PORT"],
+                    "database": db_config["DB_NAME"]
+                },
+                min_size=settings["DB_POOL_MIN_SIZE"],
+                max_size=settings["DB_POOL_MAX_SIZE"],
+                idle_timeout=settings["DB_POOL_IDLE_TIMEOUT"],
+                ping_interval=settings["DB_POOL_PING_INTERVAL"],
+                checkout_timeout=settings["DB_POOL_CHECKOUT_TIMEOUT"]
+            )
+            _pools[key] = pool
+        return pool
+
+def close_all_pools():
+    """关闭所有共享连接池中的空闲连接（进程退出前调用）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close_all()
 
 class DatabaseManager:
     """
     数据库连接管理器，提供统一的数据库连接管理。
     使用上下文管理器（with语句）自动处理连接的打开和关闭。
+    默认从进程内共享的连接池借出连接，可通过DB_POOL_ENABLED=False关闭连接池。
     """
-    
+
     def __init__(self, db_config):
         """
         初始化数据库管理器
-        
+
         Args:
             db_config (dict): 包含数据库连接信息的字典，必须包含以下键：
                               DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+                              可选的连接池键：DB_POOL_ENABLED, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+                              DB_POOL_IDLE_TIMEOUT, DB_POOL_PING_INTERVAL, DB_POOL_CHECKOUT_TIMEOUT
+                              可选的流式查询键：DB_STREAM_FETCH_SIZE
         """
         self.db_config = db_config
-        
+        self.pool = None
+        if db_config.get("DB_POOL_ENABLED", DEFAULT_POOL_SETTINGS["DB_POOL_ENABLED"]):
+            self.pool = get_connection_pool(db_config)
+
     @contextmanager
     def get_connection(self, dictionary=False, connect_timeout=5):
         """
         获取数据库连接的上下文管理器
-        
+
         Args:
             dictionary (bool): 是否返回字典形式的结果，默认为False
             connect_timeout (int): 连接超时时间，默认为5秒
-            
+
         Yields:
             tuple: (connection, cursor) 数据库连接和游标对象
         """
         connection = None
         cursor = None
+        discard = False
         try:
-            connection = mysql.connector.connect(
-                user=self.db_config["DB_USER"],
-                password=self.db_config["DB_PASSWORD"],
-                host=self.db_config["DB_HOST"],
-                port=self.db_config["DB_PORT"],
-                database=self.db_config["DB_NAME"],
-                connect_timeout=connect_timeout
-            )
+            connection = self._acquire(connect_timeout)
             cursor = connection.cursor(dictionary=dictionary)
             yield connection, cursor
         except mysql.connector.Error as err:
             if connection and connection.is_connected():
                 connection.rollback()
+            else:
+                discard = True
             raise err
         finally:
             if cursor:
-                cursor.close()
-            if connection and connection.is_connected():
-                connection.close()
-                
+                try:
+                    cursor.close()
+                except Exception:
+                    discard = True
+            self._release(connection, discard)
+
+    def _acquire(self, connect_timeout: int):
+        """从连接池借出连接，未启用连接池时新建连接"""
+        if self.pool:
+            return self.pool.acquire(connect_timeout=connect_timeout)
+        return mysql.connector.connect(
+            user=self.db_config["DB_USER"],
+            password=self.db_config["DB_PASSWORD"],
+            host=self.db_config["DB_HOST"],
+            port=self.db_config["DB_PORT"],
+            database=self.db_config["DB_NAME"],
+            connect_timeout=connect_timeout
+        )
+
+    def _release(self, connection, discard: bool = False):
+        """归还连接到连接池，未启用连接池时关闭连接"""
+        if self.pool:
+            self.pool.release(connection, discard=discard)
+        elif connection is not None:
+            try:
+                if discard or connection.is_connected():
+                    connection.close()
+            except Exception:
+                pass
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            Dict[str, Any]: 连接池统计信息，未启用连接池时返回空字典
+        """
+        return self.pool.get_stats() if self.pool else {}
+
     def execute_query(self, query, params=None, dictionary=False, commit=False):
         """
         执行查询并返回结果
-        
+
         Args:
             query (str): SQL查询语句
             params (dict, optional): 查询参数
             dictionary (bool): 是否返回字典形式的结果，默认为False
             commit (bool): 是否提交事务，默认为False
-            
+
         Returns:
             list: 查询结果列表
         """
@@ -72,15 +411,98 @@ class DatabaseManager:
             if commit:
                 connection.commit()
             return cursor.fetchall()
-            
+
+    def stream_query_chunks(self, query, params=None, dictionary=False,
+                            fetch_size: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        流式执行查询，按块返回结果。
+        使用非缓冲游标，服务器逐步发送结果，客户端每次只保留fetch_size行，内存占用与结果集大小无关。
+        迭代期间连接被独占；迭代完成后连接归还连接池，提前关闭（break、异常或close()）时
+        剩余结果未读，连接直接丢弃，不读完剩余的结果。
+
+        Args:
+            query (str): SQL查询语句
+            params (dict, optional): 查询参数
+            dictionary (bool): 是否返回字典形式的结果，默认为False
+            fetch_size (Optional[int]): 每块的行数，默认为db_config中的DB_STREAM_FETCH_SIZE
+
+        Yields:
+            List[Any]: 最多fetch_size行的查询结果
+        """
+        fetch_size = fetch_size or self.db_config.get("DB_STREAM_FETCH_SIZE", DEFAULT_STREAM_FETCH_SIZE)
+        connection = self._acquire(connect_timeout=5)
+        cursor = None
+        exhausted = False
+        try:
+            cursor = connection.cursor(dictionary=dictionary, buffered=False)
+            cursor.execute(query, params or {})
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+            exhausted = True
+        finally:
+            if exhausted:
+                try:
+                    cursor.close()
+                except Exception:
+                    exhausted = False
+            self._release(connection, discard=not exhausted)
+
+    def stream_query(self, query, params=None, dictionary=False, fetch_size: Optional[int] = None) -> Iterator[Any]:
+        """
+        流式执行查询，逐行返回结果（见stream_query_chunks）
+
+        Args:
+            query (str): SQL查询语句
+            params (dict, optional): 查询参数
+            dictionary (bool): 是否返回字典形式的结果，默认为False
+            fetch_size (Optional[int]): 每次从服务器读取的行数
+
+        Yields:
+            Any: 一行查询结果
+        """
+        chunks = self.stream_query_chunks(query, params, dictionary=dictionary, fetch_size=fetch_size)
+        try:
+            for rows in chunks:
+                yield from rows
+        finally:
+            chunks.close()
+
+    def stream_query_columns(self, query, params=None, fetch_size: Optional[int] = None,
+                             dtypes: Optional[Mapping[str, Any]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        流式执行查询，每块结果按列转换为NumPy数组（见stream_query_chunks）
+
+        未指定dtype的列按第一个非空值推断：DECIMAL和浮点数转为float64（NULL为nan），
+        没有NULL的整数列转为int64，DATETIME转为datetime64[us]，其他类型保留为object数组。
+
+        Args:
+            query (str): SQL查询语句
+            params (dict, optional): 查询参数
+            fetch_size (Optional[int]): 每块的行数
+            dtypes (Optional[Mapping[str, Any]]): 列名到NumPy dtype的映射
+
+        Yields:
+            Dict[str, np.ndarray]: 列名到该块数据的映射，各列长度相同
+        """
+        dtypes = dtypes or {}
+        chunks = self.stream_query_chunks(query, params, dictionary=True, fetch_size=fetch_size)
+        try:
+            for rows in chunks:
+                yield {name: _column_array([row[name] for row in rows], dtypes.get(name)) for name in rows[0]}
+        finally:
+            chunks.close()
+
     def execute_update(self, query, params=None):
         """
         执行更新操作（INSERT, UPDATE, DELETE等）
-        
+
         Args:
             query (str): SQL更新语句
             params (dict, optional): 更新参数
-            
+
         Returns:
             int: 受影响的行数
         """
@@ -88,15 +510,15 @@ class DatabaseManager:
             cursor.execute(query, params or {})
             connection.commit()
             return cursor.rowcount
-            
+
     def execute_many(self, query, params_list):
         """
         批量执行SQL语句
-        
+
         Args:
             query (str): SQL语句模板
             params_list (list): 参数列表
-            
+
         Returns:
             int: 受影响的行数
         """
@@ -104,3 +526,96 @@ class DatabaseManager:
             cursor.executemany(query, params_list)
             connection.commit()
             return cursor.rowcount
+
+    def bulk_upsert(self, table: str, columns: Sequence[str], rows: List[Any],
+                    update_columns: Optional[Union[Sequence[str], Mapping[str, str]]] = None,
+                    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        分块批量写入：每块生成一条多行 INSERT ... ON DUPLICATE KEY UPDATE 语句并单独提交。
+        某一块写入失败时回滚该块并逐行重试，以找出具体失败的行，其他块不受影响。
+
+        Args:
+            table (str): 表名
+            columns (Sequence[str]): 写入的列名
+            rows (List[Any]): 要写入的行，可以是以列名为键的字典，也可以是按columns顺序排列的序列
+            update_columns (Optional[Union[Sequence[str], Mapping[str, str]]]): 唯一键冲突时更新的列，为None时不更新
+                （重复行保持原值）；为字典时按顺序把列更新为对应的SQL表达式，用于条件更新
+            chunk_size (int): 每条语句包含的行数
+
+        Returns:
+            Tuple[int, List[Tuple[int, str]]]: (成功写入的行数, [(失败行在rows中的下标, 错误信息)])
+        """
+        if not rows:
+            return 0, []
+
+        column_sql = ", ".join(f"`{column}`" for column in columns)
+        row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        if isinstance(update_columns, Mapping):
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(
+                f"`{column}`={expression}" for column, expression in update_columns.items()
+            )
+        elif update_columns:
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(
+                f"`{column}`=VALUES(`{column}`)" for column in update_columns
+            )
+        else:
+            # 没有需要更新的列时让重复行保持不变
+            suffix = f" ON DUPLICATE KEY UPDATE `{columns[0]}`=`{columns[0]}`"
+
+        def build_sql(row_count):
+            return f"INSERT INTO `{table}` ({column_sql}) VALUES " + ", ".join([row_placeholder] * row_count) + suffix
+
+        def row_values(row):
+            if isinstance(row, dict):
+                return [row.get(column) for column in columns]
+            return list(row)
+
+        stored_count = 0
+        failed_rows = []
+
+        with self.get_connection() as (connection, cursor):
+            single_row_sql = build_sql(1)
+
+            for chunk_start in range(0, len(rows), chunk_size):
+                chunk = rows[chunk_start:chunk_start + chunk_size]
+                params = []
+                for row in chunk:
+                    params.extend(row_values(row))
+
+                try:
+                    cursor.execute(build_sql(len(chunk)), params)
+                    connection.commit()
+                    stored_count += len(chunk)
+                    continue
+                except mysql.connector.Error:
+                    connection.rollback()
+
+                # 整块失败时逐行重试，隔离出失败的行
+                for offset, row in enumerate(chunk):
+                    try:
+                        cursor.execute(single_row_sql, row_values(row))
+                        connection.commit()
+                        stored_count += 1
+                    except mysql.connector.Error as err:
+                        connection.rollback()
+                        failed_rows.append((chunk_start + offset, str(err)))
+
+        return stored_count, failed_rows
+
+def _column_array(values: List[Any], dtype: Any = None) -> np.ndarray:
+    """把一列查询结果转换为NumPy数组，dtype为None时按第一个非空值推断"""
+    if dtype is not None:
+        return np.asarray(values, dtype=dtype)
+
+    sample = next((value for value in values if value is not None), None)
+    has_null = sample is None or any(value is None for value in values)
+    if isinstance(sample, bool):
+        return np.asarray(values, dtype=object if has_null else bool)
+    if isinstance(sample, int) and not has_null:
+        return np.asarray(values, dtype=np.int64)
+    if isinstance(sample, (int, float, decimal.Decimal)):
+        return np.asarray([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+    if isinstance(sample, datetime.datetime):
+        return np.asarray([np.datetime64('NaT') if value is None else value for value in values],
+                          dtype='datetime64[us]')
+    return np.asarray(values, dtype=object)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+数据库迁移
+models/migrations 下的 NNN_描述.sql 文件按文件名顺序执行，已执行的版本记录在schema_migrations表中，
+每个迁移只执行一次。models/database_schema.sql 新建的数据库已登记其包含的迁移。
+"""
+import os
+import sys
+import logging
+from typing import List, Tuple, Set
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.database.db_manager import DatabaseManager
+
+# 配置日志
+logger = logging.getLogger('migrations')
+
+MIGRATIONS_DIR = os.path.join(APP_DIR, 'models', 'migrations')
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(100) PRIMARY KEY COMMENT '迁移文件名（不含扩展名）',
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '执行时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='已执行的数据库迁移'
+"""
+
+def list_migrations(directory: str = MIGRATIONS_DIR) -> List[Tuple[str, str]]:
+    """
+    列出迁移文件
+
+    Args:
+        directory (str): 迁移文件目录
+
+    Returns:
+        List[Tuple[str, str]]: 按版本排序的 (版本, 文件路径)，版本为不含扩展名的文件名
+    """
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.sql'):
+            migrations.append((filename[:-4], os.path.join(directory, filename)))
+    return migrations
+
+def split_statements(sql: str) -> List[str]:
+    """
+    把迁移文件拆分为单条语句（去掉 -- 注释行，按行尾的分号拆分）
+
+    Args:
+        sql (str): 迁移文件内容
+
+    Returns:
+        List[str]: SQL语句列表
+    """
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(current).strip().rstrip(';'))
+            current = []
+    if current:
+        statements.append('\n'.join(current).strip())
+    return statements
+
+def get_applied_migrations(db_manager: DatabaseManager) -> Set[str]:
+    """
+    获取已执行的迁移版本（迁移记录表不存在时创建）
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+
+    Returns:
+        Set[str]: 已执行的迁移版本
+    """
+    with db_manager.get_connection() as (connection, cursor):
+        cursor.execute(CREATE_MIGRATIONS_TABLE)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(db_manager: DatabaseManager, directory: str = MIGRATIONS_DIR,
+                     dry_run: bool = False) -> List[str]:
+    """
+    按顺序执行尚未执行的迁移
+
+    MySQL的DDL语句会隐式提交，迁移中途失败时已执行的语句不会回滚，也不会登记该版本；
+    修复后重新执行前需要先手工处理已生效的部分。
+
+    Args:
+        db_manager (DatabaseManager): 数据库管理器
+        directory (str): 迁移文件目录
+        dry_run (bool): 为True时只返回待执行的迁移，不执行
+
+    Returns:
+        List[str]: 本次执行（dry_run时为待执行）的迁移版本
+    """
+    applied = get_applied_migrations(db_manager)
+    pending = [(version, path) for version, path in list_migrations(directory) if version not in applied]
+    if dry_run:
+        return [version for version, _ in pending]
+
+    executed = []
+    for version, path in pending:
+        with open(path, encoding='utf-8') as migration_file:
+            statements = split_statements(migration_file.read())
+
+        logger.info(f"执行数据库迁移 {version}（{len(statements)}条语句）")
+        with db_manager.get_connection() as (connection, cursor):
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            connection.commit()
+        executed.append(version)
+
+    if executed:
+        logger.info(f"数据库迁移完成: {executed}")
+    else:
+        logger.info("没有需要执行的数据库迁移")
+    return executed
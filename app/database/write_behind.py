@@ -0,0 +1,336 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+数据库写后缓冲
+调用方把写语句放入有界队列后立即返回，后台线程按批取出，同一张表的语句合并在一个事务中提交
+（连续的相同语句用executemany，多行INSERT会被合并为一条语句）。
+一批在凑满batch_size条或最早的写入等待了max_latency秒时写入；同一张表的语句按提交顺序执行。
+数据库不可用时整批放回队列重试；某条语句本身出错时逐条重试，只丢弃出错的语句。
+队列满时调用方等待空间，不绕过队列直接写入，否则会越过同一张表更早的语句（例如订单状态更新先于订单插入）。
+必须在返回前落库的写入使用 durable=True，后台线程立即写入当前队列，调用方等待所在的批次提交后才返回。
+等待空间和等待提交都以submit_timeout为上限，超时返回False，数据库不可用时不会无限阻塞调用方。
+stop() 写入队列中剩余的语句，start() 时注册为进程退出时执行。
+"""
+import time
+import atexit
+import logging
+import threading
+import collections
+from typing import Dict, Any, Optional, List, Sequence, Iterable
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+from app.database.db_manager import DatabaseManager
+
+# 配置日志
+logger = logging.getLogger('write_behind')
+
+# 连接断开、数据库不可用等错误：整批放回队列稍后重试
+RETRYABLE_ERRORS = (mysql_errors.InterfaceError, mysql_errors.OperationalError, mysql_errors.PoolError)
+
+class PendingWrite:
+    """队列中的一条写语句"""
+
+    __slots__ = ('seq', 'table', 'query', 'params', 'submitted_at', 'done', 'finished', 'ok')
+
+    def __init__(self, seq: int, table: str, query: str, params: Sequence[Any], durable: bool):
+        self.seq = seq
+        self.table = table
+        self.query = query
+        self.params = params
+        self.submitted_at = time.monotonic()
+        self.done = threading.Event() if durable else None
+        self.finished = False
+        self.ok = False
+
+    def finish(self, ok: bool):
+        self.finished = True
+        self.ok = ok
+        if self.done:
+            self.done.set()
+
+class WriteBehindBuffer:
+    """数据库写后缓冲"""
+
+    def __init__(self, db_config: Dict[str, Any], batch_size: int = 500, max_latency: float = 0.5,
+                 max_queue_size: int = 10000, enabled: bool = True, durable_tables: Iterable[str] = (),
+                 submit_timeout: float = 5.0):
+        """
+        初始化写后缓冲
+
+        Args:
+            db_config (Dict[str, Any]): 数据库配置
+            batch_size (int): 每批最多写入的语句数
+            max_latency (float): 写入在队列中最长等待的时间（秒），也是数据库不可用时的重试间隔
+            max_queue_size (int): 队列容量，队列满时调用方等待空间
+            enabled (bool): 为False时所有写入都在调用方线程中同步执行
+            durable_tables (Iterable[str]): 这些表的写入总是按durable=True处理
+            submit_timeout (float): 队列满时等待空间、durable写入等待提交的最长时间（秒），超时放弃该写入
+        """
+        self.db_manager = DatabaseManager(db_config)
+        self.batch_size = max(1, batch_size)
+        self.max_latency = max_latency
+        self.max_queue_size = max(1, max_queue_size)
+        self.enabled = enabled
+        self.durable_tables = frozenset(durable_tables)
+        self.submit_timeout = submit_timeout
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._durable_queued = 0
+        self._seq = 0
+        # 后台线程运行期间（包括停止时写入剩余语句）为True，写入都进入队列；后台线程退出后才在调用方线程中写入
+        self._running = False
+        self._stopping = False
+        self._thread = None
+        self._atexit_registered = False
+
+        self.stats = {
+            'submitted': 0, 'written': 0, 'failed': 0, 'synchronous': 0, 'rejected': 0, 'timeouts': 0,
+            'batches': 0, 'transactions': 0, 'retries': 0, 'max_queue': 0
+        }
+
+    def start(self):
+        """启动后台写入线程"""
+        if not self.enabled:
+            return
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._stopping = False
+
+        self._thread = threading.Thread(target=self._flush_loop, name='write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    def stop(self, timeout: float = 30.0):
+        """
+        写入队列中剩余的语句并停止后台线程，之后的写入在调用方线程中同步执行
+
+        Args:
+            timeout (float): 等待后台线程写完的最长时间（秒）
+        """
+        with self._cond:
+            if not self._running:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.error(f"写后缓冲在{timeout}秒内未写完，剩余{len(self._queue)}条语句")
+                return
+        self._thread = None
+
+    def submit(self, table: str, query: str, params: Sequence[Any] = (), durable: bool = False) -> bool:
+        """
+        提交一条写语句
+
+        Args:
+            table (str): 语句写入的表，同一张表的语句在同一个事务中按顺序执行
+            query (str): SQL语句
+            params (Sequence[Any]): 语句参数
+            durable (bool): 为True时等待语句提交后才返回
+
+        Returns:
+            bool: 非durable写入放入队列即返回True；durable或同步写入返回是否写入成功；
+                队列满或等待提交超过submit_timeout时返回False
+        """
+        durable = durable or table in self.durable_tables
+        write = None
+        with self._cond:
+            self.stats['submitted'] += 1
+            if self._running:
+                has_space = self._cond.wait_for(
+                    lambda: len(self._queue) < self.max_queue_size or not self._running,
+                    timeout=self.submit_timeout
+                )
+                if not has_space:
+                    self.stats['rejected'] += 1
+                    logger.error(f"写后缓冲已满{self.submit_timeout}秒，放弃{table}的写入")
+                    return False
+                if self._running:
+                    self._seq += 1
+                    write = PendingWrite(self._seq, table, query, params, durable)
+                    self._queue.append(write)
+                    self._durable_queued += durable
+                    self.stats['max_queue'] = max(self.stats['max_queue'], len(self._queue))
+                    self._cond.notify_all()
+
+        if write is None:
+            return self._write_now(table, query, params)
+        if not durable:
+            return True
+        if write.done.wait(self.submit_timeout):
+            return write.ok
+        return self._abandon(write)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的写入全部完成（写入成功或已丢弃）
+
+        Args:
+            timeout (Optional[float]): 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 队列在超时前清空返回True
+        """
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入统计，包括当前队列长度"""
+        with self._cond:
+            return dict(self.stats, queued=len(self._queue))
+
+    def _abandon(self, write: PendingWrite) -> bool:
+        """durable写入等待超时：仍在队列中时移出队列，不再写入"""
+        with self._cond:
+            if write.finished:
+                return write.ok
+            self.stats['timeouts'] += 1
+            try:
+                self._queue.remove(write)
+            except ValueError:
+                logger.error(f"等待{write.table}的写入提交超时，该语句正在写入，结果未知")
+                return False
+            self._durable_queued -= 1
+            self.stats['failed'] += 1
+            write.finish(False)
+            self._cond.notify_all()
+        logger.error(f"等待{write.table}的写入提交超过{self.submit_timeout}秒，已放弃该写入")
+        return False
+
+    def _write_now(self, table: str, query: str, params: Sequence[Any]) -> bool:
+        """在调用方线程中同步写入（未启用、未启动或已停止时）"""
+        write = PendingWrite(0, table, query, params, durable=False)
+        try:
+            self._write_table(table, [write])
+        except Exception as e:
+            logger.error(f"写入{table}失败: {e}")
+            write.finish(False)
+        with self._cond:
+            self.stats['synchronous'] += 1
+            self.stats['written' if write.ok else 'failed'] += 1
+        return write.ok
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._stopping)
+                if not self._queue:
+                    self._running = False
+                    self._cond.notify_all()
+                    return
+                # 凑满一批，或等到最早的写入达到最大延迟；有durable写入时立即写入
+                deadline = self._queue[0].submitted_at + self.max_latency
+                while len(self._queue) < self.batch_size and not self._stopping and not self._durable_queued:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                self._durable_queued -= sum(1 for write in batch if write.done)
+                self._cond.notify_all()
+
+            retry = self._write_batch(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                if retry and not self._stopping:
+                    self.stats['retries'] += 1
+                    self._queue.extendleft(reversed(retry))
+                    self._durable_queued += sum(1 for write in retry if write.done)
+                self._cond.notify_all()
+
+            if retry and self._stopping:
+                for write in retry:
+                    write.finish(False)
+                with self._cond:
+                    self.stats['failed'] += len(retry)
+                logger.error(f"停止时数据库不可用，丢弃{len(retry)}条待写入语句")
+            elif retry:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopping, timeout=self.max_latency)
+
+    def _write_batch(self, batch: List[PendingWrite]) -> List[PendingWrite]:
+        """
+        按表分组写入一批语句
+
+        Returns:
+            List[PendingWrite]: 因数据库不可用需要重试的语句，按提交顺序排列
+        """
+        tables = {}
+        for write in batch:
+            tables.setdefault(write.table, []).append(write)
+
+        for table, writes in tables.items():
+            try:
+                self._write_table(table, writes)
+            except RETRYABLE_ERRORS as e:
+                logger.warning(f"写入{table}时数据库不可用，{self.max_latency}秒后重试: {e}")
+            except Exception as e:
+                logger.error(f"写入{table}失败: {e}")
+                for write in writes:
+                    if not write.finished:
+                        write.finish(False)
+
+        with self._cond:
+            self.stats['batches'] += 1
+            self.stats['written'] += sum(1 for write in batch if write.ok)
+            self.stats['failed'] += sum(1 for write in batch if write.finished and not write.ok)
+        return [write for write in batch if not write.finished]
+
+    def _write_table(self, table: str, writes: List[PendingWrite]):
+        """
+        在一个事务中写入同一张表的语句；事务失败时逐条写入，找出出错的语句。
+        数据库不可用时抛出RETRYABLE_ERRORS，已写入的语句标记为成功。
+        """
+        with self.db_manager.get_connection() as (connection, cursor):
+            try:
+                self._execute_runs(cursor, writes)
+                connection.commit()
+                with self._cond:
+                    self.stats['transactions'] += 1
+                for write in writes:
+                    write.finish(True)
+                return
+            except RETRYABLE_ERRORS:
+                raise
+            except mysql.connector.Error:
+                connection.rollback()
+
+            for write in writes:
+                try:
+                    cursor.execute(write.query, write.params)
+                    connection.commit()
+                    write.finish(True)
+                except RETRYABLE_ERRORS:
+                    raise
+                except mysql.connector.Error as err:
+                    connection.rollback()
+                    logger.error(f"写入{table}失败，丢弃该语句: {err}")
+                    write.finish(False)
+
+    @staticmethod
+    def _execute_runs(cursor, writes: List[PendingWrite]):
+        """连续的相同语句用executemany执行"""
+        start = 0
+        while start < len(writes):
+            end = start + 1
+            while end < len(writes) and writes[end].query == writes[start].query:
+                end += 1
+            if end - start == 1:
+                cursor.execute(writes[start].query, writes[start].params)
+            else:
+                cursor.executemany(writes[start].query, [write.params for write in writes[start:end]])
+            start = end
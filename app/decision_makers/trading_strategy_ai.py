@@ -19,6 +19,7 @@ if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
 from app.database.db_manager import DatabaseManager
+from app.data_collectors.latest_prices import get_latest_prices
 
 # 配置日志
 logger = logging.getLogger('trading_strategy_ai')
@@ -83,31 +84,19 @@ def generate_trading_strategy(
         logger.error(f"获取每日汇总数据时数据库错误: {err}")
         return False
 
-    # 2. 获取每个交易对的最新价格数据
+    # 2. 获取每个交易对的最新价格数据（latest_prices按主键一次查询全部交易对）
     try:
         price_data = {}
+        latest_prices = get_latest_prices(db_manager, trading_pairs)
         for pair in trading_pairs:
             crypto_symbol = pair.replace("USDT", "")
+            latest = latest_prices.get(pair)
 
-            # 获取最新K线数据
-            query_kline = """
-            SELECT trading_pair, close_price, high_price, low_price
-            FROM kline_data
-            WHERE trading_pair = %(pair)s
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """
-            kline_results = db_manager.execute_query(
-                query_kline,
-                {"pair": pair},
-                dictionary=True
-            )
-
-            if kline_results:
+            if latest:
                 price_data[crypto_symbol] = {
-                    "current_price": kline_results[0]["close_price"],
-                    "daily_high": kline_results[0]["high_price"],
-                    "daily_low": kline_results[0]["low_price"]
+                    "current_price": latest["price"],
+                    "daily_high": latest["high_price"] if latest["high_price"] is not None else "Unknown",
+                    "daily_low": latest["low_price"] if latest["low_price"] is not None else "Unknown"
                 }
             else:
                 logger.warning(f"未找到{pair}的价格数据")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+JSON解码
+安装了orjson时用orjson解码，否则使用标准库json。另外提供直接从原始消息中截取字段值的函数，
+行情消息的快速解析路径用它们只取出需要的几个字段，不把整条消息解码为字典；
+截取字段比标准库json快，但比orjson完整解码慢，因此只在未安装orjson时默认启用。
+截取函数只适用于Binance推送的紧凑JSON（键值之间没有空格、字符串值中没有转义字符），
+找不到字段时返回None，调用方应改用完整解码。
+"""
+import json
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+# 当前使用的JSON解码库
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+# 解码JSON文本（str或bytes），解码失败时抛出json.JSONDecodeError（orjson的异常是它的子类）
+loads = orjson.loads if orjson is not None else json.loads
+
+def string_field(message: str, marker: str, start: int = 0) -> Optional[str]:
+    """
+    截取字符串字段的值
+
+    Args:
+        message (str): 原始消息
+        marker (str): 字段前缀，例如 '"c":"'
+        start (int): 从该位置开始查找，用于跳过外层对象中同名的字段
+
+    Returns:
+        Optional[str]: 字段值，字段不存在时返回None
+    """
+    index = message.find(marker, start)
+    if index < 0:
+        return None
+    index += len(marker)
+    end = message.find('"', index)
+    return message[index:end] if end >= 0 else None
+
+def number_field(message: str, marker: str, start: int = 0) -> Optional[str]:
+    """
+    截取数字或布尔字段的原始文本
+
+    Args:
+        message (str): 原始消息
+        marker (str): 字段前缀，例如 '"E":'
+        start (int): 从该位置开始查找
+
+    Returns:
+        Optional[str]: 字段的原始文本，字段不存在时返回None
+    """
+    index = message.find(marker, start)
+    if index < 0:
+        return None
+    index += len(marker)
+    end = message.find(',', index)
+    if end < 0:
+        end = message.find('}', index)
+        if end < 0:
+            return None
+    else:
+        brace = message.find('}', index, end)
+        if brace >= 0:
+            end = brace
+    return message[index:end]
@@ -24,7 +24,8 @@ from app.scheduler.tasks import (
     collect_crypto_market_data,
     summarize_crypto_daily_data,
     generate_crypto_trading_strategy,
-    run_crypto_full_workflow
+    run_crypto_full_workflow,
+    maintain_kline_partitions
 )
 
 # 配置日志
@@ -68,6 +69,9 @@ class CryptoTradingScheduler:
         logger.info(f"高优先级交易对: {self.high_priority_pairs}")
         logger.info(f"低优先级交易对: {self.low_priority_pairs}")
 
+        # K线WebSocket实时写入（启用后每小时任务不再通过REST收集K线）
+        self.kline_ingester = None
+
         # 初始化交易管理器（如果启用自动交易）
         self.trading_manager = None
         if getattr(self.config, 'ENABLE_AUTO_TRADING', False):
@@ -97,7 +101,8 @@ class CryptoTradingScheduler:
         # 收集加密货币市场数据
         try:
             logger.info("收集加密货币市场数据...")
-            market_success = collect_crypto_market_data(self.trading_pairs)
+            market_success = collect_crypto_market_data(self.trading_pairs,
+                                                        collect_klines=self.kline_ingester is None)
             if market_success:
                 logger.info("成功收集加密货币市场数据")
             else:
@@ -141,6 +146,13 @@ class CryptoTradingScheduler:
 
         logger.info("每日加密货币策略生成完成")
 
+    def maintain_kline_partitions(self):
+        """K线分区维护任务"""
+        try:
+            maintain_kline_partitions()
+        except Exception as e:
+            logger.error(f"K线分区维护任务失败: {e}")
+
     def execute_trading_strategies(self):
         """执行交易策略任务"""
         if not self.trading_manager:
@@ -185,6 +197,41 @@ class CryptoTradingScheduler:
         except Exception as e:
             logger.error(f"清理已关闭仓位监控任务失败: {e}")
 
+    def start_kline_stream(self):
+        """启动K线WebSocket实时写入"""
+        if not getattr(self.config, 'KLINE_STREAM_ENABLED', False) or self.kline_ingester:
+            return
+
+        try:
+            from app.data_collectors.binance_data_collector import initialize_binance_client
+            from app.data_collectors.binance_rate_limiter import configure_rate_limiter
+            from app.data_collectors.kline_stream_ingester import KlineStreamIngester
+
+            configure_rate_limiter(self.config)
+            client = initialize_binance_client(
+                api_key=self.config.BINANCE_API_KEY,
+                api_secret=self.config.BINANCE_API_SECRET,
+                testnet=self.config.BINANCE_TESTNET
+            )
+            if not client:
+                logger.error("初始化Binance客户端失败，K线实时写入未启动")
+                return
+
+            self.kline_ingester = KlineStreamIngester(
+                client,
+                self.db_config,
+                self.trading_pairs,
+                getattr(self.config, 'KLINE_STREAM_INTERVALS', getattr(self.config, 'KLINE_INTERVALS', ["1m", "5m", "1h", "1d"])),
+                batch_size=getattr(self.config, 'KLINE_STREAM_BATCH_SIZE', 200),
+                flush_interval=getattr(self.config, 'KLINE_STREAM_FLUSH_INTERVAL', 2.0),
+                reconnect_interval=getattr(self.config, 'WEBSOCKET_RECONNECT_INTERVAL', 30),
+                kline_limits=getattr(self.config, 'KLINE_LIMITS', None)
+            )
+            self.kline_ingester.start()
+        except Exception as e:
+            logger.error(f"启动K线实时写入失败: {e}")
+            self.kline_ingester = None
+
     def setup_schedule(self):
         """设置定时任务计划"""
         # 清除现有的所有任务
@@ -207,6 +254,10 @@ class CryptoTradingScheduler:
         # 每日策略生成
         schedule.every().day.at(daily_strategy_time).do(self.generate_daily_strategy)
 
+        # 每日维护K线分区
+        partition_time = getattr(self.config, "KLINE_PARTITION_MAINTENANCE_TIME", "03:30")
+        schedule.every().day.at(partition_time).do(self.maintain_kline_partitions)
+
         # 如果启用自动交易，添加交易相关任务
         if self.trading_manager:
             # 每5分钟执行一次交易策略
@@ -244,6 +295,9 @@ class CryptoTradingScheduler:
             logger.warning("调度器已经在运行中")
             return
 
+        # 启动K线实时写入
+        self.start_kline_stream()
+
         # 设置定时任务
         self.setup_schedule()
 
@@ -262,10 +316,18 @@ class CryptoTradingScheduler:
 
         self.is_running = False
 
-        # 停止交易管理器的价格监控
+        # 停止K线实时写入，写入剩余的已收盘K线
+        if self.kline_ingester:
+            try:
+                self.kline_ingester.stop()
+            except Exception as e:
+                logger.error(f"停止K线实时写入失败: {e}")
+            self.kline_ingester = None
+
+        # 停止交易管理器的价格监控，写入待写的订单和仓位数据
         if self.trading_manager:
             try:
-                self.trading_manager.stop_monitoring()
+                self.trading_manager.shutdown()
                 logger.info("交易管理器价格监控已停止")
             except Exception as e:
                 logger.error(f"停止交易管理器价格监控失败: {e}")
@@ -8,6 +8,7 @@ import os
 import sys
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional
 
 # 确保app目录在Python路径中
@@ -22,9 +23,22 @@ from app.data_collectors.binance_data_collector import (
     fetch_market_fund_flow_data,
     store_market_fund_flow_data,
     fetch_kline_data,
+    fetch_kline_data_since,
+    get_latest_kline_times,
     store_kline_data
 )
+from app.data_collectors.binance_rate_limiter import configure_rate_limiter
+from app.data_collectors.kline_backfill import backfill_klines
 from app.data_processors.daily_summary_processor import process_and_store_crypto_daily_summary
+from app.data_processors.kline_resampler import (
+    BASE_INTERVAL,
+    can_resample,
+    cross_check_due,
+    cross_check_resampled_klines,
+    resample_stored_klines
+)
+from app.data_processors.kline_retention import apply_kline_retention, ensure_future_partitions
+from app.database.db_manager import DatabaseManager
 from app.decision_makers.trading_strategy_ai import generate_trading_strategy
 
 # 配置日志
@@ -50,8 +64,8 @@ def collect_crypto_news():
         logger.error(f"收集加密货币热点新闻时出错: {e}")
         return False
 
-def collect_crypto_market_data(trading_pairs: List[str] = None):
-    """收集加密货币市场数据任务"""
+def collect_crypto_market_data(trading_pairs: List[str] = None, collect_klines: bool = True):
+    """收集加密货币市场数据任务（K线由WebSocket实时写入时可跳过K线收集）"""
     logger.info("开始收集加密货币市场数据...")
 
     try:
@@ -65,6 +79,7 @@ def collect_crypto_market_data(trading_pairs: List[str] = None):
         logger.info(f"收集交易对: {trading_pairs}")
 
         # 初始化Binance客户端
+        configure_rate_limiter(config)
         client = initialize_binance_client(
             api_key=config.BINANCE_API_KEY,
             api_secret=config.BINANCE_API_SECRET,
@@ -76,7 +91,9 @@ def collect_crypto_market_data(trading_pairs: List[str] = None):
             return False
 
         # 收集市场资金流向数据
-        market_flows = fetch_market_fund_flow_data(client, trading_pairs)
+        market_flows = fetch_market_fund_flow_data(
+            client, trading_pairs, max_workers=getattr(config, 'MARKET_DATA_MAX_WORKERS', 8)
+        )
         if market_flows:
             inserted_count = store_market_fund_flow_data(db_config=db_config, flows_data=market_flows)
             logger.info(f"成功收集并存储了 {inserted_count} 条市场资金流向数据")
@@ -85,6 +102,8 @@ def collect_crypto_market_data(trading_pairs: List[str] = None):
 
         # 收集K线数据
         kline_success = True
+        if not collect_klines:
+            return kline_success
 
         # 从配置文件读取K线间隔和限制
         kline_intervals = getattr(config, 'KLINE_INTERVALS', ["1m", "5m", "1h", "1d"])
@@ -92,18 +111,47 @@ def collect_crypto_market_data(trading_pairs: List[str] = None):
             "1m": 100, "5m": 200, "1h": 500, "1d": 1000
         })
 
+        # 增量同步模式下只获取数据库中最后一根K线之后的数据
+        sync_mode = getattr(config, 'KLINE_SYNC_MODE', 'incremental')
+        latest_kline_times = {}
+        if sync_mode == 'incremental':
+            latest_kline_times = get_latest_kline_times(db_config, trading_pairs)
+            logger.info(f"K线增量同步模式，已有数据的交易对周期: {len(latest_kline_times)}个")
+
+        # 1分钟K线可用时，更高周期由1分钟K线在本地聚合，不再逐周期从交易所下载
+        resample_intervals = []
+        if getattr(config, 'KLINE_RESAMPLE_ENABLED', True) and BASE_INTERVAL in kline_intervals:
+            resample_intervals = [interval for interval in kline_intervals if can_resample(interval)]
+        cross_check_hours = getattr(config, 'KLINE_RESAMPLE_CROSS_CHECK_HOURS', 24)
+
+        # 各交易对、周期并发收集，请求速率由共享限流器控制；聚合周期跟在同一交易对的1分钟K线之后执行
+        jobs = {}
         for pair in trading_pairs:
-            # 收集不同时间周期的K线数据
+            if resample_intervals:
+                jobs[(pair, ','.join([BASE_INTERVAL] + resample_intervals))] = (
+                    _collect_and_resample_pair_klines,
+                    (client, db_config, pair, resample_intervals, kline_limits, latest_kline_times, cross_check_hours)
+                )
             for interval in kline_intervals:
-                # 从配置文件获取对应间隔的数据量限制
-                limit = kline_limits.get(interval, 500)
-
-                klines = fetch_kline_data(client, symbol=pair, interval=interval, limit=limit)
-                if klines:
-                    inserted_count = store_kline_data(db_config=db_config, kline_data=klines)
-                    logger.info(f"成功收集并存储了 {inserted_count} 条 {pair} {interval} K线数据")
-                else:
-                    logger.warning(f"未能获取 {pair} {interval} K线数据或返回为空")
+                if resample_intervals and (interval == BASE_INTERVAL or interval in resample_intervals):
+                    continue
+                jobs[(pair, interval)] = (
+                    _collect_pair_klines,
+                    (client, db_config, pair, interval, kline_limits.get(interval, 500),
+                     latest_kline_times.get((pair, interval)))
+                )
+
+        max_workers = getattr(config, 'KLINE_COLLECTION_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kline-collect') as executor:
+            futures = {executor.submit(func, *args): job for job, (func, args) in jobs.items()}
+
+            for future in as_completed(futures):
+                pair, interval = futures[future]
+                try:
+                    if not future.result():
+                        kline_success = False
+                except Exception as e:
+                    logger.error(f"收集 {pair} {interval} K线数据时出错: {e}")
                     kline_success = False
 
         return kline_success
@@ -111,6 +159,121 @@ def collect_crypto_market_data(trading_pairs: List[str] = None):
         logger.error(f"收集加密货币市场数据时出错: {e}")
         return False
 
+def _collect_pair_klines(client, db_config, pair: str, interval: str, limit: int,
+                         last_open_time: Optional[datetime.datetime]) -> bool:
+    """收集并存储单个交易对、单个周期的K线数据"""
+    if last_open_time:
+        klines = fetch_kline_data_since(client, symbol=pair, interval=interval, last_open_time=last_open_time)
+    else:
+        # 首次收集或全量模式，按配置的数量获取
+        klines = fetch_kline_data(client, symbol=pair, interval=interval, limit=limit)
+
+    if not klines:
+        logger.warning(f"未能获取 {pair} {interval} K线数据或返回为空")
+        return False
+
+    inserted_count = store_kline_data(db_config=db_config, kline_data=klines)
+    logger.info(f"成功收集并存储了 {inserted_count} 条 {pair} {interval} K线数据")
+    return True
+
+def _collect_and_resample_pair_klines(client, db_config, pair: str, resample_intervals: List[str],
+                                      kline_limits: dict, latest_kline_times: dict, cross_check_hours: float) -> bool:
+    """收集单个交易对的1分钟K线，再由1分钟K线聚合出更高周期的K线"""
+    base_success = _collect_pair_klines(client, db_config, pair, BASE_INTERVAL, kline_limits.get(BASE_INTERVAL, 500),
+                                        latest_kline_times.get((pair, BASE_INTERVAL)))
+    success = base_success
+
+    for interval in resample_intervals:
+        last_open_time = latest_kline_times.get((pair, interval))
+        # 首次收集时1分钟数据不足以覆盖历史窗口，仍从交易所获取
+        if base_success and last_open_time and resample_stored_klines(db_config, pair, interval, last_open_time):
+            if cross_check_due(pair, interval, cross_check_hours):
+                cross_check_resampled_klines(client, db_config, pair, interval)
+            continue
+
+        if not _collect_pair_klines(client, db_config, pair, interval, kline_limits.get(interval, 500), last_open_time):
+            success = False
+
+    return success
+
+def backfill_crypto_klines(trading_pairs: List[str] = None, intervals: List[str] = None,
+                           start_date_str: Optional[str] = None, end_date_str: Optional[str] = None):
+    """回填历史K线数据任务"""
+    try:
+        config = load_config()
+        db_config = get_db_config(config)
+
+        if trading_pairs is None:
+            trading_pairs = getattr(config, 'TRADING_PAIRS', ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+        if intervals is None:
+            intervals = getattr(config, 'KLINE_INTERVALS', ["1m", "5m", "1h", "1d"])
+
+        # 截止日期包含当天，未指定时回填到当前时间
+        now = datetime.datetime.now()
+        if end_date_str:
+            end = datetime.datetime.strptime(end_date_str, "%Y-%m-%d") + datetime.timedelta(days=1, milliseconds=-1)
+            end = min(end, now)
+        else:
+            end = now
+
+        if start_date_str:
+            start = datetime.datetime.strptime(start_date_str, "%Y-%m-%d")
+        else:
+            backfill_days = getattr(config, 'KLINE_BACKFILL_DAYS', 30)
+            start = datetime.datetime.combine(end.date() - datetime.timedelta(days=backfill_days), datetime.time())
+
+        logger.info(f"开始回填K线数据: {trading_pairs} {intervals} {start} ~ {end}")
+
+        configure_rate_limiter(config)
+        client = initialize_binance_client(
+            api_key=config.BINANCE_API_KEY,
+            api_secret=config.BINANCE_API_SECRET,
+            testnet=config.BINANCE_TESTNET
+        )
+
+        if not client:
+            logger.error("初始化Binance客户端失败")
+            return False
+
+        result = backfill_klines(
+            client=client,
+            db_config=db_config,
+            trading_pairs=trading_pairs,
+            intervals=intervals,
+            start=start,
+            end=end,
+            max_workers=getattr(config, 'KLINE_BACKFILL_WORKERS', 4)
+        )
+        return not result['failed']
+    except Exception as e:
+        logger.error(f"回填K线数据时出错: {e}")
+        return False
+
+def maintain_kline_partitions():
+    """K线分区维护任务：预建未来月份的分区，清理超过保留期且已聚合的1分钟K线分区"""
+    try:
+        config = load_config()
+        db_manager = DatabaseManager(get_db_config(config))
+
+        ensure_future_partitions(db_manager, months_ahead=getattr(config, 'KLINE_PARTITION_MONTHS_AHEAD', 3))
+
+        retention_months = getattr(config, 'KLINE_1M_RETENTION_MONTHS', 0)
+        if retention_months <= 0:
+            logger.info("未配置1分钟K线保留期，不清理K线分区")
+            return True
+
+        result = apply_kline_retention(
+            db_manager,
+            retention_months=retention_months,
+            rollup_intervals=getattr(config, 'KLINE_RETENTION_ROLLUP_INTERVALS', ["5m", "1h", "1d"]),
+            mode=getattr(config, 'KLINE_RETENTION_MODE', 'archive')
+        )
+        logger.info(f"K线分区维护完成: 清理{len(result['removed'])}个分区, 保留{len(result['kept'])}个未完整聚合的分区")
+        return not any(isinstance(reason, str) for reason in result['kept'].values())
+    except Exception as e:
+        logger.error(f"维护K线分区时出错: {e}")
+        return False
+
 def summarize_crypto_daily_data(target_date_str: Optional[str] = None):
     """汇总加密货币每日数据任务"""
     if not target_date_str:
@@ -21,6 +21,19 @@ from app.database.db_manager import DatabaseManager
 # 配置日志
 logger = logging.getLogger('trading_tasks')
 
+# 今日生成且未执行的策略，决策时间按半开区间过滤，可以使用decision_timestamp上的索引
+LATEST_STRATEGIES_QUERY = """
+    SELECT * FROM trading_strategies 
+    WHERE decision_timestamp >= CURDATE() AND decision_timestamp < CURDATE() + INTERVAL 1 DAY
+    AND position_type != 'NEUTRAL'
+    AND id NOT IN (
+        SELECT DISTINCT related_strategy_id 
+        FROM positions 
+        WHERE related_strategy_id IS NOT NULL
+    )
+    ORDER BY decision_timestamp DESC
+"""
+
 # 全局交易管理器实例
 _trading_manager = None
 
@@ -120,6 +133,11 @@ def monitor_positions():
             symbols = list(set([pos['trading_pair'] for pos in open_positions]))
             trading_manager.start_monitoring(symbols)
             logger.info(f"启动价格监控: {symbols}")
+        elif trading_manager.is_monitoring_active():
+            metrics = trading_manager.price_monitor.get_metrics()
+            logger.info(f"  价格分发: 队列深度={metrics['queue_depth']}, 平均延迟={metrics['avg_lag_ms']}ms, "
+                        f"最大延迟={metrics['max_lag_ms']}ms, 丢弃={metrics['ticks_dropped']}, "
+                        f"执行中平仓={metrics['in_flight']}")
         
         # 存储投资组合状态到数据库
         _store_portfolio_status(portfolio_summary)
@@ -199,17 +217,7 @@ def _get_latest_trading_strategies() -> List[Dict[str, Any]]:
         
         with db_manager.get_connection() as (connection, cursor):
             # 获取今日生成的策略，且未执行的
-            cursor.execute("""
-                SELECT * FROM trading_strategies 
-                WHERE DATE(decision_timestamp) = CURDATE()
-                AND position_type != 'NEUTRAL'
-                AND id NOT IN (
-                    SELECT DISTINCT related_strategy_id 
-                    FROM positions 
-                    WHERE related_strategy_id IS NOT NULL
-                )
-                ORDER BY decision_timestamp DESC
-            """)
+            cursor.execute(LATEST_STRATEGIES_QUERY)
             
             results = cursor.fetchall()
             columns = [desc[0] for desc in cursor.description]
@@ -302,4 +310,4 @@ if __name__ == "__main__":
     # 停止价格监控
     trading_manager = get_trading_manager()
     if trading_manager:
-        trading_manager.stop_monitoring()
+        trading_manager.shutdown()
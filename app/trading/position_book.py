@@ -0,0 +1,188 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+内存仓位簿
+保存所有开放仓位的权威副本，价格更新时只在内存中重新计算未实现盈亏并标记为待写入，
+由仓位管理器按固定间隔把有变化的仓位合并写回positions表。
+"""
+import threading
+from typing import Dict, Any, Optional, List, Tuple, Iterable
+
+def calculate_pnl(position_type: str, entry_price: float, price: float, quantity: float, leverage: float) -> float:
+    """
+    计算仓位按指定价格平仓时的盈亏
+
+    Args:
+        position_type (str): 仓位类型，LONG或SHORT
+        entry_price (float): 入场价格
+        price (float): 当前价格或平仓价格
+        quantity (float): 仓位数量
+        leverage (float): 杠杆倍数
+
+    Returns:
+        float: 盈亏金额
+    """
+    if position_type == 'LONG':
+        return (price - entry_price) * quantity * leverage
+    return (entry_price - price) * quantity * leverage
+
+class PositionBook:
+    """
+    开放仓位的内存索引（线程安全）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions = {}  # {position_id: position}
+        self._by_symbol = {}  # {trading_pair: set(position_id)}
+        self._dirty = set()  # 价格变化后尚未写回数据库的仓位ID
+        self.loaded = False
+
+    def load(self, positions: Iterable[Dict[str, Any]]):
+        """
+        用数据库中的开放仓位替换内存中的全部仓位
+
+        Args:
+            positions (Iterable[Dict[str, Any]]): 开放仓位列表
+        """
+        with self._lock:
+            self._positions = {}
+            self._by_symbol = {}
+            self._dirty = set()
+            for position in positions:
+                self._add_locked(position)
+            self.loaded = True
+
+    def upsert(self, position: Dict[str, Any]):
+        """添加或替换一个开放仓位"""
+        with self._lock:
+            self._remove_locked(position['id'])
+            self._add_locked(position)
+
+    def remove(self, position_id: int) -> Optional[Dict[str, Any]]:
+        """
+        移除仓位（仓位关闭时调用）
+
+        Args:
+            position_id (int): 仓位ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 被移除的仓位，不存在时返回None
+        """
+        with self._lock:
+            return self._remove_locked(position_id)
+
+    def get(self, position_id: int) -> Optional[Dict[str, Any]]:
+        """获取仓位副本"""
+        with self._lock:
+            position = self._positions.get(position_id)
+            return dict(position) if position else None
+
+    def get_open(self, trading_pair: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取开放仓位副本，按开仓时间倒序
+
+        Args:
+            trading_pair (Optional[str]): 交易对过滤，如果为None则获取所有交易对
+
+        Returns:
+            List[Dict[str, Any]]: 开放仓位列表
+        """
+        with self._lock:
+            if trading_pair:
+                positions = [dict(self._positions[position_id]) for position_id in self._by_symbol.get(trading_pair, ())]
+            else:
+                positions = [dict(position) for position in self._positions.values()]
+
+        positions.sort(key=lambda position: (position.get('open_time') is not None, position.get('open_time'), position['id']),
+                       reverse=True)
+        return positions
+
+    def symbols(self) -> List[str]:
+        """获取有开放仓位的交易对"""
+        with self._lock:
+            return list(self._by_symbol)
+
+    def mark_price(self, trading_pair: str, price: float) -> int:
+        """
+        按最新价格重新计算该交易对所有仓位的未实现盈亏
+
+        Args:
+            trading_pair (str): 交易对
+            price (float): 当前价格
+
+        Returns:
+            int: 更新的仓位数量
+        """
+        with self._lock:
+            position_ids = self._by_symbol.get(trading_pair)
+            if not position_ids:
+                return 0
+
+            for position_id in position_ids:
+                position = self._positions[position_id]
+                position['current_price'] = price
+                position['unrealized_pnl'] = calculate_pnl(
+                    position['position_type'], float(position['entry_price']), price,
+                    float(position['quantity']), float(position['leverage'])
+                )
+                self._dirty.add(position_id)
+            return len(position_ids)
+
+    def take_dirty(self) -> List[Tuple[int, float, float]]:
+        """
+        取出并清空待写入的仓位价格
+
+        Returns:
+            List[Tuple[int, float, float]]: [(仓位ID, 当前价格, 未实现盈亏)]
+        """
+        with self._lock:
+            updates = [
+                (position_id, self._positions[position_id]['current_price'], self._positions[position_id]['unrealized_pnl'])
+                for position_id in self._dirty if position_id in self._positions
+            ]
+            self._dirty = set()
+            return updates
+
+    def apply_prices(self, updates: Iterable[Tuple[int, float, float]]):
+        """
+        写入已经持久化到数据库的仓位价格，并清除这些仓位的待写入标记
+
+        Args:
+            updates (Iterable[Tuple[int, float, float]]): [(仓位ID, 当前价格, 未实现盈亏)]
+        """
+        with self._lock:
+            for position_id, current_price, unrealized_pnl in updates:
+                position = self._positions.get(position_id)
+                if position is None:
+                    continue
+                position['current_price'] = current_price
+                position['unrealized_pnl'] = unrealized_pnl
+                self._dirty.discard(position_id)
+
+    def mark_dirty(self, position_ids: Iterable[int]):
+        """将仓位重新标记为待写入（写入失败时调用）"""
+        with self._lock:
+            self._dirty.update(position_id for position_id in position_ids if position_id in self._positions)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._positions)
+
+    def _add_locked(self, position: Dict[str, Any]):
+        position = dict(position)
+        self._positions[position['id']] = position
+        self._by_symbol.setdefault(position['trading_pair'], set()).add(position['id'])
+
+    def _remove_locked(self, position_id: int) -> Optional[Dict[str, Any]]:
+        position = self._positions.pop(position_id, None)
+        if position is None:
+            return None
+
+        self._dirty.discard(position_id)
+        symbol_ids = self._by_symbol.get(position['trading_pair'])
+        if symbol_ids is not None:
+            symbol_ids.discard(position_id)
+            if not symbol_ids:
+                del self._by_symbol[position['trading_pair']]
+        return position
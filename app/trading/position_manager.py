@@ -8,9 +8,12 @@ import os
 import sys
 import logging
 import datetime
+import threading
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
 
+import numpy as np
+
 # 确保app目录在Python路径中
 APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if APP_DIR not in sys.path:
@@ -19,23 +22,186 @@ if APP_DIR not in sys.path:
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from app.database.db_manager import DatabaseManager
+from app.trading.position_book import PositionBook, calculate_pnl
 
 # 配置日志
 logger = logging.getLogger('position_manager')
 
+# 今日已实现盈亏，交易时间按半开区间过滤，可以使用(transaction_type, transaction_time)索引
+DAILY_REALIZED_PNL_QUERY = """
+    SELECT SUM(pnl) as daily_realized_pnl
+    FROM trades 
+    WHERE transaction_type = 'CLOSE' 
+    AND transaction_time >= CURDATE() AND transaction_time < CURDATE() + INTERVAL 1 DAY
+"""
+
 class PositionManager:
     """仓位管理器类"""
     
-    def __init__(self, binance_client: Client, db_config: Dict[str, Any]):
+    def __init__(self, binance_client: Client, db_config: Dict[str, Any], flush_interval: float = 5.0):
         """
         初始化仓位管理器
         
         Args:
             binance_client (Client): Binance API客户端
             db_config (Dict[str, Any]): 数据库配置
+            flush_interval (float): 价格更新后合并写回positions表的间隔（秒）
         """
         self.client = binance_client
         self.db_manager = DatabaseManager(db_config)
+        
+        # 开放仓位的内存副本，调用load_open_positions后作为开放仓位的权威来源
+        self.position_book = PositionBook()
+        self.flush_interval = flush_interval
+        self._flush_thread = None
+        self._flush_stop = threading.Event()
+    
+    def load_open_positions(self) -> bool:
+        """
+        从数据库加载所有开放仓位到内存仓位簿
+        
+        Returns:
+            bool: 加载成功返回True，失败返回False
+        """
+        try:
+            positions = self._query_open_positions()
+            self.position_book.load(positions)
+            logger.info(f"已加载{len(positions)}个开放仓位到内存")
+            return True
+        except Exception as e:
+            logger.error(f"加载开放仓位失败: {e}")
+            return False
+    
+    def start_price_flusher(self):
+        """启动后台线程，按固定间隔把内存中的仓位价格写回数据库"""
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+        
+        self._flush_stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='position-flush')
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+    
+    def stop_price_flusher(self):
+        """停止后台写回线程，并写入剩余的价格更新"""
+        self._flush_stop.set()
+        if self._flush_thread and self._flush_thread.is_alive():
+            self._flush_thread.join(timeout=10)
+        self._flush_thread = None
+        self.flush_position_prices()
+    
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.flush_interval):
+            self.flush_position_prices()
+    
+    def mark_price(self, trading_pair: str, current_price: float) -> int:
+        """
+        在内存中更新交易对所有开放仓位的当前价格和未实现盈亏，由后台线程合并写回数据库
+        
+        Args:
+            trading_pair (str): 交易对
+            current_price (float): 当前价格
+            
+        Returns:
+            int: 更新的仓位数量
+        """
+        return self.position_book.mark_price(trading_pair, current_price)
+    
+    def flush_position_prices(self) -> int:
+        """
+        将内存中有变化的仓位价格一次性写回positions表
+        
+        Returns:
+            int: 写回的仓位数量
+        """
+        updates = self.position_book.take_dirty()
+        if not updates:
+            return 0
+        
+        try:
+            self._write_position_prices(updates)
+            return len(updates)
+        except Exception as e:
+            # 写入失败时保留待写入标记，下次重试
+            self.position_book.mark_dirty(position_id for position_id, _, _ in updates)
+            logger.error(f"写回{len(updates)}个仓位价格失败: {e}")
+            return 0
+    
+    def _write_position_prices(self, updates: List[tuple], chunk_size: int = 1000):
+        """
+        用单条多行UPDATE写回仓位价格和未实现盈亏
+        
+        Args:
+            updates (List[tuple]): [(仓位ID, 当前价格, 未实现盈亏)]
+            chunk_size (int): 每条语句最多更新的仓位数量
+        """
+        for start in range(0, len(updates), chunk_size):
+            chunk = updates[start:start + chunk_size]
+            when_clauses = " ".join(["WHEN %s THEN %s"] * len(chunk))
+            price_params = [value for position_id, current_price, _ in chunk for value in (position_id, current_price)]
+            pnl_params = [value for position_id, _, unrealized_pnl in chunk for value in (position_id, unrealized_pnl)]
+            id_params = [position_id for position_id, _, _ in chunk]
+            
+            self.db_manager.execute_update(f"""
+                UPDATE positions 
+                SET current_price = CASE id {when_clauses} END,
+                    unrealized_pnl = CASE id {when_clauses} END,
+                    last_updated = CURRENT_TIMESTAMP
+                WHERE id IN ({', '.join(['%s'] * len(chunk))}) AND status = 'OPEN'
+            """, tuple(price_params + pnl_params + id_params))
+    
+    def revalue_all_positions(self, prices: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        用一次全市场价格快照重估所有开放仓位，并用一条语句写回数据库
+        
+        Args:
+            prices (Optional[Dict[str, float]]): 价格快照 {交易对: 价格}，为None时通过一次API请求获取全部交易对价格
+            
+        Returns:
+            Dict[str, Any]: 重估结果，包括更新的仓位数量、缺少价格的交易对和总未实现盈亏
+        """
+        positions = self.get_open_positions()
+        if not positions:
+            return {'updated': 0, 'missing_symbols': [], 'total_unrealized_pnl': 0.0}
+        
+        if prices is None:
+            prices = {ticker['symbol']: float(ticker['price']) for ticker in self.client.get_symbol_ticker()}
+        
+        priced = [position for position in positions if position['trading_pair'] in prices]
+        missing_symbols = sorted({position['trading_pair'] for position in positions} - set(prices))
+        if missing_symbols:
+            logger.warning(f"价格快照中缺少交易对: {missing_symbols}")
+        if not priced:
+            return {'updated': 0, 'missing_symbols': missing_symbols, 'total_unrealized_pnl': 0.0}
+        
+        current_prices = np.array([prices[position['trading_pair']] for position in priced], dtype=np.float64)
+        entry_prices = np.array([float(position['entry_price']) for position in priced], dtype=np.float64)
+        quantities = np.array([float(position['quantity']) for position in priced], dtype=np.float64)
+        leverages = np.array([float(position['leverage']) for position in priced], dtype=np.float64)
+        directions = np.array([1.0 if position['position_type'] == 'LONG' else -1.0 for position in priced])
+        unrealized_pnls = directions * (current_prices - entry_prices) * quantities * leverages
+        
+        updates = [
+            (position['id'], float(current_price), float(unrealized_pnl))
+            for position, current_price, unrealized_pnl in zip(priced, current_prices, unrealized_pnls)
+        ]
+        self._write_position_prices(updates)
+        self.position_book.apply_prices(updates)
+        
+        return {
+            'updated': len(updates),
+            'missing_symbols': missing_symbols,
+            'total_unrealized_pnl': float(unrealized_pnls.sum())
+        }
+    
+    def forget_position(self, position_id: int):
+        """
+        从内存仓位簿移除已在其他地方关闭的仓位
+        
+        Args:
+            position_id (int): 仓位ID
+        """
+        self.position_book.remove(position_id)
     
     def create_position(self, trading_pair: str, position_type: str, quantity: float, 
                        entry_price: float, stop_loss_price: Optional[float] = None,
@@ -75,6 +241,23 @@ class PositionManager:
                 position_id = cursor.lastrowid
                 connection.commit()
                 
+                self.position_book.upsert({
+                    'id': position_id,
+                    'trading_pair': trading_pair,
+                    'position_type': position_type,
+                    'quantity': quantity,
+                    'entry_price': entry_price,
+                    'current_price': entry_price,
+                    'unrealized_pnl': 0.0,
+                    'stop_loss_price': stop_loss_price,
+                    'take_profit_price': take_profit_price,
+                    'leverage': leverage,
+                    'margin_used': margin_used,
+                    'status': 'OPEN',
+                    'open_time': datetime.datetime.now(),
+                    'related_strategy_id': strategy_id
+                })
+                
                 logger.info(f"创建仓位成功: ID={position_id}, {trading_pair}, {position_type}, 数量={quantity}")
                 return position_id
                 
@@ -92,6 +275,10 @@ class PositionManager:
         Returns:
             Optional[Dict[str, Any]]: 仓位信息，失败时返回None
         """
+        position = self.position_book.get(position_id)
+        if position:
+            return position
+        
         try:
             with self.db_manager.get_connection() as (connection, cursor):
                 cursor.execute("""
@@ -120,75 +307,40 @@ class PositionManager:
         Returns:
             List[Dict[str, Any]]: 开放仓位列表
         """
+        if self.position_book.loaded:
+            return self.position_book.get_open(trading_pair)
+        
         try:
-            with self.db_manager.get_connection() as (connection, cursor):
-                if trading_pair:
-                    cursor.execute("""
-                        SELECT * FROM positions 
-                        WHERE status = 'OPEN' AND trading_pair = %s
-                        ORDER BY open_time DESC
-                    """, (trading_pair,))
-                else:
-                    cursor.execute("""
-                        SELECT * FROM positions 
-                        WHERE status = 'OPEN'
-                        ORDER BY open_time DESC
-                    """)
-                
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-                
-                positions = []
-                for result in results:
-                    position = dict(zip(columns, result))
-                    positions.append(position)
-                
-                return positions
-                
+            return self._query_open_positions(trading_pair)
         except Exception as e:
             logger.error(f"获取开放仓位失败: {e}")
             return []
     
-    def update_position_price(self, position_id: int, current_price: float) -> bool:
-        """
-        更新仓位当前价格和未实现盈亏
-        
-        Args:
-            position_id (int): 仓位ID
-            current_price (float): 当前价格
-            
-        Returns:
-            bool: 更新成功返回True，失败返回False
-        """
-        try:
-            position = self.get_position(position_id)
-            if not position:
-                return False
+    def _query_open_positions(self, trading_pair: Optional[str] = None) -> List[Dict[str, Any]]:
+        """从数据库查询开放仓位"""
+        with self.db_manager.get_connection() as (connection, cursor):
+            if trading_pair:
+                cursor.execute("""
+                    SELECT * FROM positions 
+                    WHERE status = 'OPEN' AND trading_pair = %s
+                    ORDER BY open_time DESC
+                """, (trading_pair,))
+            else:
+                cursor.execute("""
+                    SELECT * FROM positions 
+                    WHERE status = 'OPEN'
+                    ORDER BY open_time DESC
+                """)
             
-            # 计算未实现盈亏
-            entry_price = float(position['entry_price'])
-            quantity = float(position['quantity'])
-            position_type = position['position_type']
-            leverage = float(position['leverage'])
+            results = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
             
-            if position_type == 'LONG':
-                unrealized_pnl = (current_price - entry_price) * quantity * leverage
-            else:  # SHORT
-                unrealized_pnl = (entry_price - current_price) * quantity * leverage
+            positions = []
+            for result in results:
+                position = dict(zip(columns, result))
+                positions.append(position)
             
-            with self.db_manager.get_connection() as (connection, cursor):
-                cursor.execute("""
-                    UPDATE positions 
-                    SET current_price = %s, unrealized_pnl = %s, last_updated = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (current_price, unrealized_pnl, position_id))
-                
-                connection.commit()
-                return True
-                
-        except Exception as e:
-            logger.error(f"更新仓位价格失败: {e}")
-            return False
+            return positions
     
     def close_position(self, position_id: int, close_price: float, close_reason: str = 'MANUAL') -> bool:
         """
@@ -213,10 +365,7 @@ class PositionManager:
             position_type = position['position_type']
             leverage = float(position['leverage'])
             
-            if position_type == 'LONG':
-                realized_pnl = (close_price - entry_price) * quantity * leverage
-            else:  # SHORT
-                realized_pnl = (entry_price - close_price) * quantity * leverage
+            realized_pnl = calculate_pnl(position_type, entry_price, close_price, quantity, leverage)
             
             with self.db_manager.get_connection() as (connection, cursor):
                 cursor.execute("""
@@ -239,6 +388,7 @@ class PositionManager:
                 
                 connection.commit()
                 
+                self.position_book.remove(position_id)
                 logger.info(f"仓位关闭成功: ID={position_id}, 平仓价={close_price}, 盈亏={realized_pnl}")
                 return True
                 
@@ -268,12 +418,7 @@ class PositionManager:
                 open_stats = cursor.fetchone()
                 
                 # 获取今日已实现盈亏
-                cursor.execute("""
-                    SELECT SUM(pnl) as daily_realized_pnl
-                    FROM trades 
-                    WHERE transaction_type = 'CLOSE' 
-                    AND DATE(transaction_time) = CURDATE()
-                """)
+                cursor.execute(DAILY_REALIZED_PNL_QUERY)
                 
                 daily_pnl = cursor.fetchone()
                 
@@ -383,24 +528,8 @@ class PositionManager:
     def update_all_positions_prices(self):
         """更新所有开放仓位的当前价格"""
         try:
-            open_positions = self.get_open_positions()
-            
-            for position in open_positions:
-                trading_pair = position['trading_pair']
-                position_id = position['id']
-                
-                # 获取当前价格
-                try:
-                    ticker = self.client.get_ticker(symbol=trading_pair)
-                    current_price = float(ticker['lastPrice'])
-                    
-                    # 更新仓位价格
-                    self.update_position_price(position_id, current_price)
-                    
-                except Exception as e:
-                    logger.error(f"更新仓位{position_id}价格失败: {e}")
-            
-            logger.info(f"更新了{len(open_positions)}个仓位的价格")
+            result = self.revalue_all_positions()
+            logger.info(f"更新了{result['updated']}个仓位的价格，总未实现盈亏={result['total_unrealized_pnl']}")
             
         except Exception as e:
             logger.error(f"批量更新仓位价格失败: {e}")
@@ -2,15 +2,16 @@
 # -*- coding: utf-8 -*-
 """
 价格监控模块
-用于监控价格变动并在达到止盈或止损价格时执行卖出操作
+用于监控价格变动并在达到止盈或止损价格时执行平仓操作（多头卖出，空头买入）
 """
 import os
 import sys
 import time
-import json
+import queue
 import logging
 import threading
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Callable
 from decimal import Decimal
 
@@ -19,20 +20,96 @@ APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file
 if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
-import websocket
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from app.database.db_manager import DatabaseManager
 from app.trading.trading_executor import TradingExecutor
+from app.trading.trigger_book import TriggerBook, STOP_LOSS, TAKE_PROFIT, LONG
+from app.trading.trailing_stop import TrailingStopEngine
+from app.trading.stream_connection import StreamConnection, MAX_STREAMS_PER_CONNECTION
+from app.trading.tick_recorder import TickRecorder
+from app.fast_json import orjson, string_field, number_field
 
 # 配置日志
 logger = logging.getLogger('price_monitor')
 
+# 价格来源（即流名称后缀）：24小时ticker约每秒推送一次，bookTicker推送最优买卖价的每次变化，aggTrade推送每笔成交
+PRICE_SOURCE_TICKER = 'ticker'
+PRICE_SOURCE_BOOK_TICKER = 'bookTicker'
+PRICE_SOURCE_AGG_TRADE = 'aggTrade'
+PRICE_SOURCES = (PRICE_SOURCE_TICKER, PRICE_SOURCE_BOOK_TICKER, PRICE_SOURCE_AGG_TRADE)
+
+def parse_price_frame(message: str) -> Optional[tuple]:
+    """
+    直接从原始消息中截取价格字段，不把消息解码为字典，结果与完整解码后由_on_stream_event得到的相同
+
+    Args:
+        message (str): WebSocket收到的原始消息
+
+    Returns:
+        Optional[tuple]: (交易对, 价格, 买一价, 卖一价, 价格来源, 交易所事件时间毫秒)，
+            不是ticker、bookTicker、aggTrade行情或无法截取时返回None，由调用方完整解码
+    """
+    if not isinstance(message, str):
+        return None
+    try:
+        event_type = string_field(message, '"e":"')
+        if event_type == '24hrTicker':
+            close = string_field(message, '"c":"')
+            if close is None:
+                return None
+            price = float(close)
+            bid = string_field(message, '"b":"')
+            ask = string_field(message, '"a":"')
+            source = PRICE_SOURCE_TICKER
+            bid = float(bid) if bid else price
+            ask = float(ask) if ask else price
+        elif event_type == 'aggTrade':
+            trade_price = string_field(message, '"p":"')
+            if trade_price is None:
+                return None
+            price = bid = ask = float(trade_price)
+            source = PRICE_SOURCE_AGG_TRADE
+        elif event_type is None:
+            # 现货bookTicker事件没有e字段和事件时间，价格取买卖中间价
+            stream = string_field(message, '"stream":"')
+            if stream is not None and not stream.endswith('@bookTicker'):
+                return None
+            bid = string_field(message, '"b":"')
+            ask = string_field(message, '"a":"')
+            if bid is None or ask is None:
+                return None
+            bid = float(bid)
+            ask = float(ask)
+            price = (bid + ask) / 2
+            source = PRICE_SOURCE_BOOK_TICKER
+        else:
+            return None
+
+        symbol = string_field(message, '"s":"')
+        if symbol is None:
+            return None
+        event_time = number_field(message, '"E":')
+        return symbol, price, bid, ask, source, int(event_time) if event_time is not None else None
+    except ValueError:
+        return None
+
 class PriceMonitor:
     """价格监控器类"""
     
+    # 连接健康检查间隔（秒）
+    HEALTH_CHECK_INTERVAL = 1.0
+    # 分发线程空闲时检查停止信号的间隔（秒）
+    DISPATCH_POLL_INTERVAL = 0.5
+    
     def __init__(self, binance_client: Client, db_config: Dict[str, Any], 
-                 trading_executor: TradingExecutor):
+                 trading_executor: TradingExecutor, dispatch_queue_size: int = 10000,
+                 execution_workers: int = 4, reconnect_interval: float = 30.0,
+                 stale_timeout: float = 60.0, max_connection_age: float = 23.5 * 3600,
+                 stream_connections: int = 1, max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+                 price_source: str = PRICE_SOURCE_TICKER, symbol_price_sources: Optional[Dict[str, str]] = None,
+                 trailing_stop_percentage: Optional[float] = None, trailing_stop_step_percentage: float = 0.5,
+                 recorder: Optional[TickRecorder] = None, fast_frame_parsing: Optional[bool] = None):
         """
         初始化价格监控器
         
@@ -40,7 +117,27 @@ class PriceMonitor:
             binance_client (Client): Binance API客户端
             db_config (Dict[str, Any]): 数据库配置
             trading_executor (TradingExecutor): 交易执行器
+            dispatch_queue_size (int): 待处理价格队列的最大长度
+            execution_workers (int): 执行止盈止损订单的最大线程数
+            reconnect_interval (float): 连接断开后的最长重连等待时间（秒）
+            stale_timeout (float): 有订阅时超过该时间（秒）没有收到消息则认为连接已失效并重连
+            max_connection_age (float): 连接存活超过该时间（秒）后主动重连，避开Binance的24小时强制断线
+            stream_connections (int): 分摊交易对的WebSocket连接数量
+            max_streams_per_connection (int): 单个连接最多订阅的交易对数量，所有连接都满时自动增加连接
+            price_source (str): 默认价格来源，ticker、bookTicker或aggTrade
+            symbol_price_sources (Optional[Dict[str, str]]): 按交易对指定的价格来源 {交易对: 价格来源}
+            trailing_stop_percentage (Optional[float]): 移动止损距离百分比，为None时不启用移动止损
+            trailing_stop_step_percentage (float): 移动止损价变化超过该百分比时才写回数据库
+            recorder (Optional[TickRecorder]): 行情记录器，设置后各连接收到的原始消息都会写入记录文件，用于离线回放
+            fast_frame_parsing (Optional[bool]): 是否直接从原始消息中截取价格字段而不完整解码为字典，
+                为None时只在未安装orjson时启用（截取字段比标准库json快，但比orjson慢）
         """
+        self.price_source = price_source
+        self.symbol_price_sources = dict(symbol_price_sources or {})
+        for source in {price_source, *self.symbol_price_sources.values()}:
+            if source not in PRICE_SOURCES:
+                raise ValueError(f"不支持的价格来源: {source}，可选值为{PRICE_SOURCES}")
+        
         self.client = binance_client
         self.db_manager = DatabaseManager(db_config)
         self.trading_executor = trading_executor
@@ -48,19 +145,71 @@ class PriceMonitor:
         # 监控状态
         self.is_monitoring = False
         self.monitor_thread = None
-        self.websocket_thread = None
-        self.ws = None
+        self.watchdog_thread = None
+        self._stop_event = threading.Event()
+        
+        # 交易对分摊到多个连接，每个连接有自己的读取线程，共用同一个分发队列；
+        # 连接断线按带抖动的指数退避重连，长时间无消息或接近24小时时主动重连
+        self.reconnect_interval = reconnect_interval
+        self.stale_timeout = stale_timeout
+        self.max_connection_age = max_connection_age
+        self.max_streams_per_connection = max_streams_per_connection
+        self.recorder = recorder
+        self.fast_frame_parsing = orjson is None if fast_frame_parsing is None else fast_frame_parsing
+        self.connections = []
+        self._symbol_connections = {}  # {交易对: 所在连接}
+        self._subscription_lock = threading.Lock()
+        for _ in range(max(1, stream_connections)):
+            self._add_connection()
         
         # 价格数据缓存
         self.current_prices = {}
         self.price_callbacks = []
+        self.position_closed_callbacks = []
         
         # 监控的交易对
         self.monitored_symbols = set()
         
-        # 止盈止损触发器
-        self.stop_loss_triggers = {}  # {symbol: {position_id: {price: float, quantity: float}}}
-        self.take_profit_triggers = {}  # {symbol: {position_id: {price: float, quantity: float}}}
+        # 止盈止损触发器，按交易对和多空方向以价格排序
+        self.trigger_book = TriggerBook()
+        
+        # 移动止损：有止损的仓位在内存中跟踪最高价并上移止损触发器，按步长写回数据库
+        self.trailing_stops = None
+        if trailing_stop_percentage:
+            self.trailing_stops = TrailingStopEngine(trailing_stop_percentage, trailing_stop_step_percentage)
+        
+        # WebSocket读取线程只解码并入队，由分发线程检查触发器，订单在执行线程池中提交
+        self.dispatch_queue = queue.Queue(maxsize=dispatch_queue_size)
+        self.dispatch_thread = None
+        self.execution_workers = execution_workers
+        self.execution_pool = None
+        # 移动止损写回在单独的单线程执行器中按顺序执行，不占用平仓订单的执行线程
+        self.stop_persist_pool = None
+        self._in_flight = set()  # 正在执行平仓的仓位ID
+        self._in_flight_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'ticks_received': 0,
+            'ticks_processed': 0,
+            'ticks_dropped': 0,
+            'max_queue_depth': 0,
+            'last_lag_ms': 0.0,
+            'max_lag_ms': 0.0,
+            'total_lag_ms': 0.0,
+            'executions_submitted': 0,
+            'executions_deduplicated': 0,
+            'executions_completed': 0,
+            'last_execution_ms': 0.0,
+            'max_execution_ms': 0.0,
+            'last_trigger_latency_ms': 0.0,
+            'max_trigger_latency_ms': 0.0,
+            'rest_price_refreshes': 0,
+            'rebalanced_symbols': 0,
+            'trailing_stop_moves': 0,
+            'trailing_stop_persists': 0
+        }
+        # 各价格来源从交易所事件时间到完成触发判断的延迟统计
+        self._source_metrics = {}
     
     def add_price_callback(self, callback: Callable[[str, float], None]):
         """
@@ -71,6 +220,15 @@ class PriceMonitor:
         """
         self.price_callbacks.append(callback)
     
+    def add_position_closed_callback(self, callback: Callable[[int, str], None]):
+        """
+        添加止盈止损平仓后的回调函数
+        
+        Args:
+            callback: 回调函数，接收position_id和close_reason参数
+        """
+        self.position_closed_callbacks.append(callback)
+    
     def start_monitoring(self, symbols: List[str]):
         """
         开始价格监控
@@ -82,13 +240,24 @@ class PriceMonitor:
             logger.warning("价格监控已在运行中")
             return
         
-        self.monitored_symbols = set(symbols)
         self.is_monitoring = True
+        self._stop_event.clear()
+        self.subscribe_symbols(symbols)
+        
+        # 启动触发器执行线程池和价格分发线程
+        self.execution_pool = ThreadPoolExecutor(max_workers=self.execution_workers,
+                                                 thread_name_prefix='trigger-exec')
+        self.stop_persist_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stop-persist')
+        self.dispatch_thread = threading.Thread(target=self._dispatch_loop, name='price-dispatch')
+        self.dispatch_thread.daemon = True
+        self.dispatch_thread.start()
         
-        # 启动WebSocket监控线程
-        self.websocket_thread = threading.Thread(target=self._start_websocket_monitoring)
-        self.websocket_thread.daemon = True
-        self.websocket_thread.start()
+        # 启动各WebSocket连接和连接健康检查线程
+        self._start_stream_connections()
+        
+        self.watchdog_thread = threading.Thread(target=self._watchdog_loop, name='price-ws-watchdog')
+        self.watchdog_thread.daemon = True
+        self.watchdog_thread.start()
         
         # 启动主监控线程
         self.monitor_thread = threading.Thread(target=self._monitoring_loop)
@@ -100,19 +269,45 @@ class PriceMonitor:
     def stop_monitoring(self):
         """停止价格监控"""
         self.is_monitoring = False
+        self._stop_event.set()
         
-        if self.ws:
-            self.ws.close()
+        for connection in self.connections:
+            connection.stop()
         
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
         
-        if self.websocket_thread and self.websocket_thread.is_alive():
-            self.websocket_thread.join(timeout=5)
+        if self.watchdog_thread and self.watchdog_thread.is_alive():
+            self.watchdog_thread.join(timeout=5)
+        
+        # 唤醒分发线程退出。队列已满时放不进结束标记，分发线程处理完积压的价格后按停止信号退出；
+        # 执行线程池必须在分发线程退出后才能关闭，否则分发线程提交平仓订单会失败
+        if self.dispatch_thread and self.dispatch_thread.is_alive():
+            try:
+                self.dispatch_queue.put(None, timeout=self.DISPATCH_POLL_INTERVAL)
+            except queue.Full:
+                pass
+            self.dispatch_thread.join(timeout=5)
+            if self.dispatch_thread.is_alive():
+                logger.warning(f"分发线程仍在处理{self.dispatch_queue.qsize()}个积压的价格，等待其退出")
+                self.dispatch_thread.join()
+        self.dispatch_thread = None
+        
+        # 等待已提交的平仓订单执行完毕
+        if self.execution_pool:
+            self.execution_pool.shutdown(wait=True)
+            self.execution_pool = None
+        if self.stop_persist_pool:
+            self.stop_persist_pool.shutdown(wait=True)
+            self.stop_persist_pool = None
+        
+        if self.recorder is not None:
+            self.recorder.flush()
         
-        logger.info("价格监控已停止")
+        logger.info(f"价格监控已停止: {self.get_metrics()}")
     
-    def add_stop_loss_trigger(self, symbol: str, position_id: int, stop_price: float, quantity: float):
+    def add_stop_loss_trigger(self, symbol: str, position_id: int, stop_price: float, quantity: float,
+                              position_type: str = LONG):
         """
         添加止损触发器
         
@@ -121,18 +316,17 @@ class PriceMonitor:
             position_id (int): 仓位ID
             stop_price (float): 止损价格
             quantity (float): 止损数量
+            position_type (str): 仓位类型，LONG或SHORT，空头止损在价格上涨到止损价时触发
         """
-        if symbol not in self.stop_loss_triggers:
-            self.stop_loss_triggers[symbol] = {}
-        
-        self.stop_loss_triggers[symbol][position_id] = {
-            'price': stop_price,
-            'quantity': quantity
-        }
+        # 启用移动止损时，已上移的止损价不会被数据库中较旧的止损价覆盖
+        if self.trailing_stops is not None:
+            stop_price = self.trailing_stops.track(symbol, position_id, stop_price, quantity, position_type)
         
-        logger.info(f"添加止损触发器: {symbol}, 仓位ID={position_id}, 止损价={stop_price}")
+        if self.trigger_book.add(symbol, position_id, STOP_LOSS, stop_price, quantity, position_type):
+            logger.info(f"添加止损触发器: {symbol}, 仓位ID={position_id}, {position_type}, 止损价={stop_price}")
     
-    def add_take_profit_trigger(self, symbol: str, position_id: int, take_profit_price: float, quantity: float):
+    def add_take_profit_trigger(self, symbol: str, position_id: int, take_profit_price: float, quantity: float,
+                                position_type: str = LONG):
         """
         添加止盈触发器
         
@@ -141,16 +335,10 @@ class PriceMonitor:
             position_id (int): 仓位ID
             take_profit_price (float): 止盈价格
             quantity (float): 止盈数量
+            position_type (str): 仓位类型，LONG或SHORT，空头止盈在价格下跌到止盈价时触发
         """
-        if symbol not in self.take_profit_triggers:
-            self.take_profit_triggers[symbol] = {}
-        
-        self.take_profit_triggers[symbol][position_id] = {
-            'price': take_profit_price,
-            'quantity': quantity
-        }
-        
-        logger.info(f"添加止盈触发器: {symbol}, 仓位ID={position_id}, 止盈价={take_profit_price}")
+        if self.trigger_book.add(symbol, position_id, TAKE_PROFIT, take_profit_price, quantity, position_type):
+            logger.info(f"添加止盈触发器: {symbol}, 仓位ID={position_id}, {position_type}, 止盈价={take_profit_price}")
     
     def remove_triggers_for_position(self, symbol: str, position_id: int):
         """
@@ -160,13 +348,63 @@ class PriceMonitor:
             symbol (str): 交易对
             position_id (int): 仓位ID
         """
-        if symbol in self.stop_loss_triggers and position_id in self.stop_loss_triggers[symbol]:
-            del self.stop_loss_triggers[symbol][position_id]
-            logger.info(f"移除止损触发器: {symbol}, 仓位ID={position_id}")
+        if self.trailing_stops is not None:
+            self.trailing_stops.untrack(symbol, position_id)
+        
+        for trigger in self.trigger_book.remove(symbol, position_id):
+            trigger_name = "止损" if trigger['trigger_type'] == STOP_LOSS else "止盈"
+            logger.info(f"移除{trigger_name}触发器: {symbol}, 仓位ID={position_id}")
+    
+    def subscribe_symbols(self, symbols: List[str]) -> List[str]:
+        """
+        增加监控的交易对，分配到交易对最少的连接，连接已建立时通过SUBSCRIBE消息订阅，不需要重连
+        
+        Args:
+            symbols (List[str]): 交易对列表
+            
+        Returns:
+            List[str]: 新增订阅的交易对
+        """
+        assignments = {}
+        with self._subscription_lock:
+            added = sorted(set(symbols) - self.monitored_symbols)
+            for symbol in added:
+                connection = self._least_loaded_connection()
+                self._symbol_connections[symbol] = connection
+                assignments.setdefault(connection, []).append(symbol)
+            self.monitored_symbols.update(added)
+        
+        for connection, connection_symbols in assignments.items():
+            connection.subscribe(connection_symbols)
+        if added:
+            logger.info(f"增加监控交易对: {added}")
+        return added
+    
+    def unsubscribe_symbols(self, symbols: List[str]) -> List[str]:
+        """
+        停止监控交易对，通过UNSUBSCRIBE消息取消订阅，其他交易对的价格不受影响，之后重新平衡各连接的交易对
         
-        if symbol in self.take_profit_triggers and position_id in self.take_profit_triggers[symbol]:
-            del self.take_profit_triggers[symbol][position_id]
-            logger.info(f"移除止盈触发器: {symbol}, 仓位ID={position_id}")
+        Args:
+            symbols (List[str]): 交易对列表
+            
+        Returns:
+            List[str]: 取消订阅的交易对
+        """
+        assignments = {}
+        with self._subscription_lock:
+            removed = sorted(self.monitored_symbols & set(symbols))
+            for symbol in removed:
+                assignments.setdefault(self._symbol_connections.pop(symbol), []).append(symbol)
+            self.monitored_symbols.difference_update(removed)
+        
+        for connection, connection_symbols in assignments.items():
+            connection.unsubscribe(connection_symbols)
+        if removed:
+            for symbol in removed:
+                self.current_prices.pop(symbol, None)
+            logger.info(f"移除监控交易对: {removed}")
+            self._rebalance_connections()
+        return removed
     
     def get_current_price(self, symbol: str) -> Optional[float]:
         """
@@ -180,66 +418,340 @@ class PriceMonitor:
         """
         return self.current_prices.get(symbol)
     
-    def _start_websocket_monitoring(self):
-        """启动WebSocket价格监控"""
-        try:
-            # 构建WebSocket URL
-            streams = [f"{symbol.lower()}@ticker" for symbol in self.monitored_symbols]
-            stream_url = f"wss://stream.binance.com:9443/ws/{'/'.join(streams)}"
-            
-            # 创建WebSocket连接
-            self.ws = websocket.WebSocketApp(
-                stream_url,
-                on_message=self._on_websocket_message,
-                on_error=self._on_websocket_error,
-                on_close=self._on_websocket_close,
-                on_open=self._on_websocket_open
-            )
-            
-            # 运行WebSocket
-            self.ws.run_forever()
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取价格分发和触发执行的指标
+        
+        Returns:
+            Dict[str, Any]: 队列深度、分发延迟（毫秒）、执行次数等指标
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        with self._in_flight_lock:
+            metrics['in_flight'] = len(self._in_flight)
+        
+        processed = metrics['ticks_processed']
+        metrics['avg_lag_ms'] = round(metrics.pop('total_lag_ms') / processed, 3) if processed else 0.0
+        metrics['queue_depth'] = self.dispatch_queue.qsize()
+        with self._subscription_lock:
+            metrics['subscribed_symbols'] = len(self.monitored_symbols)
+        
+        connection_stats = [connection.get_stats() for connection in self.connections]
+        for key in ('connects', 'disconnects', 'stale_reconnects', 'rollover_reconnects', 'pending_control_requests'):
+            metrics[key] = sum(stats[key] for stats in connection_stats)
+        metrics['connections'] = connection_stats
+        
+        with self._metrics_lock:
+            source_metrics = {source: dict(stats) for source, stats in self._source_metrics.items()}
+        for stats in source_metrics.values():
+            samples = stats.pop('latency_samples')
+            total_latency_ms = stats.pop('total_latency_ms')
+            stats['avg_latency_ms'] = round(total_latency_ms / samples, 3) if samples else 0.0
+        metrics['sources'] = source_metrics
+        return metrics
+    
+    def get_price_source(self, symbol: str) -> str:
+        """
+        获取交易对的价格来源
+        
+        Args:
+            symbol (str): 交易对
             
+        Returns:
+            str: 价格来源
+        """
+        return self.symbol_price_sources.get(symbol, self.price_source)
+    
+    def _add_connection(self) -> StreamConnection:
+        """创建一个新的WebSocket连接，监控运行中时立即启动"""
+        connection = StreamConnection(
+            name=f'shard-{len(self.connections)}',
+            on_event=self._on_stream_event,
+            on_frame=self._on_stream_frame if self.fast_frame_parsing else None,
+            on_connect=self._refresh_prices_from_rest,
+            stream_name=self._stream_name,
+            reconnect_interval=self.reconnect_interval,
+            stale_timeout=self.stale_timeout,
+            max_connection_age=self.max_connection_age,
+            recorder=self.recorder
+        )
+        self.connections.append(connection)
+        if self.is_monitoring:
+            connection.start()
+        return connection
+    
+    def _stream_name(self, symbol: str) -> str:
+        """交易对按其价格来源对应的流名称"""
+        return f"{symbol.lower()}@{self.get_price_source(symbol)}"
+    
+    def _connection_loads(self) -> Dict[StreamConnection, int]:
+        """按当前分配统计各连接的交易对数量（调用方持有_subscription_lock）"""
+        loads = {connection: 0 for connection in self.connections}
+        for connection in self._symbol_connections.values():
+            loads[connection] += 1
+        return loads
+    
+    def _least_loaded_connection(self) -> StreamConnection:
+        """选择交易对最少的连接，所有连接都已满时新建连接（调用方持有_subscription_lock）"""
+        loads = self._connection_loads()
+        connection = min(self.connections, key=lambda candidate: loads[candidate])
+        if loads[connection] >= self.max_streams_per_connection:
+            connection = self._add_connection()
+            logger.info(f"所有连接的交易对已满，新建连接: {connection.name}")
+        return connection
+    
+    def _rebalance_connections(self):
+        """
+        交易对减少后重新平衡各连接，使交易对数量相差不超过1；
+        迁移时先在新连接订阅再从旧连接取消，迁移期间不会丢失价格
+        """
+        moves = []
+        with self._subscription_lock:
+            loads = self._connection_loads()
+            while True:
+                busiest = max(self.connections, key=lambda connection: loads[connection])
+                idlest = min(self.connections, key=lambda connection: loads[connection])
+                if loads[busiest] - loads[idlest] <= 1:
+                    break
+                symbol = max(symbol for symbol, connection in self._symbol_connections.items() if connection is busiest)
+                self._symbol_connections[symbol] = idlest
+                loads[busiest] -= 1
+                loads[idlest] += 1
+                moves.append((symbol, busiest, idlest))
+        
+        for symbol, source, target in moves:
+            target.subscribe([symbol])
+            source.unsubscribe([symbol])
+        if moves:
+            with self._metrics_lock:
+                self._metrics['rebalanced_symbols'] += len(moves)
+            logger.info(f"重新平衡连接，迁移了{len(moves)}个交易对")
+    
+    def _start_stream_connections(self):
+        """启动所有WebSocket连接"""
+        for connection in self.connections:
+            connection.start()
+    
+    def _watchdog_loop(self):
+        """连接健康检查线程"""
+        while not self._stop_event.wait(self.HEALTH_CHECK_INTERVAL):
+            for connection in list(self.connections):
+                try:
+                    connection.check_health()
+                except Exception as e:
+                    logger.error(f"检查WebSocket连接{connection.name}状态出错: {e}")
+    
+    def _refresh_prices_from_rest(self, symbols: List[str]):
+        """
+        通过REST接口获取交易对的最新价格并放入分发队列，
+        使断线期间已被穿越的触发器在重连后立即得到检查
+        
+        Args:
+            symbols (List[str]): 重连的连接上的交易对
+        """
+        if self.client is None or not symbols:
+            return
+        
+        try:
+            tickers = self.client.get_symbol_ticker()
         except Exception as e:
-            logger.error(f"WebSocket监控出错: {e}")
+            logger.error(f"重连后通过REST获取价格失败: {e}")
+            return
+        
+        symbols = set(symbols)
+        received_at = time.monotonic()
+        refreshed = 0
+        for ticker in tickers:
+            if ticker['symbol'] in symbols:
+                price = float(ticker['price'])
+                self._put_tick((ticker['symbol'], price, price, price, received_at, 'rest', None))
+                refreshed += 1
+        
+        with self._metrics_lock:
+            self._metrics['rest_price_refreshes'] += 1
+        logger.info(f"重连后通过REST刷新了{refreshed}个交易对的价格")
     
-    def _on_websocket_open(self, ws):
-        """WebSocket连接打开回调"""
-        logger.info("WebSocket价格监控连接已建立")
+    def _on_stream_frame(self, message: str, received_at: float) -> bool:
+        """
+        原始消息的快速处理回调，在各连接的读取线程中执行
+        
+        Args:
+            message (str): 原始消息
+            received_at (float): 消息接收时间（单调时钟）
+            
+        Returns:
+            bool: 已截取出价格并放入分发队列时返回True，否则由连接完整解码后交给_on_stream_event
+        """
+        tick = parse_price_frame(message)
+        if tick is None:
+            return False
+        symbol, price, bid, ask, source, event_time = tick
+        self._put_tick((symbol, price, bid, ask, received_at, source, event_time))
+        return True
+    
+    def _on_stream_event(self, stream: Optional[str], event: Dict[str, Any], received_at: float):
+        """
+        行情事件回调，在各连接的读取线程中执行，只解码并放入分发队列
+        
+        放入队列的价格为 (交易对, 价格, 买一价, 卖一价, 接收时间, 价格来源, 交易所事件时间毫秒)，
+        没有买卖价的来源用成交价代替
+        
+        Args:
+            stream (Optional[str]): 流名称，单独订阅时为None
+            event (Dict[str, Any]): 行情事件数据
+            received_at (float): 消息接收时间（单调时钟）
+        """
+        event_type = event.get('e')
+        if event_type == '24hrTicker':
+            price = float(event['c'])
+            bid = float(event['b']) if event.get('b') else price
+            ask = float(event['a']) if event.get('a') else price
+            source = PRICE_SOURCE_TICKER
+        elif event_type == 'aggTrade':
+            price = bid = ask = float(event['p'])
+            source = PRICE_SOURCE_AGG_TRADE
+        elif event_type is None and 'b' in event and 'a' in event and (stream is None or stream.endswith('@bookTicker')):
+            # 现货bookTicker事件没有e字段和事件时间，价格取买卖中间价
+            bid = float(event['b'])
+            ask = float(event['a'])
+            price = (bid + ask) / 2
+            source = PRICE_SOURCE_BOOK_TICKER
+        else:
+            return
+        self._put_tick((event['s'], price, bid, ask, received_at, source, event.get('E')))
     
-    def _on_websocket_message(self, ws, message):
-        """WebSocket消息回调"""
+    def _put_tick(self, tick):
+        """将价格放入分发队列，队列已满时丢弃并计数"""
         try:
-            data = json.loads(message)
+            self.dispatch_queue.put_nowait(tick)
+        except queue.Full:
+            with self._metrics_lock:
+                self._metrics['ticks_dropped'] += 1
+                dropped = self._metrics['ticks_dropped']
+            if dropped % 1000 == 1:
+                logger.warning(f"价格分发队列已满，累计丢弃{dropped}个价格更新")
+            return
+        
+        depth = self.dispatch_queue.qsize()
+        with self._metrics_lock:
+            self._metrics['ticks_received'] += 1
+            if depth > self._metrics['max_queue_depth']:
+                self._metrics['max_queue_depth'] = depth
+    
+    def _dispatch_loop(self):
+        """分发线程：更新价格缓存、检查触发器并调用价格回调"""
+        while True:
+            try:
+                tick = self.dispatch_queue.get(timeout=self.DISPATCH_POLL_INTERVAL)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    break
+                continue
+            if tick is None:
+                break
             
-            # 处理单个ticker数据
-            if 'stream' in data:
-                stream_data = data['data']
-                symbol = stream_data['s']
-                price = float(stream_data['c'])
-                
+            symbol, price, bid, ask, received_at, source, event_time = tick
+            try:
                 # 更新价格缓存
                 self.current_prices[symbol] = price
                 
+                # 先移动止损，再检查止盈止损触发，多头按买一价、空头按卖一价判断，订单提交到执行线程池
+                if self.trailing_stops is not None:
+                    self._update_trailing_stops(symbol, bid, ask)
+                self._check_triggers(symbol, bid, ask, received_at)
+                self._record_source_latency(source, event_time)
+                
                 # 调用价格回调函数
                 for callback in self.price_callbacks:
                     try:
                         callback(symbol, price)
                     except Exception as e:
                         logger.error(f"价格回调函数执行出错: {e}")
-                
-                # 检查止盈止损触发
-                self._check_triggers(symbol, price)
-            
-        except Exception as e:
-            logger.error(f"处理WebSocket消息出错: {e}")
+            except Exception as e:
+                logger.error(f"分发价格更新出错: {e}")
+            finally:
+                lag_ms = (time.monotonic() - received_at) * 1000
+                with self._metrics_lock:
+                    self._metrics['ticks_processed'] += 1
+                    self._metrics['last_lag_ms'] = round(lag_ms, 3)
+                    self._metrics['total_lag_ms'] += lag_ms
+                    if lag_ms > self._metrics['max_lag_ms']:
+                        self._metrics['max_lag_ms'] = round(lag_ms, 3)
     
-    def _on_websocket_error(self, ws, error):
-        """WebSocket错误回调"""
-        logger.error(f"WebSocket错误: {error}")
+    def _update_trailing_stops(self, symbol: str, bid: float, ask: float):
+        """
+        按最新价格移动止损触发器，止损价变化达到步长时在止损写回线程中写回数据库
+        
+        Args:
+            symbol (str): 交易对
+            bid (float): 买一价
+            ask (float): 卖一价
+        """
+        moves = self.trailing_stops.on_price(symbol, bid, ask)
+        if not moves:
+            return
+        
+        persisted = 0
+        for move in moves:
+            self.trigger_book.add(symbol, move['position_id'], STOP_LOSS, move['stop_price'],
+                                  move['quantity'], move['position_type'])
+            if move['persist']:
+                persisted += 1
+                self.stop_persist_pool.submit(self._persist_stop_loss, symbol, move['position_id'],
+                                              move['stop_price'], move['previous_persisted_stop'],
+                                              move['position_type'])
+        
+        with self._metrics_lock:
+            self._metrics['trailing_stop_moves'] += len(moves)
+            self._metrics['trailing_stop_persists'] += persisted
     
-    def _on_websocket_close(self, ws, close_status_code, close_msg):
-        """WebSocket关闭回调"""
-        logger.info("WebSocket连接已关闭")
+    def _persist_stop_loss(self, symbol: str, position_id: int, stop_price: float, previous_stop: float,
+                           position_type: str = LONG):
+        """
+        将移动后的止损价写回positions表，只向收紧的方向更新，数据库中更紧的止损价不会被较旧的写入放宽
+        
+        Args:
+            symbol (str): 交易对
+            position_id (int): 仓位ID
+            stop_price (float): 新止损价
+            previous_stop (float): 上次成功写入的止损价，写入失败时恢复
+            position_type (str): 仓位类型，多头止损只上移，空头止损只下移
+        """
+        tighter = '<' if position_type == LONG else '>'
+        try:
+            self.db_manager.execute_update(f"""
+                UPDATE positions 
+                SET stop_loss_price = %s, last_updated = CURRENT_TIMESTAMP
+                WHERE id = %s AND status = 'OPEN' AND (stop_loss_price IS NULL OR stop_loss_price {tighter} %s)
+            """, (stop_price, position_id, stop_price))
+            logger.info(f"移动止损: {symbol}, 仓位ID={position_id}, 止损价={stop_price}")
+        except Exception as e:
+            self.trailing_stops.persist_failed(symbol, position_id, previous_stop)
+            logger.error(f"写回移动止损价失败: {symbol}, 仓位ID={position_id}, {e}")
+    
+    def _record_source_latency(self, source: str, event_time: Optional[int]):
+        """
+        记录价格来源的延迟：从交易所事件时间到完成触发判断
+        
+        Args:
+            source (str): 价格来源
+            event_time (Optional[int]): 交易所事件时间（毫秒），没有事件时间时只计数
+        """
+        latency_ms = time.time() * 1000 - event_time if event_time else None
+        with self._metrics_lock:
+            stats = self._source_metrics.get(source)
+            if stats is None:
+                stats = self._source_metrics[source] = {
+                    'ticks': 0, 'latency_samples': 0, 'total_latency_ms': 0.0,
+                    'last_latency_ms': 0.0, 'max_latency_ms': 0.0
+                }
+            stats['ticks'] += 1
+            if latency_ms is not None:
+                stats['latency_samples'] += 1
+                stats['total_latency_ms'] += latency_ms
+                stats['last_latency_ms'] = round(latency_ms, 3)
+                if latency_ms > stats['max_latency_ms']:
+                    stats['max_latency_ms'] = round(latency_ms, 3)
     
     def _monitoring_loop(self):
         """主监控循环"""
@@ -267,6 +779,7 @@ class PriceMonitor:
                 """)
                 
                 positions = cursor.fetchall()
+                open_positions = set()
                 
                 for position in positions:
                     position_id = position[0]
@@ -278,46 +791,107 @@ class PriceMonitor:
                     
                     # 添加止损触发器
                     if stop_loss_price:
-                        self.add_stop_loss_trigger(symbol, position_id, stop_loss_price, quantity)
+                        self.add_stop_loss_trigger(symbol, position_id, stop_loss_price, quantity, position_type)
                     
                     # 添加止盈触发器
                     if take_profit_price:
-                        self.add_take_profit_trigger(symbol, position_id, take_profit_price, quantity)
+                        self.add_take_profit_trigger(symbol, position_id, take_profit_price, quantity, position_type)
+                    
+                    open_positions.add((symbol, position_id))
+                
+                # 移除已不再开放的仓位的触发器
+                for symbol, position_id in self.trigger_book.position_keys():
+                    if (symbol, position_id) not in open_positions:
+                        self.remove_triggers_for_position(symbol, position_id)
+                
+                # 其他进程开的仓位也需要订阅价格
+                self.subscribe_symbols([symbol for symbol, _ in open_positions])
                 
         except Exception as e:
             logger.error(f"更新仓位触发器失败: {e}")
     
-    def _check_triggers(self, symbol: str, current_price: float):
+    def _check_triggers(self, symbol: str, current_price: float, short_price: Optional[float] = None,
+                        received_at: Optional[float] = None):
         """
         检查触发器
         
         Args:
             symbol (str): 交易对
-            current_price (float): 当前价格
+            current_price (float): 多头仓位用于判断的价格（买一价）
+            short_price (Optional[float]): 空头仓位用于判断的价格（卖一价），为None时与current_price相同
+            received_at (Optional[float]): 价格的接收时间（单调时钟），用于统计从收到价格到开始平仓的延迟
         """
-        # 检查止损触发器
-        if symbol in self.stop_loss_triggers:
-            for position_id, trigger_info in list(self.stop_loss_triggers[symbol].items()):
-                stop_price = trigger_info['price']
-                quantity = trigger_info['quantity']
-                
-                # 如果当前价格低于或等于止损价格，触发止损
-                if current_price <= stop_price:
-                    logger.warning(f"触发止损: {symbol}, 仓位ID={position_id}, 当前价={current_price}, 止损价={stop_price}")
-                    self._execute_stop_loss(symbol, position_id, quantity)
-        
-        # 检查止盈触发器
-        if symbol in self.take_profit_triggers:
-            for position_id, trigger_info in list(self.take_profit_triggers[symbol].items()):
-                take_profit_price = trigger_info['price']
-                quantity = trigger_info['quantity']
-                
-                # 如果当前价格高于或等于止盈价格，触发止盈
-                if current_price >= take_profit_price:
-                    logger.info(f"触发止盈: {symbol}, 仓位ID={position_id}, 当前价={current_price}, 止盈价={take_profit_price}")
-                    self._execute_take_profit(symbol, position_id, quantity)
+        # 只取出当前价格已穿越的触发器，止损优先于止盈
+        for trigger in self.trigger_book.crossed(symbol, current_price, short_price):
+            position_id = trigger['position_id']
+            position_type = trigger['position_type']
+            side_price = current_price if position_type == LONG or short_price is None else short_price
+            
+            # 同一仓位的平仓订单还在执行中时不重复提交
+            with self._in_flight_lock:
+                if position_id in self._in_flight:
+                    with self._metrics_lock:
+                        self._metrics['executions_deduplicated'] += 1
+                    continue
+                self._in_flight.add(position_id)
+            
+            # 平仓在取出触发器之后刚刚完成时，触发器已被移除，不能再次提交
+            if self.trigger_book.get(symbol, position_id, trigger['trigger_type']) is None:
+                with self._in_flight_lock:
+                    self._in_flight.discard(position_id)
+                with self._metrics_lock:
+                    self._metrics['executions_deduplicated'] += 1
+                continue
+            
+            if trigger['trigger_type'] == STOP_LOSS:
+                logger.warning(f"触发止损: {symbol}, 仓位ID={position_id}, {position_type}, 当前价={side_price}, 止损价={trigger['price']}")
+                execute = self._execute_stop_loss
+            else:
+                logger.info(f"触发止盈: {symbol}, 仓位ID={position_id}, {position_type}, 当前价={side_price}, 止盈价={trigger['price']}")
+                execute = self._execute_take_profit
+            
+            with self._metrics_lock:
+                self._metrics['executions_submitted'] += 1
+            try:
+                self.execution_pool.submit(self._run_execution, execute, symbol, position_id,
+                                           trigger['quantity'], position_type, received_at)
+            except Exception as e:
+                with self._in_flight_lock:
+                    self._in_flight.discard(position_id)
+                logger.error(f"提交平仓任务失败: {symbol}, 仓位ID={position_id}, {e}")
+    
+    def _run_execution(self, execute: Callable[[str, int, float, str], None], symbol: str,
+                       position_id: int, quantity: float, position_type: str = LONG,
+                       received_at: Optional[float] = None):
+        """在执行线程中平仓，结束后释放仓位的执行占用"""
+        started = time.monotonic()
+        if received_at is not None:
+            self._record_trigger_latency((started - received_at) * 1000)
+        try:
+            execute(symbol, position_id, quantity, position_type)
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._in_flight_lock:
+                self._in_flight.discard(position_id)
+            with self._metrics_lock:
+                self._metrics['executions_completed'] += 1
+                self._metrics['last_execution_ms'] = round(elapsed_ms, 3)
+                if elapsed_ms > self._metrics['max_execution_ms']:
+                    self._metrics['max_execution_ms'] = round(elapsed_ms, 3)
+    
+    def _record_trigger_latency(self, latency_ms: float):
+        """
+        记录触发延迟：从收到穿越触发价的价格到执行线程开始平仓
+        
+        Args:
+            latency_ms (float): 延迟（毫秒）
+        """
+        with self._metrics_lock:
+            self._metrics['last_trigger_latency_ms'] = round(latency_ms, 3)
+            if latency_ms > self._metrics['max_trigger_latency_ms']:
+                self._metrics['max_trigger_latency_ms'] = round(latency_ms, 3)
     
-    def _execute_stop_loss(self, symbol: str, position_id: int, quantity: float):
+    def _execute_stop_loss(self, symbol: str, position_id: int, quantity: float, position_type: str = LONG):
         """
         执行止损
         
@@ -325,10 +899,11 @@ class PriceMonitor:
             symbol (str): 交易对
             position_id (int): 仓位ID
             quantity (float): 止损数量
+            position_type (str): 仓位类型，多头卖出平仓，空头买入平仓
         """
         try:
-            # 下市价卖单
-            order = self.trading_executor.place_market_order(symbol, 'SELL', quantity)
+            # 下市价平仓单
+            order = self.trading_executor.place_market_order(symbol, self._close_side(position_type), quantity)
             
             if order:
                 # 更新仓位状态
@@ -344,7 +919,7 @@ class PriceMonitor:
         except Exception as e:
             logger.error(f"执行止损出错: {e}")
     
-    def _execute_take_profit(self, symbol: str, position_id: int, quantity: float):
+    def _execute_take_profit(self, symbol: str, position_id: int, quantity: float, position_type: str = LONG):
         """
         执行止盈
         
@@ -352,10 +927,11 @@ class PriceMonitor:
             symbol (str): 交易对
             position_id (int): 仓位ID
             quantity (float): 止盈数量
+            position_type (str): 仓位类型，多头卖出平仓，空头买入平仓
         """
         try:
-            # 下市价卖单
-            order = self.trading_executor.place_market_order(symbol, 'SELL', quantity)
+            # 下市价平仓单
+            order = self.trading_executor.place_market_order(symbol, self._close_side(position_type), quantity)
             
             if order:
                 # 更新仓位状态
@@ -371,6 +947,11 @@ class PriceMonitor:
         except Exception as e:
             logger.error(f"执行止盈出错: {e}")
     
+    @staticmethod
+    def _close_side(position_type: str) -> str:
+        """平仓订单方向：多头卖出，空头买入"""
+        return 'SELL' if position_type == LONG else 'BUY'
+    
     def _close_position(self, position_id: int, close_reason: str):
         """
         关闭仓位
@@ -392,3 +973,10 @@ class PriceMonitor:
                 
         except Exception as e:
             logger.error(f"关闭仓位失败: {e}")
+            return
+        
+        for callback in self.position_closed_callbacks:
+            try:
+                callback(position_id, close_reason)
+            except Exception as e:
+                logger.error(f"平仓回调函数执行出错: {e}")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情WebSocket连接
+一个连接对应Binance组合流端点上的一组交易对，负责订阅管理、断线重连和连接健康检查，
+收到的行情事件交给回调处理，多个连接可以共用同一个分发队列。
+"""
+import os
+import sys
+import time
+import json
+import random
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import websocket
+from app.fast_json import loads
+
+# 配置日志
+logger = logging.getLogger('stream_connection')
+
+# 组合流端点，连接后通过SUBSCRIBE/UNSUBSCRIBE控制消息增减订阅
+COMBINED_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+# Binance单个连接最多订阅的流数量
+MAX_STREAMS_PER_CONNECTION = 1024
+
+def ticker_stream_name(symbol: str) -> str:
+    """交易对对应的ticker流名称"""
+    return f"{symbol.lower()}@ticker"
+
+class StreamConnection:
+    """单个组合流WebSocket连接"""
+
+    # Binance限制每个连接每秒最多5条控制消息
+    CONTROL_MESSAGE_INTERVAL = 0.25
+    # 单条控制消息最多包含的流数量
+    CONTROL_MESSAGE_MAX_STREAMS = 200
+    # 重连退避的初始等待时间（秒），每次失败翻倍，不超过reconnect_interval
+    RECONNECT_BASE_DELAY = 1.0
+    # 连接维持超过该时间（秒）后断开视为正常断线，重置退避
+    RECONNECT_RESET_AFTER = 60.0
+
+    def __init__(self, name: str, on_event: Callable[[Optional[str], Dict[str, Any], float], None],
+                 on_connect: Optional[Callable[[List[str]], None]] = None,
+                 on_frame: Optional[Callable[[str, float], bool]] = None,
+                 stream_name: Callable[[str], str] = ticker_stream_name,
+                 reconnect_interval: float = 30.0, stale_timeout: float = 60.0,
+                 max_connection_age: float = 23.5 * 3600, recorder: Optional[Any] = None):
+        """
+        初始化行情连接
+
+        Args:
+            name (str): 连接名称，用于日志和线程名
+            on_event (Callable): 行情事件回调，接收流名称、事件数据和接收时间（单调时钟）
+            on_connect (Optional[Callable]): 连接建立后、订阅之前的回调，接收本连接的交易对列表
+            on_frame (Optional[Callable]): 原始消息的快速处理回调，接收原始消息和接收时间，
+                返回True表示已处理，否则完整解码后交给on_event
+            stream_name (Callable[[str], str]): 交易对到流名称的映射
+            reconnect_interval (float): 连接断开后的最长重连等待时间（秒）
+            stale_timeout (float): 有订阅时超过该时间（秒）没有收到消息则认为连接已失效并重连
+            max_connection_age (float): 连接存活超过该时间（秒）后主动重连，避开Binance的24小时强制断线
+            recorder (Optional[TickRecorder]): 行情记录器，设置后收到的原始消息都会写入记录文件，用于离线回放
+        """
+        self.name = name
+        self.on_event = on_event
+        self.on_connect = on_connect
+        self.on_frame = on_frame
+        self.stream_name = stream_name
+        self.reconnect_interval = reconnect_interval
+        self.stale_timeout = stale_timeout
+        self.max_connection_age = max_connection_age
+        self.recorder = recorder
+
+        self.symbols = set()
+        self.ws = None
+        self.thread = None
+        self.is_running = False
+        self._stop_event = threading.Event()
+        self._connected = False
+        self._connected_at = None
+        self._last_message_at = None
+        self._forced_reconnect = False
+
+        self._lock = threading.Lock()
+        self._control_lock = threading.Lock()
+        self._next_request_id = 1
+        self._pending_requests = {}  # {请求ID: (方法, 流列表)}
+        self._last_control_sent = 0.0
+
+        self.stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'stale_reconnects': 0,
+            'rollover_reconnects': 0,
+            'messages': 0
+        }
+
+    def start(self):
+        """启动连接线程"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=f'price-ws-{self.name}', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """关闭连接并等待连接线程退出"""
+        self.is_running = False
+        self._stop_event.set()
+        if self.ws:
+            self.ws.close()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    def subscribe(self, symbols: List[str]) -> List[str]:
+        """
+        增加本连接的交易对，连接已建立时通过SUBSCRIBE消息订阅
+
+        Args:
+            symbols (List[str]): 交易对列表
+
+        Returns:
+            List[str]: 新增的交易对
+        """
+        with self._lock:
+            added = sorted(set(symbols) - self.symbols)
+            self.symbols.update(added)
+            connected = self._connected
+
+        if added and connected:
+            self._send_control('SUBSCRIBE', added)
+        return added
+
+    def unsubscribe(self, symbols: List[str]) -> List[str]:
+        """
+        移除本连接的交易对，连接已建立时通过UNSUBSCRIBE消息取消订阅
+
+        Args:
+            symbols (List[str]): 交易对列表
+
+        Returns:
+            List[str]: 移除的交易对
+        """
+        with self._lock:
+            removed = sorted(self.symbols & set(symbols))
+            self.symbols.difference_update(removed)
+            connected = self._connected
+
+        if removed and connected:
+            self._send_control('UNSUBSCRIBE', removed)
+        return removed
+
+    def get_symbols(self) -> List[str]:
+        """获取本连接的交易对"""
+        with self._lock:
+            return sorted(self.symbols)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.symbols)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接统计
+
+        Returns:
+            Dict[str, Any]: 连接状态、交易对数量、重连次数等
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['symbols'] = len(self.symbols)
+            stats['connected'] = self._connected
+        with self._control_lock:
+            stats['pending_control_requests'] = len(self._pending_requests)
+        stats['name'] = self.name
+        return stats
+
+    def check_health(self, now: Optional[float] = None) -> Optional[str]:
+        """
+        检查连接是否失效或接近24小时强制断线，需要时关闭连接由连接线程立即重连
+
+        Args:
+            now (Optional[float]): 当前单调时钟时间，默认为time.monotonic()
+
+        Returns:
+            Optional[str]: 触发重连的原因（stale或rollover），连接正常时返回None
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._connected:
+                return None
+            has_subscriptions = bool(self.symbols)
+
+        reason = None
+        if now - self._connected_at >= self.max_connection_age:
+            reason = 'rollover'
+            logger.info(f"[{self.name}] WebSocket连接已存活{(now - self._connected_at) / 3600:.1f}小时，主动重连")
+        elif has_subscriptions and now - self._last_message_at >= self.stale_timeout:
+            reason = 'stale'
+            logger.warning(f"[{self.name}] WebSocket已{now - self._last_message_at:.0f}秒没有收到消息，重新连接")
+
+        if reason:
+            self._forced_reconnect = True
+            with self._lock:
+                self.stats[f'{reason}_reconnects'] += 1
+                self._connected = False
+            self.ws.close()
+        return reason
+
+    def reconnect_delay(self, attempt: int) -> float:
+        """
+        计算重连等待时间（带抖动的指数退避），避免多个连接同时重连
+
+        Args:
+            attempt (int): 已连续重连的次数
+
+        Returns:
+            float: 等待时间（秒）
+        """
+        ceiling = min(self.reconnect_interval, self.RECONNECT_BASE_DELAY * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def _run(self):
+        """保持WebSocket连接，断开后按带抖动的指数退避重连"""
+        attempt = 0
+        while self.is_running:
+            started_at = time.monotonic()
+            try:
+                self.ws = websocket.WebSocketApp(
+                    COMBINED_STREAM_URL,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close,
+                    on_open=self._on_open
+                )
+
+                # 运行WebSocket，连接断开后返回
+                self.ws.run_forever(ping_interval=180, ping_timeout=10)
+
+            except Exception as e:
+                logger.error(f"[{self.name}] WebSocket运行出错: {e}")
+
+            with self._lock:
+                self._connected = False
+            if not self.is_running:
+                break
+
+            with self._lock:
+                self.stats['disconnects'] += 1
+
+            # 主动重连（连接失效或接近24小时）立即执行，连接维持较久后断开视为偶发断线，重置退避
+            if self._forced_reconnect:
+                self._forced_reconnect = False
+                attempt = 0
+                continue
+            if time.monotonic() - started_at > self.RECONNECT_RESET_AFTER:
+                attempt = 0
+
+            delay = self.reconnect_delay(attempt)
+            attempt += 1
+            logger.warning(f"[{self.name}] WebSocket已断开，{delay:.1f}秒后第{attempt}次重连")
+            self._stop_event.wait(delay)
+
+    def _on_open(self, ws):
+        """连接建立回调，先调用on_connect（补充断线期间的价格），再订阅本连接的所有交易对"""
+        now = time.monotonic()
+        self._connected_at = now
+        self._last_message_at = now
+        with self._control_lock:
+            self._pending_requests = {}
+        with self._lock:
+            self.stats['connects'] += 1
+            symbols = sorted(self.symbols)
+
+        logger.info(f"[{self.name}] WebSocket连接已建立，交易对数量={len(symbols)}")
+        if self.on_connect and symbols:
+            try:
+                self.on_connect(symbols)
+            except Exception as e:
+                logger.error(f"[{self.name}] 连接建立回调执行出错: {e}")
+
+        # 回调期间新增的交易对也在这里一起订阅
+        with self._lock:
+            self._connected = True
+            symbols = sorted(self.symbols)
+        if symbols:
+            self._send_control('SUBSCRIBE', symbols)
+
+    def _on_message(self, ws, message):
+        """消息回调，控制消息响应在这里处理，行情事件交给on_event"""
+        received_at = time.monotonic()
+        self._last_message_at = received_at
+        if self.recorder is not None:
+            self.recorder.record(self.name, message)
+        try:
+            if self.on_frame is not None and self.on_frame(message, received_at):
+                self.stats['messages'] += 1
+                return
+
+            data = loads(message)
+
+            # 控制消息的响应只有id和result/error字段
+            if 'id' in data and 'data' not in data:
+                self._handle_control_response(data)
+                return
+
+            self.stats['messages'] += 1
+            # 组合流的数据包在data字段中，单独订阅时直接是事件数据
+            self.on_event(data.get('stream'), data.get('data', data), received_at)
+
+        except Exception as e:
+            logger.error(f"[{self.name}] 处理WebSocket消息出错: {e}")
+
+    def _on_error(self, ws, error):
+        logger.error(f"[{self.name}] WebSocket错误: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        with self._lock:
+            self._connected = False
+        logger.info(f"[{self.name}] WebSocket连接已关闭")
+
+    def _send_control(self, method: str, symbols: List[str]):
+        """
+        发送SUBSCRIBE/UNSUBSCRIBE控制消息，按Binance的控制消息频率限制节流
+
+        Args:
+            method (str): SUBSCRIBE或UNSUBSCRIBE
+            symbols (List[str]): 交易对列表
+        """
+        streams = [self.stream_name(symbol) for symbol in symbols]
+        for start in range(0, len(streams), self.CONTROL_MESSAGE_MAX_STREAMS):
+            chunk = streams[start:start + self.CONTROL_MESSAGE_MAX_STREAMS]
+            with self._control_lock:
+                wait = self._last_control_sent + self.CONTROL_MESSAGE_INTERVAL - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                request_id = self._next_request_id
+                self._next_request_id += 1
+                try:
+                    self.ws.send(json.dumps({'method': method, 'params': chunk, 'id': request_id}))
+                except Exception as e:
+                    # 连接断开时不重试，重连后会按当前交易对重新订阅
+                    logger.error(f"[{self.name}] 发送{method}控制消息失败: {e}")
+                    return
+                self._pending_requests[request_id] = (method, chunk)
+                self._last_control_sent = time.monotonic()
+
+    def _handle_control_response(self, data: Dict[str, Any]):
+        """处理控制消息的响应"""
+        with self._control_lock:
+            method, streams = self._pending_requests.pop(data.get('id'), (None, []))
+
+        if data.get('error'):
+            logger.error(f"[{self.name}] {method}控制消息失败: {streams}, {data['error']}")
+        else:
+            logger.debug(f"[{self.name}] {method}控制消息成功: {streams}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情记录器
+把WebSocket收到的原始消息连同接收时间追加写入记录文件，每行一条：
+    接收时间（Unix微秒）<TAB>连接名称<TAB>原始消息
+文件名以.gz结尾时使用gzip压缩。记录文件可以用 tick_replay 模块离线回放。
+"""
+import gzip
+import time
+import logging
+import threading
+from typing import Iterator, Optional, Tuple, Union
+
+# 配置日志
+logger = logging.getLogger('tick_recorder')
+
+def _open_tick_log(path: str, mode: str):
+    """按扩展名打开普通或gzip压缩的记录文件（文本模式）"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8', buffering=1024 * 1024)
+
+class TickRecorder:
+    """
+    行情记录器（线程安全，多个连接可以共用一个记录器）
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        """
+        初始化行情记录器，以追加方式打开记录文件
+
+        Args:
+            path (str): 记录文件路径，以.gz结尾时压缩写入
+            flush_interval (float): 缓冲区写入磁盘的最长间隔（秒）
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = _open_tick_log(path, 'a')
+        self._last_flush = time.monotonic()
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, connection: str, message: Union[str, bytes], received_at_us: Optional[int] = None):
+        """
+        记录一条原始消息，在连接的读取线程中调用，只做缓冲写入
+
+        Args:
+            connection (str): 连接名称
+            message (Union[str, bytes]): WebSocket收到的原始消息
+            received_at_us (Optional[int]): 接收时间（Unix微秒），默认为当前时间，生成合成记录时指定
+        """
+        if received_at_us is None:
+            received_at_us = time.time_ns() // 1000
+        if isinstance(message, bytes):
+            message = message.decode('utf-8')
+        if '\n' in message:
+            # JSON中的换行只是空白，替换后不影响解析
+            message = message.replace('\n', ' ')
+        line = f"{received_at_us}\t{connection}\t{message}\n"
+
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(line)
+            except Exception as e:
+                logger.error(f"写入行情记录失败，停止记录: {self.path}, {e}")
+                self._file = None
+                return
+            self.frames += 1
+            self.bytes += len(line)
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def flush(self):
+        """把缓冲区写入磁盘"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        """关闭记录文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.info(f"行情记录已关闭: {self.path}, 共{self.frames}条消息")
+
+def read_tick_log(path: str) -> Iterator[Tuple[int, str, str]]:
+    """
+    按写入顺序读取记录文件
+
+    进程异常退出时最后一行可能不完整，这样的行会被跳过。
+
+    Args:
+        path (str): 记录文件路径
+
+    Returns:
+        Iterator[Tuple[int, str, str]]: (接收时间（Unix微秒）, 连接名称, 原始消息)
+    """
+    with _open_tick_log(path, 'r') as log_file:
+        for line_number, line in enumerate(log_file, 1):
+            parts = line[:-1].split('\t', 2)
+            if not line.endswith('\n') or len(parts) != 3 or not parts[0].isdigit():
+                logger.warning(f"跳过无法解析的行情记录: {path}:{line_number}")
+                continue
+            yield int(parts[0]), parts[1], parts[2]
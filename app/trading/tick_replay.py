@@ -0,0 +1,255 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情回放
+把 TickRecorder 记录的原始消息按原始节奏（1倍速）、N倍速或最快速度送入价格监控器，
+经过与线上相同的解码、分发、移动止损、触发器检查和仓位估值路径，订单由不连接交易所的桩执行器接收，
+不需要网络和数据库。回放结束后报告吞吐量、触发延迟分位数和最终的平仓决策，用于离线复现问题和衡量性能回退。
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Iterable
+
+import numpy as np
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.price_monitor import PriceMonitor
+from app.trading.position_manager import PositionManager
+from app.trading.trading_manager import TradingManager
+from app.trading.trigger_book import LONG
+from app.trading.tick_recorder import read_tick_log
+from app.data_collectors.latest_prices import LatestPriceRecorder
+from app.database.write_behind import WriteBehindBuffer
+
+# 配置日志
+logger = logging.getLogger('tick_replay')
+
+# 回放不连接数据库，仓位管理器和价格监控器只使用内存中的状态
+REPLAY_DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'replay', 'DB_PASSWORD': '',
+    'DB_NAME': 'replay', 'DB_POOL_ENABLED': False
+}
+
+# 平仓执行函数名到平仓原因的映射
+CLOSE_REASONS = {'_execute_stop_loss': 'STOP_LOSS', '_execute_take_profit': 'TAKE_PROFIT'}
+
+class StubTradingExecutor:
+    """不连接交易所的交易执行器，记录收到的市价单并立即返回成交结果"""
+
+    def __init__(self, order_latency: float = 0.0):
+        """
+        初始化桩执行器
+
+        Args:
+            order_latency (float): 模拟的下单耗时（秒）
+        """
+        self.order_latency = order_latency
+        self.orders = []
+        self._lock = threading.Lock()
+
+    def place_market_order(self, symbol: str, side: str, quantity: float) -> Dict[str, Any]:
+        """
+        模拟市价单
+
+        Args:
+            symbol (str): 交易对
+            side (str): 订单方向，BUY或SELL
+            quantity (float): 数量
+
+        Returns:
+            Dict[str, Any]: 已成交的订单信息
+        """
+        if self.order_latency:
+            time.sleep(self.order_latency)
+        with self._lock:
+            order = {
+                'orderId': len(self.orders) + 1,
+                'symbol': symbol,
+                'side': side,
+                'type': 'MARKET',
+                'origQty': quantity,
+                'status': 'FILLED'
+            }
+            self.orders.append(order)
+        return order
+
+class ReplayPriceMonitor(PriceMonitor):
+    """
+    回放用价格监控器：不建立WebSocket连接、不读写数据库，记录每次触发的延迟和平仓决策
+    """
+
+    def __init__(self, trading_executor: StubTradingExecutor, **options):
+        """
+        初始化回放用价格监控器
+
+        Args:
+            trading_executor (StubTradingExecutor): 桩执行器
+            **options: 传给PriceMonitor的其他参数（价格来源、移动止损等）；
+                默认使用不限长度的分发队列，最快速度回放时不会丢弃价格，结果可以复现
+        """
+        options.setdefault('dispatch_queue_size', 0)
+        super().__init__(None, REPLAY_DB_CONFIG, trading_executor, **options)
+        self.decisions = []
+        self.trigger_latencies_ms = []
+        self._replay_lock = threading.Lock()
+
+    def _start_stream_connections(self):
+        """回放时消息由回放驱动直接送入连接，不建立WebSocket连接"""
+
+    def _monitoring_loop(self):
+        """回放时触发器来自回放开始前加载的仓位，不定期查询数据库"""
+
+    def _persist_stop_loss(self, symbol: str, position_id: int, stop_price: float, previous_stop: float,
+                           position_type: str = LONG):
+        """回放时移动止损只在内存中生效"""
+
+    def _close_position(self, position_id: int, close_reason: str):
+        """回放时不更新数据库，只通知平仓回调"""
+        for callback in self.position_closed_callbacks:
+            try:
+                callback(position_id, close_reason)
+            except Exception as e:
+                logger.error(f"平仓回调函数执行出错: {e}")
+
+    def _run_execution(self, execute, symbol: str, position_id: int, quantity: float,
+                       position_type: str = LONG, received_at: Optional[float] = None):
+        """记录平仓决策后按正常流程执行"""
+        with self._replay_lock:
+            self.decisions.append({
+                'position_id': position_id,
+                'symbol': symbol,
+                'position_type': position_type,
+                'quantity': quantity,
+                'close_reason': CLOSE_REASONS.get(getattr(execute, '__name__', ''), 'UNKNOWN')
+            })
+        super()._run_execution(execute, symbol, position_id, quantity, position_type, received_at)
+
+    def _record_trigger_latency(self, latency_ms: float):
+        with self._replay_lock:
+            self.trigger_latencies_ms.append(latency_ms)
+        super()._record_trigger_latency(latency_ms)
+
+class ReplayTradingManager(TradingManager):
+    """
+    回放用交易管理器：使用桩执行器和回放用价格监控器，仓位从参数加载到内存，
+    价格回调和平仓回调与线上的交易管理器相同
+    """
+
+    def __init__(self, positions: Iterable[Dict[str, Any]], config: Any = None,
+                 order_latency: float = 0.0, **monitor_options):
+        """
+        初始化回放用交易管理器（不初始化Binance客户端和数据库）
+
+        Args:
+            positions (Iterable[Dict[str, Any]]): 开放仓位，包括id、trading_pair、position_type、quantity、
+                entry_price，可选leverage、stop_loss_price、take_profit_price
+            config (Any): 配置对象，回放时不使用
+            order_latency (float): 桩执行器模拟的下单耗时（秒）
+            **monitor_options: 传给ReplayPriceMonitor的参数
+        """
+        self.config = config
+        self.db_config = REPLAY_DB_CONFIG
+        self.client = None
+        self.trading_executor = StubTradingExecutor(order_latency)
+        # 回放时不启动写后缓冲；桩执行器不写数据库
+        self.write_buffer = WriteBehindBuffer(REPLAY_DB_CONFIG, enabled=False)
+        self.position_manager = PositionManager(None, REPLAY_DB_CONFIG)
+        self.price_monitor = ReplayPriceMonitor(self.trading_executor, **monitor_options)
+        # 回放时不启动写入线程，记录的价格只保留在内存中
+        self.latest_price_recorder = LatestPriceRecorder(REPLAY_DB_CONFIG)
+
+        positions = [dict(position) for position in positions]
+        for position in positions:
+            position.setdefault('leverage', 1.0)
+            position.setdefault('status', 'OPEN')
+        self.position_manager.position_book.load(positions)
+
+        for position in positions:
+            symbol = position['trading_pair']
+            quantity = float(position['quantity'])
+            if position.get('stop_loss_price'):
+                self.price_monitor.add_stop_loss_trigger(symbol, position['id'], float(position['stop_loss_price']),
+                                                         quantity, position['position_type'])
+            if position.get('take_profit_price'):
+                self.price_monitor.add_take_profit_trigger(symbol, position['id'], float(position['take_profit_price']),
+                                                           quantity, position['position_type'])
+
+        self.price_monitor.add_price_callback(self._on_price_update)
+        self.price_monitor.add_position_closed_callback(self._on_position_closed)
+
+def _latency_percentiles(samples: List[float]) -> Dict[str, float]:
+    """计算延迟分位数（毫秒）"""
+    if not samples:
+        return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    values = np.asarray(samples)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'count': len(samples),
+        'p50': round(float(p50), 3),
+        'p90': round(float(p90), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+def replay_tick_log(manager: ReplayTradingManager, path: str, speed: Optional[float] = None) -> Dict[str, Any]:
+    """
+    回放记录文件
+
+    记录文件先全部读入内存，读盘和解压不计入回放耗时。按记录的接收时间间隔除以speed控制节奏，
+    所有消息送入后等待分发线程处理完毕，再停止监控并等待进行中的平仓执行完成。
+
+    Args:
+        manager (ReplayTradingManager): 回放用交易管理器
+        path (str): 记录文件路径
+        speed (Optional[float]): 回放速度倍数，1为原始节奏，None或0为最快速度
+
+    Returns:
+        Dict[str, Any]: 回放报告，包括消息数、价格数、耗时、每秒处理价格数、分发延迟、
+            触发延迟分位数（毫秒）、按仓位ID排序的平仓决策和剩余的触发器数量
+    """
+    monitor = manager.price_monitor
+    frames = [(recorded_at_us, frame) for recorded_at_us, _, frame in read_tick_log(path)]
+
+    monitor.start_monitoring(manager.position_manager.position_book.symbols())
+    connection = monitor.connections[0]
+    try:
+        started = time.monotonic()
+        first_recorded_at_us = frames[0][0] if frames else 0
+        for recorded_at_us, frame in frames:
+            if speed:
+                wait = started + (recorded_at_us - first_recorded_at_us) / 1e6 / speed - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            connection._on_message(None, frame)
+
+        while True:
+            metrics = monitor.get_metrics()
+            if metrics['ticks_processed'] >= metrics['ticks_received']:
+                break
+            time.sleep(0.001)
+        elapsed = time.monotonic() - started
+    finally:
+        monitor.stop_monitoring()
+
+    metrics = monitor.get_metrics()
+    ticks = metrics['ticks_processed']
+    return {
+        'frames': len(frames),
+        'ticks': ticks,
+        'ticks_dropped': metrics['ticks_dropped'],
+        'elapsed_seconds': round(elapsed, 3),
+        'ticks_per_second': round(ticks / elapsed, 1) if elapsed > 0 else 0.0,
+        'dispatch_lag_ms': {'avg': metrics['avg_lag_ms'], 'max': metrics['max_lag_ms']},
+        'trigger_latency_ms': _latency_percentiles(monitor.trigger_latencies_ms),
+        'trailing_stop_moves': metrics['trailing_stop_moves'],
+        'orders': len(manager.trading_executor.orders),
+        'decisions': sorted(monitor.decisions, key=lambda decision: decision['position_id']),
+        'open_triggers': monitor.trigger_book.count()
+    }
@@ -20,23 +20,50 @@ if APP_DIR not in sys.path:
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from app.database.db_manager import DatabaseManager
+from app.database.write_behind import WriteBehindBuffer
 
 # 配置日志
 logger = logging.getLogger('trading_executor')
 
+INSERT_ORDER_SQL = """
+    INSERT INTO orders
+    (binance_order_id, trading_pair, order_type, side, quantity, price, stop_price,
+     executed_quantity, executed_price, status, time_in_force, order_time, related_strategy_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+UPDATE_ORDER_STATUS_SQL = """
+    UPDATE orders
+    SET status = %s, update_time = CURRENT_TIMESTAMP
+    WHERE binance_order_id = %s
+"""
+
+UPSERT_BALANCE_SQL = """
+    INSERT INTO account_balance (asset, free_balance, locked_balance, total_balance)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    free_balance = VALUES(free_balance),
+    locked_balance = VALUES(locked_balance),
+    total_balance = VALUES(total_balance),
+    last_updated = CURRENT_TIMESTAMP
+"""
+
 class TradingExecutor:
     """交易执行器类"""
 
-    def __init__(self, binance_client: Client, db_config: Dict[str, Any]):
+    def __init__(self, binance_client: Client, db_config: Dict[str, Any],
+                 write_buffer: Optional[WriteBehindBuffer] = None):
         """
         初始化交易执行器
 
         Args:
             binance_client (Client): Binance API客户端
             db_config (Dict[str, Any]): 数据库配置
+            write_buffer (Optional[WriteBehindBuffer]): 订单和余额写入使用的写后缓冲，默认同步写入
         """
         self.client = binance_client
         self.db_manager = DatabaseManager(db_config)
+        self.write_buffer = write_buffer or WriteBehindBuffer(db_config, enabled=False)
 
     def get_account_info(self) -> Optional[Dict[str, Any]]:
         """
@@ -303,28 +330,20 @@ class TradingExecutor:
 
             balances = account_info.get('balances', [])
 
-            with self.db_manager.get_connection() as (connection, cursor):
-                for balance in balances:
-                    asset = balance['asset']
-                    free = float(balance['free'])
-                    locked = float(balance['locked'])
-                    total = free + locked
-
-                    # 只更新有余额的资产
-                    if total > 0:
-                        cursor.execute("""
-                            INSERT INTO account_balance (asset, free_balance, locked_balance, total_balance)
-                            VALUES (%s, %s, %s, %s)
-                            ON DUPLICATE KEY UPDATE
-                            free_balance = VALUES(free_balance),
-                            locked_balance = VALUES(locked_balance),
-                            total_balance = VALUES(total_balance),
-                            last_updated = CURRENT_TIMESTAMP
-                        """, (asset, free, locked, total))
-
-                connection.commit()
-                logger.info("账户余额更新成功")
-                return True
+            # 同一条语句的多个资产在写后缓冲中合并为一个事务
+            for balance in balances:
+                asset = balance['asset']
+                free = float(balance['free'])
+                locked = float(balance['locked'])
+                total = free + locked
+
+                # 只更新有余额的资产
+                if total > 0 and not self.write_buffer.submit(
+                        'account_balance', UPSERT_BALANCE_SQL, (asset, free, locked, total)):
+                    return False
+
+            logger.info("账户余额更新成功")
+            return True
 
         except Exception as e:
             logger.error(f"更新账户余额失败: {e}")
@@ -344,31 +363,26 @@ class TradingExecutor:
             bool: 存储成功返回True，失败返回False
         """
         try:
-            with self.db_manager.get_connection() as (connection, cursor):
-                cursor.execute("""
-                    INSERT INTO orders
-                    (binance_order_id, trading_pair, order_type, side, quantity, price, stop_price,
-                     executed_quantity, executed_price, status, time_in_force, order_time, related_strategy_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    order['orderId'],
-                    order['symbol'],
-                    order_type,
-                    order['side'],
-                    float(order['origQty']),
-                    float(order.get('price', 0)) if order.get('price') else None,
-                    float(order.get('stopPrice', 0)) if order.get('stopPrice') else None,
-                    float(order['executedQty']),
-                    float(order.get('avgPrice', 0)) if order.get('avgPrice') else None,
-                    order['status'],
-                    order.get('timeInForce', 'GTC'),
-                    datetime.datetime.fromtimestamp(order['transactTime'] / 1000),
-                    strategy_id
-                ))
-
-                connection.commit()
-                logger.info(f"订单存储到数据库成功: 订单ID={order['orderId']}")
-                return True
+            params = (
+                order['orderId'],
+                order['symbol'],
+                order_type,
+                order['side'],
+                float(order['origQty']),
+                float(order.get('price', 0)) if order.get('price') else None,
+                float(order.get('stopPrice', 0)) if order.get('stopPrice') else None,
+                float(order['executedQty']),
+                float(order.get('avgPrice', 0)) if order.get('avgPrice') else None,
+                order['status'],
+                order.get('timeInForce', 'GTC'),
+                datetime.datetime.fromtimestamp(order['transactTime'] / 1000),
+                strategy_id
+            )
+            if not self.write_buffer.submit('orders', INSERT_ORDER_SQL, params):
+                return False
+
+            logger.info(f"订单存储到数据库成功: 订单ID={order['orderId']}")
+            return True
 
         except Exception as e:
             logger.error(f"存储订单到数据库失败: {e}")
@@ -386,16 +400,11 @@ class TradingExecutor:
             bool: 更新成功返回True，失败返回False
         """
         try:
-            with self.db_manager.get_connection() as (connection, cursor):
-                cursor.execute("""
-                    UPDATE orders
-                    SET status = %s, update_time = CURRENT_TIMESTAMP
-                    WHERE binance_order_id = %s
-                """, (status, order_id))
-
-                connection.commit()
-                logger.info(f"订单状态更新成功: 订单ID={order_id}, 状态={status}")
-                return True
+            if not self.write_buffer.submit('orders', UPDATE_ORDER_STATUS_SQL, (status, order_id)):
+                return False
+
+            logger.info(f"订单状态更新成功: 订单ID={order_id}, 状态={status}")
+            return True
 
         except Exception as e:
             logger.error(f"更新订单状态失败: {e}")
@@ -19,7 +19,11 @@ from binance.client import Client
 from app.trading.trading_executor import TradingExecutor
 from app.trading.price_monitor import PriceMonitor
 from app.trading.position_manager import PositionManager
+from app.trading.tick_recorder import TickRecorder
 from app.data_collectors.binance_data_collector import initialize_binance_client
+from app.data_collectors.binance_rate_limiter import configure_rate_limiter
+from app.data_collectors.latest_prices import LatestPriceRecorder
+from app.database.write_behind import WriteBehindBuffer
 
 # 配置日志
 logger = logging.getLogger('trading_manager')
@@ -38,7 +42,8 @@ class TradingManager:
         self.config = config
         self.db_config = db_config
         
-        # 初始化Binance客户端
+        # 初始化Binance客户端，交易执行、仓位管理与价格监控共用该客户端及其请求权重限流
+        configure_rate_limiter(config)
         self.client = initialize_binance_client(
             api_key=config.BINANCE_API_KEY,
             api_secret=config.BINANCE_API_SECRET,
@@ -48,13 +53,55 @@ class TradingManager:
         if not self.client:
             raise Exception("无法初始化Binance客户端")
         
+        # 订单、订单状态、账户余额和仓位价格的写入经写后缓冲批量提交，不阻塞下单和价格回调
+        self.write_buffer = WriteBehindBuffer(
+            db_config,
+            batch_size=getattr(config, 'WRITE_BEHIND_BATCH_SIZE', 500),
+            max_latency=getattr(config, 'WRITE_BEHIND_MAX_LATENCY', 0.5),
+            max_queue_size=getattr(config, 'WRITE_BEHIND_QUEUE_SIZE', 10000),
+            enabled=getattr(config, 'WRITE_BEHIND_ENABLED', True),
+            durable_tables=getattr(config, 'WRITE_BEHIND_DURABLE_TABLES', []),
+            submit_timeout=getattr(config, 'WRITE_BEHIND_SUBMIT_TIMEOUT', 5.0)
+        )
+        self.write_buffer.start()
+        
         # 初始化各个模块
-        self.trading_executor = TradingExecutor(self.client, db_config)
-        self.position_manager = PositionManager(self.client, db_config)
-        self.price_monitor = PriceMonitor(self.client, db_config, self.trading_executor)
+        self.trading_executor = TradingExecutor(self.client, db_config, write_buffer=self.write_buffer)
+        self.position_manager = PositionManager(
+            self.client, db_config,
+            flush_interval=getattr(config, 'POSITION_FLUSH_INTERVAL', 5.0)
+        )
+        # 行情价格合并后定期写入latest_prices，供策略生成等读取最新价格
+        self.latest_price_recorder = LatestPriceRecorder(
+            db_config, flush_interval=getattr(config, 'LATEST_PRICE_FLUSH_INTERVAL', 5.0)
+        )
+        # 配置了记录文件时记录价格WebSocket收到的原始消息，用于离线回放
+        record_path = getattr(config, 'PRICE_TICK_RECORD_PATH', None)
+        self.tick_recorder = TickRecorder(record_path) if record_path else None
+        
+        self.price_monitor = PriceMonitor(
+            self.client, db_config, self.trading_executor,
+            dispatch_queue_size=getattr(config, 'PRICE_DISPATCH_QUEUE_SIZE', 10000),
+            execution_workers=getattr(config, 'TRIGGER_EXECUTION_WORKERS', 4),
+            reconnect_interval=getattr(config, 'WEBSOCKET_RECONNECT_INTERVAL', 30),
+            stale_timeout=getattr(config, 'WEBSOCKET_STALE_TIMEOUT', 60),
+            max_connection_age=getattr(config, 'WEBSOCKET_MAX_CONNECTION_HOURS', 23.5) * 3600,
+            stream_connections=getattr(config, 'PRICE_STREAM_CONNECTIONS', 1),
+            max_streams_per_connection=getattr(config, 'PRICE_STREAM_MAX_SYMBOLS_PER_CONNECTION', 1024),
+            price_source=getattr(config, 'PRICE_SOURCE', 'ticker'),
+            symbol_price_sources=getattr(config, 'SYMBOL_PRICE_SOURCES', None),
+            trailing_stop_percentage=(getattr(config, 'TRAILING_STOP_PERCENTAGE', 2.0)
+                                      if getattr(config, 'ENABLE_TRAILING_STOP', False) else None),
+            trailing_stop_step_percentage=getattr(config, 'TRAILING_STOP_STEP_PERCENTAGE', 0.5),
+            recorder=self.tick_recorder
+        )
+        
+        # 开放仓位加载到内存，价格回调只更新内存，由后台线程合并写回数据库
+        self.position_manager.load_open_positions()
         
         # 添加价格监控回调
         self.price_monitor.add_price_callback(self._on_price_update)
+        self.price_monitor.add_position_closed_callback(self._on_position_closed)
         
         logger.info("交易管理器初始化完成")
     
@@ -140,15 +187,18 @@ class TradingManager:
             if not position_id:
                 return {'status': 'error', 'message': '仓位记录创建失败'}
             
+            # 订阅新仓位交易对的价格，已在监控时通过控制消息订阅，不需要重连
+            self.price_monitor.subscribe_symbols([trading_pair])
+            
             # 设置止损止盈监控
             if stop_loss_price:
                 self.price_monitor.add_stop_loss_trigger(
-                    trading_pair, position_id, stop_loss_price, quantity
+                    trading_pair, position_id, stop_loss_price, quantity, position_type
                 )
             
             if take_profit_price:
                 self.price_monitor.add_take_profit_trigger(
-                    trading_pair, position_id, take_profit_price, quantity
+                    trading_pair, position_id, take_profit_price, quantity, position_type
                 )
             
             # 更新账户余额
@@ -175,14 +225,24 @@ class TradingManager:
         Args:
             symbols (List[str]): 要监控的交易对列表
         """
+        self.position_manager.start_price_flusher()
+        self.latest_price_recorder.start()
         self.price_monitor.start_monitoring(symbols)
         logger.info(f"开始监控交易对: {symbols}")
     
     def stop_monitoring(self):
         """停止价格监控"""
         self.price_monitor.stop_monitoring()
+        self.position_manager.stop_price_flusher()
+        self.latest_price_recorder.stop()
         logger.info("停止价格监控")
     
+    def shutdown(self):
+        """停止价格监控，并写入写后缓冲中剩余的语句"""
+        self.stop_monitoring()
+        self.write_buffer.stop()
+        logger.info(f"交易管理器已关闭，写入统计: {self.write_buffer.get_stats()}")
+    
     def get_portfolio_status(self) -> Dict[str, Any]:
         """
         获取投资组合状态
@@ -264,6 +324,7 @@ class TradingManager:
             
             # 移除价格监控触发器
             self.price_monitor.remove_triggers_for_position(trading_pair, position_id)
+            self._unsubscribe_if_idle(trading_pair)
             
             # 更新账户余额
             self.trading_executor.update_account_balance()
@@ -306,16 +367,36 @@ class TradingManager:
             price (float): 当前价格
         """
         try:
-            # 更新相关仓位的当前价格
-            open_positions = self.position_manager.get_open_positions(symbol)
-            
-            for position in open_positions:
-                position_id = position['id']
-                self.position_manager.update_position_price(position_id, price)
+            # 在内存中更新相关仓位的当前价格和未实现盈亏
+            self.position_manager.mark_price(symbol, price)
+            self.latest_price_recorder.record(symbol, price)
                 
         except Exception as e:
             logger.error(f"价格更新回调处理失败: {e}")
     
+    def _on_position_closed(self, position_id: int, close_reason: str):
+        """
+        价格监控触发平仓后的回调函数
+        
+        Args:
+            position_id (int): 仓位ID
+            close_reason (str): 关闭原因
+        """
+        position = self.position_manager.position_book.get(position_id)
+        self.position_manager.forget_position(position_id)
+        if position:
+            self._unsubscribe_if_idle(position['trading_pair'])
+    
+    def _unsubscribe_if_idle(self, trading_pair: str):
+        """
+        交易对没有开放仓位时取消价格订阅
+        
+        Args:
+            trading_pair (str): 交易对
+        """
+        if not self.position_manager.get_open_positions(trading_pair):
+            self.price_monitor.unsubscribe_symbols([trading_pair])
+    
     def get_current_prices(self) -> Dict[str, float]:
         """
         获取当前监控的所有交易对价格
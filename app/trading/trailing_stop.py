@@ -0,0 +1,155 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+移动止损引擎
+在内存中为每个仓位维护最高价（多头）或最低价（空头），每个价格更新只对该交易对的仓位做常数时间的计算，
+止损价只向有利方向移动；止损价相对上次写入数据库的值变化超过设定步长时才需要持久化。
+"""
+import threading
+from typing import Dict, Any, Optional, List
+
+from app.trading.trigger_book import LONG
+
+class TrailingStopEngine:
+    """
+    移动止损引擎（线程安全）
+    """
+
+    def __init__(self, trail_percentage: float, persist_step_percentage: float = 0.5):
+        """
+        初始化移动止损引擎
+
+        Args:
+            trail_percentage (float): 止损价与最高价（多头）或最低价（空头）之间的距离百分比
+            persist_step_percentage (float): 止损价相对上次持久化的值变化超过该百分比时才写入数据库
+        """
+        self.trail_ratio = trail_percentage / 100
+        self.persist_step_ratio = persist_step_percentage / 100
+        self._lock = threading.Lock()
+        self._stops = {}  # {symbol: {position_id: state}}
+
+    def track(self, symbol: str, position_id: int, stop_price: float, quantity: float,
+              position_type: str = LONG) -> float:
+        """
+        开始或继续跟踪仓位的移动止损
+
+        已在跟踪的仓位保留更有利的止损价，因此从数据库重新加载的旧止损价不会把已上移的止损拉回去。
+
+        Args:
+            symbol (str): 交易对
+            position_id (int): 仓位ID
+            stop_price (float): 初始止损价或数据库中的止损价
+            quantity (float): 仓位数量
+            position_type (str): 仓位方向，LONG 或 SHORT
+
+        Returns:
+            float: 当前生效的止损价
+        """
+        with self._lock:
+            positions = self._stops.setdefault(symbol, {})
+            state = positions.get(position_id)
+            if state is None or state['position_type'] != position_type:
+                positions[position_id] = {
+                    'position_type': position_type,
+                    'quantity': quantity,
+                    'water_mark': None,
+                    'stop_price': stop_price,
+                    'persisted_stop': stop_price
+                }
+                return stop_price
+
+            state['quantity'] = quantity
+            if self._is_better(position_type, stop_price, state['stop_price']):
+                state['stop_price'] = stop_price
+                state['persisted_stop'] = stop_price
+            return state['stop_price']
+
+    def untrack(self, symbol: str, position_id: int):
+        """停止跟踪仓位（仓位关闭时调用）"""
+        with self._lock:
+            positions = self._stops.get(symbol)
+            if positions is None:
+                return
+            positions.pop(position_id, None)
+            if not positions:
+                del self._stops[symbol]
+
+    def get(self, symbol: str, position_id: int) -> Optional[Dict[str, Any]]:
+        """获取仓位的跟踪状态副本"""
+        with self._lock:
+            state = self._stops.get(symbol, {}).get(position_id)
+            return dict(state) if state else None
+
+    def on_price(self, symbol: str, bid: float, ask: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        用最新价格更新最高价/最低价并上移（多头）或下移（空头）止损价
+
+        Args:
+            symbol (str): 交易对
+            bid (float): 多头仓位使用的价格（买一价）
+            ask (Optional[float]): 空头仓位使用的价格（卖一价），为None时与bid相同
+
+        Returns:
+            List[Dict[str, Any]]: 止损价发生移动的仓位，包括position_id、position_type、stop_price、quantity、
+                是否达到持久化步长的persist标记和上次持久化的止损价previous_persisted_stop
+        """
+        ask = bid if ask is None else ask
+        moved = []
+        with self._lock:
+            positions = self._stops.get(symbol)
+            if not positions:
+                return moved
+
+            for position_id, state in positions.items():
+                if state['position_type'] == LONG:
+                    if state['water_mark'] is not None and bid <= state['water_mark']:
+                        continue
+                    state['water_mark'] = bid
+                    candidate = bid * (1 - self.trail_ratio)
+                else:
+                    if state['water_mark'] is not None and ask >= state['water_mark']:
+                        continue
+                    state['water_mark'] = ask
+                    candidate = ask * (1 + self.trail_ratio)
+
+                if not self._is_better(state['position_type'], candidate, state['stop_price']):
+                    continue
+
+                state['stop_price'] = candidate
+                previous_persisted = state['persisted_stop']
+                persist = abs(candidate - previous_persisted) >= previous_persisted * self.persist_step_ratio
+                if persist:
+                    state['persisted_stop'] = candidate
+                moved.append({
+                    'position_id': position_id,
+                    'position_type': state['position_type'],
+                    'stop_price': candidate,
+                    'quantity': state['quantity'],
+                    'persist': persist,
+                    'previous_persisted_stop': previous_persisted
+                })
+        return moved
+
+    def persist_failed(self, symbol: str, position_id: int, persisted_stop: float):
+        """
+        持久化失败时恢复上次成功写入的止损价，使下一次移动重新尝试写入
+
+        Args:
+            symbol (str): 交易对
+            position_id (int): 仓位ID
+            persisted_stop (float): 上次成功写入数据库的止损价
+        """
+        with self._lock:
+            state = self._stops.get(symbol, {}).get(position_id)
+            if state:
+                state['persisted_stop'] = persisted_stop
+
+    def count(self) -> int:
+        """获取跟踪中的仓位数量"""
+        with self._lock:
+            return sum(len(positions) for positions in self._stops.values())
+
+    @staticmethod
+    def _is_better(position_type: str, candidate: float, current: float) -> bool:
+        """多头止损价越高越有利，空头止损价越低越有利"""
+        return candidate > current if position_type == LONG else candidate < current
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+止盈止损触发器索引
+每个交易对按多空方向分别维护按价格排序的触发器列表，
+价格变动时通过二分查找只取出被穿越的触发器，不再逐个扫描全部触发器；
+价格上涨时只检查上涨触发的一侧，下跌时只检查下跌触发的一侧。
+"""
+import bisect
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+STOP_LOSS = 'STOP_LOSS'
+TAKE_PROFIT = 'TAKE_PROFIT'
+
+LONG = 'LONG'
+SHORT = 'SHORT'
+
+# 触发方向：多头止损和空头止盈在价格下跌到触发价时触发，多头止盈和空头止损在价格上涨到触发价时触发
+FALLING = 'FALLING'
+RISING = 'RISING'
+
+TRIGGER_DIRECTIONS = {
+    (LONG, STOP_LOSS): FALLING,
+    (LONG, TAKE_PROFIT): RISING,
+    (SHORT, STOP_LOSS): RISING,
+    (SHORT, TAKE_PROFIT): FALLING
+}
+DIRECTION_TRIGGER_TYPES = {(side, direction): trigger_type for (side, trigger_type), direction in TRIGGER_DIRECTIONS.items()}
+
+class _SortedTriggers:
+    """按 (触发价, 仓位ID) 排序的触发器列表"""
+
+    def __init__(self):
+        self.keys = []  # [(price, position_id)]
+
+    def add(self, price: float, position_id: int):
+        bisect.insort(self.keys, (price, position_id))
+
+    def remove(self, price: float, position_id: int):
+        index = bisect.bisect_left(self.keys, (price, position_id))
+        if index < len(self.keys) and self.keys[index] == (price, position_id):
+            del self.keys[index]
+
+    def at_or_below(self, price: float) -> List[Tuple[float, int]]:
+        """触发价小于等于price的触发器"""
+        return self.keys[:bisect.bisect_right(self.keys, (price, float('inf')))]
+
+    def at_or_above(self, price: float) -> List[Tuple[float, int]]:
+        """触发价大于等于price的触发器"""
+        return self.keys[bisect.bisect_left(self.keys, (price, float('-inf'))):]
+
+    def __len__(self):
+        return len(self.keys)
+
+class _SymbolBook:
+    """单个交易对的触发器簿，多空方向分别维护下跌触发和上涨触发两组列表"""
+
+    def __init__(self):
+        self.sides = {
+            LONG: {FALLING: _SortedTriggers(), RISING: _SortedTriggers()},
+            SHORT: {FALLING: _SortedTriggers(), RISING: _SortedTriggers()}
+        }
+        # 每个方向上次检查的价格，以及上次检查时是否有已穿越的触发器；新增触发器时清空上次价格。
+        # 价格上涨时下跌触发的列表只会比上次少，上次没有穿越就不用检查，反之亦然，因此跳过的列表本来也不会有结果
+        self.last_prices = {LONG: None, SHORT: None}
+        self.pending = {(side, direction): False for side in (LONG, SHORT) for direction in (FALLING, RISING)}
+
+    def __len__(self):
+        return sum(len(triggers) for side in self.sides.values() for triggers in side.values())
+
+class TriggerBook:
+    """
+    止盈止损触发器簿（线程安全）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._books = {}  # {symbol: _SymbolBook}
+        self._triggers = {}  # {(symbol, position_id, trigger_type): trigger}
+
+    def add(self, symbol: str, position_id: int, trigger_type: str, price: float, quantity: float,
+            position_type: str = LONG) -> bool:
+        """
+        添加或更新触发器
+
+        Args:
+            symbol (str): 交易对
+            position_id (int): 仓位ID
+            trigger_type (str): STOP_LOSS 或 TAKE_PROFIT
+            price (float): 触发价格
+            quantity (float): 平仓数量
+            position_type (str): 仓位方向，LONG 或 SHORT
+
+        Returns:
+            bool: 触发器是否有变化（新增或价格、数量、方向改变）
+        """
+        key = (symbol, position_id, trigger_type)
+        with self._lock:
+            existing = self._triggers.get(key)
+            if existing and (existing['price'], existing['quantity'], existing['position_type']) == (price, quantity, position_type):
+                return False
+
+            if existing:
+                self._unindex_locked(existing)
+
+            trigger = {
+                'symbol': symbol,
+                'position_id': position_id,
+                'trigger_type': trigger_type,
+                'price': price,
+                'quantity': quantity,
+                'position_type': position_type
+            }
+            self._triggers[key] = trigger
+            book = self._books.setdefault(symbol, _SymbolBook())
+            book.sides[position_type][TRIGGER_DIRECTIONS[(position_type, trigger_type)]].add(price, position_id)
+            book.last_prices[position_type] = None
+            return True
+
+    def remove(self, symbol: str, position_id: int, trigger_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        移除仓位的触发器
+
+        Args:
+            symbol (str): 交易对
+            position_id (int): 仓位ID
+            trigger_type (Optional[str]): 只移除指定类型，为None时移除该仓位的全部触发器
+
+        Returns:
+            List[Dict[str, Any]]: 被移除的触发器
+        """
+        trigger_types = [trigger_type] if trigger_type else [STOP_LOSS, TAKE_PROFIT]
+        removed = []
+        with self._lock:
+            for current_type in trigger_types:
+                trigger = self._triggers.pop((symbol, position_id, current_type), None)
+                if trigger:
+                    self._unindex_locked(trigger)
+                    removed.append(trigger)
+        return removed
+
+    def get(self, symbol: str, position_id: int, trigger_type: str) -> Optional[Dict[str, Any]]:
+        """获取指定触发器"""
+        with self._lock:
+            trigger = self._triggers.get((symbol, position_id, trigger_type))
+            return dict(trigger) if trigger else None
+
+    def crossed(self, symbol: str, price: float, short_price: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        获取当前价格已穿越的触发器
+
+        Args:
+            symbol (str): 交易对
+            price (float): 多头仓位用于判断的价格（平多时卖出，通常为买一价）
+            short_price (Optional[float]): 空头仓位用于判断的价格（平空时买入，通常为卖一价），为None时与price相同
+
+        Returns:
+            List[Dict[str, Any]]: 已触发的触发器，止损排在止盈之前
+        """
+        side_prices = {LONG: price, SHORT: price if short_price is None else short_price}
+        with self._lock:
+            book = self._books.get(symbol)
+            if not book:
+                return []
+
+            hits = []
+            pending = book.pending
+            for position_type, side in book.sides.items():
+                side_price = side_prices[position_type]
+                last_price = book.last_prices[position_type]
+                book.last_prices[position_type] = side_price
+
+                falling = side[FALLING]
+                if falling.keys and (last_price is None or side_price < last_price or pending[(position_type, FALLING)]):
+                    crossed = falling.at_or_above(side_price)
+                    pending[(position_type, FALLING)] = bool(crossed)
+                    for _, position_id in crossed:
+                        hits.append((position_type, FALLING, position_id))
+
+                rising = side[RISING]
+                if rising.keys and (last_price is None or side_price > last_price or pending[(position_type, RISING)]):
+                    crossed = rising.at_or_below(side_price)
+                    pending[(position_type, RISING)] = bool(crossed)
+                    for _, position_id in crossed:
+                        hits.append((position_type, RISING, position_id))
+
+            triggered = [
+                dict(self._triggers[(symbol, position_id, DIRECTION_TRIGGER_TYPES[(position_type, direction)])])
+                for position_type, direction, position_id in hits
+            ]
+
+        triggered.sort(key=lambda trigger: trigger['trigger_type'] != STOP_LOSS)
+        return triggered
+
+    def position_keys(self) -> List[Tuple[str, int]]:
+        """获取所有有触发器的 (交易对, 仓位ID)"""
+        with self._lock:
+            return list({(symbol, position_id) for symbol, position_id, _ in self._triggers})
+
+    def count(self, symbol: Optional[str] = None) -> int:
+        """获取触发器数量"""
+        with self._lock:
+            if symbol is None:
+                return len(self._triggers)
+            book = self._books.get(symbol)
+            return len(book) if book else 0
+
+    def _unindex_locked(self, trigger: Dict[str, Any]):
+        book = self._books.get(trigger['symbol'])
+        if not book:
+            return
+        direction = TRIGGER_DIRECTIONS[(trigger['position_type'], trigger['trigger_type'])]
+        book.sides[trigger['position_type']][direction].remove(trigger['price'], trigger['position_id'])
+        if not len(book):
+            del self._books[trigger['symbol']]
@@ -50,7 +50,16 @@ def get_db_config(config):
         "DB_PORT": config.DB_PORT,
         "DB_USER": config.DB_USER,
         "DB_PASSWORD": config.DB_PASSWORD,
-        "DB_NAME": config.DB_NAME
+        "DB_NAME": config.DB_NAME,
+        # 连接池配置（可选）
+        "DB_POOL_ENABLED": getattr(config, "DB_POOL_ENABLED", True),
+        "DB_POOL_MIN_SIZE": getattr(config, "DB_POOL_MIN_SIZE", 1),
+        "DB_POOL_MAX_SIZE": getattr(config, "DB_POOL_MAX_SIZE", 10),
+        "DB_POOL_IDLE_TIMEOUT": getattr(config, "DB_POOL_IDLE_TIMEOUT", 300),
+        "DB_POOL_PING_INTERVAL": getattr(config, "DB_POOL_PING_INTERVAL", 30),
+        "DB_POOL_CHECKOUT_TIMEOUT": getattr(config, "DB_POOL_CHECKOUT_TIMEOUT", 10),
+        # 流式查询每次读取的行数（可选）
+        "DB_STREAM_FETCH_SIZE": getattr(config, "DB_STREAM_FETCH_SIZE", 10000)
     }
 
 if __name__ == "__main__":
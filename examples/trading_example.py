@@ -127,7 +127,7 @@ def main():
             print("⚠ 暂未接收到价格数据")
 
         print("   停止价格监控...")
-        trading_manager.stop_monitoring()
+        trading_manager.shutdown()
         print("✓ 价格监控已停止")
 
         print()
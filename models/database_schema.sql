@@ -9,7 +9,8 @@ CREATE TABLE IF NOT EXISTS hot_topics (
     url VARCHAR(255) UNIQUE COMMENT '资讯原始链接',
     content_summary TEXT COMMENT '资讯内容摘要',
     sentiment ENUM('positive', 'negative', 'neutral') COMMENT '情感分析结果',
-    retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '数据入库时间'
+    retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '数据入库时间',
+    KEY `idx_retrieved_at` (`retrieved_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储获取的加密货币热点资讯';
 
 -- 2. 市场资金流向表 (market_fund_flows)
@@ -24,7 +25,8 @@ CREATE TABLE IF NOT EXISTS market_fund_flows (
     open_interest DECIMAL(30, 8) COMMENT '合约未平仓量',
     liquidations_24h DECIMAL(30, 8) COMMENT '24小时爆仓量',
     data_source VARCHAR(255) COMMENT '数据来源平台',
-    retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '数据入库时间'
+    retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '数据入库时间',
+    KEY `idx_retrieved_at` (`retrieved_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储加密货币市场资金流向数据';
 
 -- 3. 每日数据汇总表 (daily_summary)
@@ -57,12 +59,13 @@ CREATE TABLE IF NOT EXISTS trading_strategies (
     executed_entry_price DECIMAL(20, 8) COMMENT '实际执行入场价格',
     executed_position_size DECIMAL(20, 8) COMMENT '实际执行仓位大小',
     executed_timestamp DATETIME COMMENT '实际执行入场时间',
+    KEY `idx_decision_timestamp` (`decision_timestamp`),
     FOREIGN KEY (daily_summary_id) REFERENCES daily_summary(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储AI生成的交易策略信息';
 
 -- 5. K线图数据表 (kline_data)
+-- 1分钟K线按月分区，超过保留期后整块删除或归档；分区维护见 app/data_processors/kline_retention.py
 CREATE TABLE IF NOT EXISTS kline_data (
-    id INT AUTO_INCREMENT PRIMARY KEY,
     trading_pair VARCHAR(20) NOT NULL COMMENT '交易对，例如：BTCUSDT',
     interval_type VARCHAR(10) NOT NULL COMMENT 'K线间隔类型（1m, 5m, 1h, 1d等）',
     timestamp DATETIME NOT NULL COMMENT 'K线时间点',
@@ -76,8 +79,133 @@ CREATE TABLE IF NOT EXISTS kline_data (
     taker_buy_base_volume DECIMAL(30, 8) COMMENT 'Taker买入基础资产成交量',
     taker_buy_quote_volume DECIMAL(30, 8) COMMENT 'Taker买入报价资产成交量',
     retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '数据入库时间',
-    UNIQUE KEY `idx_pair_interval_time` (`trading_pair`, `interval_type`, `timestamp`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储获取的加密货币K线图数据';
+    PRIMARY KEY (`trading_pair`, `interval_type`, `timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储获取的加密货币K线图数据'
+PARTITION BY RANGE COLUMNS(interval_type, timestamp) (
+    PARTITION p_coarse_a VALUES LESS THAN ('1m', '1000-01-01'),
+    PARTITION p1m_201707 VALUES LESS THAN ('1m', '2017-08-01'),
+    PARTITION p1m_201708 VALUES LESS THAN ('1m', '2017-09-01'),
+    PARTITION p1m_201709 VALUES LESS THAN ('1m', '2017-10-01'),
+    PARTITION p1m_201710 VALUES LESS THAN ('1m', '2017-11-01'),
+    PARTITION p1m_201711 VALUES LESS THAN ('1m', '2017-12-01'),
+    PARTITION p1m_201712 VALUES LESS THAN ('1m', '2018-01-01'),
+    PARTITION p1m_201801 VALUES LESS THAN ('1m', '2018-02-01'),
+    PARTITION p1m_201802 VALUES LESS THAN ('1m', '2018-03-01'),
+    PARTITION p1m_201803 VALUES LESS THAN ('1m', '2018-04-01'),
+    PARTITION p1m_201804 VALUES LESS THAN ('1m', '2018-05-01'),
+    PARTITION p1m_201805 VALUES LESS THAN ('1m', '2018-06-01'),
+    PARTITION p1m_201806 VALUES LESS THAN ('1m', '2018-07-01'),
+    PARTITION p1m_201807 VALUES LESS THAN ('1m', '2018-08-01'),
+    PARTITION p1m_201808 VALUES LESS THAN ('1m', '2018-09-01'),
+    PARTITION p1m_201809 VALUES LESS THAN ('1m', '2018-10-01'),
+    PARTITION p1m_201810 VALUES LESS THAN ('1m', '2018-11-01'),
+    PARTITION p1m_201811 VALUES LESS THAN ('1m', '2018-12-01'),
+    PARTITION p1m_201812 VALUES LESS THAN ('1m', '2019-01-01'),
+    PARTITION p1m_201901 VALUES LESS THAN ('1m', '2019-02-01'),
+    PARTITION p1m_201902 VALUES LESS THAN ('1m', '2019-03-01'),
+    PARTITION p1m_201903 VALUES LESS THAN ('1m', '2019-04-01'),
+    PARTITION p1m_201904 VALUES LESS THAN ('1m', '2019-05-01'),
+    PARTITION p1m_201905 VALUES LESS THAN ('1m', '2019-06-01'),
+    PARTITION p1m_201906 VALUES LESS THAN ('1m', '2019-07-01'),
+    PARTITION p1m_201907 VALUES LESS THAN ('1m', '2019-08-01'),
+    PARTITION p1m_201908 VALUES LESS THAN ('1m', '2019-09-01'),
+    PARTITION p1m_201909 VALUES LESS THAN ('1m', '2019-10-01'),
+    PARTITION p1m_201910 VALUES LESS THAN ('1m', '2019-11-01'),
+    PARTITION p1m_201911 VALUES LESS THAN ('1m', '2019-12-01'),
+    PARTITION p1m_201912 VALUES LESS THAN ('1m', '2020-01-01'),
+    PARTITION p1m_202001 VALUES LESS THAN ('1m', '2020-02-01'),
+    PARTITION p1m_202002 VALUES LESS THAN ('1m', '2020-03-01'),
+    PARTITION p1m_202003 VALUES LESS THAN ('1m', '2020-04-01'),
+    PARTITION p1m_202004 VALUES LESS THAN ('1m', '2020-05-01'),
+    PARTITION p1m_202005 VALUES LESS THAN ('1m', '2020-06-01'),
+    PARTITION p1m_202006 VALUES LESS THAN ('1m', '2020-07-01'),
+    PARTITION p1m_202007 VALUES LESS THAN ('1m', '2020-08-01'),
+    PARTITION p1m_202008 VALUES LESS THAN ('1m', '2020-09-01'),
+    PARTITION p1m_202009 VALUES LESS THAN ('1m', '2020-10-01'),
+    PARTITION p1m_202010 VALUES LESS THAN ('1m', '2020-11-01'),
+    PARTITION p1m_202011 VALUES LESS THAN ('1m', '2020-12-01'),
+    PARTITION p1m_202012 VALUES LESS THAN ('1m', '2021-01-01'),
+    PARTITION p1m_202101 VALUES LESS THAN ('1m', '2021-02-01'),
+    PARTITION p1m_202102 VALUES LESS THAN ('1m', '2021-03-01'),
+    PARTITION p1m_202103 VALUES LESS THAN ('1m', '2021-04-01'),
+    PARTITION p1m_202104 VALUES LESS THAN ('1m', '2021-05-01'),
+    PARTITION p1m_202105 VALUES LESS THAN ('1m', '2021-06-01'),
+    PARTITION p1m_202106 VALUES LESS THAN ('1m', '2021-07-01'),
+    PARTITION p1m_202107 VALUES LESS THAN ('1m', '2021-08-01'),
+    PARTITION p1m_202108 VALUES LESS THAN ('1m', '2021-09-01'),
+    PARTITION p1m_202109 VALUES LESS THAN ('1m', '2021-10-01'),
+    PARTITION p1m_202110 VALUES LESS THAN ('1m', '2021-11-01'),
+    PARTITION p1m_202111 VALUES LESS THAN ('1m', '2021-12-01'),
+    PARTITION p1m_202112 VALUES LESS THAN ('1m', '2022-01-01'),
+    PARTITION p1m_202201 VALUES LESS THAN ('1m', '2022-02-01'),
+    PARTITION p1m_202202 VALUES LESS THAN ('1m', '2022-03-01'),
+    PARTITION p1m_202203 VALUES LESS THAN ('1m', '2022-04-01'),
+    PARTITION p1m_202204 VALUES LESS THAN ('1m', '2022-05-01'),
+    PARTITION p1m_202205 VALUES LESS THAN ('1m', '2022-06-01'),
+    PARTITION p1m_202206 VALUES LESS THAN ('1m', '2022-07-01'),
+    PARTITION p1m_202207 VALUES LESS THAN ('1m', '2022-08-01'),
+    PARTITION p1m_202208 VALUES LESS THAN ('1m', '2022-09-01'),
+    PARTITION p1m_202209 VALUES LESS THAN ('1m', '2022-10-01'),
+    PARTITION p1m_202210 VALUES LESS THAN ('1m', '2022-11-01'),
+    PARTITION p1m_202211 VALUES LESS THAN ('1m', '2022-12-01'),
+    PARTITION p1m_202212 VALUES LESS THAN ('1m', '2023-01-01'),
+    PARTITION p1m_202301 VALUES LESS THAN ('1m', '2023-02-01'),
+    PARTITION p1m_202302 VALUES LESS THAN ('1m', '2023-03-01'),
+    PARTITION p1m_202303 VALUES LESS THAN ('1m', '2023-04-01'),
+    PARTITION p1m_202304 VALUES LESS THAN ('1m', '2023-05-01'),
+    PARTITION p1m_202305 VALUES LESS THAN ('1m', '2023-06-01'),
+    PARTITION p1m_202306 VALUES LESS THAN ('1m', '2023-07-01'),
+    PARTITION p1m_202307 VALUES LESS THAN ('1m', '2023-08-01'),
+    PARTITION p1m_202308 VALUES LESS THAN ('1m', '2023-09-01'),
+    PARTITION p1m_202309 VALUES LESS THAN ('1m', '2023-10-01'),
+    PARTITION p1m_202310 VALUES LESS THAN ('1m', '2023-11-01'),
+    PARTITION p1m_202311 VALUES LESS THAN ('1m', '2023-12-01'),
+    PARTITION p1m_202312 VALUES LESS THAN ('1m', '2024-01-01'),
+    PARTITION p1m_202401 VALUES LESS THAN ('1m', '2024-02-01'),
+    PARTITION p1m_202402 VALUES LESS THAN ('1m', '2024-03-01'),
+    PARTITION p1m_202403 VALUES LESS THAN ('1m', '2024-04-01'),
+    PARTITION p1m_202404 VALUES LESS THAN ('1m', '2024-05-01'),
+    PARTITION p1m_202405 VALUES LESS THAN ('1m', '2024-06-01'),
+    PARTITION p1m_202406 VALUES LESS THAN ('1m', '2024-07-01'),
+    PARTITION p1m_202407 VALUES LESS THAN ('1m', '2024-08-01'),
+    PARTITION p1m_202408 VALUES LESS THAN ('1m', '2024-09-01'),
+    PARTITION p1m_202409 VALUES LESS THAN ('1m', '2024-10-01'),
+    PARTITION p1m_202410 VALUES LESS THAN ('1m', '2024-11-01'),
+    PARTITION p1m_202411 VALUES LESS THAN ('1m', '2024-12-01'),
+    PARTITION p1m_202412 VALUES LESS THAN ('1m', '2025-01-01'),
+    PARTITION p1m_202501 VALUES LESS THAN ('1m', '2025-02-01'),
+    PARTITION p1m_202502 VALUES LESS THAN ('1m', '2025-03-01'),
+    PARTITION p1m_202503 VALUES LESS THAN ('1m', '2025-04-01'),
+    PARTITION p1m_202504 VALUES LESS THAN ('1m', '2025-05-01'),
+    PARTITION p1m_202505 VALUES LESS THAN ('1m', '2025-06-01'),
+    PARTITION p1m_202506 VALUES LESS THAN ('1m', '2025-07-01'),
+    PARTITION p1m_202507 VALUES LESS THAN ('1m', '2025-08-01'),
+    PARTITION p1m_202508 VALUES LESS THAN ('1m', '2025-09-01'),
+    PARTITION p1m_202509 VALUES LESS THAN ('1m', '2025-10-01'),
+    PARTITION p1m_202510 VALUES LESS THAN ('1m', '2025-11-01'),
+    PARTITION p1m_202511 VALUES LESS THAN ('1m', '2025-12-01'),
+    PARTITION p1m_202512 VALUES LESS THAN ('1m', '2026-01-01'),
+    PARTITION p1m_202601 VALUES LESS THAN ('1m', '2026-02-01'),
+    PARTITION p1m_202602 VALUES LESS THAN ('1m', '2026-03-01'),
+    PARTITION p1m_202603 VALUES LESS THAN ('1m', '2026-04-01'),
+    PARTITION p1m_202604 VALUES LESS THAN ('1m', '2026-05-01'),
+    PARTITION p1m_202605 VALUES LESS THAN ('1m', '2026-06-01'),
+    PARTITION p1m_202606 VALUES LESS THAN ('1m', '2026-07-01'),
+    PARTITION p1m_202607 VALUES LESS THAN ('1m', '2026-08-01'),
+    PARTITION p1m_202608 VALUES LESS THAN ('1m', '2026-09-01'),
+    PARTITION p1m_202609 VALUES LESS THAN ('1m', '2026-10-01'),
+    PARTITION p1m_202610 VALUES LESS THAN ('1m', '2026-11-01'),
+    PARTITION p1m_202611 VALUES LESS THAN ('1m', '2026-12-01'),
+    PARTITION p1m_202612 VALUES LESS THAN ('1m', '2027-01-01'),
+    PARTITION p1m_202701 VALUES LESS THAN ('1m', '2027-02-01'),
+    PARTITION p1m_202702 VALUES LESS THAN ('1m', '2027-03-01'),
+    PARTITION p1m_202703 VALUES LESS THAN ('1m', '2027-04-01'),
+    PARTITION p1m_202704 VALUES LESS THAN ('1m', '2027-05-01'),
+    PARTITION p1m_202705 VALUES LESS THAN ('1m', '2027-06-01'),
+    PARTITION p1m_202706 VALUES LESS THAN ('1m', '2027-07-01'),
+    PARTITION p1m_future VALUES LESS THAN ('1m', MAXVALUE),
+    PARTITION p_coarse_b VALUES LESS THAN (MAXVALUE, MAXVALUE)
+);
 
 -- 6. 交易记录表 (trades)
 CREATE TABLE IF NOT EXISTS trades (
@@ -97,6 +225,7 @@ CREATE TABLE IF NOT EXISTS trades (
     related_strategy_id INT COMMENT '关联的交易策略ID',
     related_open_trade_id INT COMMENT '关联的开仓交易ID（如果是平仓交易）',
     close_reason TEXT COMMENT '平仓原因（如果是平仓交易）',
+    KEY `idx_type_time` (`transaction_type`, `transaction_time`),
     FOREIGN KEY (related_strategy_id) REFERENCES trading_strategies(id) ON DELETE SET NULL,
     FOREIGN KEY (related_open_trade_id) REFERENCES trades(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='记录实际的加密货币交易操作';
@@ -202,3 +331,30 @@ CREATE TABLE IF NOT EXISTS orders (
     FOREIGN KEY (related_strategy_id) REFERENCES trading_strategies(id) ON DELETE SET NULL,
     FOREIGN KEY (related_position_id) REFERENCES positions(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='订单信息';
+
+-- 13. 最新价格表 (latest_prices)
+-- 每个交易对一行，由K线写入和价格监控维护，读取最新价格时按主键查询，不对kline_data排序
+CREATE TABLE IF NOT EXISTS latest_prices (
+    trading_pair VARCHAR(20) PRIMARY KEY COMMENT '交易对，例如：BTCUSDT',
+    price DECIMAL(20, 8) NOT NULL COMMENT '最新价格',
+    price_time DATETIME NOT NULL COMMENT '价格时间',
+    price_source VARCHAR(20) NOT NULL COMMENT '价格来源：kline或stream',
+    high_price DECIMAL(20, 8) COMMENT '最新K线的最高价',
+    low_price DECIMAL(20, 8) COMMENT '最新K线的最低价',
+    kline_interval VARCHAR(10) COMMENT '最新K线的周期',
+    kline_time DATETIME COMMENT '最新K线的开盘时间',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每个交易对的最新价格';
+
+-- 14. 数据库迁移记录表 (schema_migrations)
+-- 已有数据库用 scripts/migrate_db.py 执行 models/migrations 下尚未执行的迁移；
+-- 本文件已包含的迁移在这里登记，新建的数据库不会重复执行
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(100) PRIMARY KEY COMMENT '迁移文件名（不含扩展名）',
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '执行时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='已执行的数据库迁移';
+
+INSERT IGNORE INTO schema_migrations (version) VALUES
+    ('001_daily_query_indexes'),
+    ('002_latest_prices'),
+    ('003_partition_kline_data');
@@ -0,0 +1,12 @@
+-- 001 每日查询按时间范围过滤所需的索引
+-- 对应的查询都改为半开区间 col >= 当日0点 AND col < 次日0点，不再对列使用DATE()，可以走这些索引。
+
+-- 每日汇总按入库时间取当日热点资讯和资金流向
+ALTER TABLE hot_topics ADD INDEX idx_retrieved_at (retrieved_at);
+ALTER TABLE market_fund_flows ADD INDEX idx_retrieved_at (retrieved_at);
+
+-- 组合摘要统计当日平仓交易的已实现盈亏：等值条件在前，范围条件在后
+ALTER TABLE trades ADD INDEX idx_type_time (transaction_type, transaction_time);
+
+-- 交易任务取当日生成的交易策略
+ALTER TABLE trading_strategies ADD INDEX idx_decision_timestamp (decision_timestamp);
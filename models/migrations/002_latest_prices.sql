@@ -0,0 +1,35 @@
+-- 002 最新价格表
+-- 策略生成按交易对读取最新价格，原来对kline_data按timestamp倒序取第一行，没有interval_type条件，
+-- 唯一索引 (trading_pair, interval_type, timestamp) 无法服务排序，每个交易对都要对全部历史K线排序。
+-- latest_prices 每个交易对一行，由K线写入和价格监控维护，按主键读取。
+
+CREATE TABLE IF NOT EXISTS latest_prices (
+    trading_pair VARCHAR(20) PRIMARY KEY COMMENT '交易对，例如：BTCUSDT',
+    price DECIMAL(20, 8) NOT NULL COMMENT '最新价格',
+    price_time DATETIME NOT NULL COMMENT '价格时间',
+    price_source VARCHAR(20) NOT NULL COMMENT '价格来源：kline或stream',
+    high_price DECIMAL(20, 8) COMMENT '最新K线的最高价',
+    low_price DECIMAL(20, 8) COMMENT '最新K线的最低价',
+    kline_interval VARCHAR(10) COMMENT '最新K线的周期',
+    kline_time DATETIME COMMENT '最新K线的开盘时间',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每个交易对的最新价格';
+
+-- 用已有K线回填：分组查询取每个交易对、每个周期的最后一根K线（可以走唯一索引），
+-- 同一交易对多个周期时保留开盘时间最新的一根
+INSERT INTO latest_prices (trading_pair, price, price_time, price_source, high_price, low_price, kline_interval, kline_time)
+SELECT k.trading_pair, k.close_price, k.timestamp, 'kline', k.high_price, k.low_price, k.interval_type, k.timestamp
+FROM kline_data k
+JOIN (
+    SELECT trading_pair, interval_type, MAX(timestamp) AS latest_time
+    FROM kline_data
+    GROUP BY trading_pair, interval_type
+) latest ON k.trading_pair = latest.trading_pair AND k.interval_type = latest.interval_type
+    AND k.timestamp = latest.latest_time
+ON DUPLICATE KEY UPDATE
+    price = IF(VALUES(kline_time) >= latest_prices.kline_time, VALUES(price), latest_prices.price),
+    price_time = IF(VALUES(kline_time) >= latest_prices.kline_time, VALUES(price_time), latest_prices.price_time),
+    high_price = IF(VALUES(kline_time) >= latest_prices.kline_time, VALUES(high_price), latest_prices.high_price),
+    low_price = IF(VALUES(kline_time) >= latest_prices.kline_time, VALUES(low_price), latest_prices.low_price),
+    kline_interval = IF(VALUES(kline_time) >= latest_prices.kline_time, VALUES(kline_interval), latest_prices.kline_interval),
+    kline_time = GREATEST(latest_prices.kline_time, VALUES(kline_time));
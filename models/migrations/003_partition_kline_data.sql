@@ -0,0 +1,141 @@
+-- 003 kline_data按月分区
+-- 1分钟K线持续增长，单表的插入、索引维护和范围扫描随历史变长而变慢，过期数据也只能逐行DELETE。
+-- 分区键为 (interval_type, timestamp)：1分钟K线每月一个分区 p1m_YYYYMM，可以整块删除或归档
+-- （app/data_processors/kline_retention.py），不影响由它们聚合出的其他周期；
+-- 其他周期数据量小，周期名排在1m之前的（12h/15m/1d/1h）放在 p_coarse_a，之后的放在 p_coarse_b。
+-- 查询带 interval_type 等值条件和 timestamp 范围条件时只扫描相关的分区。
+-- 分区表的每个唯一键都必须包含分区列，因此去掉自增id，改用 (trading_pair, interval_type, timestamp) 作为主键；
+-- 代码中没有使用kline_data.id。之后月份的分区由每日维护任务从 p1m_future 中拆出。
+-- 两条ALTER都会重建整张表，大表上执行需要较长时间，期间写入K线会被阻塞。
+
+ALTER TABLE kline_data
+    DROP COLUMN id,
+    DROP INDEX idx_pair_interval_time,
+    ADD PRIMARY KEY (trading_pair, interval_type, timestamp);
+
+ALTER TABLE kline_data
+PARTITION BY RANGE COLUMNS(interval_type, timestamp) (
+    PARTITION p_coarse_a VALUES LESS THAN ('1m', '1000-01-01'),
+    PARTITION p1m_201707 VALUES LESS THAN ('1m', '2017-08-01'),
+    PARTITION p1m_201708 VALUES LESS THAN ('1m', '2017-09-01'),
+    PARTITION p1m_201709 VALUES LESS THAN ('1m', '2017-10-01'),
+    PARTITION p1m_201710 VALUES LESS THAN ('1m', '2017-11-01'),
+    PARTITION p1m_201711 VALUES LESS THAN ('1m', '2017-12-01'),
+    PARTITION p1m_201712 VALUES LESS THAN ('1m', '2018-01-01'),
+    PARTITION p1m_201801 VALUES LESS THAN ('1m', '2018-02-01'),
+    PARTITION p1m_201802 VALUES LESS THAN ('1m', '2018-03-01'),
+    PARTITION p1m_201803 VALUES LESS THAN ('1m', '2018-04-01'),
+    PARTITION p1m_201804 VALUES LESS THAN ('1m', '2018-05-01'),
+    PARTITION p1m_201805 VALUES LESS THAN ('1m', '2018-06-01'),
+    PARTITION p1m_201806 VALUES LESS THAN ('1m', '2018-07-01'),
+    PARTITION p1m_201807 VALUES LESS THAN ('1m', '2018-08-01'),
+    PARTITION p1m_201808 VALUES LESS THAN ('1m', '2018-09-01'),
+    PARTITION p1m_201809 VALUES LESS THAN ('1m', '2018-10-01'),
+    PARTITION p1m_201810 VALUES LESS THAN ('1m', '2018-11-01'),
+    PARTITION p1m_201811 VALUES LESS THAN ('1m', '2018-12-01'),
+    PARTITION p1m_201812 VALUES LESS THAN ('1m', '2019-01-01'),
+    PARTITION p1m_201901 VALUES LESS THAN ('1m', '2019-02-01'),
+    PARTITION p1m_201902 VALUES LESS THAN ('1m', '2019-03-01'),
+    PARTITION p1m_201903 VALUES LESS THAN ('1m', '2019-04-01'),
+    PARTITION p1m_201904 VALUES LESS THAN ('1m', '2019-05-01'),
+    PARTITION p1m_201905 VALUES LESS THAN ('1m', '2019-06-01'),
+    PARTITION p1m_201906 VALUES LESS THAN ('1m', '2019-07-01'),
+    PARTITION p1m_201907 VALUES LESS THAN ('1m', '2019-08-01'),
+    PARTITION p1m_201908 VALUES LESS THAN ('1m', '2019-09-01'),
+    PARTITION p1m_201909 VALUES LESS THAN ('1m', '2019-10-01'),
+    PARTITION p1m_201910 VALUES LESS THAN ('1m', '2019-11-01'),
+    PARTITION p1m_201911 VALUES LESS THAN ('1m', '2019-12-01'),
+    PARTITION p1m_201912 VALUES LESS THAN ('1m', '2020-01-01'),
+    PARTITION p1m_202001 VALUES LESS THAN ('1m', '2020-02-01'),
+    PARTITION p1m_202002 VALUES LESS THAN ('1m', '2020-03-01'),
+    PARTITION p1m_202003 VALUES LESS THAN ('1m', '2020-04-01'),
+    PARTITION p1m_202004 VALUES LESS THAN ('1m', '2020-05-01'),
+    PARTITION p1m_202005 VALUES LESS THAN ('1m', '2020-06-01'),
+    PARTITION p1m_202006 VALUES LESS THAN ('1m', '2020-07-01'),
+    PARTITION p1m_202007 VALUES LESS THAN ('1m', '2020-08-01'),
+    PARTITION p1m_202008 VALUES LESS THAN ('1m', '2020-09-01'),
+    PARTITION p1m_202009 VALUES LESS THAN ('1m', '2020-10-01'),
+    PARTITION p1m_202010 VALUES LESS THAN ('1m', '2020-11-01'),
+    PARTITION p1m_202011 VALUES LESS THAN ('1m', '2020-12-01'),
+    PARTITION p1m_202012 VALUES LESS THAN ('1m', '2021-01-01'),
+    PARTITION p1m_202101 VALUES LESS THAN ('1m', '2021-02-01'),
+    PARTITION p1m_202102 VALUES LESS THAN ('1m', '2021-03-01'),
+    PARTITION p1m_202103 VALUES LESS THAN ('1m', '2021-04-01'),
+    PARTITION p1m_202104 VALUES LESS THAN ('1m', '2021-05-01'),
+    PARTITION p1m_202105 VALUES LESS THAN ('1m', '2021-06-01'),
+    PARTITION p1m_202106 VALUES LESS THAN ('1m', '2021-07-01'),
+    PARTITION p1m_202107 VALUES LESS THAN ('1m', '2021-08-01'),
+    PARTITION p1m_202108 VALUES LESS THAN ('1m', '2021-09-01'),
+    PARTITION p1m_202109 VALUES LESS THAN ('1m', '2021-10-01'),
+    PARTITION p1m_202110 VALUES LESS THAN ('1m', '2021-11-01'),
+    PARTITION p1m_202111 VALUES LESS THAN ('1m', '2021-12-01'),
+    PARTITION p1m_202112 VALUES LESS THAN ('1m', '2022-01-01'),
+    PARTITION p1m_202201 VALUES LESS THAN ('1m', '2022-02-01'),
+    PARTITION p1m_202202 VALUES LESS THAN ('1m', '2022-03-01'),
+    PARTITION p1m_202203 VALUES LESS THAN ('1m', '2022-04-01'),
+    PARTITION p1m_202204 VALUES LESS THAN ('1m', '2022-05-01'),
+    PARTITION p1m_202205 VALUES LESS THAN ('1m', '2022-06-01'),
+    PARTITION p1m_202206 VALUES LESS THAN ('1m', '2022-07-01'),
+    PARTITION p1m_202207 VALUES LESS THAN ('1m', '2022-08-01'),
+    PARTITION p1m_202208 VALUES LESS THAN ('1m', '2022-09-01'),
+    PARTITION p1m_202209 VALUES LESS THAN ('1m', '2022-10-01'),
+    PARTITION p1m_202210 VALUES LESS THAN ('1m', '2022-11-01'),
+    PARTITION p1m_202211 VALUES LESS THAN ('1m', '2022-12-01'),
+    PARTITION p1m_202212 VALUES LESS THAN ('1m', '2023-01-01'),
+    PARTITION p1m_202301 VALUES LESS THAN ('1m', '2023-02-01'),
+    PARTITION p1m_202302 VALUES LESS THAN ('1m', '2023-03-01'),
+    PARTITION p1m_202303 VALUES LESS THAN ('1m', '2023-04-01'),
+    PARTITION p1m_202304 VALUES LESS THAN ('1m', '2023-05-01'),
+    PARTITION p1m_202305 VALUES LESS THAN ('1m', '2023-06-01'),
+    PARTITION p1m_202306 VALUES LESS THAN ('1m', '2023-07-01'),
+    PARTITION p1m_202307 VALUES LESS THAN ('1m', '2023-08-01'),
+    PARTITION p1m_202308 VALUES LESS THAN ('1m', '2023-09-01'),
+    PARTITION p1m_202309 VALUES LESS THAN ('1m', '2023-10-01'),
+    PARTITION p1m_202310 VALUES LESS THAN ('1m', '2023-11-01'),
+    PARTITION p1m_202311 VALUES LESS THAN ('1m', '2023-12-01'),
+    PARTITION p1m_202312 VALUES LESS THAN ('1m', '2024-01-01'),
+    PARTITION p1m_202401 VALUES LESS THAN ('1m', '2024-02-01'),
+    PARTITION p1m_202402 VALUES LESS THAN ('1m', '2024-03-01'),
+    PARTITION p1m_202403 VALUES LESS THAN ('1m', '2024-04-01'),
+    PARTITION p1m_202404 VALUES LESS THAN ('1m', '2024-05-01'),
+    PARTITION p1m_202405 VALUES LESS THAN ('1m', '2024-06-01'),
+    PARTITION p1m_202406 VALUES LESS THAN ('1m', '2024-07-01'),
+    PARTITION p1m_202407 VALUES LESS THAN ('1m', '2024-08-01'),
+    PARTITION p1m_202408 VALUES LESS THAN ('1m', '2024-09-01'),
+    PARTITION p1m_202409 VALUES LESS THAN ('1m', '2024-10-01'),
+    PARTITION p1m_202410 VALUES LESS THAN ('1m', '2024-11-01'),
+    PARTITION p1m_202411 VALUES LESS THAN ('1m', '2024-12-01'),
+    PARTITION p1m_202412 VALUES LESS THAN ('1m', '2025-01-01'),
+    PARTITION p1m_202501 VALUES LESS THAN ('1m', '2025-02-01'),
+    PARTITION p1m_202502 VALUES LESS THAN ('1m', '2025-03-01'),
+    PARTITION p1m_202503 VALUES LESS THAN ('1m', '2025-04-01'),
+    PARTITION p1m_202504 VALUES LESS THAN ('1m', '2025-05-01'),
+    PARTITION p1m_202505 VALUES LESS THAN ('1m', '2025-06-01'),
+    PARTITION p1m_202506 VALUES LESS THAN ('1m', '2025-07-01'),
+    PARTITION p1m_202507 VALUES LESS THAN ('1m', '2025-08-01'),
+    PARTITION p1m_202508 VALUES LESS THAN ('1m', '2025-09-01'),
+    PARTITION p1m_202509 VALUES LESS THAN ('1m', '2025-10-01'),
+    PARTITION p1m_202510 VALUES LESS THAN ('1m', '2025-11-01'),
+    PARTITION p1m_202511 VALUES LESS THAN ('1m', '2025-12-01'),
+    PARTITION p1m_202512 VALUES LESS THAN ('1m', '2026-01-01'),
+    PARTITION p1m_202601 VALUES LESS THAN ('1m', '2026-02-01'),
+    PARTITION p1m_202602 VALUES LESS THAN ('1m', '2026-03-01'),
+    PARTITION p1m_202603 VALUES LESS THAN ('1m', '2026-04-01'),
+    PARTITION p1m_202604 VALUES LESS THAN ('1m', '2026-05-01'),
+    PARTITION p1m_202605 VALUES LESS THAN ('1m', '2026-06-01'),
+    PARTITION p1m_202606 VALUES LESS THAN ('1m', '2026-07-01'),
+    PARTITION p1m_202607 VALUES LESS THAN ('1m', '2026-08-01'),
+    PARTITION p1m_202608 VALUES LESS THAN ('1m', '2026-09-01'),
+    PARTITION p1m_202609 VALUES LESS THAN ('1m', '2026-10-01'),
+    PARTITION p1m_202610 VALUES LESS THAN ('1m', '2026-11-01'),
+    PARTITION p1m_202611 VALUES LESS THAN ('1m', '2026-12-01'),
+    PARTITION p1m_202612 VALUES LESS THAN ('1m', '2027-01-01'),
+    PARTITION p1m_202701 VALUES LESS THAN ('1m', '2027-02-01'),
+    PARTITION p1m_202702 VALUES LESS THAN ('1m', '2027-03-01'),
+    PARTITION p1m_202703 VALUES LESS THAN ('1m', '2027-04-01'),
+    PARTITION p1m_202704 VALUES LESS THAN ('1m', '2027-05-01'),
+    PARTITION p1m_202705 VALUES LESS THAN ('1m', '2027-06-01'),
+    PARTITION p1m_202706 VALUES LESS THAN ('1m', '2027-07-01'),
+    PARTITION p1m_future VALUES LESS THAN ('1m', MAXVALUE),
+    PARTITION p_coarse_b VALUES LESS THAN (MAXVALUE, MAXVALUE)
+);
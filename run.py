@@ -22,9 +22,12 @@ from app.scheduler.tasks import (
     collect_crypto_market_data,
     summarize_crypto_daily_data,
     generate_crypto_trading_strategy,
-    run_crypto_full_workflow
+    run_crypto_full_workflow,
+    backfill_crypto_klines,
+    maintain_kline_partitions
 )
 from app.utils import load_config, get_db_config
+from app.database.db_manager import close_all_pools
 
 # 创建日志目录
 os.makedirs(os.path.join(APP_DIR, 'logs'), exist_ok=True)
@@ -54,9 +57,10 @@ def run_scheduler():
     except KeyboardInterrupt:
         logger.info("接收到停止信号，正在停止调度器...")
         scheduler.stop()
+        close_all_pools()
         logger.info("调度器已停止")
 
-def run_task(task_name, date_str=None, trading_pairs=None):
+def run_task(task_name, date_str=None, trading_pairs=None, start_date=None, end_date=None, intervals=None):
     """运行指定的任务"""
     logger.info(f"运行任务: {task_name}")
 
@@ -92,6 +96,12 @@ def run_task(task_name, date_str=None, trading_pairs=None):
     elif task_name == "full_workflow":
         # 运行完整工作流程
         success = run_crypto_full_workflow(today, trading_pairs)
+    elif task_name == "backfill_klines":
+        # 回填历史K线数据
+        success = backfill_crypto_klines(trading_pairs, intervals, start_date, end_date)
+    elif task_name == "maintain_kline_partitions":
+        # 预建K线分区并清理过期的1分钟K线分区
+        success = maintain_kline_partitions()
     else:
         logger.error(f"未知任务: {task_name}")
         return
@@ -106,10 +116,14 @@ def main():
     parser = argparse.ArgumentParser(description="加密货币交易系统")
     parser.add_argument("--run", choices=["scheduler", "task"], help="运行模式: scheduler(调度器) 或 task(单个任务)", default="scheduler")
     parser.add_argument("--task", choices=["collect_crypto_news", "collect_crypto_market_data", "summarize_crypto_daily_data",
-                                          "generate_crypto_trading_strategy", "collect_hourly_data", "daily_strategy", "full_workflow"],
+                                          "generate_crypto_trading_strategy", "collect_hourly_data", "daily_strategy", "full_workflow",
+                                          "backfill_klines", "maintain_kline_partitions"],
                         help="要运行的任务名称")
     parser.add_argument("--date", help="目标日期 (YYYY-MM-DD)，默认为今天")
     parser.add_argument("--pairs", help="交易对列表，用逗号分隔，例如: BTCUSDT,ETHUSDT,SOLUSDT")
+    parser.add_argument("--intervals", help="K线周期列表（backfill_klines），用逗号分隔，例如: 1m,1h,1d")
+    parser.add_argument("--start", help="回填起始日期 (YYYY-MM-DD)，默认为KLINE_BACKFILL_DAYS天前")
+    parser.add_argument("--end", help="回填截止日期 (YYYY-MM-DD)，包含当天，默认为当前时间")
 
     args = parser.parse_args()
 
@@ -119,6 +133,8 @@ def main():
         trading_pairs = args.pairs.split(",")
         logger.info(f"使用指定的交易对: {trading_pairs}")
 
+    intervals = args.intervals.split(",") if args.intervals else None
+
     try:
         if args.run == "scheduler":
             run_scheduler()
@@ -127,7 +143,7 @@ def main():
                 logger.error("运行单个任务时必须指定 --task 参数")
                 parser.print_help()
                 return
-            run_task(args.task, args.date, trading_pairs)
+            run_task(args.task, args.date, trading_pairs, args.start, args.end, intervals)
         else:
             logger.error(f"未知运行模式: {args.run}")
             parser.print_help()
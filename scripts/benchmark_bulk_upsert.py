@@ -0,0 +1,120 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+批量写入性能测试
+在本地MySQL上对比逐行 cursor.execute 与 DatabaseManager.bulk_upsert 的写入速度（行/秒）。
+测试使用与kline_data结构相同的临时表，结束后自动删除，不影响正式数据。
+
+用法:
+    python scripts/benchmark_bulk_upsert.py --rows 20000 --chunk-sizes 100,500,1000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.utils import load_config, get_db_config
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import KLINE_COLUMNS, KLINE_UPDATE_COLUMNS
+
+BENCH_TABLE = "kline_data_bench"
+
+def generate_klines(count):
+    """生成模拟的1分钟K线数据"""
+    start = datetime.datetime(2024, 1, 1)
+    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    price = 40000.0
+    klines = []
+    for i in range(count):
+        open_price = price
+        price = max(1.0, price + random.uniform(-50, 50))
+        klines.append({
+            'trading_pair': 'BTCUSDT',
+            'interval_type': '1m',
+            'timestamp': (start + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            'open_price': open_price,
+            'high_price': max(open_price, price) + 10,
+            'low_price': min(open_price, price) - 10,
+            'close_price': price,
+            'volume': random.uniform(1, 100),
+            'quote_asset_volume': random.uniform(40000, 4000000),
+            'number_of_trades': random.randint(100, 5000),
+            'taker_buy_base_volume': random.uniform(0, 50),
+            'taker_buy_quote_volume': random.uniform(0, 2000000),
+            'retrieved_at': now_str
+        })
+    return klines
+
+def reset_table(db_manager):
+    """重建测试表"""
+    with db_manager.get_connection() as (connection, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE kline_data")
+        connection.commit()
+
+def drop_table(db_manager):
+    """删除测试表"""
+    with db_manager.get_connection() as (connection, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        connection.commit()
+
+def bench_row_by_row(db_manager, klines):
+    """旧实现：循环中逐行执行INSERT ... ON DUPLICATE KEY UPDATE"""
+    sql = (f"INSERT INTO {BENCH_TABLE} ({', '.join(KLINE_COLUMNS)}) VALUES ("
+           + ", ".join(f"%({column})s" for column in KLINE_COLUMNS) + ") ON DUPLICATE KEY UPDATE "
+           + ", ".join(f"{column}=VALUES({column})" for column in KLINE_UPDATE_COLUMNS))
+
+    started = time.perf_counter()
+    with db_manager.get_connection() as (connection, cursor):
+        for kline in klines:
+            cursor.execute(sql, kline)
+        connection.commit()
+    return time.perf_counter() - started
+
+def bench_bulk(db_manager, klines, chunk_size):
+    """新实现：分块多行INSERT ... ON DUPLICATE KEY UPDATE"""
+    started = time.perf_counter()
+    stored, failed = db_manager.bulk_upsert(BENCH_TABLE, KLINE_COLUMNS, klines, KLINE_UPDATE_COLUMNS,
+                                            chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+    if failed or stored != len(klines):
+        print(f"  ⚠️  写入异常: 成功{stored}行, 失败{len(failed)}行")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="批量写入性能测试")
+    parser.add_argument("--rows", type=int, default=20000, help="测试行数")
+    parser.add_argument("--chunk-sizes", default="100,500,1000", help="bulk_upsert分块大小，用逗号分隔")
+    args = parser.parse_args()
+
+    config = load_config()
+    db_manager = DatabaseManager(get_db_config(config))
+    klines = generate_klines(args.rows)
+
+    print(f"=== 批量写入性能测试: {args.rows}行 ===")
+    try:
+        for label, mode in (("首次插入", "insert"), ("重复写入(更新)", "update")):
+            print(f"\n[{label}]")
+
+            if mode == "insert":
+                reset_table(db_manager)
+            elapsed = bench_row_by_row(db_manager, klines)
+            print(f"  逐行写入:            {args.rows / elapsed:>10.0f} 行/秒 ({elapsed:.2f}秒)")
+
+            for chunk_size in [int(size) for size in args.chunk_sizes.split(",")]:
+                if mode == "insert":
+                    reset_table(db_manager)
+                elapsed = bench_bulk(db_manager, klines, chunk_size)
+                print(f"  bulk_upsert({chunk_size:>5}):  {args.rows / elapsed:>10.0f} 行/秒 ({elapsed:.2f}秒)")
+    finally:
+        drop_table(db_manager)
+
+if __name__ == "__main__":
+    main()
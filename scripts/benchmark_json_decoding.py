@@ -0,0 +1,149 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情消息解码性能测试
+在WebSocket读取线程的消息回调上测量每条消息的CPU耗时（包括放入分发队列），对比：
+    json      标准库json完整解码为字典
+    截取字段  直接从原始消息中截取价格字段（未安装orjson时价格监控的默认路径）
+    orjson    orjson完整解码为字典（已安装时的默认路径）
+不需要数据库和网络。
+
+用法:
+    python scripts/benchmark_json_decoding.py --messages 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app import fast_json
+from app.trading import stream_connection
+from app.trading.price_monitor import PriceMonitor
+from app.data_collectors import kline_stream_ingester
+from app.data_collectors.kline_stream_ingester import KlineStreamIngester
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'bench', 'DB_PASSWORD': '',
+    'DB_NAME': 'bench', 'DB_POOL_ENABLED': False
+}
+
+def compact(payload):
+    return json.dumps(payload, separators=(',', ':'))
+
+def ticker_frame(symbol, price, event_ms):
+    """与Binance推送相同字段的24小时ticker组合流消息"""
+    return compact({'stream': f'{symbol.lower()}@ticker', 'data': {
+        'e': '24hrTicker', 'E': event_ms, 's': symbol, 'p': '12.50000000', 'P': '0.031', 'w': f'{price:.8f}',
+        'x': f'{price:.8f}', 'c': f'{price:.8f}', 'Q': '0.01200000', 'b': f'{price - 0.01:.8f}', 'B': '1.50000000',
+        'a': f'{price + 0.01:.8f}', 'A': '2.10000000', 'o': f'{price:.8f}', 'h': f'{price * 1.02:.8f}',
+        'l': f'{price * 0.98:.8f}', 'v': '15234.12000000', 'q': '612345678.12000000', 'O': event_ms - 86400000,
+        'C': event_ms, 'F': 3311000000, 'L': 3312000000, 'n': 1000000
+    }})
+
+def book_ticker_frame(symbol, price, event_ms):
+    return compact({'stream': f'{symbol.lower()}@bookTicker', 'data': {
+        'u': event_ms, 's': symbol, 'b': f'{price - 0.01:.8f}', 'B': '1.50000000',
+        'a': f'{price + 0.01:.8f}', 'A': '2.10000000'
+    }})
+
+def agg_trade_frame(symbol, price, event_ms):
+    return compact({'stream': f'{symbol.lower()}@aggTrade', 'data': {
+        'e': 'aggTrade', 'E': event_ms, 's': symbol, 'a': 26129, 'p': f'{price:.8f}', 'q': '0.01500000',
+        'f': 100, 'l': 105, 'T': event_ms, 'm': True, 'M': True
+    }})
+
+def kline_frame(symbol, price, event_ms):
+    open_ms = event_ms - event_ms % 60000
+    return compact({'stream': f'{symbol.lower()}@kline_1m', 'data': {
+        'e': 'kline', 'E': event_ms, 's': symbol, 'k': {
+            't': open_ms, 'T': open_ms + 59999, 's': symbol, 'i': '1m', 'f': 100, 'L': 200,
+            'o': f'{price:.8f}', 'c': f'{price:.8f}', 'h': f'{price * 1.001:.8f}', 'l': f'{price * 0.999:.8f}',
+            'v': '12.50000000', 'n': 100, 'x': False, 'q': '500000.00000000', 'V': '6.20000000',
+            'Q': '250000.00000000', 'B': '0'
+        }
+    }})
+
+def generate_frames(make_frame, count):
+    price = 40000.0
+    event_ms = 1_700_000_000_000
+    frames = []
+    for _ in range(count):
+        price += random.uniform(-5, 5)
+        event_ms += 10
+        frames.append(make_frame('BTCUSDT', price, event_ms))
+    return frames
+
+def bench_price_monitor(frames, backend, fast_path):
+    """价格监控连接的消息回调：解码并放入分发队列"""
+    stream_connection.loads = backend
+    try:
+        monitor = PriceMonitor(None, DB_CONFIG, None, dispatch_queue_size=0, fast_frame_parsing=fast_path)
+        on_message = monitor.connections[0]._on_message
+        started = time.process_time()
+        for frame in frames:
+            on_message(None, frame)
+        elapsed = time.process_time() - started
+    finally:
+        stream_connection.loads = fast_json.loads
+    assert monitor.dispatch_queue.qsize() == len(frames)
+    return elapsed
+
+def bench_kline_ingester(frames, backend, fast_path):
+    """K线写入的消息回调：解码为K线字典（未收盘K线只保存在内存中）"""
+    kline_stream_ingester.loads = backend
+    try:
+        ingester = KlineStreamIngester(None, DB_CONFIG, ['BTCUSDT'], ['1m'])
+        started = time.process_time()
+        for frame in frames:
+            ingester._on_message(None, frame)
+        elapsed = time.process_time() - started
+    finally:
+        kline_stream_ingester.loads = fast_json.loads
+    assert ingester.stats['messages'] == len(frames)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="行情消息解码性能测试")
+    parser.add_argument("--messages", type=int, default=100000, help="每种消息的数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    random.seed(args.seed)
+
+    price_variants = [("json", json.loads, False), ("截取字段", json.loads, True)]
+    kline_variants = [("json", json.loads, False)]
+    if fast_json.orjson is not None:
+        price_variants.append(("orjson", fast_json.orjson.loads, False))
+        kline_variants.append(("orjson", fast_json.orjson.loads, False))
+    else:
+        print("未安装orjson，跳过orjson完整解码")
+
+    cases = [
+        ("ticker", ticker_frame, bench_price_monitor, price_variants),
+        ("bookTicker", book_ticker_frame, bench_price_monitor, price_variants),
+        ("aggTrade", agg_trade_frame, bench_price_monitor, price_variants),
+        ("kline", kline_frame, bench_kline_ingester, kline_variants),
+    ]
+
+    print(f"=== 行情消息解码性能测试: 每种消息{args.messages}条, 进程CPU时间 ===")
+    for name, make_frame, bench, variants in cases:
+        frames = generate_frames(make_frame, args.messages)
+        baseline = None
+        for label, backend, fast_path in variants:
+            elapsed = bench(frames, backend, fast_path)
+            per_message = elapsed / len(frames) * 1e6
+            baseline = baseline or per_message
+            print(f"  {name:<11} {label:<8} {per_message:>8.2f} 微秒/条  ({baseline / per_message:>4.1f}x)")
+    print(f"当前默认解码库: {fast_json.JSON_BACKEND}")
+
+if __name__ == "__main__":
+    main()
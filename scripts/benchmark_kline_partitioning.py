@@ -0,0 +1,231 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线分区效果报告
+在本地MySQL上用多年的合成K线（1m及由其聚合的1h/1d）分别写入两张临时表：
+    flat         迁移前的结构：自增id主键 + (trading_pair, interval_type, timestamp) 唯一索引，不分区
+    partitioned  迁移后的结构：(trading_pair, interval_type, timestamp) 主键，1分钟K线按月分区
+报告两张表的大小、写入第一年和最后一年时的速度、常用查询的耗时中位数和扫描的分区，
+以及清理最早一个月1分钟K线的耗时（DELETE 对比 DROP PARTITION）。结束后删除临时表。
+
+用法:
+    python scripts/benchmark_kline_partitioning.py --pairs 2 --years 3
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+import statistics
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.utils import load_config, get_db_config
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import KLINE_COLUMNS, KLINE_UPDATE_COLUMNS
+from app.data_processors.kline_resampler import resample_klines
+from app.data_processors.kline_retention import add_months, month_start, partition_clause, partition_name
+
+FLAT_TABLE = "kline_bench_flat"
+PARTITIONED_TABLE = "kline_bench_partitioned"
+
+COLUMNS_DDL = """
+    trading_pair VARCHAR(20) NOT NULL,
+    interval_type VARCHAR(10) NOT NULL,
+    timestamp DATETIME NOT NULL,
+    open_price DECIMAL(20, 8) NOT NULL,
+    high_price DECIMAL(20, 8) NOT NULL,
+    low_price DECIMAL(20, 8) NOT NULL,
+    close_price DECIMAL(20, 8) NOT NULL,
+    volume DECIMAL(30, 8),
+    quote_asset_volume DECIMAL(30, 8),
+    number_of_trades INT,
+    taker_buy_base_volume DECIMAL(30, 8),
+    taker_buy_quote_volume DECIMAL(30, 8),
+    retrieved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+"""
+
+DAY_SECONDS = 24 * 60 * 60
+
+def create_tables(db_manager, first_month, last_month):
+    """按迁移前后的结构建立两张临时表"""
+    with db_manager.get_connection() as (connection, cursor):
+        for table in (FLAT_TABLE, PARTITIONED_TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+            CREATE TABLE {FLAT_TABLE} (
+                id INT AUTO_INCREMENT PRIMARY KEY,{COLUMNS_DDL}
+                UNIQUE KEY idx_pair_interval_time (trading_pair, interval_type, timestamp)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute(f"""
+            CREATE TABLE {PARTITIONED_TABLE} ({COLUMNS_DDL}
+                PRIMARY KEY (trading_pair, interval_type, timestamp)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            {partition_clause(first_month, last_month)}
+        """)
+        connection.commit()
+
+def drop_tables(db_manager):
+    with db_manager.get_connection() as (connection, cursor):
+        for table in (FLAT_TABLE, PARTITIONED_TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.commit()
+
+def generate_day(pair, day_start, price):
+    """生成一个UTC日的1分钟K线随机游走，并聚合出1h和1d K线"""
+    retrieved_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    klines = []
+    for minute in range(1440):
+        open_price = price
+        price = max(1.0, price * (1 + random.gauss(0, 0.0008)))
+        klines.append({
+            'trading_pair': pair,
+            'interval_type': '1m',
+            'timestamp': datetime.datetime.fromtimestamp(day_start + minute * 60).strftime("%Y-%m-%d %H:%M:%S"),
+            'open_price': open_price,
+            'high_price': max(open_price, price) * 1.0005,
+            'low_price': min(open_price, price) * 0.9995,
+            'close_price': price,
+            'volume': random.uniform(1, 100),
+            'quote_asset_volume': random.uniform(40000, 4000000),
+            'number_of_trades': random.randint(100, 5000),
+            'taker_buy_base_volume': random.uniform(0, 50),
+            'taker_buy_quote_volume': random.uniform(0, 2000000),
+            'retrieved_at': retrieved_at
+        })
+    now_ms = (day_start + DAY_SECONDS) * 1000
+    return klines + resample_klines(klines, '1h', now_ms) + resample_klines(klines, '1d', now_ms), price
+
+def load_tables(db_manager, pairs, first_day, days):
+    """逐日写入两张表，返回每张表写入第一年和最后一年的速度（行/秒）"""
+    elapsed = {FLAT_TABLE: [], PARTITIONED_TABLE: []}
+    prices = {pair: random.uniform(100, 40000) for pair in pairs}
+    rows_per_day = 0
+
+    for day in range(days):
+        day_start = first_day + day * DAY_SECONDS
+        batch = []
+        for pair in pairs:
+            klines, prices[pair] = generate_day(pair, day_start, prices[pair])
+            batch.extend(klines)
+        rows_per_day = len(batch)
+
+        for table in (FLAT_TABLE, PARTITIONED_TABLE):
+            started = time.perf_counter()
+            db_manager.bulk_upsert(table, KLINE_COLUMNS, batch, KLINE_UPDATE_COLUMNS, chunk_size=1000)
+            elapsed[table].append(time.perf_counter() - started)
+
+        if (day + 1) % 30 == 0:
+            print(f"  已写入 {day + 1}/{days} 天", flush=True)
+
+    year = min(365, days)
+    return {table: (rows_per_day * year / sum(times[:year]), rows_per_day * year / sum(times[-year:]))
+            for table, times in elapsed.items()}
+
+def table_sizes(db_manager):
+    with db_manager.get_connection() as (connection, cursor):
+        for table in (FLAT_TABLE, PARTITIONED_TABLE):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN (%s, %s)", (FLAT_TABLE, PARTITIONED_TABLE)
+        )
+        return {name: (rows, data, index) for name, rows, data, index in cursor.fetchall()}
+
+def time_query(db_manager, table, query, params, repeat):
+    """查询耗时中位数（毫秒）和执行计划中扫描的分区"""
+    sql = query.format(table=table)
+    timings = []
+    with db_manager.get_connection(dictionary=True) as (connection, cursor):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+    partitions = plan[0].get('partitions') if plan else None
+    return statistics.median(timings), partitions
+
+def main():
+    parser = argparse.ArgumentParser(description="K线分区效果报告")
+    parser.add_argument("--pairs", type=int, default=2, help="交易对数量")
+    parser.add_argument("--years", type=float, default=3, help="合成数据的年数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询执行的次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--keep", action="store_true", help="保留临时表")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    config = load_config()
+    db_manager = DatabaseManager(get_db_config(config))
+
+    pairs = [f"BENCH{index}USDT" for index in range(args.pairs)]
+    days = int(args.years * 365)
+    # 从UTC日边界开始，聚合出的1d K线都是完整的
+    first_day = int(time.time()) // DAY_SECONDS * DAY_SECONDS - days * DAY_SECONDS
+    first_month = month_start(datetime.date.fromtimestamp(first_day))
+    last_day = datetime.datetime.fromtimestamp(first_day + days * DAY_SECONDS)
+    last_month = month_start(last_day.date())
+
+    print(f"=== K线分区效果报告: {args.pairs}个交易对, {args.years}年, "
+          f"每表约{args.pairs * days * (1440 + 25)}行 ===")
+    try:
+        create_tables(db_manager, first_month, last_month)
+        print("\n[写入]")
+        rates = load_tables(db_manager, pairs, first_day, days)
+        for table, (first_rate, last_rate) in rates.items():
+            print(f"  {table:<26} 第一年 {first_rate:>8.0f} 行/秒   最后一年 {last_rate:>8.0f} 行/秒")
+
+        print("\n[大小]")
+        for table, (rows, data, index) in table_sizes(db_manager).items():
+            print(f"  {table:<26} 约{rows}行  数据 {data / 1024 / 1024:>8.1f}MB  索引 {index / 1024 / 1024:>8.1f}MB")
+
+        recent = (last_day - datetime.timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+        middle = add_months(first_month, int(args.years * 6))
+        month_range = (middle.strftime("%Y-%m-%d"), add_months(middle, 1).strftime("%Y-%m-%d"))
+        queries = [
+            ("最近1天1m（重采样读取）",
+             "SELECT * FROM {table} WHERE trading_pair = %s AND interval_type = '1m' AND timestamp >= %s "
+             "ORDER BY timestamp", (pairs[0], recent)),
+            ("历史中一个月的1m汇总",
+             "SELECT COUNT(*), AVG(close_price) FROM {table} WHERE trading_pair = %s AND interval_type = '1m' "
+             "AND timestamp >= %s AND timestamp < %s", (pairs[0],) + month_range),
+            ("一个月的1h K线",
+             "SELECT * FROM {table} WHERE trading_pair = %s AND interval_type = '1h' "
+             "AND timestamp >= %s AND timestamp < %s ORDER BY timestamp", (pairs[0],) + month_range),
+            ("各周期最后K线时间",
+             "SELECT trading_pair, interval_type, MAX(timestamp) FROM {table} "
+             "GROUP BY trading_pair, interval_type", ()),
+        ]
+        print("\n[查询耗时中位数]")
+        for label, query, params in queries:
+            print(f"  {label}")
+            for table in (FLAT_TABLE, PARTITIONED_TABLE):
+                median_ms, partitions = time_query(db_manager, table, query, params, args.repeat)
+                scanned = f"  扫描分区: {len(partitions.split(','))}个" if partitions else ""
+                print(f"    {table:<26} {median_ms:>9.2f} ms{scanned}")
+
+        print("\n[清理最早一个月的1分钟K线]")
+        oldest = first_month
+        started = time.perf_counter()
+        removed = db_manager.execute_update(
+            f"DELETE FROM {FLAT_TABLE} WHERE interval_type = '1m' AND timestamp < %s",
+            (add_months(oldest, 1).strftime("%Y-%m-%d"),)
+        )
+        print(f"  {FLAT_TABLE:<26} DELETE删除{removed}行: {time.perf_counter() - started:.2f}秒")
+        started = time.perf_counter()
+        db_manager.execute_update(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {partition_name(oldest)}")
+        print(f"  {PARTITIONED_TABLE:<26} DROP PARTITION {partition_name(oldest)}: {time.perf_counter() - started:.2f}秒")
+    finally:
+        if not args.keep:
+            drop_tables(db_manager)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+止盈止损触发器检查性能测试
+对比逐个扫描触发器字典的旧实现与 TriggerBook 二分查找在大量挂单触发器下每个价格tick的耗时。
+不需要数据库和网络。
+
+用法:
+    python scripts/benchmark_trigger_book.py --triggers 10000 --ticks 20000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.trigger_book import TriggerBook, STOP_LOSS, TAKE_PROFIT, LONG, SHORT
+
+SYMBOL = 'BTCUSDT'
+BASE_PRICE = 40000.0
+
+def generate_triggers(count):
+    """生成挂在当前价格上下1%~30%之间的多空止盈止损触发器"""
+    triggers = []
+    for position_id in range(count // 2):
+        position_type = LONG if position_id % 2 == 0 else SHORT
+        below = BASE_PRICE * (1 - random.uniform(0.01, 0.30))
+        above = BASE_PRICE * (1 + random.uniform(0.01, 0.30))
+        if position_type == LONG:
+            triggers.append((position_id, STOP_LOSS, below, position_type))
+            triggers.append((position_id, TAKE_PROFIT, above, position_type))
+        else:
+            triggers.append((position_id, STOP_LOSS, above, position_type))
+            triggers.append((position_id, TAKE_PROFIT, below, position_type))
+    return triggers
+
+def generate_ticks(count):
+    """生成在基准价格附近随机游走的价格序列"""
+    price = BASE_PRICE
+    ticks = []
+    for _ in range(count):
+        price = min(BASE_PRICE * 1.04, max(BASE_PRICE * 0.96, price + random.uniform(-20, 20)))
+        ticks.append(price)
+    return ticks
+
+def bench_linear_scan(triggers, ticks):
+    """旧实现：每个tick遍历该交易对的全部止损、止盈触发器"""
+    stop_loss_triggers = {SYMBOL: {}}
+    take_profit_triggers = {SYMBOL: {}}
+    for position_id, trigger_type, price, position_type in triggers:
+        target = stop_loss_triggers if trigger_type == STOP_LOSS else take_profit_triggers
+        target[SYMBOL][position_id] = {'price': price, 'quantity': 1.0, 'position_type': position_type}
+
+    hits = 0
+    started = time.perf_counter()
+    for current_price in ticks:
+        for position_id, trigger_info in list(stop_loss_triggers[SYMBOL].items()):
+            if trigger_info['position_type'] == LONG:
+                hits += current_price <= trigger_info['price']
+            else:
+                hits += current_price >= trigger_info['price']
+        for position_id, trigger_info in list(take_profit_triggers[SYMBOL].items()):
+            if trigger_info['position_type'] == LONG:
+                hits += current_price >= trigger_info['price']
+            else:
+                hits += current_price <= trigger_info['price']
+    return time.perf_counter() - started, hits
+
+def bench_trigger_book(triggers, ticks):
+    """新实现：按价格排序的触发器簿，只取出被穿越的触发器"""
+    book = TriggerBook()
+    for position_id, trigger_type, price, position_type in triggers:
+        book.add(SYMBOL, position_id, trigger_type, price, 1.0, position_type)
+
+    hits = 0
+    started = time.perf_counter()
+    for current_price in ticks:
+        hits += len(book.crossed(SYMBOL, current_price))
+    return time.perf_counter() - started, hits
+
+def main():
+    parser = argparse.ArgumentParser(description="止盈止损触发器检查性能测试")
+    parser.add_argument("--triggers", type=int, default=10000, help="挂单触发器数量")
+    parser.add_argument("--ticks", type=int, default=20000, help="价格tick数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    triggers = generate_triggers(args.triggers)
+    ticks = generate_ticks(args.ticks)
+
+    print(f"=== 触发器检查性能测试: {len(triggers)}个触发器, {len(ticks)}个tick ===")
+    for label, bench in (("逐个扫描", bench_linear_scan), ("TriggerBook", bench_trigger_book)):
+        elapsed, hits = bench(triggers, ticks)
+        print(f"  {label:<12} {elapsed / len(ticks) * 1e6:>10.2f} 微秒/tick  "
+              f"({len(ticks) / elapsed:>10.0f} tick/秒, 触发{hits}次)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线导出
+用 DatabaseManager.stream_query 逐块读取kline_data并写入CSV（文件名以.gz结尾时压缩写入），
+内存占用只与 --fetch-size 有关，与导出的行数无关。结束时打印行数、耗时和进程内存峰值。
+加 --compare-fetchall 时先用 execute_query 整体读取一次，对比两种方式的内存峰值（在单独的进程中运行更准确）。
+
+用法:
+    python scripts/export_klines.py --pair BTCUSDT --interval 1m --start 2024-01-01 --output btc_1m.csv.gz
+"""
+import os
+import sys
+import csv
+import gzip
+import time
+import argparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.utils import load_config, get_db_config
+from app.database.db_manager import DatabaseManager
+from app.data_collectors.binance_data_collector import KLINE_COLUMNS
+
+def peak_memory_mb():
+    """进程内存峰值（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def build_query(args):
+    conditions = ["interval_type = %s"]
+    params = [args.interval]
+    if args.pair:
+        conditions.append("trading_pair = %s")
+        params.append(args.pair)
+    if args.start:
+        conditions.append("timestamp >= %s")
+        params.append(args.start)
+    if args.end:
+        conditions.append("timestamp < %s")
+        params.append(args.end)
+
+    query = f"""
+    SELECT {', '.join(KLINE_COLUMNS)}
+    FROM kline_data
+    WHERE {' AND '.join(conditions)}
+    ORDER BY trading_pair, timestamp
+    """
+    return query, tuple(params)
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出K线到CSV")
+    parser.add_argument("--output", required=True, help="输出文件，以.gz结尾时压缩写入")
+    parser.add_argument("--pair", help="交易对，默认导出所有交易对")
+    parser.add_argument("--interval", default="1m", help="K线周期")
+    parser.add_argument("--start", help="起始时间（包含），例如 2024-01-01")
+    parser.add_argument("--end", help="结束时间（不包含）")
+    parser.add_argument("--fetch-size", type=int, help="每次从服务器读取的行数，默认使用DB_STREAM_FETCH_SIZE")
+    parser.add_argument("--compare-fetchall", action="store_true", help="先用fetchall整体读取一次作对比")
+    args = parser.parse_args()
+
+    config = load_config()
+    db_manager = DatabaseManager(get_db_config(config))
+    query, params = build_query(args)
+
+    if args.compare_fetchall:
+        started = time.perf_counter()
+        rows = db_manager.execute_query(query, params)
+        print(f"fetchall: {len(rows)}行, {time.perf_counter() - started:.2f}秒, 内存峰值 {peak_memory_mb()}MB")
+        del rows
+
+    opener = gzip.open if args.output.endswith('.gz') else open
+    started = time.perf_counter()
+    exported = 0
+    with opener(args.output, 'wt', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(KLINE_COLUMNS)
+        for chunk in db_manager.stream_query_chunks(query, params, fetch_size=args.fetch_size):
+            writer.writerows(chunk)
+            exported += len(chunk)
+
+    print(f"stream: {exported}行 -> {args.output}, {time.perf_counter() - started:.2f}秒, "
+          f"内存峰值 {peak_memory_mb()}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+数据库迁移工具
+按文件名顺序执行 models/migrations 下尚未执行的迁移，已执行的版本记录在schema_migrations表中。
+
+用法:
+    python scripts/migrate_db.py            # 执行所有待执行的迁移
+    python scripts/migrate_db.py --dry-run  # 只列出待执行的迁移
+"""
+import os
+import sys
+import logging
+import argparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.utils import load_config, get_db_config
+from app.database.db_manager import DatabaseManager
+from app.database.migrations import apply_migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库迁移工具")
+    parser.add_argument("--dry-run", action="store_true", help="只列出待执行的迁移，不执行")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = load_config()
+    db_manager = DatabaseManager(get_db_config(config))
+    versions = apply_migrations(db_manager, dry_run=args.dry_run)
+
+    if args.dry_run:
+        print(f"待执行的迁移: {versions if versions else '无'}")
+    else:
+        print(f"已执行的迁移: {versions if versions else '无'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情回放工具
+把线上记录的（PRICE_TICK_RECORD_PATH）或合成的行情消息送入价格监控器和交易管理器，
+订单由桩执行器接收，报告每秒处理的价格数、触发延迟分位数和最终的平仓决策。不需要网络和数据库。
+最快速度回放时消息送入得比处理快，触发延迟主要是排队时间，这时看每秒处理的价格数；
+按1倍或N倍速回放时触发延迟反映线上节奏下的真实延迟。
+
+用法:
+    # 生成合成记录和仓位后以最快速度回放
+    python scripts/replay_ticks.py ticks.log.gz --generate 200000 --positions positions.json
+    # 按原始节奏的10倍回放线上记录
+    python scripts/replay_ticks.py ticks.log.gz --positions positions.json --speed 10
+"""
+import os
+import sys
+import json
+import random
+import logging
+import argparse
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.tick_recorder import TickRecorder
+from app.trading.tick_replay import ReplayTradingManager, replay_tick_log
+
+BASE_PRICES = {'BTCUSDT': 40000.0, 'ETHUSDT': 2500.0, 'SOLUSDT': 100.0, 'BNBUSDT': 300.0}
+
+def generate_tick_log(path, ticks, interval_us=1000):
+    """生成各交易对随机游走的组合流ticker消息，消息间隔固定"""
+    prices = dict(BASE_PRICES)
+    symbols = list(prices)
+    if os.path.exists(path):
+        os.remove(path)
+    recorder = TickRecorder(path)
+    recorded_at_us = 1_700_000_000_000_000
+    for index in range(ticks):
+        symbol = symbols[index % len(symbols)]
+        base = BASE_PRICES[symbol]
+        price = prices[symbol] = min(base * 1.05, max(base * 0.95, prices[symbol] * (1 + random.gauss(0, 0.0005))))
+        event = {'e': '24hrTicker', 'E': recorded_at_us // 1000, 's': symbol, 'c': f'{price:.2f}',
+                 'b': f'{price * 0.9999:.2f}', 'a': f'{price * 1.0001:.2f}'}
+        frame = json.dumps({'stream': f'{symbol.lower()}@ticker', 'data': event}, separators=(',', ':'))
+        recorder.record('synthetic', frame, recorded_at_us)
+        recorded_at_us += interval_us
+    recorder.close()
+
+def generate_positions(count):
+    """生成止损止盈挂在基准价格上下1%~6%之间的多空仓位"""
+    positions = []
+    symbols = list(BASE_PRICES)
+    for position_id in range(1, count + 1):
+        symbol = symbols[position_id % len(symbols)]
+        base = BASE_PRICES[symbol]
+        position_type = 'LONG' if position_id % 2 else 'SHORT'
+        below = round(base * (1 - random.uniform(0.01, 0.06)), 2)
+        above = round(base * (1 + random.uniform(0.01, 0.06)), 2)
+        positions.append({
+            'id': position_id,
+            'trading_pair': symbol,
+            'position_type': position_type,
+            'quantity': 1.0,
+            'entry_price': base,
+            'stop_loss_price': below if position_type == 'LONG' else above,
+            'take_profit_price': above if position_type == 'LONG' else below
+        })
+    return positions
+
+def main():
+    parser = argparse.ArgumentParser(description="行情回放工具")
+    parser.add_argument("log", help="行情记录文件，以.gz结尾时为压缩文件")
+    parser.add_argument("--positions", help="开放仓位JSON文件（与--generate一起使用时写入生成的仓位）")
+    parser.add_argument("--speed", default="max", help="回放速度倍数，1为原始节奏，max为最快速度")
+    parser.add_argument("--generate", type=int, default=0, help="先生成指定数量的合成消息和仓位")
+    parser.add_argument("--position-count", type=int, default=1000, help="生成的仓位数量")
+    parser.add_argument("--trailing-stop", type=float, default=None, help="移动止损百分比，不指定时不启用")
+    parser.add_argument("--order-latency-ms", type=float, default=0.0, help="桩执行器模拟的下单耗时（毫秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--show-decisions", action="store_true", help="输出全部平仓决策")
+    parser.add_argument("--verbose", action="store_true", help="输出触发和平仓日志（会降低回放速度）")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    positions = []
+    if args.generate:
+        random.seed(args.seed)
+        generate_tick_log(args.log, args.generate)
+        positions = generate_positions(args.position_count)
+        if args.positions:
+            with open(args.positions, 'w', encoding='utf-8') as positions_file:
+                json.dump(positions, positions_file)
+    elif args.positions:
+        with open(args.positions, encoding='utf-8') as positions_file:
+            positions = json.load(positions_file)
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    manager = ReplayTradingManager(positions, order_latency=args.order_latency_ms / 1000,
+                                   trailing_stop_percentage=args.trailing_stop)
+    report = replay_tick_log(manager, args.log, speed=speed)
+
+    decisions = report.pop('decisions')
+    reasons = {}
+    for decision in decisions:
+        reasons[decision['close_reason']] = reasons.get(decision['close_reason'], 0) + 1
+    report['closed_positions'] = reasons
+    if args.show_decisions:
+        report['decisions'] = decisions
+
+    print(f"=== 行情回放: {args.log}, 速度={args.speed}, 仓位{len(positions)}个 ===")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
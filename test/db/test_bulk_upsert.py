@@ -0,0 +1,81 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+批量写入测试（使用伪连接，不需要真实MySQL）
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from mysql.connector import errors as mysql_errors
+
+from app.database.db_manager import DatabaseManager
+
+class RecordingCursor:
+    """记录执行的语句，参数中出现 'bad' 时模拟数据库错误"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=None):
+        if 'bad' in params:
+            raise mysql_errors.DataError("Data too long")
+        self.statements.append((query, list(params)))
+
+class FakeConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def make_manager(cursor):
+    manager = DatabaseManager({"DB_POOL_ENABLED": False})
+
+    @contextmanager
+    def get_connection(dictionary=False, connect_timeout=5):
+        yield FakeConnection(), cursor
+
+    manager.get_connection = get_connection
+    return manager
+
+def test_rows_are_written_as_multi_row_chunks():
+    cursor = RecordingCursor()
+    rows = [{'pair': f'P{i}', 'price': i} for i in range(5)]
+
+    stored, failed = make_manager(cursor).bulk_upsert('prices', ('pair', 'price'), rows, ('price',), chunk_size=2)
+
+    assert stored == 5
+    assert failed == []
+    assert len(cursor.statements) == 3
+    first_sql, first_params = cursor.statements[0]
+    assert first_sql.startswith("INSERT INTO `prices` (`pair`, `price`) VALUES (%s, %s), (%s, %s)")
+    assert first_sql.endswith("ON DUPLICATE KEY UPDATE `price`=VALUES(`price`)")
+    assert first_params == ['P0', 0, 'P1', 1]
+
+def test_failed_chunk_is_retried_row_by_row():
+    cursor = RecordingCursor()
+    rows = [('P0', 0), ('P1', 'bad'), ('P2', 2), ('P3', 3)]
+
+    stored, failed = make_manager(cursor).bulk_upsert('prices', ('pair', 'price'), rows, ('price',), chunk_size=2)
+
+    assert stored == 3
+    assert [index for index, _ in failed] == [1]
+    assert "Data too long" in failed[0][1]
+
+def test_update_expressions_are_kept_in_order():
+    cursor = RecordingCursor()
+    updates = {'price': "IF(VALUES(`ts`) >= `ts`, VALUES(`price`), `price`)", 'ts': "GREATEST(`ts`, VALUES(`ts`))"}
+
+    stored, _ = make_manager(cursor).bulk_upsert('prices', ('pair', 'price', 'ts'), [('P0', 1, 2)], updates)
+
+    assert stored == 1
+    assert cursor.statements[0][0].endswith(
+        "ON DUPLICATE KEY UPDATE `price`=IF(VALUES(`ts`) >= `ts`, VALUES(`price`), `price`), "
+        "`ts`=GREATEST(`ts`, VALUES(`ts`))"
+    )
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+数据库连接池测试（使用伪连接，不需要真实MySQL）
+"""
+import os
+import sys
+import threading
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import pytest
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+from app.database import db_manager
+from app.database.db_manager import ConnectionPool, DatabaseManager
+
+class FakeCursor:
+    def __init__(self):
+        self.closed = False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        self.closed = True
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.ping_ok = True
+        self.in_transaction = False
+        self.unread_result = False
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=False):
+        return FakeCursor()
+
+    def ping(self, reconnect=False):
+        if not self.ping_ok:
+            raise mysql_errors.InterfaceError("gone away")
+
+    def is_connected(self):
+        return not self.closed and self.ping_ok
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def commit(self):
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    created = []
+
+    def connect(**kwargs):
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    monkeypatch.setattr(mysql.connector, "connect", connect)
+    return created
+
+def make_pool(**kwargs):
+    return ConnectionPool({"host": "localhost"}, **kwargs)
+
+def test_connection_is_reused(fake_connect):
+    pool = make_pool()
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert first is second
+    assert len(fake_connect) == 1
+    assert pool.get_stats()["reused"] == 1
+
+def test_same_thread_gets_its_own_connection_back(fake_connect):
+    pool = make_pool(max_size=4)
+    mine = pool.acquire()
+
+    other = {}
+
+    def borrow():
+        other["connection"] = pool.acquire()
+        pool.release(other["connection"])
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join()
+
+    pool.release(mine)
+    assert pool.acquire() is mine
+
+def test_open_transaction_is_rolled_back_on_release(fake_connect):
+    pool = make_pool()
+    connection = pool.acquire()
+    connection.in_transaction = True
+    pool.release(connection)
+
+    assert connection.rollbacks == 1
+    assert pool.get_stats()["idle"] == 1
+
+def test_failed_health_check_replaces_connection(fake_connect):
+    pool = make_pool(ping_interval=0)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.ping_ok = False
+
+    replacement = pool.acquire()
+    stats = pool.get_stats()
+
+    assert replacement is not connection
+    assert connection.closed
+    assert stats["health_check_failures"] == 1
+    assert stats["size"] == 1
+
+def test_idle_connections_expire_down_to_min_size(fake_connect):
+    pool = make_pool(min_size=1, max_size=3, idle_timeout=0)
+    connections = [pool.acquire() for _ in range(3)]
+    for connection in connections:
+        pool.release(connection)
+
+    stats = pool.get_stats()
+    assert stats["size"] == 1
+    assert stats["idle"] == 1
+
+def test_exhausted_pool_times_out(fake_connect):
+    pool = make_pool(max_size=1, checkout_timeout=0.05)
+    pool.acquire()
+
+    with pytest.raises(mysql_errors.PoolError):
+        pool.acquire()
+    assert pool.get_stats()["checkout_timeouts"] == 1
+
+def test_database_managers_share_pool(fake_connect, monkeypatch):
+    monkeypatch.setattr(db_manager, "_pools", {})
+    db_config = {
+        "DB_HOST": "localhost",
+        "DB_PORT": 3306,
+        "DB_USER": "user",
+        "DB_PASSWORD": "password",
+        "DB_NAME": "crypto_trading"
+    }
+
+    DatabaseManager(db_config).execute_query("SELECT 1")
+    DatabaseManager(db_config).execute_query("SELECT 1")
+
+    assert len(fake_connect) == 1
+    assert DatabaseManager(db_config).get_pool_stats()["reused"] == 1
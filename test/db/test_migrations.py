@@ -0,0 +1,86 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+数据库迁移执行测试（使用伪连接，不需要真实MySQL）
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.database.db_manager import DatabaseManager
+from app.database.migrations import apply_migrations, list_migrations, split_statements, MIGRATIONS_DIR
+
+class MigrationCursor:
+    """记录执行的语句，schema_migrations表的内容保存在applied中"""
+
+    def __init__(self, applied):
+        self.applied = applied
+        self.statements = []
+        self._rows = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query.strip())
+        if query.startswith("SELECT version FROM schema_migrations"):
+            self._rows = [(version,) for version in sorted(self.applied)]
+        elif query.startswith("INSERT INTO schema_migrations"):
+            self.applied.add(params[0])
+
+    def fetchall(self):
+        return self._rows
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+def make_manager(cursor):
+    manager = DatabaseManager({"DB_POOL_ENABLED": False})
+
+    @contextmanager
+    def get_connection(dictionary=False, connect_timeout=5):
+        yield FakeConnection(), cursor
+
+    manager.get_connection = get_connection
+    return manager
+
+def write_migrations(directory):
+    (directory / '002_second.sql').write_text("-- 第二个迁移\nALTER TABLE b ADD INDEX idx_x (x);\n", encoding='utf-8')
+    (directory / '001_first.sql').write_text(
+        "-- 第一个迁移\nALTER TABLE a\n    ADD INDEX idx_y (y);\n\nALTER TABLE a ADD INDEX idx_z (z);\n", encoding='utf-8')
+    (directory / 'README.txt').write_text("not a migration", encoding='utf-8')
+
+def test_statements_are_split_and_comments_dropped():
+    assert split_statements("-- 注释\nALTER TABLE a\n  ADD INDEX i (x);\n\nALTER TABLE b ADD INDEX j (y);") == [
+        "ALTER TABLE a\n  ADD INDEX i (x)", "ALTER TABLE b ADD INDEX j (y)"
+    ]
+
+def test_pending_migrations_run_in_order_once(tmp_path):
+    write_migrations(tmp_path)
+    cursor = MigrationCursor(applied=set())
+    manager = make_manager(cursor)
+
+    assert apply_migrations(manager, str(tmp_path), dry_run=True) == ['001_first', '002_second']
+    assert cursor.applied == set()
+
+    assert apply_migrations(manager, str(tmp_path)) == ['001_first', '002_second']
+    executed = [statement for statement in cursor.statements if statement.startswith('ALTER')]
+    assert executed == ["ALTER TABLE a\n    ADD INDEX idx_y (y)", "ALTER TABLE a ADD INDEX idx_z (z)",
+                        "ALTER TABLE b ADD INDEX idx_x (x)"]
+
+    cursor.statements = []
+    assert apply_migrations(manager, str(tmp_path)) == []
+    assert not any(statement.startswith('ALTER') for statement in cursor.statements)
+
+def test_schema_file_registers_every_shipped_migration():
+    with open(os.path.join(APP_DIR, 'models', 'database_schema.sql'), encoding='utf-8') as schema_file:
+        schema = schema_file.read()
+
+    for version, _ in list_migrations(MIGRATIONS_DIR):
+        assert f"('{version}')" in schema
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+每日查询的执行计划回归测试
+按日期过滤的查询必须是半开区间谓词，并且在真实MySQL上用EXPLAIN确认走索引而不是全表扫描。
+EXPLAIN部分需要config/config.py中配置的数据库（已执行 scripts/migrate_db.py），连接不上时跳过。
+"""
+import os
+import re
+import sys
+import datetime
+
+import pytest
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.data_processors.daily_summary_processor import HOT_TOPICS_QUERY, FUND_FLOWS_QUERY, day_range
+from app.trading.position_manager import DAILY_REALIZED_PNL_QUERY
+from app.scheduler.trading_tasks import LATEST_STRATEGIES_QUERY
+
+# (查询, 参数, 表, 期望使用的索引)
+DAILY_QUERIES = [
+    (HOT_TOPICS_QUERY, day_range(datetime.date(2024, 1, 1)), 'hot_topics', 'idx_retrieved_at'),
+    (FUND_FLOWS_QUERY, day_range(datetime.date(2024, 1, 1)), 'market_fund_flows', 'idx_retrieved_at'),
+    (DAILY_REALIZED_PNL_QUERY, None, 'trades', 'idx_type_time'),
+    (LATEST_STRATEGIES_QUERY, None, 'trading_strategies', 'idx_decision_timestamp'),
+]
+
+@pytest.fixture(scope='module')
+def db_manager():
+    try:
+        from app.utils import load_config, get_db_config
+        from app.database.db_manager import DatabaseManager
+        config = load_config()
+        manager = DatabaseManager(get_db_config(config))
+        with manager.get_connection(connect_timeout=2) as (connection, cursor):
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        return manager
+    except Exception as e:
+        pytest.skip(f"没有可用的数据库: {e}")
+
+def test_day_range_is_half_open():
+    assert day_range(datetime.date(2024, 2, 29)) == {'day_start': '2024-02-29 00:00:00', 'day_end': '2024-03-01 00:00:00'}
+
+@pytest.mark.parametrize('query, params, table, index', DAILY_QUERIES)
+def test_date_filters_are_sargable(query, params, table, index):
+    # 对列使用DATE()等函数会让索引失效
+    assert not re.search(r'DATE\s*\(\s*\w+\s*\)', query)
+
+@pytest.mark.parametrize('query, params, table, index', DAILY_QUERIES)
+def test_daily_queries_use_index(db_manager, query, params, table, index):
+    with db_manager.get_connection(dictionary=True) as (connection, cursor):
+        cursor.execute("EXPLAIN " + query, params or {})
+        plan = [row for row in cursor.fetchall() if row['table'] == table]
+
+    assert plan, f"执行计划中没有{table}"
+    row = plan[0]
+    assert index in (row['possible_keys'] or ''), f"{table}缺少索引{index}，请执行 scripts/migrate_db.py"
+    assert row['type'] != 'ALL', f"{table}的查询退化为全表扫描: {row}"
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+流式查询测试（使用伪连接，不需要真实MySQL）
+"""
+import os
+import sys
+import decimal
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import numpy as np
+import pytest
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+from app.database.db_manager import ConnectionPool, DatabaseManager
+
+COLUMNS = ('trading_pair', 'timestamp', 'close_price', 'number_of_trades')
+
+def make_rows(count):
+    start = datetime.datetime(2024, 1, 1)
+    return [('BTCUSDT', start + datetime.timedelta(minutes=index), decimal.Decimal(f"{40000 + index}.5"), index)
+            for index in range(count)]
+
+class StreamingCursor:
+    """非缓冲游标：结果逐块读取，未读完时连接上留有未读结果"""
+
+    def __init__(self, connection, dictionary, buffered):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.buffered = buffered
+        self.fetch_sizes = []
+
+    def execute(self, query, params=None):
+        if 'bad' in query:
+            raise mysql_errors.ProgrammingError("You have an error in your SQL syntax")
+        self.connection.unread_result = bool(self.connection.rows)
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        rows, self.connection.rows = self.connection.rows[:size], self.connection.rows[size:]
+        self.connection.unread_result = bool(self.connection.rows)
+        if self.dictionary:
+            return [dict(zip(COLUMNS, row)) for row in rows]
+        return rows
+
+    def close(self):
+        if self.connection.unread_result:
+            raise mysql_errors.InternalError("Unread result found")
+
+class StreamingConnection:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.unread_result = False
+        self.in_transaction = False
+        self.closed = False
+        self.cursors = []
+
+    def cursor(self, dictionary=False, buffered=None):
+        cursor = StreamingCursor(self, dictionary, buffered)
+        self.cursors.append(cursor)
+        return cursor
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def make_manager(monkeypatch):
+    def make(rows, **db_config):
+        connection = StreamingConnection(rows)
+        monkeypatch.setattr(mysql.connector, "connect", lambda **kwargs: connection)
+        manager = DatabaseManager(dict(db_config, DB_POOL_ENABLED=False))
+        manager.pool = ConnectionPool({"host": "localhost"})
+        return manager, connection
+    return make
+
+def test_chunks_are_fetched_with_unbuffered_cursor(make_manager):
+    manager, connection = make_manager(make_rows(5))
+
+    chunks = list(manager.stream_query_chunks("SELECT * FROM kline_data", fetch_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    cursor = connection.cursors[0]
+    assert cursor.buffered is False
+    assert cursor.fetch_sizes == [2, 2, 2, 2]
+    # 读完的连接归还连接池
+    stats = manager.get_pool_stats()
+    assert stats["idle"] == 1
+    assert stats["discarded"] == 0
+    assert not connection.closed
+
+def test_fetch_size_defaults_to_config(make_manager):
+    manager, connection = make_manager(make_rows(7), DB_STREAM_FETCH_SIZE=3)
+
+    rows = list(manager.stream_query("SELECT * FROM kline_data"))
+
+    assert rows == make_rows(7)
+    assert connection.cursors[0].fetch_sizes == [3, 3, 3, 3]
+
+def test_closing_iterator_early_discards_connection(make_manager):
+    manager, connection = make_manager(make_rows(10))
+
+    for row in manager.stream_query("SELECT * FROM kline_data", fetch_size=4):
+        break
+
+    # 剩余结果不读取，连接直接关闭
+    assert connection.rows == make_rows(10)[4:]
+    assert connection.closed
+    stats = manager.get_pool_stats()
+    assert stats["discarded"] == 1
+    assert stats["size"] == 0
+
+def test_query_error_discards_connection(make_manager):
+    manager, connection = make_manager(make_rows(3))
+
+    with pytest.raises(mysql_errors.ProgrammingError):
+        list(manager.stream_query_chunks("SELECT bad FROM kline_data"))
+
+    assert connection.closed
+    assert manager.get_pool_stats()["size"] == 0
+
+def test_columnar_chunks_are_numpy_arrays(make_manager):
+    rows = make_rows(3)
+    rows[1] = rows[1][:2] + (None,) + rows[1][3:]
+    manager, connection = make_manager(rows)
+
+    chunks = list(manager.stream_query_columns("SELECT * FROM kline_data", fetch_size=2))
+
+    assert len(chunks) == 2
+    first = chunks[0]
+    assert list(first) == list(COLUMNS)
+    assert first['close_price'].dtype == np.float64
+    assert first['close_price'][0] == 40000.5
+    assert np.isnan(first['close_price'][1])
+    assert first['number_of_trades'].dtype == np.int64
+    assert first['timestamp'].dtype == np.dtype('datetime64[us]')
+    assert first['timestamp'][1] == np.datetime64('2024-01-01T00:01')
+    assert first['trading_pair'].dtype == object
+    assert chunks[1]['number_of_trades'].tolist() == [2]
+
+def test_columnar_dtypes_can_be_overridden(make_manager):
+    manager, connection = make_manager(make_rows(2))
+
+    chunk = next(manager.stream_query_columns("SELECT * FROM kline_data",
+                                              dtypes={'close_price': np.float32, 'trading_pair': 'U10'}))
+
+    assert chunk['close_price'].dtype == np.float32
+    assert chunk['trading_pair'].tolist() == ['BTCUSDT', 'BTCUSDT']
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+写后缓冲测试（使用伪连接，不需要真实MySQL）
+"""
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from mysql.connector import errors as mysql_errors
+
+from app.database.write_behind import WriteBehindBuffer
+
+class FakeDatabase:
+    """
+    记录已提交的事务，每个事务是[(语句, 参数列表)]；参数中出现 'bad' 时模拟数据库错误。
+    unavailable 大于0时获取连接抛出OperationalError并减一；gate 未打开时后台写入线程在获取连接时等待
+    """
+
+    def __init__(self, unavailable=0):
+        self.transactions = []
+        self.unavailable = unavailable
+        self.gate = threading.Event()
+        self.gate.set()
+        self.waiting = threading.Event()
+
+    @contextmanager
+    def get_connection(self, dictionary=False, connect_timeout=5):
+        if threading.current_thread().name == 'write-behind' and not self.gate.is_set():
+            self.waiting.set()
+            self.gate.wait()
+        if self.unavailable:
+            self.unavailable -= 1
+            raise mysql_errors.OperationalError("Lost connection to MySQL server")
+        cursor = FakeCursor()
+        yield FakeConnection(self, cursor), cursor
+
+    def committed(self):
+        return [params for transaction in self.transactions for _, params_list in transaction
+                for params in params_list]
+
+class FakeCursor:
+    def __init__(self):
+        self.pending = []
+
+    def execute(self, query, params=None):
+        self.executemany(query, [params])
+
+    def executemany(self, query, params_list):
+        if any('bad' in params for params in params_list):
+            raise mysql_errors.DataError("Data too long")
+        self.pending.append((query, list(params_list)))
+
+class FakeConnection:
+    def __init__(self, database, cursor):
+        self.database = database
+        self.cursor = cursor
+
+    def commit(self):
+        if self.cursor.pending:
+            self.database.transactions.append(self.cursor.pending)
+        self.cursor.pending = []
+
+    def rollback(self):
+        self.cursor.pending = []
+
+def make_buffer(database, **options):
+    buffer = WriteBehindBuffer({"DB_POOL_ENABLED": False}, **options)
+    buffer.db_manager.get_connection = database.get_connection
+    return buffer
+
+ORDER_SQL = "INSERT INTO orders (id) VALUES (%s)"
+STATUS_SQL = "UPDATE orders SET status = %s WHERE id = %s"
+PRICE_SQL = "UPDATE positions SET current_price = %s WHERE id = %s"
+
+def test_statements_are_grouped_by_table_into_transactions():
+    database = FakeDatabase()
+    buffer = make_buffer(database, batch_size=5, max_latency=10)
+    buffer.start()
+
+    buffer.submit('orders', ORDER_SQL, (1,))
+    buffer.submit('positions', PRICE_SQL, (100.0, 7))
+    buffer.submit('orders', ORDER_SQL, (2,))
+    buffer.submit('orders', STATUS_SQL, ('FILLED', 1))
+    buffer.submit('positions', PRICE_SQL, (101.0, 7))
+    assert buffer.flush(timeout=5)
+    buffer.stop()
+
+    # 一批五条语句，每张表一个事务，连续的相同语句合并执行，同表内保持提交顺序
+    assert database.transactions == [
+        [(ORDER_SQL, [(1,), (2,)]), (STATUS_SQL, [('FILLED', 1)])],
+        [(PRICE_SQL, [(100.0, 7), (101.0, 7)])],
+    ]
+    stats = buffer.get_stats()
+    assert stats['batches'] == 1
+    assert stats['transactions'] == 2
+    assert stats['written'] == 5
+
+def test_durable_write_waits_for_commit():
+    database = FakeDatabase()
+    buffer = make_buffer(database, max_latency=60)
+    buffer.start()
+
+    # durable写入不等待最大延迟
+    buffer.submit('positions', PRICE_SQL, (100.0, 7))
+    assert buffer.submit('orders', ORDER_SQL, (1,), durable=True)
+    assert database.committed() == [(100.0, 7), (1,)]
+    assert not buffer.submit('orders', ORDER_SQL, ('bad',), durable=True)
+    buffer.stop()
+
+    buffer = make_buffer(database, max_latency=60, durable_tables=['orders'])
+    buffer.start()
+    assert buffer.submit('orders', ORDER_SQL, (2,))
+    assert database.committed()[-1] == (2,)
+    buffer.stop()
+
+def test_disabled_or_stopped_buffer_writes_synchronously():
+    database = FakeDatabase()
+    buffer = make_buffer(database, enabled=False)
+    buffer.start()
+
+    assert buffer.submit('orders', ORDER_SQL, (1,))
+    assert database.committed() == [(1,)]
+    assert not buffer.submit('orders', ORDER_SQL, ('bad',))
+    assert buffer.get_stats()['synchronous'] == 2
+
+def test_failing_statement_is_dropped_without_losing_the_batch():
+    database = FakeDatabase()
+    buffer = make_buffer(database, batch_size=3, max_latency=10)
+    buffer.start()
+
+    for order_id in (1, 'bad', 3):
+        buffer.submit('orders', ORDER_SQL, (order_id,))
+    assert buffer.flush(timeout=5)
+    buffer.stop()
+
+    assert database.committed() == [(1,), (3,)]
+    assert buffer.get_stats()['failed'] == 1
+
+def test_batch_is_retried_in_order_when_database_is_unavailable():
+    database = FakeDatabase(unavailable=2)
+    buffer = make_buffer(database, batch_size=2, max_latency=0.01)
+    buffer.start()
+
+    for order_id in range(4):
+        buffer.submit('orders', ORDER_SQL, (order_id,))
+    assert buffer.flush(timeout=5)
+    buffer.stop()
+
+    assert database.committed() == [(0,), (1,), (2,), (3,)]
+    stats = buffer.get_stats()
+    assert stats['retries'] == 2
+    assert stats['written'] == 4
+    assert stats['failed'] == 0
+
+def test_stop_writes_remaining_statements():
+    database = FakeDatabase()
+    buffer = make_buffer(database, batch_size=100, max_latency=60)
+    buffer.start()
+
+    for order_id in range(3):
+        buffer.submit('orders', ORDER_SQL, (order_id,))
+    buffer.stop()
+
+    assert database.committed() == [(0,), (1,), (2,)]
+    # 停止后的写入在调用线程中完成
+    assert buffer.submit('orders', ORDER_SQL, (3,))
+    assert database.committed()[-1] == (3,)
+
+def test_full_queue_blocks_caller_and_keeps_table_order():
+    database = FakeDatabase()
+    buffer = make_buffer(database, batch_size=1, max_queue_size=1, max_latency=0.01)
+    buffer.start()
+
+    # 后台线程卡在第一条语句上，第二条占满队列，第三条（同一订单的状态更新）等待空间
+    database.gate.clear()
+    buffer.submit('orders', ORDER_SQL, (1,))
+    assert database.waiting.wait(timeout=5)
+    buffer.submit('orders', ORDER_SQL, (2,))
+    results = []
+    caller = threading.Thread(target=lambda: results.append(buffer.submit('orders', STATUS_SQL, ('FILLED', 2))))
+    caller.start()
+    caller.join(timeout=0.2)
+    assert caller.is_alive()
+    assert database.committed() == []
+
+    database.gate.set()
+    caller.join(timeout=5)
+    buffer.stop()
+    assert results == [True]
+    assert database.committed() == [(1,), (2,), ('FILLED', 2)]
+
+def test_full_queue_rejects_after_submit_timeout():
+    database = FakeDatabase()
+    buffer = make_buffer(database, batch_size=1, max_queue_size=1, max_latency=0.01, submit_timeout=0.1)
+    buffer.start()
+
+    database.gate.clear()
+    buffer.submit('orders', ORDER_SQL, (1,))
+    assert database.waiting.wait(timeout=5)
+    buffer.submit('orders', ORDER_SQL, (2,))
+    assert not buffer.submit('orders', ORDER_SQL, (3,))
+    assert buffer.get_stats()['rejected'] == 1
+
+    database.gate.set()
+    buffer.stop()
+    assert database.committed() == [(1,), (2,)]
+
+def test_durable_write_gives_up_when_database_is_down():
+    database = FakeDatabase(unavailable=10 ** 6)
+    buffer = make_buffer(database, max_latency=0.5, submit_timeout=0.2, durable_tables=['orders'])
+    buffer.start()
+
+    started = time.monotonic()
+    assert not buffer.submit('orders', ORDER_SQL, (1,))
+    assert time.monotonic() - started < 2
+
+    # 超时的写入已移出队列，数据库恢复后也不会再写入
+    stats = buffer.get_stats()
+    assert stats['timeouts'] == 1
+    assert stats['queued'] == 0
+    database.unavailable = 0
+    assert buffer.submit('positions', PRICE_SQL, (100.0, 7))
+    buffer.stop()
+    assert database.committed() == [(100.0, 7)]
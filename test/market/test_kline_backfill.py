@@ -0,0 +1,128 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线历史回填测试（使用伪Binance客户端和伪数据库，不需要网络）
+"""
+import os
+import sys
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import pytest
+
+from app.data_collectors.binance_data_collector import INTERVAL_MILLISECONDS
+from app.data_collectors.kline_backfill import (
+    BackfillCheckpoint,
+    backfill_kline_job
+)
+
+class FakeHistoryClient:
+    """返回 [startTime, endTime] 范围内连续K线的伪客户端，可在第N次请求时失败"""
+
+    def __init__(self, interval_ms, fail_on_call=None):
+        self.interval_ms = interval_ms
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+
+    def get_klines(self, symbol, interval, limit, startTime=None, endTime=None):
+        self.calls += 1
+        if self.fail_on_call == self.calls:
+            raise RuntimeError("network down")
+        klines = []
+        open_ms = startTime
+        while open_ms <= endTime and len(klines) < limit:
+            klines.append([open_ms, "1", "2", "0.5", "1.5", "10", open_ms + self.interval_ms - 1,
+                           "15", 3, "4", "6", "0"])
+            open_ms += self.interval_ms
+        return klines
+
+class FakeDatabaseManager:
+    """fail_calls 大于0时每次写入让最后一行失败并减一"""
+
+    def __init__(self, fail_calls=0):
+        self.rows = {}
+        self.fail_calls = fail_calls
+
+    def bulk_upsert(self, table, columns, rows, update_columns=None, chunk_size=500):
+        failed_rows = []
+        if self.fail_calls:
+            self.fail_calls -= 1
+            failed_rows = [(len(rows) - 1, "Data too long")]
+            rows = rows[:-1]
+        for row in rows:
+            self.rows[(row['trading_pair'], row['interval_type'], row['timestamp'])] = row
+        return len(rows), failed_rows
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    interval_ms = INTERVAL_MILLISECONDS['1m']
+    start = datetime.datetime(2024, 1, 1)
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = start_ms + 2499 * interval_ms
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    db_manager = FakeDatabaseManager()
+
+    failing_client = FakeHistoryClient(interval_ms, fail_on_call=2)
+    with pytest.raises(RuntimeError):
+        backfill_kline_job(failing_client, db_manager, BackfillCheckpoint(checkpoint_file),
+                           'BTCUSDT', '1m', start_ms, end_ms)
+    assert len(db_manager.rows) == 1000
+
+    client = FakeHistoryClient(interval_ms)
+    written = backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                                 'BTCUSDT', '1m', start_ms, end_ms)
+
+    assert written == 1500
+    assert client.calls == 2
+    assert len(db_manager.rows) == 2500
+
+    # 已完成的任务再次运行时直接跳过
+    assert backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                              'BTCUSDT', '1m', start_ms, end_ms) == 0
+    assert client.calls == 2
+
+def test_resume_keeps_checkpoint_when_end_time_moves(tmp_path):
+    interval_ms = INTERVAL_MILLISECONDS['1m']
+    start_ms = int(datetime.datetime(2024, 1, 1).timestamp() * 1000)
+    end_ms = start_ms + 2499 * interval_ms
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    db_manager = FakeDatabaseManager()
+
+    with pytest.raises(RuntimeError):
+        backfill_kline_job(FakeHistoryClient(interval_ms, fail_on_call=2), db_manager,
+                           BackfillCheckpoint(checkpoint_file), 'BTCUSDT', '1m', start_ms, end_ms)
+
+    # 未指定截止日期时重新运行的截止时间更晚：从检查点继续并延长到新的截止时间
+    client = FakeHistoryClient(interval_ms)
+    written = backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                                 'BTCUSDT', '1m', start_ms, end_ms + 100 * interval_ms)
+    assert written == 1600
+    assert len(db_manager.rows) == 2600
+    assert BackfillCheckpoint(checkpoint_file).get(f"BTCUSDT|1m|{start_ms}")['end_time'] == end_ms + 100 * interval_ms
+
+    # 已完成到更晚的截止时间，较早的截止时间直接跳过；更晚的截止时间只回填新增的部分
+    assert backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                              'BTCUSDT', '1m', start_ms, end_ms) == 0
+    assert backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                              'BTCUSDT', '1m', start_ms, end_ms + 150 * interval_ms) == 50
+
+def test_failed_rows_stop_the_job_before_checkpoint(tmp_path):
+    interval_ms = INTERVAL_MILLISECONDS['1m']
+    start_ms = int(datetime.datetime(2024, 1, 1).timestamp() * 1000)
+    end_ms = start_ms + 1499 * interval_ms
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    db_manager = FakeDatabaseManager(fail_calls=1)
+
+    with pytest.raises(RuntimeError):
+        backfill_kline_job(FakeHistoryClient(interval_ms), db_manager,
+                           BackfillCheckpoint(checkpoint_file), 'BTCUSDT', '1m', start_ms, end_ms)
+    assert BackfillCheckpoint(checkpoint_file).get(f"BTCUSDT|1m|{start_ms}") is None
+
+    # 重新运行时重试失败的页
+    client = FakeHistoryClient(interval_ms)
+    assert backfill_kline_job(client, db_manager, BackfillCheckpoint(checkpoint_file),
+                              'BTCUSDT', '1m', start_ms, end_ms) == 1500
+    assert len(db_manager.rows) == 1500
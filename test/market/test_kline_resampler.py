@@ -0,0 +1,106 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线重采样测试（纯计算，不需要数据库和网络）
+"""
+import os
+import sys
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import pytest
+
+from app.data_processors.kline_resampler import can_resample, cross_check_due, resample_klines
+
+MINUTE_MS = 60 * 1000
+# 2024-01-01 00:00:00 UTC
+DAY_START_MS = 1704067200000
+
+def make_minute_klines(start_ms, count, skip=()):
+    """生成连续的1分钟K线，第i根的价格和成交量都与i相关，便于核对聚合结果"""
+    klines = []
+    for i in range(count):
+        if i in skip:
+            continue
+        klines.append({
+            'trading_pair': 'BTCUSDT',
+            'interval_type': '1m',
+            'timestamp': datetime.datetime.fromtimestamp((start_ms + i * MINUTE_MS) / 1000).strftime("%Y-%m-%d %H:%M:%S"),
+            'open_price': 100.0 + i,
+            'high_price': 101.0 + i,
+            'low_price': 99.0 + i,
+            'close_price': 100.5 + i,
+            'volume': 1.0,
+            'quote_asset_volume': 100.0 + i,
+            'number_of_trades': 2,
+            'taker_buy_base_volume': 0.5,
+            'taker_buy_quote_volume': 50.0
+        })
+    return klines
+
+def test_can_resample():
+    assert can_resample('5m')
+    assert can_resample('1d')
+    assert not can_resample('1m')
+    assert not can_resample('1M')
+
+def test_resample_to_5m_aggregates_every_field():
+    klines = make_minute_klines(DAY_START_MS, 10)
+
+    resampled = resample_klines(klines, '5m', now_ms=DAY_START_MS + 10 * MINUTE_MS)
+
+    assert len(resampled) == 2
+    first, second = resampled
+    assert first['interval_type'] == '5m'
+    assert first['timestamp'] == klines[0]['timestamp']
+    assert first['open_price'] == 100.0
+    assert first['high_price'] == 105.0
+    assert first['low_price'] == 99.0
+    assert first['close_price'] == 104.5
+    assert first['volume'] == 5.0
+    assert first['quote_asset_volume'] == sum(100.0 + i for i in range(5))
+    assert first['number_of_trades'] == 10
+    assert first['taker_buy_base_volume'] == 2.5
+    assert first['taker_buy_quote_volume'] == 250.0
+    assert second['timestamp'] == klines[5]['timestamp']
+    assert second['open_price'] == 105.0
+    assert second['close_price'] == 109.5
+
+def test_resample_accepts_unordered_and_duplicate_rows():
+    klines = make_minute_klines(DAY_START_MS, 5)
+    shuffled = [klines[3], klines[0], klines[4], klines[1], klines[2], dict(klines[4], close_price=200.0)]
+
+    resampled = resample_klines(shuffled, '5m', now_ms=DAY_START_MS + 5 * MINUTE_MS)
+
+    assert len(resampled) == 1
+    assert resampled[0]['open_price'] == 100.0
+    assert resampled[0]['close_price'] == 200.0
+    assert resampled[0]['volume'] == 5.0
+
+def test_open_bucket_may_be_partial():
+    klines = make_minute_klines(DAY_START_MS, 90)
+
+    resampled = resample_klines(klines, '1h', now_ms=DAY_START_MS + 90 * MINUTE_MS)
+
+    assert len(resampled) == 2
+    assert resampled[1]['volume'] == 30.0
+
+@pytest.mark.parametrize('skip, now_offset', [
+    ((2,), 10),        # 已收盘桶中间缺一分钟
+    ((0,), 10),        # 桶的第一分钟缺失
+    ((), 60)           # 已收盘的桶只覆盖了一部分
+])
+def test_incomplete_bucket_returns_none(skip, now_offset):
+    klines = make_minute_klines(DAY_START_MS, 10, skip=skip)
+
+    assert resample_klines(klines, '1h' if now_offset == 60 else '5m',
+                           now_ms=DAY_START_MS + now_offset * MINUTE_MS) is None
+
+def test_cross_check_due_respects_interval():
+    assert not cross_check_due('BTCUSDT', '1h', 0)
+    assert cross_check_due('XYZUSDT', '1h', 24)
+    assert not cross_check_due('XYZUSDT', '1h', 24)
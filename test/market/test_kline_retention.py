@@ -0,0 +1,163 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线分区维护和保留策略测试（使用伪数据库，不需要真实MySQL）
+"""
+import os
+import sys
+import datetime
+from contextlib import contextmanager
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.database.migrations import MIGRATIONS_DIR
+from app.data_processors.kline_retention import (
+    FIRST_PARTITION_MONTH,
+    add_months,
+    apply_kline_retention,
+    ensure_future_partitions,
+    missing_rollups,
+    partition_definitions,
+    partition_month
+)
+
+HOUR = 3600
+DAY = 24 * HOUR
+TODAY = datetime.date(2026, 10, 17)
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+class FakeConnection:
+    def commit(self):
+        pass
+
+class FakeDatabaseManager:
+    """
+    partitions: [(分区名, 字节数)]
+    base_buckets: {分区名: {周期秒数: [(交易对, 时间桶)]}}
+    rollups: {周期: [(交易对, 时间桶)]}
+    """
+
+    def __init__(self, partitions, base_buckets=None, rollups=None):
+        self.partitions = partitions
+        self.base_buckets = base_buckets or {}
+        self.rollups = rollups or {}
+        self.statements = []
+
+    def execute_query(self, query, params=None, dictionary=False):
+        if 'information_schema.PARTITIONS' in query:
+            return [(name, 1000, size) for name, size in self.partitions]
+        if 'PARTITION (' in query:
+            partition = query.split('PARTITION (')[1].split(')')[0]
+            return self.base_buckets.get(partition, {}).get(params[0], [])
+        return self.rollups.get(params[1], [])
+
+    def execute_update(self, query, params=None):
+        self.statements.append(query)
+        return 0
+
+    @contextmanager
+    def get_connection(self, dictionary=False, connect_timeout=5):
+        yield FakeConnection(), FakeCursor(self.statements)
+
+def buckets(month, seconds, count):
+    """月初开始的count个时间桶"""
+    start = int(datetime.datetime.combine(month, datetime.time()).timestamp()) // seconds
+    return [('BTCUSDT', start + offset) for offset in range(count)]
+
+def test_month_partitions_and_migration_agree():
+    assert add_months(datetime.date(2024, 11, 1), 3) == datetime.date(2025, 2, 1)
+    assert add_months(datetime.date(2024, 1, 1), -1) == datetime.date(2023, 12, 1)
+    assert partition_month('p1m_202402') == datetime.date(2024, 2, 1)
+    assert partition_month('p1m_future') is None
+    assert partition_month('p_coarse_a') is None
+
+    definitions = partition_definitions(FIRST_PARTITION_MONTH, datetime.date(2027, 6, 1))
+    assert definitions[0].startswith('PARTITION p_coarse_a')
+    assert definitions[1] == "PARTITION p1m_201707 VALUES LESS THAN ('1m', '2017-08-01')"
+    assert definitions[-2] == "PARTITION p1m_future VALUES LESS THAN ('1m', MAXVALUE)"
+
+    with open(os.path.join(MIGRATIONS_DIR, '003_partition_kline_data.sql'), encoding='utf-8') as migration_file:
+        migration = migration_file.read()
+    assert all(definition in migration for definition in definitions)
+
+def test_future_partitions_are_split_from_catch_all():
+    db_manager = FakeDatabaseManager([('p_coarse_a', 0), ('p1m_202609', 0), ('p1m_202610', 0),
+                                      ('p1m_future', 0), ('p_coarse_b', 0)])
+
+    created = ensure_future_partitions(db_manager, months_ahead=3, today=TODAY)
+
+    assert created == ['p1m_202611', 'p1m_202612', 'p1m_202701']
+    statement = db_manager.statements[0]
+    assert statement.startswith('ALTER TABLE kline_data REORGANIZE PARTITION p1m_future INTO (')
+    assert "PARTITION p1m_202701 VALUES LESS THAN ('1m', '2027-02-01')" in statement
+    assert statement.endswith("PARTITION p1m_future VALUES LESS THAN ('1m', MAXVALUE))")
+
+    db_manager.partitions.insert(-2, ('p1m_202701', 0))
+    assert ensure_future_partitions(db_manager, months_ahead=3, today=TODAY) == []
+
+def test_unpartitioned_table_is_left_alone():
+    db_manager = FakeDatabaseManager([])
+    assert ensure_future_partitions(db_manager, today=TODAY) == []
+    assert apply_kline_retention(db_manager, 6, ['1h'], today=TODAY)['removed'] == []
+    assert db_manager.statements == []
+
+def test_missing_rollup_buckets_are_counted():
+    month = datetime.date(2024, 1, 1)
+    db_manager = FakeDatabaseManager(
+        [],
+        base_buckets={'p1m_202401': {HOUR: buckets(month, HOUR, 744), DAY: buckets(month, DAY, 31)}},
+        rollups={'1h': buckets(month, HOUR, 740), '1d': buckets(month, DAY, 31)}
+    )
+
+    assert missing_rollups(db_manager, 'p1m_202401', ['1h', '1d']) == {'1h': 4, '1d': 0}
+    assert missing_rollups(db_manager, 'p1m_202402', ['1h']) is None
+
+def make_retention_db():
+    january, february = datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)
+    return FakeDatabaseManager(
+        [('p_coarse_a', 0), ('p1m_202401', 1024 * 1024), ('p1m_202402', 1024 * 1024), ('p1m_202403', 0),
+         ('p1m_202609', 1024 * 1024), ('p1m_future', 0), ('p_coarse_b', 0)],
+        base_buckets={
+            'p1m_202401': {HOUR: buckets(january, HOUR, 744)},
+            'p1m_202402': {HOUR: buckets(february, HOUR, 696)},
+            'p1m_202609': {HOUR: buckets(datetime.date(2026, 9, 1), HOUR, 720)},
+        },
+        rollups={'1h': buckets(january, HOUR, 744) + buckets(february, HOUR, 600)}
+    )
+
+def test_only_rolled_up_partitions_past_retention_are_dropped():
+    db_manager = make_retention_db()
+
+    planned = apply_kline_retention(db_manager, 6, ['1h'], dry_run=True, today=TODAY)
+    assert planned['removed'] == ['p1m_202401']
+    assert db_manager.statements == []
+
+    result = apply_kline_retention(db_manager, 6, ['1h'], mode='drop', today=TODAY)
+
+    # 2月缺少1h K线保留，3月没有1分钟数据不处理，9月还在保留期内
+    assert result['removed'] == ['p1m_202401']
+    assert result['kept'] == {'p1m_202402': {'1h': 96}}
+    assert result['freed_bytes'] == 1024 * 1024
+    assert db_manager.statements == ['ALTER TABLE kline_data DROP PARTITION p1m_202401']
+
+def test_archive_mode_exchanges_partition_before_dropping():
+    db_manager = make_retention_db()
+
+    result = apply_kline_retention(db_manager, 6, ['1h'], mode='archive', today=TODAY)
+
+    assert result['archived'] == {'p1m_202401': 'kline_data_archive_202401'}
+    assert db_manager.statements == [
+        'CREATE TABLE kline_data_archive_202401 LIKE kline_data',
+        'ALTER TABLE kline_data_archive_202401 REMOVE PARTITIONING',
+        'ALTER TABLE kline_data EXCHANGE PARTITION p1m_202401 WITH TABLE kline_data_archive_202401',
+        'ALTER TABLE kline_data DROP PARTITION p1m_202401',
+    ]
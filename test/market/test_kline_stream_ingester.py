@@ -0,0 +1,101 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+K线WebSocket实时写入测试（直接调用消息回调，使用伪数据库，不需要网络）
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.data_collectors.kline_stream_ingester import KlineStreamIngester, parse_kline_event
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeDatabaseManager:
+    """记录写入批次的伪数据库管理器，latest_prices的写入单独记录"""
+
+    def __init__(self):
+        self.batches = []
+        self.latest_prices = []
+
+    def bulk_upsert(self, table, columns, rows, update_columns=None, chunk_size=500):
+        if table == 'latest_prices':
+            self.latest_prices.extend(rows)
+        else:
+            self.batches.append(list(rows))
+        return len(rows), []
+
+def make_message(symbol, interval, open_ms, close, closed):
+    return json.dumps({
+        'stream': f"{symbol.lower()}@kline_{interval}",
+        'data': {
+            'e': 'kline', 'E': open_ms + 1000, 's': symbol,
+            'k': {
+                't': open_ms, 'T': open_ms + 59999, 's': symbol, 'i': interval,
+                'o': '100', 'c': str(close), 'h': '110', 'l': '90', 'v': '5', 'n': 7,
+                'x': closed, 'q': '500', 'V': '2', 'Q': '200'
+            }
+        }
+    })
+
+def make_ingester(batch_size=2, flush_interval=0.05):
+    ingester = KlineStreamIngester(None, DB_CONFIG, ['BTCUSDT'], ['1m'],
+                                   batch_size=batch_size, flush_interval=flush_interval)
+    ingester.db_manager = FakeDatabaseManager()
+    return ingester
+
+def test_parse_kline_event_matches_rest_format():
+    event = json.loads(make_message('BTCUSDT', '1m', 1704067200000, 105, True))['data']
+
+    kline = parse_kline_event(event)
+
+    assert kline['trading_pair'] == 'BTCUSDT'
+    assert kline['interval_type'] == '1m'
+    assert kline['close_price'] == 105.0
+    assert kline['quote_asset_volume'] == 500.0
+    assert kline['number_of_trades'] == 7
+    assert kline['taker_buy_quote_volume'] == 200.0
+    assert kline['is_closed'] is True
+
+def test_open_candle_kept_in_memory_and_closed_candle_written():
+    ingester = make_ingester()
+    ingester.is_running = True
+
+    ingester._on_message(None, make_message('BTCUSDT', '1m', 1704067200000, 101, False))
+    assert ingester.get_open_candle('BTCUSDT', '1m')['close_price'] == 101.0
+    assert ingester.get_stats()['pending'] == 0
+
+    ingester._on_message(None, make_message('BTCUSDT', '1m', 1704067200000, 102, True))
+    assert ingester.get_open_candle('BTCUSDT', '1m') is None
+    assert ingester.get_stats()['pending'] == 1
+    assert 'is_closed' not in ingester._pending[0]
+
+def test_flush_loop_writes_micro_batches_and_drains_on_stop():
+    ingester = make_ingester(batch_size=2, flush_interval=0.05)
+    ingester.is_running = True
+    ingester.flush_thread = threading.Thread(target=ingester._flush_loop, daemon=True)
+    ingester.flush_thread.start()
+
+    for i in range(3):
+        ingester._on_message(None, make_message('BTCUSDT', '1m', 1704067200000 + i * 60000, 100 + i, True))
+
+    time.sleep(0.2)
+    ingester.stop()
+
+    written = [row for batch in ingester.db_manager.batches for row in batch]
+    assert len(written) == 3
+    assert ingester.get_stats()['rows_written'] == 3
+    assert ingester.get_stats()['pending'] == 0
+    # 每个批次写入后更新最新价格，最后一次是最新收盘K线的收盘价
+    assert ingester.db_manager.latest_prices[-1]['price'] == 102.0
+    assert ingester.db_manager.latest_prices[-1]['kline_time'] == written[-1]['timestamp']
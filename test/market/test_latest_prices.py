@@ -0,0 +1,109 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+最新价格表维护和批量查询测试（使用伪数据库，不需要真实MySQL）
+"""
+import os
+import sys
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.data_collectors.binance_data_collector import latest_price_rows
+from app.data_collectors.latest_prices import (
+    LATEST_PRICE_UPDATES,
+    LatestPriceRecorder,
+    get_latest_prices,
+    store_latest_prices
+)
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeDatabaseManager:
+    """记录写入和查询的伪数据库管理器"""
+
+    def __init__(self, query_results=None):
+        self.upserts = []
+        self.queries = []
+        self.query_results = query_results or []
+
+    def bulk_upsert(self, table, columns, rows, update_columns=None, chunk_size=500):
+        self.upserts.append((table, columns, list(rows), update_columns))
+        return len(rows), []
+
+    def execute_query(self, query, params=None, dictionary=False):
+        self.queries.append((query, params))
+        return self.query_results
+
+def kline(pair, interval, timestamp, close, retrieved_at):
+    return {'trading_pair': pair, 'interval_type': interval, 'timestamp': timestamp, 'close_price': close,
+            'high_price': close + 1, 'low_price': close - 1, 'retrieved_at': retrieved_at}
+
+def test_latest_kline_per_pair_with_price_time_capped_at_close():
+    rows = latest_price_rows([
+        kline('BTCUSDT', '1h', '2024-01-01 10:00:00', 100.0, '2024-01-01 10:30:00'),
+        kline('BTCUSDT', '1h', '2024-01-01 09:00:00', 99.0, '2024-01-01 10:30:00'),
+        kline('ETHUSDT', '1h', '2023-06-01 00:00:00', 50.0, '2024-01-01 10:30:00'),
+    ])
+
+    by_pair = {row['trading_pair']: row for row in rows}
+    assert len(rows) == 2
+    # 未收盘的K线：价格时间为获取时间
+    assert by_pair['BTCUSDT']['price'] == 100.0
+    assert by_pair['BTCUSDT']['price_time'] == '2024-01-01 10:30:00'
+    assert by_pair['BTCUSDT']['kline_time'] == '2024-01-01 10:00:00'
+    assert (by_pair['BTCUSDT']['high_price'], by_pair['BTCUSDT']['low_price']) == (101.0, 99.0)
+    # 回填的历史K线：价格时间为收盘时间，不会覆盖更新的价格
+    assert by_pair['ETHUSDT']['price_time'] == '2023-06-01 01:00:00'
+
+def test_conditional_update_assigns_times_after_dependent_columns():
+    columns = list(LATEST_PRICE_UPDATES)
+    assert columns.index('price_time') > max(columns.index('price'), columns.index('price_source'))
+    assert columns[-1] == 'kline_time'
+
+    db_manager = FakeDatabaseManager()
+    assert store_latest_prices(db_manager, [{'trading_pair': 'BTCUSDT', 'price': 1.0}]) == 1
+    assert db_manager.upserts[0][0] == 'latest_prices'
+    assert db_manager.upserts[0][3] is LATEST_PRICE_UPDATES
+    assert store_latest_prices(db_manager, []) == 0
+    assert len(db_manager.upserts) == 1
+
+def test_all_pairs_are_read_with_one_query():
+    db_manager = FakeDatabaseManager(query_results=[
+        {'trading_pair': 'BTCUSDT', 'price': 100.0, 'high_price': 101.0, 'low_price': 99.0}
+    ])
+
+    prices = get_latest_prices(db_manager, ['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+
+    assert list(prices) == ['BTCUSDT']
+    assert len(db_manager.queries) == 1
+    query, params = db_manager.queries[0]
+    assert 'FROM latest_prices' in query and 'IN (%s, %s, %s)' in query
+    assert 'ORDER BY' not in query
+    assert params == ('BTCUSDT', 'ETHUSDT', 'SOLUSDT')
+    assert get_latest_prices(db_manager, []) == {}
+    assert len(db_manager.queries) == 1
+
+def test_recorder_coalesces_ticks_between_flushes():
+    recorder = LatestPriceRecorder(DB_CONFIG)
+    recorder.db_manager = FakeDatabaseManager()
+    tick_time = datetime.datetime(2024, 1, 1, 12, 0, 0).timestamp()
+
+    for price in (100.0, 100.5, 101.0):
+        recorder.record('BTCUSDT', price, tick_time)
+    recorder.record('ETHUSDT', 2000.0, tick_time)
+
+    assert recorder.flush() == 2
+    rows = {row['trading_pair']: row for row in recorder.db_manager.upserts[0][2]}
+    assert rows['BTCUSDT']['price'] == 101.0
+    assert rows['BTCUSDT']['price_time'] == '2024-01-01 12:00:00'
+    assert rows['ETHUSDT']['price_source'] == 'stream'
+    # 价格行不带K线列，不会改动表中的最高/最低价
+    assert 'high_price' not in rows['BTCUSDT']
+    assert recorder.flush() == 0
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+市场资金流向数据获取测试（使用伪Binance客户端，不需要网络）
+"""
+import os
+import sys
+import json
+import threading
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from binance.exceptions import BinanceAPIException
+
+from app.data_collectors.binance_data_collector import fetch_market_fund_flow_data
+
+class FakeMarketClient:
+    def __init__(self, spot_symbols, futures_symbols):
+        self.spot_symbols = spot_symbols
+        self.futures_symbols = futures_symbols
+        self.calls = {'get_ticker': 0, 'futures_mark_price': 0, 'futures_open_interest': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def get_ticker(self, symbols=None):
+        """与Binance一致：symbols中有任何未知交易对时整个请求失败"""
+        self._count('get_ticker')
+        requested = json.loads(symbols) if symbols else self.spot_symbols
+        if any(symbol not in self.spot_symbols for symbol in requested):
+            raise BinanceAPIException(None, 400, '{"code": -1121, "msg": "Invalid symbol."}')
+        return [{'symbol': symbol, 'quoteVolume': '1000', 'priceChangePercent': '1.5', 'volume': '10'}
+                for symbol in requested]
+
+    def futures_mark_price(self):
+        self._count('futures_mark_price')
+        return [{'symbol': symbol, 'lastFundingRate': '0.0001'} for symbol in self.futures_symbols]
+
+    def futures_open_interest(self, symbol):
+        self._count('futures_open_interest')
+        return {'symbol': symbol, 'openInterest': '123.5'}
+
+def test_snapshot_uses_one_ticker_and_one_premium_request():
+    client = FakeMarketClient(['BTCUSDT', 'ETHUSDT', 'SPOTUSDT', 'OTHERUSDT'], ['BTCUSDT', 'ETHUSDT'])
+
+    flows = fetch_market_fund_flow_data(client, ['BTCUSDT', 'ETHUSDT', 'SPOTUSDT'])
+    by_symbol = {flow['crypto_symbol']: flow for flow in flows}
+
+    assert client.calls == {'get_ticker': 1, 'futures_mark_price': 1, 'futures_open_interest': 2}
+    assert set(by_symbol) == {'BTC', 'ETH', 'SPOT'}
+    assert by_symbol['BTC']['funding_rate'] == 0.0001
+    assert by_symbol['BTC']['open_interest'] == 123.5
+    assert by_symbol['SPOT']['funding_rate'] == 0
+    assert by_symbol['SPOT']['open_interest'] == 0
+
+def test_invalid_symbol_falls_back_to_full_market_ticker():
+    client = FakeMarketClient(['BTCUSDT', 'ETHUSDT', 'OTHERUSDT'], ['BTCUSDT'])
+
+    flows = fetch_market_fund_flow_data(client, ['BTCUSDT', 'GONEUSDT', 'ETHUSDT'])
+
+    # 批量请求因GONEUSDT失败后获取全市场行情，有效的交易对仍然返回，未请求的交易对被过滤
+    assert client.calls['get_ticker'] == 2
+    assert sorted(flow['crypto_symbol'] for flow in flows) == ['BTC', 'ETH']
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+Binance请求权重限流器测试（使用伪响应对象，不需要网络）
+"""
+import os
+import sys
+import time
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.data_collectors.binance_rate_limiter import (
+    BinanceRateLimiter,
+    api_family,
+    estimate_request_weight
+)
+
+class FakeResponse:
+    """只包含限流器用到字段的伪响应"""
+
+    def __init__(self, url, used_weight=None, status_code=200, retry_after=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {}
+        if used_weight is not None:
+            self.headers['x-mbx-used-weight-1m'] = str(used_weight)
+        if retry_after is not None:
+            self.headers['Retry-After'] = str(retry_after)
+
+SPOT_URL = 'https://api.binance.com/api/v3/klines'
+FUTURES_URL = 'https://fapi.binance.com/fapi/v1/openInterest'
+
+def test_estimate_request_weight():
+    assert estimate_request_weight(SPOT_URL, {'symbol': 'BTCUSDT'}) == 2
+    assert estimate_request_weight('https://api.binance.com/api/v3/ticker/24hr', {'symbol': 'BTCUSDT'}) == 2
+    assert estimate_request_weight('https://api.binance.com/api/v3/ticker/24hr', {'symbols': '["A","B"]'}) == 2
+    assert estimate_request_weight('https://api.binance.com/api/v3/ticker/24hr', {}) == 80
+    assert estimate_request_weight('https://fapi.binance.com/fapi/v1/premiumIndex', {}) == 10
+    assert estimate_request_weight('https://api.binance.com/api/v3/account', {}) == 20
+    assert estimate_request_weight('https://api.binance.com/api/v3/ping') == 1
+    assert api_family(SPOT_URL) == 'spot'
+    assert api_family(FUTURES_URL) == 'futures'
+
+def test_acquire_throttles_when_bucket_is_empty():
+    limiter = BinanceRateLimiter({'spot': 600}, safety_ratio=1.0)  # 每秒补充10个权重
+
+    started = time.monotonic()
+    limiter.acquire('spot', 600)
+    limiter.acquire('spot', 2)
+    elapsed = time.monotonic() - started
+
+    stats = limiter.get_stats()
+    assert elapsed >= 0.15
+    assert stats['requests'] == 2
+    assert stats['throttled'] == 1
+
+def test_used_weight_header_clamps_available_tokens():
+    limiter = BinanceRateLimiter({'spot': 1000}, safety_ratio=0.8)
+
+    limiter.update_from_response(FakeResponse(SPOT_URL, used_weight=700))
+
+    spot = limiter.get_stats()['spot']
+    assert spot['server_used_weight'] == 700
+    assert spot['available_weight'] <= 101
+    assert spot['paused_seconds'] == 0
+
+def test_backs_off_until_next_window_near_limit():
+    limiter = BinanceRateLimiter({'spot': 1000}, safety_ratio=0.8)
+
+    limiter.update_from_response(FakeResponse(SPOT_URL, used_weight=850))
+
+    stats = limiter.get_stats()
+    assert stats['window_backoffs'] == 1
+    assert 0 < stats['spot']['paused_seconds'] <= 61
+    # 合约接口的额度不受影响
+    assert stats['futures']['paused_seconds'] == 0
+
+def test_rate_limit_response_pauses_by_retry_after():
+    limiter = BinanceRateLimiter()
+
+    limiter.update_from_response(FakeResponse(FUTURES_URL, status_code=429, retry_after=30))
+
+    stats = limiter.get_stats()
+    assert stats['rate_limit_responses'] == 1
+    assert 29 <= stats['futures']['paused_seconds'] <= 30
+    assert stats['futures']['available_weight'] == 0
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+内存仓位簿测试（使用伪数据库，不需要网络）
+"""
+import os
+import sys
+import datetime
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from decimal import Decimal
+
+from app.trading.position_book import PositionBook, calculate_pnl
+from app.trading.position_manager import PositionManager
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeDatabaseManager:
+    """记录多行UPDATE的伪数据库管理器，可设置为写入失败"""
+
+    def __init__(self):
+        self.statements = []
+        self.fail = False
+
+    def execute_update(self, query, params=None):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.statements.append((query, params))
+        return len(params) // 5
+
+def written_rows(query, params):
+    """把CASE形式的多行UPDATE参数还原为[(仓位ID, 当前价格, 未实现盈亏)]"""
+    count = len(params) // 5
+    prices = dict(zip(params[0:2 * count:2], params[1:2 * count:2]))
+    pnls = dict(zip(params[2 * count:4 * count:2], params[2 * count + 1:4 * count:2]))
+    return sorted((position_id, prices[position_id], pnls[position_id]) for position_id in params[4 * count:])
+
+class FakeTickerClient:
+    """返回全市场价格快照的伪Binance客户端"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+
+    def get_symbol_ticker(self, **params):
+        self.calls += 1
+        return [{'symbol': symbol, 'price': str(price)} for symbol, price in self.prices.items()]
+
+def make_position(position_id, trading_pair, position_type='LONG', entry_price='100', quantity='2', minutes_ago=0):
+    return {
+        'id': position_id,
+        'trading_pair': trading_pair,
+        'position_type': position_type,
+        'quantity': Decimal(quantity),
+        'entry_price': Decimal(entry_price),
+        'current_price': Decimal(entry_price),
+        'unrealized_pnl': Decimal('0'),
+        'leverage': Decimal('1.00'),
+        'status': 'OPEN',
+        'open_time': datetime.datetime(2024, 1, 1, 12, 0) - datetime.timedelta(minutes=minutes_ago)
+    }
+
+def test_calculate_pnl():
+    assert calculate_pnl('LONG', 100.0, 110.0, 2.0, 1.0) == 20.0
+    assert calculate_pnl('SHORT', 100.0, 110.0, 2.0, 1.0) == -20.0
+
+def test_mark_price_updates_only_the_symbol_and_coalesces():
+    book = PositionBook()
+    book.load([
+        make_position(1, 'BTCUSDT'),
+        make_position(2, 'BTCUSDT', 'SHORT', minutes_ago=5),
+        make_position(3, 'ETHUSDT')
+    ])
+
+    assert book.mark_price('BTCUSDT', 105.0) == 2
+    assert book.mark_price('BTCUSDT', 110.0) == 2
+    assert book.mark_price('SOLUSDT', 1.0) == 0
+
+    updates = sorted(book.take_dirty())
+    assert updates == [(1, 110.0, 20.0), (2, 110.0, -20.0)]
+    assert book.take_dirty() == []
+    assert [p['id'] for p in book.get_open('BTCUSDT')] == [1, 2]
+
+def test_remove_drops_pending_update():
+    book = PositionBook()
+    book.load([make_position(1, 'BTCUSDT')])
+    book.mark_price('BTCUSDT', 101.0)
+
+    assert book.remove(1)['id'] == 1
+    assert book.take_dirty() == []
+    assert book.get_open() == []
+    assert book.symbols() == []
+
+def test_position_manager_flushes_in_one_batch_and_retries_on_failure():
+    manager = PositionManager(None, DB_CONFIG)
+    manager.db_manager = FakeDatabaseManager()
+    manager.position_book.load([make_position(1, 'BTCUSDT'), make_position(2, 'BTCUSDT', minutes_ago=1)])
+
+    manager.mark_price('BTCUSDT', 101.0)
+    manager.db_manager.fail = True
+    assert manager.flush_position_prices() == 0
+
+    manager.mark_price('BTCUSDT', 102.0)
+    manager.db_manager.fail = False
+    assert manager.flush_position_prices() == 2
+
+    assert len(manager.db_manager.statements) == 1
+    assert written_rows(*manager.db_manager.statements[0]) == [(1, 102.0, 4.0), (2, 102.0, 4.0)]
+    assert manager.get_open_positions('BTCUSDT')[0]['current_price'] == 102.0
+
+    manager.forget_position(1)
+    assert [p['id'] for p in manager.get_open_positions()] == [2]
+
+def test_revalue_all_positions_uses_one_snapshot_and_one_statement():
+    client = FakeTickerClient({'BTCUSDT': 110.0, 'ETHUSDT': 90.0, 'SOLUSDT': 20.0})
+    manager = PositionManager(client, DB_CONFIG)
+    manager.db_manager = FakeDatabaseManager()
+    positions = [make_position(i, 'BTCUSDT' if i % 2 else 'ETHUSDT', 'SHORT' if i % 3 == 0 else 'LONG')
+                 for i in range(1, 501)]
+    positions.append(make_position(501, 'XRPUSDT'))
+    manager.position_book.load(positions)
+    manager.mark_price('BTCUSDT', 105.0)
+
+    result = manager.revalue_all_positions()
+
+    assert client.calls == 1
+    assert len(manager.db_manager.statements) == 1
+    assert result['updated'] == 500
+    assert result['missing_symbols'] == ['XRPUSDT']
+
+    rows = written_rows(*manager.db_manager.statements[0])
+    expected = [
+        (p['id'], 110.0 if p['trading_pair'] == 'BTCUSDT' else 90.0,
+         calculate_pnl(p['position_type'], 100.0, 110.0 if p['trading_pair'] == 'BTCUSDT' else 90.0, 2.0, 1.0))
+        for p in positions[:500]
+    ]
+    assert rows == expected
+    assert result['total_unrealized_pnl'] == sum(row[2] for row in expected)
+
+    # 已写回的价格不会被后台线程重复写入
+    assert manager.position_book.take_dirty() == []
+    assert manager.get_position(3)['current_price'] == 110.0
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+价格监控分发测试（直接调用WebSocket消息回调，使用伪交易执行器，不需要网络和数据库）
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.price_monitor import PriceMonitor
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class SlowExecutor:
+    """下单耗时较长的伪交易执行器"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.orders = []
+        self.lock = threading.Lock()
+
+    def place_market_order(self, symbol, side, quantity):
+        time.sleep(self.delay)
+        with self.lock:
+            self.orders.append((symbol, side, quantity))
+        return {'orderId': len(self.orders)}
+
+def ticker_message(symbol, price):
+    return json.dumps({'stream': f'{symbol.lower()}@ticker', 'data': {'e': '24hrTicker', 's': symbol, 'c': str(price)}})
+
+def make_monitor(monkeypatch, executor):
+    monitor = PriceMonitor(None, DB_CONFIG, executor, execution_workers=2)
+    closed = []
+    monkeypatch.setattr(monitor, '_start_stream_connections', lambda: None)
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_close_position', lambda position_id, reason: closed.append((position_id, reason)))
+    return monitor, closed
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_reader_does_not_wait_for_order_execution(monkeypatch):
+    executor = SlowExecutor(delay=0.3)
+    monitor, closed = make_monitor(monkeypatch, executor)
+    monitor.add_stop_loss_trigger('BTCUSDT', 1, 95.0, 0.5)
+    monitor.start_monitoring(['BTCUSDT', 'ETHUSDT'])
+
+    try:
+        started = time.monotonic()
+        for _ in range(5):
+            monitor.connections[0]._on_message(None, ticker_message('BTCUSDT', 94.0))
+        monitor.connections[0]._on_message(None, ticker_message('ETHUSDT', 2000.0))
+        assert time.monotonic() - started < 0.1
+
+        # 其他交易对的价格不会被慢订单阻塞
+        assert wait_until(lambda: monitor.get_current_price('ETHUSDT') == 2000.0, timeout=0.2)
+        assert wait_until(lambda: monitor.get_metrics()['executions_completed'] == 1)
+    finally:
+        monitor.stop_monitoring()
+
+    metrics = monitor.get_metrics()
+    assert executor.orders == [('BTCUSDT', 'SELL', 0.5)]
+    assert closed == [(1, 'STOP_LOSS')]
+    assert metrics['executions_submitted'] == 1
+    assert metrics['executions_deduplicated'] >= 1
+    assert metrics['ticks_received'] == metrics['ticks_processed'] == 6
+    assert metrics['in_flight'] == 0
+    assert metrics['queue_depth'] == 0
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    monitor = PriceMonitor(None, DB_CONFIG, SlowExecutor(delay=0), dispatch_queue_size=2)
+
+    for price in (1, 2, 3, 4):
+        monitor.connections[0]._on_message(None, ticker_message('BTCUSDT', price))
+
+    metrics = monitor.get_metrics()
+    assert metrics['queue_depth'] == 2
+    assert metrics['ticks_received'] == 2
+    assert metrics['ticks_dropped'] == 2
+
+def test_stop_with_full_queue_waits_for_dispatch_thread(monkeypatch):
+    executor = SlowExecutor(delay=0)
+    monitor = PriceMonitor(None, DB_CONFIG, executor, dispatch_queue_size=2, execution_workers=1)
+    monkeypatch.setattr(monitor, '_start_stream_connections', lambda: None)
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_close_position', lambda position_id, reason: None)
+    monitor.DISPATCH_POLL_INTERVAL = 0.05
+    monitor.add_stop_loss_trigger('BTCUSDT', 1, 95.0, 0.5)
+
+    # 价格回调卡住分发线程，使停止时分发队列已满
+    gate = threading.Event()
+    monitor.add_price_callback(lambda symbol, price: gate.wait())
+    monitor.start_monitoring(['BTCUSDT'])
+    monitor.connections[0]._on_message(None, ticker_message('BTCUSDT', 100.0))
+    assert wait_until(lambda: monitor.dispatch_queue.empty())
+    for price in (101.0, 94.0):
+        monitor.connections[0]._on_message(None, ticker_message('BTCUSDT', price))
+    assert monitor.dispatch_queue.full()
+
+    dispatch_thread = monitor.dispatch_thread
+    stopper = threading.Thread(target=monitor.stop_monitoring)
+    stopper.start()
+    time.sleep(0.2)
+    gate.set()
+    stopper.join(timeout=10)
+
+    # 分发线程处理完积压的价格后退出，之后才关闭执行线程池，积压中触发的止损仍能提交
+    assert not stopper.is_alive()
+    assert not dispatch_thread.is_alive()
+    assert monitor.execution_pool is None
+    assert monitor.get_metrics()['ticks_processed'] == 3
+    assert executor.orders == [('BTCUSDT', 'SELL', 0.5)]
+
+def test_short_triggers_close_with_buy_orders(monkeypatch):
+    executor = SlowExecutor(delay=0)
+    monitor, closed = make_monitor(monkeypatch, executor)
+    monitor.add_stop_loss_trigger('ETHUSDT', 7, 2100.0, 1.5, 'SHORT')
+    monitor.add_take_profit_trigger('ETHUSDT', 8, 1900.0, 2.0, 'SHORT')
+    monitor.add_stop_loss_trigger('ETHUSDT', 9, 1950.0, 1.0)
+    monitor.start_monitoring(['ETHUSDT'])
+
+    try:
+        monitor.connections[0]._on_message(None, ticker_message('ETHUSDT', 2000.0))
+        monitor.connections[0]._on_message(None, ticker_message('ETHUSDT', 2150.0))
+        assert wait_until(lambda: monitor.get_metrics()['executions_completed'] == 1)
+        monitor.connections[0]._on_message(None, ticker_message('ETHUSDT', 1850.0))
+        assert wait_until(lambda: monitor.get_metrics()['executions_completed'] == 3)
+    finally:
+        monitor.stop_monitoring()
+
+    assert executor.orders[0] == ('ETHUSDT', 'BUY', 1.5)
+    assert sorted(executor.orders[1:]) == [('ETHUSDT', 'BUY', 2.0), ('ETHUSDT', 'SELL', 1.0)]
+    assert sorted(closed) == [(7, 'STOP_LOSS'), (8, 'TAKE_PROFIT'), (9, 'STOP_LOSS')]
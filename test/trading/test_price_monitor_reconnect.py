@@ -0,0 +1,140 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+价格监控断线重连测试（使用伪WebSocket和伪Binance客户端，不需要网络和数据库）
+"""
+import os
+import sys
+import time
+import threading
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading import stream_connection as stream_connection_module
+from app.trading.price_monitor import PriceMonitor
+from app.trading.stream_connection import StreamConnection
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeTickerClient:
+    """返回全市场价格快照的伪Binance客户端"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+
+    def get_symbol_ticker(self, **params):
+        self.calls += 1
+        return [{'symbol': symbol, 'price': str(price)} for symbol, price in self.prices.items()]
+
+class FlakyWebSocketApp:
+    """前几次连接建立后立即断开，之后保持连接直到被关闭的伪WebSocketApp"""
+
+    drops = 2
+    instances = []
+
+    def __init__(self, url, on_message=None, on_error=None, on_close=None, on_open=None):
+        self.url = url
+        self.on_open = on_open
+        self.on_close = on_close
+        self.sent = []
+        self.closed = threading.Event()
+        FlakyWebSocketApp.instances.append(self)
+
+    def run_forever(self, **kwargs):
+        self.on_open(self)
+        if len(FlakyWebSocketApp.instances) > FlakyWebSocketApp.drops:
+            self.closed.wait(5)
+        self.on_close(self, None, None)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        self.closed.set()
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.close_calls = 0
+
+    def send(self, message):
+        pass
+
+    def close(self):
+        self.close_calls += 1
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_reconnects_with_backoff_and_refreshes_prices_over_rest(monkeypatch):
+    FlakyWebSocketApp.instances = []
+    monkeypatch.setattr(stream_connection_module.websocket, 'WebSocketApp', FlakyWebSocketApp)
+
+    client = FakeTickerClient({'BTCUSDT': 94.0, 'ETHUSDT': 2000.0})
+    monitor = PriceMonitor(client, DB_CONFIG, None, reconnect_interval=0.05)
+    monitor.connections[0].RECONNECT_BASE_DELAY = 0.01
+    monitor.connections[0].CONTROL_MESSAGE_INTERVAL = 0
+    closed = []
+
+    def execute_stop_loss(symbol, position_id, quantity, position_type):
+        closed.append(position_id)
+        monitor.remove_triggers_for_position(symbol, position_id)
+
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_execute_stop_loss', execute_stop_loss)
+    monitor.add_stop_loss_trigger('BTCUSDT', 1, 95.0, 0.5)
+
+    monitor.start_monitoring(['BTCUSDT'])
+    try:
+        assert wait_until(lambda: monitor.get_metrics()['connects'] == 3)
+        assert wait_until(lambda: closed == [1])
+    finally:
+        monitor.stop_monitoring()
+
+    metrics = monitor.get_metrics()
+    assert metrics['disconnects'] == 2
+    assert metrics['rest_price_refreshes'] == 3
+    assert monitor.get_current_price('BTCUSDT') == 94.0
+    assert monitor.get_current_price('ETHUSDT') is None
+    assert len(FlakyWebSocketApp.instances) == 3
+    assert all('"SUBSCRIBE"' in ws.sent[0] for ws in FlakyWebSocketApp.instances)
+
+def test_reconnect_delay_is_jittered_and_capped():
+    connection = StreamConnection('test', on_event=lambda stream, event, received_at: None, reconnect_interval=30)
+
+    for attempt in range(10):
+        ceiling = min(30, 2 ** attempt)
+        delays = [connection.reconnect_delay(attempt) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+
+def test_stale_stream_and_rollover_force_reconnect():
+    monitor = PriceMonitor(None, DB_CONFIG, None, stale_timeout=60, max_connection_age=3600)
+    connection = monitor.connections[0]
+    connection.ws = RecordingWebSocket()
+    monitor.subscribe_symbols(['BTCUSDT'])
+
+    connection._on_open(connection.ws)
+    now = connection._connected_at
+    assert connection.check_health(now + 30) is None
+    assert connection.check_health(now + 61) == 'stale'
+    assert connection.ws.close_calls == 1
+    assert connection._forced_reconnect
+
+    connection._on_open(connection.ws)
+    connection._last_message_at = connection._connected_at + 3600
+    assert connection.check_health(connection._connected_at + 3601) == 'rollover'
+
+    metrics = monitor.get_metrics()
+    assert metrics['stale_reconnects'] == 1
+    assert metrics['rollover_reconnects'] == 1
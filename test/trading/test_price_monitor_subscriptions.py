@@ -0,0 +1,122 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+价格监控组合流订阅和多连接分摊测试（使用伪WebSocket连接，不需要网络和数据库）
+"""
+import os
+import sys
+import json
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.price_monitor import PriceMonitor
+from app.trading.stream_connection import StreamConnection
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeWebSocket:
+    """记录发送的控制消息的伪WebSocket连接，可共用一个日志以检查多个连接之间的顺序"""
+
+    def __init__(self, name='ws', log=None):
+        self.name = name
+        self.sent = []
+        self.log = log if log is not None else []
+
+    def send(self, message):
+        message = json.loads(message)
+        self.sent.append(message)
+        self.log.append((self.name, message['method'], message['params']))
+
+def make_connected(symbols, events=None):
+    connection = StreamConnection('test', on_event=lambda stream, event, received_at: events.append(event))
+    connection.CONTROL_MESSAGE_INTERVAL = 0
+    connection.symbols = set(symbols)
+    connection.ws = FakeWebSocket()
+    connection._on_open(connection.ws)
+    return connection
+
+def connect_all(monitor, log):
+    for connection in monitor.connections:
+        connection.CONTROL_MESSAGE_INTERVAL = 0
+        connection.ws = FakeWebSocket(connection.name, log)
+        connection._on_open(connection.ws)
+
+def test_open_subscribes_all_symbols_of_the_connection():
+    connection = make_connected(['BTCUSDT', 'ETHUSDT'])
+
+    assert connection.ws.sent == [{'method': 'SUBSCRIBE', 'params': ['btcusdt@ticker', 'ethusdt@ticker'], 'id': 1}]
+
+def test_subscribe_and_unsubscribe_send_control_messages_without_reconnect():
+    events = []
+    connection = make_connected(['BTCUSDT'], events)
+    ws = connection.ws
+
+    assert connection.subscribe(['BTCUSDT', 'SOLUSDT']) == ['SOLUSDT']
+    assert connection.subscribe(['SOLUSDT']) == []
+    connection._on_message(ws, json.dumps({
+        'stream': 'btcusdt@ticker', 'data': {'e': '24hrTicker', 's': 'BTCUSDT', 'c': '100.5'}
+    }))
+    assert connection.unsubscribe(['BTCUSDT']) == ['BTCUSDT']
+
+    assert connection.ws is ws
+    assert ws.sent[1:] == [
+        {'method': 'SUBSCRIBE', 'params': ['solusdt@ticker'], 'id': 2},
+        {'method': 'UNSUBSCRIBE', 'params': ['btcusdt@ticker'], 'id': 3}
+    ]
+    assert connection.get_symbols() == ['SOLUSDT']
+
+    # 控制消息的响应不会作为行情事件转发
+    for request_id in (1, 2, 3):
+        connection._on_message(ws, json.dumps({'result': None, 'id': request_id}))
+    assert events == [{'e': '24hrTicker', 's': 'BTCUSDT', 'c': '100.5'}]
+    assert connection.get_stats()['pending_control_requests'] == 0
+
+def test_symbols_added_while_disconnected_are_subscribed_on_open():
+    connection = StreamConnection('test', on_event=lambda stream, event, received_at: None)
+    connection.CONTROL_MESSAGE_INTERVAL = 0
+    connection.ws = FakeWebSocket()
+
+    connection.subscribe(['ETHUSDT'])
+    assert connection.ws.sent == []
+
+    connection._on_open(connection.ws)
+    assert connection.ws.sent == [{'method': 'SUBSCRIBE', 'params': ['ethusdt@ticker'], 'id': 1}]
+
+def test_monitor_spreads_symbols_across_connections_and_rebalances():
+    monitor = PriceMonitor(None, DB_CONFIG, None, stream_connections=3)
+    log = []
+    connect_all(monitor, log)
+    symbols = [f'S{i:02d}USDT' for i in range(9)]
+
+    monitor.subscribe_symbols(symbols)
+    assert [len(connection) for connection in monitor.connections] == [3, 3, 3]
+    assert sorted(s for connection in monitor.connections for s in connection.get_symbols()) == symbols
+
+    # 清空第一个连接后，其他连接的交易对迁移过来，先订阅再取消
+    del log[:]
+    monitor.unsubscribe_symbols(monitor.connections[0].get_symbols())
+    loads = [len(connection) for connection in monitor.connections]
+    assert max(loads) - min(loads) <= 1 and sum(loads) == 6
+    moved = [params for name, method, params in log if name == 'shard-0' and method == 'SUBSCRIBE']
+    assert len(moved) == 2
+    for params in moved:
+        subscribed_at = log.index(('shard-0', 'SUBSCRIBE', params))
+        assert any(method == 'UNSUBSCRIBE' and other_params == params and index > subscribed_at
+                   for index, (name, method, other_params) in enumerate(log))
+    assert monitor.get_metrics()['rebalanced_symbols'] == 2
+
+def test_monitor_adds_connection_when_all_are_full():
+    monitor = PriceMonitor(None, DB_CONFIG, None, stream_connections=1, max_streams_per_connection=2)
+
+    monitor.subscribe_symbols(['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT', 'EUSDT'])
+
+    assert [len(connection) for connection in monitor.connections] == [2, 2, 1]
+    metrics = monitor.get_metrics()
+    assert metrics['subscribed_symbols'] == 5
+    assert len(metrics['connections']) == 3
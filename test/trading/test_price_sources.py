@@ -0,0 +1,131 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+价格来源选择和按多空方向判断触发器的测试（直接调用行情事件回调，不需要网络和数据库）
+"""
+import os
+import sys
+import time
+import json
+
+import pytest
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.price_monitor import PriceMonitor, parse_price_frame
+from app.trading.trigger_book import TriggerBook, STOP_LOSS, TAKE_PROFIT, LONG, SHORT
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(json.loads(message))
+
+def drain(monitor):
+    ticks = []
+    while not monitor.dispatch_queue.empty():
+        ticks.append(monitor.dispatch_queue.get_nowait())
+    return ticks
+
+def test_stream_names_follow_the_symbol_price_source():
+    monitor = PriceMonitor(None, DB_CONFIG, None, price_source='aggTrade',
+                           symbol_price_sources={'BTCUSDT': 'bookTicker'})
+    connection = monitor.connections[0]
+    connection.CONTROL_MESSAGE_INTERVAL = 0
+    connection.ws = FakeWebSocket()
+    monitor.subscribe_symbols(['BTCUSDT', 'ETHUSDT'])
+
+    connection._on_open(connection.ws)
+
+    assert connection.ws.sent[0]['params'] == ['btcusdt@bookTicker', 'ethusdt@aggTrade']
+
+def test_unknown_price_source_is_rejected():
+    with pytest.raises(ValueError):
+        PriceMonitor(None, DB_CONFIG, None, symbol_price_sources={'BTCUSDT': 'depth'})
+
+def test_events_are_decoded_into_bid_and_ask():
+    monitor = PriceMonitor(None, DB_CONFIG, None)
+    now = int(time.time() * 1000)
+
+    monitor._on_stream_event('btcusdt@bookTicker', {'u': 1, 's': 'BTCUSDT', 'b': '99.0', 'B': '1', 'a': '101.0', 'A': '1'}, 1.0)
+    monitor._on_stream_event('ethusdt@aggTrade', {'e': 'aggTrade', 'E': now, 's': 'ETHUSDT', 'p': '2000.5', 'q': '1'}, 2.0)
+    monitor._on_stream_event('solusdt@ticker', {'e': '24hrTicker', 'E': now, 's': 'SOLUSDT', 'c': '20', 'b': '19.9', 'a': '20.1'}, 3.0)
+    monitor._on_stream_event('btcusdt@depth', {'e': 'depthUpdate', 's': 'BTCUSDT'}, 4.0)
+
+    assert drain(monitor) == [
+        ('BTCUSDT', 100.0, 99.0, 101.0, 1.0, 'bookTicker', None),
+        ('ETHUSDT', 2000.5, 2000.5, 2000.5, 2.0, 'aggTrade', now),
+        ('SOLUSDT', 20.0, 19.9, 20.1, 3.0, 'ticker', now)
+    ]
+
+def test_long_triggers_use_bid_and_short_triggers_use_ask():
+    book = TriggerBook()
+    book.add('BTCUSDT', 1, STOP_LOSS, 99.5, 1.0, LONG)
+    book.add('BTCUSDT', 2, STOP_LOSS, 100.5, 1.0, SHORT)
+    book.add('BTCUSDT', 3, TAKE_PROFIT, 100.2, 1.0, LONG)
+
+    # 中间价100.0时两个止损都未穿越，但买一价已跌破多头止损、卖一价已涨破空头止损
+    assert book.crossed('BTCUSDT', 100.0) == []
+    hits = book.crossed('BTCUSDT', 99.4, 100.6)
+    assert sorted(trigger['position_id'] for trigger in hits) == [1, 2]
+
+def test_source_latency_is_measured_from_event_time(monkeypatch):
+    monitor = PriceMonitor(None, DB_CONFIG, None)
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_start_stream_connections', lambda: None)
+    monitor.start_monitoring(['BTCUSDT'])
+    try:
+        monitor._on_stream_event('btcusdt@aggTrade', {'e': 'aggTrade', 'E': int(time.time() * 1000) - 50,
+                                                      's': 'BTCUSDT', 'p': '100'}, time.monotonic())
+        monitor._on_stream_event('btcusdt@bookTicker', {'u': 1, 's': 'BTCUSDT', 'b': '99', 'a': '101'}, time.monotonic())
+        deadline = time.monotonic() + 2
+        while monitor.get_metrics()['ticks_processed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        monitor.stop_monitoring()
+
+    sources = monitor.get_metrics()['sources']
+    assert sources['aggTrade']['ticks'] == 1
+    assert 50 <= sources['aggTrade']['avg_latency_ms'] < 1000
+    assert sources['bookTicker'] == {'ticks': 1, 'last_latency_ms': 0.0, 'max_latency_ms': 0.0, 'avg_latency_ms': 0.0}
+    assert monitor.get_current_price('BTCUSDT') == 100.0
+
+def compact(payload):
+    return json.dumps(payload, separators=(',', ':'))
+
+def test_fast_frame_parsing_matches_full_decode():
+    now = int(time.time() * 1000)
+    frames = [
+        compact({'stream': 'btcusdt@bookTicker', 'data': {'u': 1, 's': 'BTCUSDT', 'b': '99.0', 'B': '1', 'a': '101.0', 'A': '1'}}),
+        compact({'stream': 'ethusdt@aggTrade', 'data': {'e': 'aggTrade', 'E': now, 's': 'ETHUSDT', 'a': 7, 'p': '2000.5', 'q': '1', 'm': True}}),
+        compact({'stream': 'solusdt@ticker', 'data': {'e': '24hrTicker', 'E': now, 's': 'SOLUSDT', 'x': '19', 'c': '20', 'b': '', 'a': '20.1', 'n': 5}}),
+        compact({'e': 'aggTrade', 'E': now, 's': 'BNBUSDT', 'p': '300'}),
+        compact({'stream': 'btcusdt@depth', 'data': {'e': 'depthUpdate', 's': 'BTCUSDT', 'b': [], 'a': []}}),
+        json.dumps({'stream': 'btcusdt@ticker', 'data': {'e': '24hrTicker', 'E': now, 's': 'BTCUSDT', 'c': '100'}}),
+        compact({'result': None, 'id': 1}),
+    ]
+
+    ticks = []
+    for fast_frame_parsing in (False, True):
+        monitor = PriceMonitor(None, DB_CONFIG, None, fast_frame_parsing=fast_frame_parsing)
+        for frame in frames:
+            monitor.connections[0]._on_message(None, frame)
+        ticks.append([tick[:4] + tick[5:] for tick in drain(monitor)])
+
+    assert ticks[0] == ticks[1]
+    assert [tick[0] for tick in ticks[1]] == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'BTCUSDT']
+
+def test_frames_the_fast_path_cannot_read_fall_back_to_full_decode():
+    assert parse_price_frame(compact({'result': None, 'id': 1})) is None
+    assert parse_price_frame(json.dumps({'e': 'aggTrade', 'E': 1, 's': 'BTCUSDT', 'p': '1'})) is None
+    assert parse_price_frame(compact({'e': 'aggTrade', 'E': 1, 's': 'BTCUSDT', 'p': 'abc'})) is None
+    assert parse_price_frame(b'{"e":"aggTrade","s":"BTCUSDT","p":"1"}') is None
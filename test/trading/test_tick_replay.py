@@ -0,0 +1,100 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+行情记录和回放测试（不需要网络和数据库）
+"""
+import os
+import sys
+import json
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.stream_connection import StreamConnection
+from app.trading.tick_recorder import TickRecorder, read_tick_log
+from app.trading.tick_replay import ReplayTradingManager, replay_tick_log
+
+POSITIONS = [
+    {'id': 1, 'trading_pair': 'BTCUSDT', 'position_type': 'LONG', 'quantity': 0.5, 'entry_price': 100.0,
+     'stop_loss_price': 95.0, 'take_profit_price': 120.0},
+    {'id': 2, 'trading_pair': 'BTCUSDT', 'position_type': 'SHORT', 'quantity': 0.2, 'entry_price': 100.0,
+     'stop_loss_price': 104.0, 'take_profit_price': 80.0},
+    {'id': 3, 'trading_pair': 'ETHUSDT', 'position_type': 'LONG', 'quantity': 1.0, 'entry_price': 2000.0,
+     'stop_loss_price': 1900.0, 'take_profit_price': 2100.0},
+]
+
+def ticker_frame(symbol, price):
+    return json.dumps({'stream': f'{symbol.lower()}@ticker',
+                       'data': {'e': '24hrTicker', 'E': 1, 's': symbol, 'c': str(price)}})
+
+def write_log(path, prices, interval_us=1000):
+    recorder = TickRecorder(str(path))
+    for index, (symbol, price) in enumerate(prices):
+        recorder.record('shard-0', ticker_frame(symbol, price), 1_000_000 + index * interval_us)
+    recorder.close()
+
+def test_connection_records_raw_frames(tmp_path):
+    for name in ('ticks.log', 'ticks.log.gz'):
+        path = str(tmp_path / name)
+        recorder = TickRecorder(path)
+        events = []
+        connection = StreamConnection('shard-0', on_event=lambda stream, event, received_at: events.append(event),
+                                      recorder=recorder)
+        frames = [ticker_frame('BTCUSDT', 100.5), json.dumps({'result': None, 'id': 1})]
+        for frame in frames:
+            connection._on_message(None, frame)
+        recorder.close()
+
+        records = list(read_tick_log(path))
+        assert [(connection_name, frame) for _, connection_name, frame in records] == [('shard-0', frame) for frame in frames]
+        assert records[0][0] <= records[1][0]
+        assert len(events) == 1
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / 'ticks.log'
+    write_log(path, [('BTCUSDT', 100.0)])
+    with open(path, 'a', encoding='utf-8') as log_file:
+        log_file.write('2000000\tshard-0\t{"stream": "btcu')
+
+    assert len(list(read_tick_log(str(path)))) == 1
+
+def test_replay_is_deterministic_and_closes_shorts_with_buy(tmp_path):
+    path = tmp_path / 'ticks.log.gz'
+    prices = [('BTCUSDT', 101.0), ('ETHUSDT', 2050.0), ('BTCUSDT', 104.5), ('BTCUSDT', 104.6),
+              ('ETHUSDT', 2101.0), ('BTCUSDT', 97.0)] * 50
+    write_log(path, prices)
+
+    reports = []
+    for _ in range(3):
+        manager = ReplayTradingManager(POSITIONS)
+        reports.append(replay_tick_log(manager, str(path)))
+
+    report = reports[0]
+    assert report['frames'] == report['ticks'] == len(prices)
+    assert report['ticks_dropped'] == 0
+    assert [(decision['position_id'], decision['close_reason']) for decision in report['decisions']] == [
+        (2, 'STOP_LOSS'), (3, 'TAKE_PROFIT')
+    ]
+    assert all(other['decisions'] == report['decisions'] for other in reports[1:])
+    assert sorted((order['symbol'], order['side']) for order in manager.trading_executor.orders) == [
+        ('BTCUSDT', 'BUY'), ('ETHUSDT', 'SELL')
+    ]
+    assert report['trigger_latency_ms']['count'] == 2
+    assert report['open_triggers'] == 2
+
+    # 仓位估值走交易管理器的价格回调，已平仓的仓位从内存中移除
+    remaining = manager.position_manager.get_open_positions()
+    assert [position['id'] for position in remaining] == [1]
+    assert remaining[0]['current_price'] == 97.0
+
+def test_replay_speed_follows_recorded_intervals(tmp_path):
+    path = tmp_path / 'ticks.log'
+    write_log(path, [('BTCUSDT', 100.0)] * 3, interval_us=100_000)
+
+    paced = replay_tick_log(ReplayTradingManager(POSITIONS), str(path), speed=2)
+    fastest = replay_tick_log(ReplayTradingManager(POSITIONS), str(path))
+
+    assert paced['elapsed_seconds'] >= 0.1
+    assert fastest['elapsed_seconds'] < paced['elapsed_seconds']
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+移动止损测试（使用伪数据库，直接调用行情事件回调，不需要网络）
+"""
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.price_monitor import PriceMonitor
+from app.trading.trailing_stop import TrailingStopEngine
+from app.trading.trigger_book import STOP_LOSS, SHORT
+
+DB_CONFIG = {
+    'DB_HOST': 'localhost', 'DB_PORT': 3306, 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'DB_POOL_ENABLED': False
+}
+
+class FakeDatabaseManager:
+    """记录止损价写入的伪数据库管理器"""
+
+    def __init__(self):
+        self.updates = []
+        self.queries = []
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def execute_update(self, query, params=None):
+        with self.lock:
+            self.updates.append(params)
+            self.queries.append(query)
+            self.threads.append(threading.current_thread().name)
+        return 1
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_long_stop_only_ratchets_up_and_persists_on_step():
+    engine = TrailingStopEngine(trail_percentage=2.0, persist_step_percentage=1.0)
+    assert engine.track('BTCUSDT', 1, 95.0, 1.0) == 95.0
+
+    moves = engine.on_price('BTCUSDT', 100.0)
+    assert [(m['stop_price'], m['persist']) for m in moves] == [(pytest.approx(98.0), True)]
+    assert [m['persist'] for m in engine.on_price('BTCUSDT', 100.5)] == [False]
+    assert engine.on_price('BTCUSDT', 99.0) == []
+    assert [m['persist'] for m in engine.on_price('BTCUSDT', 101.2)] == [True]
+
+    # 数据库中较旧的止损价不会把已上移的止损拉回去
+    assert engine.track('BTCUSDT', 1, 95.0, 1.0) == pytest.approx(101.2 * 0.98)
+
+def test_short_stop_ratchets_down_on_ask():
+    engine = TrailingStopEngine(trail_percentage=2.0, persist_step_percentage=0.0)
+    engine.track('ETHUSDT', 2, 105.0, 1.0, SHORT)
+
+    moves = engine.on_price('ETHUSDT', 99.0, 100.0)
+    assert moves[0]['stop_price'] == pytest.approx(102.0)
+    assert engine.on_price('ETHUSDT', 100.0, 101.0) == []
+
+    engine.untrack('ETHUSDT', 2)
+    assert engine.count() == 0
+
+def test_monitor_moves_trigger_and_fires_on_trailed_stop(monkeypatch):
+    monitor = PriceMonitor(None, DB_CONFIG, None, trailing_stop_percentage=2.0, trailing_stop_step_percentage=1.0)
+    monitor.db_manager = FakeDatabaseManager()
+    closed = []
+
+    def execute_stop_loss(symbol, position_id, quantity, position_type):
+        closed.append(position_id)
+        monitor.remove_triggers_for_position(symbol, position_id)
+
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_start_stream_connections', lambda: None)
+    monkeypatch.setattr(monitor, '_execute_stop_loss', execute_stop_loss)
+    monitor.add_stop_loss_trigger('BTCUSDT', 1, 95.0, 0.5)
+
+    monitor.start_monitoring(['BTCUSDT'])
+    try:
+        for price in (100.0, 100.5, 101.2):
+            monitor._on_stream_event(None, {'e': '24hrTicker', 's': 'BTCUSDT', 'c': str(price)}, time.monotonic())
+        assert wait_until(lambda: monitor.get_metrics()['ticks_processed'] == 3)
+        assert monitor.trigger_book.get('BTCUSDT', 1, STOP_LOSS)['price'] == pytest.approx(101.2 * 0.98)
+
+        # 数据库中的旧止损价重新加载时不会覆盖内存中的止损价
+        monitor.add_stop_loss_trigger('BTCUSDT', 1, 98.0, 0.5)
+        assert monitor.trigger_book.get('BTCUSDT', 1, STOP_LOSS)['price'] == pytest.approx(101.2 * 0.98)
+
+        monitor._on_stream_event(None, {'e': '24hrTicker', 's': 'BTCUSDT', 'c': '99.0'}, time.monotonic())
+        assert wait_until(lambda: closed == [1])
+    finally:
+        monitor.stop_monitoring()
+
+    metrics = monitor.get_metrics()
+    assert metrics['trailing_stop_moves'] == 3
+    assert metrics['trailing_stop_persists'] == 2
+    assert [params[1] for params in monitor.db_manager.updates] == [1, 1]
+    assert monitor.trailing_stops.count() == 0
+
+def test_stop_writes_run_in_order_and_only_tighten(monkeypatch):
+    monitor = PriceMonitor(None, DB_CONFIG, None, trailing_stop_percentage=2.0, trailing_stop_step_percentage=0.0)
+    monitor.db_manager = FakeDatabaseManager()
+    monkeypatch.setattr(monitor, '_monitoring_loop', lambda: None)
+    monkeypatch.setattr(monitor, '_start_stream_connections', lambda: None)
+    monitor.add_stop_loss_trigger('ETHUSDT', 2, 105.0, 1.0, SHORT)
+
+    monitor.start_monitoring(['ETHUSDT'])
+    try:
+        for ask in (100.0, 99.0, 98.0):
+            monitor._on_stream_event(None, {'e': '24hrTicker', 's': 'ETHUSDT', 'c': str(ask), 'b': str(ask - 0.1),
+                                           'a': str(ask)}, time.monotonic())
+        assert wait_until(lambda: monitor.get_metrics()['ticks_processed'] == 3)
+    finally:
+        monitor.stop_monitoring()
+
+    # 写回在单独的单线程执行器中按止损移动的顺序执行，空头止损只在更低时写入
+    database = monitor.db_manager
+    assert [params[0] for params in database.updates] == [pytest.approx(102.0), pytest.approx(100.98),
+                                                         pytest.approx(99.96)]
+    assert all(params[1] == 2 and params[2] == params[0] for params in database.updates)
+    assert all('stop_loss_price > %s' in query for query in database.queries)
+    assert set(database.threads) == {'stop-persist_0'}
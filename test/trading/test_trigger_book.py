@@ -0,0 +1,103 @@
+#!/usr/bin/env python3.11
+# -*- coding: utf-8 -*-
+"""
+止盈止损触发器簿测试（纯内存，不需要数据库和网络）
+"""
+import os
+import sys
+import random
+
+# 确保app目录在Python路径中
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from app.trading.trigger_book import TriggerBook, STOP_LOSS, TAKE_PROFIT, LONG, SHORT
+
+def crossed_ids(book, symbol, price):
+    return [(t['position_id'], t['trigger_type']) for t in book.crossed(symbol, price)]
+
+def test_long_triggers_fire_on_the_right_side():
+    book = TriggerBook()
+    book.add('BTCUSDT', 1, STOP_LOSS, 95.0, 1.0)
+    book.add('BTCUSDT', 1, TAKE_PROFIT, 110.0, 1.0)
+
+    assert crossed_ids(book, 'BTCUSDT', 100.0) == []
+    assert crossed_ids(book, 'BTCUSDT', 95.0) == [(1, STOP_LOSS)]
+    assert crossed_ids(book, 'BTCUSDT', 111.0) == [(1, TAKE_PROFIT)]
+    assert crossed_ids(book, 'ETHUSDT', 1.0) == []
+
+def test_short_triggers_are_mirrored():
+    book = TriggerBook()
+    book.add('BTCUSDT', 2, STOP_LOSS, 105.0, 1.0, SHORT)
+    book.add('BTCUSDT', 2, TAKE_PROFIT, 90.0, 1.0, SHORT)
+
+    assert crossed_ids(book, 'BTCUSDT', 100.0) == []
+    assert crossed_ids(book, 'BTCUSDT', 105.0) == [(2, STOP_LOSS)]
+    assert crossed_ids(book, 'BTCUSDT', 89.0) == [(2, TAKE_PROFIT)]
+
+def test_update_and_remove_reindex_triggers():
+    book = TriggerBook()
+    assert book.add('BTCUSDT', 1, STOP_LOSS, 95.0, 1.0)
+    assert not book.add('BTCUSDT', 1, STOP_LOSS, 95.0, 1.0)
+
+    # 上移止损价后旧价格不再出现在索引中
+    assert book.add('BTCUSDT', 1, STOP_LOSS, 98.0, 1.0)
+    assert crossed_ids(book, 'BTCUSDT', 97.0) == [(1, STOP_LOSS)]
+    assert book.count('BTCUSDT') == 1
+
+    removed = book.remove('BTCUSDT', 1)
+    assert [t['trigger_type'] for t in removed] == [STOP_LOSS]
+    assert book.count() == 0
+    assert crossed_ids(book, 'BTCUSDT', 50.0) == []
+
+def test_matches_linear_scan():
+    random.seed(7)
+    book = TriggerBook()
+    triggers = []
+    for position_id in range(500):
+        position_type = random.choice([LONG, SHORT])
+        trigger_type = random.choice([STOP_LOSS, TAKE_PROFIT])
+        price = round(random.uniform(90, 110), 1)
+        book.add('BTCUSDT', position_id, trigger_type, price, 1.0, position_type)
+        triggers.append((position_id, trigger_type, price, position_type))
+
+    for current_price in [90.0, 95.5, 100.0, 104.3, 110.0]:
+        expected = set()
+        for position_id, trigger_type, price, position_type in triggers:
+            falls = (position_type == LONG) == (trigger_type == STOP_LOSS)
+            if (falls and current_price <= price) or (not falls and current_price >= price):
+                expected.add((position_id, trigger_type))
+
+        hits = book.crossed('BTCUSDT', current_price)
+        assert set((t['position_id'], t['trigger_type']) for t in hits) == expected
+        # 止损排在止盈之前
+        types = [t['trigger_type'] for t in hits]
+        assert types == sorted(types, key=lambda trigger_type: trigger_type != STOP_LOSS)
+
+def test_direction_filter_matches_full_scan_on_a_random_walk():
+    random.seed(11)
+    book = TriggerBook()
+    triggers = {}
+    price = 100.0
+    for tick in range(2000):
+        if tick % 20 == 0:
+            position_id = len(triggers)
+            position_type = random.choice([LONG, SHORT])
+            trigger_type = random.choice([STOP_LOSS, TAKE_PROFIT])
+            trigger_price = round(price * random.uniform(0.97, 1.03), 2)
+            book.add('BTCUSDT', position_id, trigger_type, trigger_price, 1.0, position_type)
+            triggers[(position_id, trigger_type)] = (trigger_price, position_type)
+        if tick % 50 == 25 and triggers:
+            position_id, trigger_type = random.choice(sorted(triggers))
+            book.remove('BTCUSDT', position_id, trigger_type)
+            del triggers[(position_id, trigger_type)]
+
+        price = round(price * random.uniform(0.995, 1.005), 2)
+        expected = set()
+        for (position_id, trigger_type), (trigger_price, position_type) in triggers.items():
+            falls = (position_type == LONG) == (trigger_type == STOP_LOSS)
+            if (falls and price <= trigger_price) or (not falls and price >= trigger_price):
+                expected.add((position_id, trigger_type))
+
+        assert set(crossed_ids(book, 'BTCUSDT', price)) == expected